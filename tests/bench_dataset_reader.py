@@ -0,0 +1,105 @@
+"""Benchmark for reading pages from datasets in the file system data store.
+
+Creates datasets of increasing size and measures the latency and the peak
+resident set size (RSS) for reading the first page of rows. Also measures the
+latency for reading the last page with and without the row offset index, and
+for datasets in columnar format. Each
+measurement runs in a separate process so that the peak RSS is not carried
+over between runs.
+
+Usage: python bench_dataset_reader.py [max_rows]
+"""
+
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from vizier.datastore.base import DatasetRow
+from vizier.datastore.columnar import ColumnarDatasetReader
+from vizier.datastore.columnar import convert_json_file
+from vizier.datastore.reader import DefaultJsonDatasetReader
+
+
+PAGE_SIZE = 25
+
+
+def create_data_file(filename, index_file, row_count):
+    """Write a dataset with the given number of rows to file."""
+    DefaultJsonDatasetReader(filename, index_file=index_file).write(
+        DatasetRow(i, ['Name ' + str(i), i, i * 1.5, 'Some text value'])
+            for i in xrange(row_count)
+    )
+
+
+def read_page(filename, streaming, offset, index_file, queue):
+    """Read a page of rows and report latency (ms) and peak RSS (KB)."""
+    start = time.time()
+    if streaming is None:
+        reader = ColumnarDatasetReader(
+            filename,
+            offset=offset,
+            limit=PAGE_SIZE
+        )
+    else:
+        reader = DefaultJsonDatasetReader(
+            filename,
+            offset=offset,
+            limit=PAGE_SIZE,
+            streaming=streaming,
+            index_file=index_file
+        )
+    with reader.open() as r:
+        rows = [row for row in r]
+    assert len(rows) == PAGE_SIZE
+    elapsed = (time.time() - start) * 1000
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def measure(filename, streaming, offset=0, index_file=None):
+    queue = multiprocessing.Queue()
+    p = multiprocessing.Process(
+        target=read_page,
+        args=(filename, streaming, offset, index_file, queue)
+    )
+    p.start()
+    result = queue.get()
+    p.join()
+    return result
+
+
+if __name__ == '__main__':
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print 'rows\tmode\tpage\tlatency (ms)\tpeak RSS (KB)'
+        row_count = 1000
+        while row_count <= max_rows:
+            filename = os.path.join(tmp_dir, 'data.json')
+            index_file = os.path.join(tmp_dir, 'index.bin')
+            columnar_file = os.path.join(tmp_dir, 'data.col')
+            create_data_file(filename, index_file, row_count)
+            convert_json_file(filename, columnar_file, 4)
+            last_page = row_count - PAGE_SIZE
+            runs = [
+                ('full', False, 0, None),
+                ('streaming', True, 0, None),
+                ('full', False, last_page, None),
+                ('streaming', True, last_page, None),
+                ('indexed', True, last_page, index_file),
+                ('columnar', None, 0, None),
+                ('columnar', None, last_page, None)
+            ]
+            for mode, streaming, offset, index in runs:
+                datafile = columnar_file if streaming is None else filename
+                elapsed, rss = measure(datafile, streaming, offset, index)
+                page = 'first' if offset == 0 else 'last'
+                print '%d\t%s\t%s\t%.2f\t%d' % (
+                    row_count, mode, page, elapsed, rss
+                )
+            row_count *= 10
+    finally:
+        shutil.rmtree(tmp_dir)
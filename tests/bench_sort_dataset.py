@@ -0,0 +1,92 @@
+"""Benchmark for sorting datasets in the file system data store using the
+default VizUAL engine.
+
+Creates datasets of increasing size (from 1M rows up to the given maximum) and
+measures the latency and the peak resident set size (RSS) for sorting the
+dataset on two columns (one in reversed order). The sorted dataset is a row
+view whose position vector is computed by the external merge sort on pairs of
+sort values and row position (see vizier.datastore.sort.sort_positions), i.e.,
+the sort buffer size bounds the memory that is used for sorting. Each
+measurement runs in a separate process so that the peak RSS is not carried
+over between runs.
+
+Usage: python bench_sort_dataset.py [max_rows] [sort_buffer_size]
+"""
+
+import multiprocessing
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.datastore.sort import DEFAULT_SORT_BUFFER_SIZE
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+def create_dataset(base_dir, row_count):
+    """Create a dataset with the given number of rows. Returns the dataset
+    identifier."""
+    columns = [
+        DatasetColumn(0, 'Name'),
+        DatasetColumn(1, 'Age'),
+        DatasetColumn(2, 'Salary')
+    ]
+    rows = (
+        DatasetRow(i, ['Name ' + str((i * 7919) % row_count), i % 97, i * 1.5])
+            for i in xrange(row_count)
+    )
+    return FileSystemDataStore(base_dir).create_dataset(
+        columns=columns,
+        rows=rows
+    ).identifier
+
+
+def sort_dataset(base_dir, identifier, buffer_size, queue):
+    """Sort the dataset and report latency (ms) and peak RSS (KB)."""
+    start = time.time()
+    vizual = DefaultVizualEngine(
+        FileSystemDataStore(base_dir),
+        None,
+        sort_buffer_size=buffer_size
+    )
+    vizual.sort_dataset(identifier, [1, 0], [False, True])
+    elapsed = (time.time() - start) * 1000
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def measure(target, args):
+    queue = multiprocessing.Queue()
+    p = multiprocessing.Process(target=target, args=args + (queue,))
+    p.start()
+    result = queue.get()
+    p.join()
+    return result
+
+
+def run_create(base_dir, row_count, queue):
+    queue.put(create_dataset(base_dir, row_count))
+
+
+if __name__ == '__main__':
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000000
+    if len(sys.argv) > 2:
+        buffer_size = int(sys.argv[2])
+    else:
+        buffer_size = DEFAULT_SORT_BUFFER_SIZE
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print 'rows\tlatency (ms)\tpeak RSS (KB)'
+        for row_count in [1000000, 5000000, 10000000, 50000000]:
+            if row_count > max_rows:
+                break
+            identifier = measure(run_create, (tmp_dir, row_count))
+            elapsed, rss = measure(
+                sort_dataset,
+                (tmp_dir, identifier, buffer_size)
+            )
+            print '%d\t%.2f\t%d' % (row_count, elapsed, rss)
+    finally:
+        shutil.rmtree(tmp_dir)
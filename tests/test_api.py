@@ -6,6 +6,7 @@ import time
 import unittest
 
 from vizier.config import AppConfig, ExecEnv, FileServerConfig
+from vizier.datastore.base import DatasetColumn, DatasetRow
 from vizier.datastore.fs import FileSystemDataStore
 from vizier.datastore.metadata import DatasetMetadata
 from vizier.filestore.base import DefaultFileServer
@@ -141,6 +142,31 @@ class TestWebServiceAPI(unittest.TestCase):
         self.assertIsNone(self.api.get_dataset('someunknonwidentifier'))
         self.assertIsNone(self.api.get_dataset_annotations('someunknonwidentifier'))
 
+    def test_dataset_pagination(self):
+        """Test keyset pagination using row cursors."""
+        ds = self.datastore.create_dataset(
+            columns=[DatasetColumn(0, 'A')],
+            rows=[DatasetRow(i * 2, [i]) for i in range(25)]
+        )
+        page = self.api.get_dataset(ds.identifier, after='18', limit='10')
+        self.assertEquals(page['offset'], 10)
+        self.assertEquals([r['id'] for r in page['rows']], range(20, 40, 2))
+        links = {l['rel'] : l['href'] for l in page['links']}
+        self.assertTrue(links['pagenext'].endswith('?after=38&limit=10'))
+        self.assertTrue(links['pageprev'].endswith('?before=20&limit=10'))
+        page = self.api.get_dataset(ds.identifier, before='20', limit='10')
+        self.assertEquals(page['offset'], 0)
+        self.assertEquals([r['id'] for r in page['rows']], range(0, 20, 2))
+        links = {l['rel'] : l['href'] for l in page['links']}
+        self.assertFalse('pageprev' in links)
+        page = self.api.get_dataset(ds.identifier, after='48', limit='10')
+        self.assertEquals(page['rows'], [])
+        # Page that contains a given row
+        page = self.api.get_dataset(ds.identifier, contains='30', limit='10')
+        self.assertEquals(page['offset'], 10)
+        with self.assertRaises(ValueError):
+            self.api.get_dataset(ds.identifier, after='1', limit='10')
+
     def test_projects(self):
         """Test API calls to create and manipulate projects."""
         # Create a new project
@@ -227,6 +253,12 @@ class TestWebServiceAPI(unittest.TestCase):
         modules = self.api.get_workflow_modules(ph['id'], DEFAULT_BRANCH, -1)
         self.validate_workflow_modules(modules, number_of_modules=1)
         self.assertNotEquals(last_modified, wf['project']['lastModifiedAt'])
+        status = self.api.get_workflow_status(ph['id'], DEFAULT_BRANCH, -1)
+        self.validate_keys(status, ['version', 'status', 'modules', 'links'])
+        self.validate_links(status['links'], ['self', 'workflow'])
+        self.assertEquals(status['status'], 'SUCCESS')
+        self.assertEquals([m['status'] for m in status['modules']], ['SUCCESS'])
+        self.assertIsNone(self.api.get_workflow_status('invalid id', DEFAULT_BRANCH))
         last_modified =  wf['project']['lastModifiedAt']
         # Create a new branch
         time.sleep(1)
@@ -379,7 +411,7 @@ class TestWebServiceAPI(unittest.TestCase):
         self.validate_keys({l['rel'] : l['href'] for l in links}, keys)
 
     def validate_module_handle(self, module):
-        self.validate_keys(module, ['id', 'command', 'text', 'stdout', 'stderr', 'datasets', 'links', 'views'])
+        self.validate_keys(module, ['id', 'command', 'text', 'stdout', 'stderr', 'datasets', 'links', 'views', 'status'])
         self.validate_keys(module['command'], ['type', 'id', 'arguments'])
         self.validate_links(module['links'], ['delete', 'insert', 'replace'])
         for ds in module['datasets']:
@@ -407,14 +439,14 @@ class TestWebServiceAPI(unittest.TestCase):
 
     def validate_workflow_descriptor(self, wf):
         self.validate_keys(wf, ['version', 'links', 'createdAt', 'packageId', 'commandId', 'action', 'statement'])
-        self.validate_links(wf['links'], ['self', 'branch', 'branches', 'append', 'modules'])
+        self.validate_links(wf['links'], ['self', 'branch', 'branches', 'append', 'modules', 'status'])
 
     def validate_workflow_handle(self, wf):
         self.validate_keys(wf,['project', 'branch', 'version', 'createdAt', 'state', 'links', 'readOnly'])
-        self.validate_links(wf['links'], ['self', 'branch', 'branches', 'append', 'modules'])
+        self.validate_links(wf['links'], ['self', 'branch', 'branches', 'append', 'modules', 'status'])
         self.validate_project_descriptor(wf['project'])
         state = wf['state']
-        self.validate_keys(state,['datasets', 'charts', 'hasError', 'moduleCount'])
+        self.validate_keys(state,['datasets', 'charts', 'hasError', 'moduleCount', 'status'])
 
     def validate_workflow_modules(self, wf, number_of_modules=0):
         self.validate_keys(wf,['project', 'branch', 'version', 'modules', 'createdAt', 'links', 'datasets', 'readOnly'])
@@ -0,0 +1,57 @@
+import unittest
+
+from vizier.core.cache import LRUCache, MemoryBudgetCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_lru_cache(self):
+        """Test cache eviction and statistics."""
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEquals(cache.get('a'), 1)
+        # Adding a third entry evicts the least recently used entry 'b'
+        cache.put('c', 3)
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertIsNone(cache.get('b'))
+        self.assertEquals(len(cache), 2)
+        self.assertEquals(cache.hits, 1)
+        self.assertEquals(cache.misses, 1)
+        self.assertEquals(cache.evictions, 1)
+        self.assertEquals(cache.hit_ratio(), 0.5)
+        self.assertTrue(cache.remove('a'))
+        self.assertFalse(cache.remove('a'))
+        cache.clear()
+        self.assertEquals(cache.stats()['entries'], 0)
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+    def test_memory_budget_cache(self):
+        """Test cache eviction based on the size of cached values."""
+        cache = MemoryBudgetCache(100)
+        cache.put('a', 'A', size=40)
+        cache.put('b', 'B', size=40)
+        self.assertEquals(cache.size, 80)
+        cache.get('a')
+        cache.put('c', 'C', size=40)
+        self.assertFalse('b' in cache)
+        self.assertEquals(cache.size, 80)
+        self.assertEquals(cache.evictions, 1)
+        # Values that exceed the budget are not cached
+        cache.put('d', 'D', size=101)
+        self.assertFalse('d' in cache)
+        # Reducing the budget evicts entries
+        cache.set_budget(50)
+        self.assertEquals(len(cache), 1)
+        self.assertTrue('c' in cache)
+        self.assertEquals(cache.stats()['bytes'], 40)
+        cache.remove('c')
+        self.assertEquals(cache.size, 0)
+        with self.assertRaises(ValueError):
+            cache.set_budget(-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
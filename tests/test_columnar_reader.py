@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.columnar import ColumnarDatasetReader, FOOTER_CACHE
+from vizier.datastore.columnar import ColumnarDatasetWriter, convert_json_file
+from vizier.datastore.columnar import decode_block, encode_block
+from vizier.datastore.columnar import is_columnar_file
+from vizier.datastore.columnar import ENC_DICT, ENC_FLOAT, ENC_INT, ENC_JSON
+from vizier.datastore.reader import DefaultJsonDatasetReader
+
+
+JSON_FILE = './data/dataset.json'
+
+
+class TestColumnarReader(unittest.TestCase):
+
+    def setUp(self):
+        """Create temporary data file."""
+        self.filename = tempfile.mkstemp()[1]
+
+    def tearDown(self):
+        """Remove temporary data file."""
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_encodings(self):
+        """Test encoding and decoding of column blocks."""
+        for values, encoding in [
+            ([1, 2, -3, 2 ** 40], ENC_INT),
+            ([1.5, 2.0, -0.25], ENC_FLOAT),
+            ([u'NY', u'NY', u'CA', u'NY'], ENC_DICT),
+            ([u'A', u'B'], ENC_JSON),
+            ([1, None, u'A', 2.5, True], ENC_JSON),
+            ([2 ** 70, 1], ENC_JSON)
+        ]:
+            data, enc = encode_block(values)
+            self.assertEquals(enc, encoding)
+            self.assertEquals(decode_block(data, enc), values)
+
+    def test_read_write(self):
+        """Test writing and reading datasets in columnar format."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B'), DatasetColumn(2, 'C')]
+        rows = [
+            DatasetRow(i * 2, [i, 'Name ' + str(i % 3), None if i % 5 == 0 else i * 1.5])
+                for i in range(100)
+        ]
+        writer = ColumnarDatasetWriter(self.filename, 3, row_group_size=16)
+        self.assertEquals(writer.write(rows), 100)
+        self.assertTrue(is_columnar_file(self.filename))
+        self.assertFalse(is_columnar_file(JSON_FILE))
+        result = self.read_rows(columns=columns)
+        self.assertEquals(len(result), 100)
+        for i in range(100):
+            self.assertEquals(result[i].identifier, rows[i].identifier)
+            self.assertEquals(result[i].values, rows[i].values)
+        # Offset and limit across row group boundaries
+        for offset in [0, 1, 15, 16, 17, 95, 99, 100, 200]:
+            result = self.read_rows(columns=columns, offset=offset, limit=20)
+            self.assertEquals(
+                [r.identifier for r in result],
+                [r.identifier for r in rows[offset:offset+20]]
+            )
+        # Row identifier
+        result = self.read_rows(columns=columns, rowid=42)
+        self.assertEquals(len(result), 1)
+        self.assertEquals(result[0].values, [21, 'Name 0', 31.5])
+        self.assertEquals(self.read_rows(columns=columns, rowid=43), [])
+        # Projection
+        result = self.read_rows(
+            columns=[columns[2], columns[0]],
+            offset=30,
+            limit=2,
+            projection=[2, 0]
+        )
+        self.assertEquals([r.values for r in result], [[None, 30], [46.5, 31]])
+        # The footer is only parsed once
+        hits = FOOTER_CACHE.hits
+        misses = FOOTER_CACHE.misses
+        self.read_rows(columns=columns, offset=50, limit=1)
+        self.assertEquals(FOOTER_CACHE.hits, hits + 1)
+        self.assertEquals(FOOTER_CACHE.misses, misses)
+        # Files that are replaced are not read using the cached footer
+        tmp_file = self.filename + '.tmp'
+        ColumnarDatasetWriter(tmp_file, 3, row_group_size=8).write(rows[:20])
+        os.rename(tmp_file, self.filename)
+        result = self.read_rows(columns=columns, offset=10)
+        self.assertEquals(
+            [r.identifier for r in result],
+            [r.identifier for r in rows[10:20]]
+        )
+
+    def test_convert_and_empty(self):
+        """Test converting Json data files and reading empty datasets."""
+        convert_json_file(JSON_FILE, self.filename, 3)
+        result = self.read_rows()
+        self.assertEquals([r.identifier for r in result], [0, 1])
+        json_rows = DefaultJsonDatasetReader(JSON_FILE).open()
+        for row in result:
+            self.assertEquals(row.values, json_rows.next().values)
+        ColumnarDatasetWriter(self.filename, 3).write([])
+        self.assertEquals(self.read_rows(), [])
+        self.assertEquals(self.read_rows(offset=10), [])
+
+    def read_rows(self, **kwargs):
+        """Read rows from the temporary data file."""
+        with ColumnarDatasetReader(self.filename, **kwargs).open() as reader:
+            return [row for row in reader]
+
+
+if __name__ == '__main__':
+    unittest.main()
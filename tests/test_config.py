@@ -2,6 +2,7 @@ import unittest
 
 from vizier.config import AppConfig, ENGINEENV_DEFAULT, ENGINEENV_MIMIR
 from vizier.config import DEFAULT_ENV_NAME, DEFAULT_ENV_DESC
+from vizier.datastore.cache import DEFAULT_PAGE_CACHE_SIZE
 
 
 class TestConfig(unittest.TestCase):
@@ -32,6 +33,7 @@ class TestConfig(unittest.TestCase):
         self.assertEquals(config.name, 'Vizier Web API')
         self.assertEquals(config.debug, True)
         self.assertEquals(config.logs, '../.env/logs')
+        self.assertEquals(config.defaults.page_cache_size, DEFAULT_PAGE_CACHE_SIZE)
 
     def test_local_file(self):
         """Test reading configuration from local config file.
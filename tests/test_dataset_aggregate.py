@@ -0,0 +1,170 @@
+import os
+import shutil
+import unittest
+
+import vizier.datastore.aggregate as aggregate
+from vizier.datastore.aggregate import hash_aggregate
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.filestore.base import DefaultFileServer
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+DATASTORE_DIR = './env/ds'
+FILESERVER_DIR = './env/fs'
+SPILL_DIR = './env/spill'
+
+
+class TestDatasetAggregate(unittest.TestCase):
+
+    def setUp(self):
+        """Create empty directories for the data store, file server, and
+        partition files."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, SPILL_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+            os.makedirs(d)
+
+    def tearDown(self):
+        """Delete all directories."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, SPILL_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+
+    def test_hash_aggregate(self):
+        """Test hash aggregation in memory and with spilled partitions."""
+        rows = [[i % 50, str(i % 3), i, None if i % 10 == 0 else i] for i in range(3000)]
+        aggregates = [
+            (aggregate.AGG_COUNT, None),
+            (aggregate.AGG_COUNT, 3),
+            (aggregate.AGG_SUM, 2),
+            (aggregate.AGG_MIN, 2),
+            (aggregate.AGG_MAX, 1),
+            (aggregate.AGG_AVG, 2)
+        ]
+        expected = dict()
+        for values in rows:
+            key = (values[0], values[1])
+            if not key in expected:
+                expected[key] = [list(), list()]
+            expected[key][0].append(values[2])
+            if not values[3] is None:
+                expected[key][1].append(values[3])
+        # Aggregate in memory. Groups are in order of first occurrence
+        result = list(hash_aggregate(iter(rows), [0, 1], aggregates))
+        self.assertEquals(len(result), 150)
+        self.assertEquals([r[:2] for r in result[:3]], [[0, '0'], [1, '1'], [2, '2']])
+        for r in result:
+            vals, non_null = expected[(r[0], r[1])]
+            self.assertEquals(r[2:], [
+                len(vals),
+                len(non_null),
+                sum(vals),
+                min(vals),
+                int(r[1]),
+                float(sum(vals)) / len(vals)
+            ])
+        # Aggregate with a small buffer and a recursion depth of two
+        max_depth = aggregate.MAX_SPILL_DEPTH
+        aggregate.MAX_SPILL_DEPTH = 2
+        try:
+            spilled = list(hash_aggregate(
+                iter(rows),
+                [0, 1],
+                aggregates,
+                buffer_size=1000,
+                tmp_dir=SPILL_DIR
+            ))
+        finally:
+            aggregate.MAX_SPILL_DEPTH = max_depth
+        self.assertEquals(sorted(spilled), sorted(result))
+        # All partition files are deleted
+        self.assertEquals(os.listdir(SPILL_DIR), [])
+        # Numeric strings are aggregated as numbers
+        result = list(hash_aggregate(
+            iter([['1'], ['2.5'], [''], ['10']]),
+            [],
+            [(aggregate.AGG_SUM, 0), (aggregate.AGG_MAX, 0)]
+        ))
+        self.assertEquals(result, [[13.5, 10]])
+        # Invalid aggregates and non-numeric values
+        with self.assertRaises(ValueError):
+            list(hash_aggregate(iter(rows), [0], [('median', 1)]))
+        with self.assertRaises(ValueError):
+            list(hash_aggregate(iter(rows), [0], [(aggregate.AGG_SUM, None)]))
+        with self.assertRaises(ValueError):
+            list(hash_aggregate(iter([['A']]), [], [(aggregate.AGG_AVG, 0)]))
+
+    def test_aggregate_dataset(self):
+        """Test aggregating a dataset using the default VizUAL engine."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        vizual = DefaultVizualEngine(
+            datastore,
+            fileserver,
+            aggregate_buffer_size=100
+        )
+        columns = [
+            DatasetColumn(0, 'Name'),
+            DatasetColumn(1, 'Age'),
+            DatasetColumn(2, 'Salary')
+        ]
+        rows = [
+            DatasetRow(0, ['Alice', 23, 35]),
+            DatasetRow(1, ['Bob', 23, 45]),
+            DatasetRow(2, ['Claudia', None, 10]),
+            DatasetRow(3, ['Dave', 33, 30]),
+            DatasetRow(4, ['Eileen', None, 45]),
+            DatasetRow(5, ['Frank', 34, 56])
+        ]
+        ds = datastore.create_dataset(columns=columns, rows=rows)
+        count, ds_id = vizual.aggregate_dataset(
+            ds.identifier,
+            [1],
+            [
+                (aggregate.AGG_COUNT, None, None),
+                (aggregate.AGG_SUM, 2, 'Total'),
+                (aggregate.AGG_MIN, 0, None)
+            ]
+        )
+        self.assertEquals(count, 4)
+        result = datastore.get_dataset(ds_id)
+        self.assertEquals(
+            [col.name for col in result.columns],
+            ['Age', 'count', 'Total', 'min_Name']
+        )
+        self.assertEquals(result.column_counter, 4)
+        groups = dict()
+        for row in result.fetch_rows():
+            groups[row.values[0]] = row.values[1:]
+        self.assertEquals(groups[23], [2, 80, 'Alice'])
+        self.assertEquals(groups[None], [2, 55, 'Claudia'])
+        self.assertEquals(groups[34], [1, 56, 'Frank'])
+        self.assertEquals(
+            sorted([row.identifier for row in result.fetch_rows()]),
+            [0, 1, 2, 3]
+        )
+        # Aggregate all rows without grouping columns
+        count, ds_id = vizual.aggregate_dataset(
+            ds.identifier,
+            [],
+            [(aggregate.AGG_AVG, 2, None)]
+        )
+        self.assertEquals(count, 1)
+        result = datastore.get_dataset(ds_id)
+        self.assertEquals(result.fetch_rows()[0].values, [221 / 6.0])
+        # Unknown columns and aggregate functions
+        with self.assertRaises(ValueError):
+            vizual.aggregate_dataset(ds.identifier, [5], [])
+        with self.assertRaises(ValueError):
+            vizual.aggregate_dataset(ds.identifier, [], [('median', 2, None)])
+        with self.assertRaises(ValueError):
+            vizual.aggregate_dataset(
+                ds.identifier,
+                [],
+                [(aggregate.AGG_SUM, 0, None)]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import shutil
+import unittest
+
+import vizier.datastore.convert as convert
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.columnar import ENC_NULL_FLOAT, ENC_NULL_INT
+from vizier.datastore.columnar import decode_block, encode_block, read_footer
+from vizier.datastore.convert import cast_column, cast_values
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.filestore.base import DefaultFileServer
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+DATASTORE_DIR = './env/ds'
+FILESERVER_DIR = './env/fs'
+
+
+COLUMNS = [
+    DatasetColumn(0, 'Name'),
+    DatasetColumn(1, 'Age'),
+    DatasetColumn(2, 'Salary')
+]
+
+ROWS = [
+    DatasetRow(0, ['Alice', '23', '35.5']),
+    DatasetRow(1, ['Bob', '32', '']),
+    DatasetRow(2, ['Claudia', None, '45']),
+    DatasetRow(3, ['Dave', 'abc', '30.25']),
+    DatasetRow(4, ['Eileen', '7.9', '40'])
+]
+
+
+class TestDatasetConvert(unittest.TestCase):
+
+    def setUp(self):
+        """Create empty directories for the data store and file server."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+            os.makedirs(d)
+
+    def tearDown(self):
+        """Delete all directories."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+
+    def test_cast_values(self):
+        """Test converting batches of values."""
+        self.assertEquals(
+            cast_values(['1', '2', 3.0], convert.DT_INT),
+            ([1, 2, 3], 0)
+        )
+        self.assertEquals(
+            cast_values(['1', None, '', '2.5'], convert.DT_REAL),
+            ([1.0, None, None, 2.5], 0)
+        )
+        self.assertEquals(
+            cast_values(['1', 'A', '2.5', None], convert.DT_INT),
+            ([1, None, 2, None], 1)
+        )
+        self.assertEquals(
+            cast_values([1, 2.5, 'A', None], convert.DT_VARCHAR),
+            ([u'1', u'2.5', 'A', None], 0)
+        )
+        with self.assertRaises(ValueError):
+            cast_values(['1'], 'date')
+        # Batches of rows
+        rows = list(cast_column(iter(ROWS), 1, convert.DT_INT, batch_size=2))
+        self.assertEquals([r.values[1] for r in rows], [23, 32, None, None, 7])
+        self.assertEquals([r.identifier for r in rows], range(5))
+        self.assertEquals(ROWS[0].values[1], '23')
+
+    def test_typed_blocks(self):
+        """Test encoding of numeric blocks with missing values."""
+        for values, encoding in [
+            ([1, None, 3], ENC_NULL_INT),
+            ([None, 2.5, 0.5], ENC_NULL_FLOAT)
+        ]:
+            data, enc = encode_block(values)
+            self.assertEquals(enc, encoding)
+            self.assertEquals(decode_block(data, enc), values)
+        # Blocks with only missing values or mixed types are encoded as Json
+        self.assertEquals(encode_block([None, None])[1], 'json')
+        self.assertEquals(encode_block([1, 'A', None])[1], 'json')
+
+    def test_cast_dataset(self):
+        """Test converting a dataset column using the default VizUAL engine."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        vizual = DefaultVizualEngine(datastore, fileserver)
+        ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        count, ds_id = vizual.cast_column(ds.identifier, 1, convert.DT_INT)
+        self.assertEquals(count, 5)
+        _, ds_id = vizual.cast_column(ds_id, 2, convert.DT_REAL)
+        # The column types are stored with the dataset handle
+        ds = FileSystemDataStore(DATASTORE_DIR).get_dataset(ds_id)
+        self.assertEquals(
+            [col.data_type for col in ds.columns],
+            [None, convert.DT_INT, convert.DT_REAL]
+        )
+        self.assertEquals(
+            [r.values[1:] for r in ds.fetch_rows()],
+            [[23, 35.5], [32, None], [None, 45.0], [None, 30.25], [7, 40.0]]
+        )
+        # Numeric columns are stored as typed arrays
+        with open(ds.datafile, 'rb') as f:
+            group = read_footer(f)['rowGroups'][0]
+        self.assertEquals(
+            [block[2] for block in group['columns'][1:]],
+            [ENC_NULL_INT, ENC_NULL_FLOAT]
+        )
+        # Column types are kept by renaming and converted by cell updates
+        _, ds_id = vizual.rename_column(ds_id, 1, 'Years')
+        _, ds_id = vizual.update_cell(ds_id, 1, 2, '41')
+        ds = datastore.get_dataset(ds_id)
+        self.assertEquals(ds.columns[1].data_type, convert.DT_INT)
+        self.assertEquals(ds.fetch_rows()[2].values[1], 41)
+        # Values that cannot be converted remove the column type
+        _, ds_id = vizual.fill_column(ds_id, 2, 'unknown')
+        ds = datastore.get_dataset(ds_id)
+        self.assertIsNone(ds.columns[2].data_type)
+        self.assertEquals(ds.fetch_rows()[0].values[2], 'unknown')
+        # Deferred conversion
+        vizual = DefaultVizualEngine(datastore, fileserver, defer=True)
+        _, ds_id = vizual.insert_column(ds_id, 0, 'Id')
+        _, ds_id = vizual.cast_column(ds_id, 1, convert.DT_VARCHAR)
+        ds = datastore.get_dataset(ds_id)
+        self.assertEquals(ds.columns[2].data_type, convert.DT_VARCHAR)
+        self.assertEquals(
+            [r.values[2] for r in ds.fetch_rows()],
+            [u'23', u'32', u'41', None, u'7']
+        )
+        # Invalid data types and columns
+        with self.assertRaises(ValueError):
+            vizual.cast_column(ds_id, 1, 'date')
+        with self.assertRaises(ValueError):
+            vizual.cast_column(ds_id, 10, convert.DT_INT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import shutil
+import unittest
+
+import vizier.datastore.dedup as dedup
+import vizier.datastore.derived as derived
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.dedup import FingerprintSet, fingerprint
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.datastore.fs import DERIVATION_FILE, VIEW_FILE
+from vizier.filestore.base import DefaultFileServer
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+DATASTORE_DIR = './env/ds'
+FILESERVER_DIR = './env/fs'
+SPILL_DIR = './env/spill'
+
+
+COLUMNS = [
+    DatasetColumn(0, 'Name'),
+    DatasetColumn(1, 'Age'),
+    DatasetColumn(2, 'City')
+]
+
+ROWS = [
+    DatasetRow(0, ['Alice', 23, 'NYC']),
+    DatasetRow(1, ['Bob', 32, 'NYC']),
+    DatasetRow(2, ['Alice', 23, 'NYC']),
+    DatasetRow(3, ['Claudia', None, 'Buffalo']),
+    DatasetRow(4, ['Bob', 32.0, 'Chicago']),
+    DatasetRow(5, [u'Claudia', None, 'Buffalo'])
+]
+
+
+class TestDatasetDeduplicate(unittest.TestCase):
+
+    def setUp(self):
+        """Create empty directories for the data store, file server, and
+        temporary files."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, SPILL_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+            os.makedirs(d)
+
+    def tearDown(self):
+        """Delete all directories."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, SPILL_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+
+    def test_fingerprints(self):
+        """Test fingerprints of key values and collision detection."""
+        self.assertEquals(fingerprint([1, 'A']), fingerprint([1.0, u'A']))
+        self.assertNotEquals(fingerprint([1, 'A']), fingerprint(['1', 'A']))
+        self.assertNotEquals(fingerprint(['AB', 'C']), fingerprint(['A', 'BC']))
+        self.assertNotEquals(fingerprint([None]), fingerprint(['']))
+        keys = FingerprintSet()
+        self.assertTrue(keys.add(1, 2))
+        self.assertFalse(keys.add(1, 2))
+        # Same hash with a different check value is a collision
+        self.assertTrue(keys.add(1, 3))
+        self.assertFalse(keys.add(1, 3))
+        self.assertTrue(keys.add(2, 2))
+        self.assertEquals(len(keys), 3)
+
+    def test_deduplicate_rows(self):
+        """Test removing duplicates from a stream of rows."""
+        for keep, all_ids, key_ids in [
+            (dedup.KEEP_FIRST, [0, 1, 3, 4], [0, 1, 3]),
+            (dedup.KEEP_LAST, [1, 2, 4, 5], [2, 4, 5])
+        ]:
+            rows = list(dedup.deduplicate(
+                iter(ROWS),
+                [0, 1, 2],
+                keep=keep,
+                tmp_dir=SPILL_DIR
+            ))
+            self.assertEquals([r.identifier for r in rows], all_ids)
+            # The temporary run file is deleted
+            self.assertEquals(os.listdir(SPILL_DIR), [])
+            rows = list(derived.apply_operations(
+                iter(ROWS),
+                [{'type': derived.OP_DEDUPLICATE, 'positions': [0], 'keep': keep}]
+            ))
+            self.assertEquals([r.identifier for r in rows], key_ids)
+        self.assertEquals(
+            list(dedup.distinct_positions([1, 2, 1, 1], [0, 0, 0, 5], keep=dedup.KEEP_LAST)),
+            [1, 2, 3]
+        )
+        with self.assertRaises(ValueError):
+            list(dedup.deduplicate(iter(ROWS), [0], keep='any'))
+
+    def test_deduplicate_dataset(self):
+        """Test removing duplicate rows from datasets using the default VizUAL
+        engine."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        vizual = DefaultVizualEngine(datastore, fileserver)
+        ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        # Duplicates on all columns are removed using a row view
+        count, ds_id = vizual.deduplicate(ds.identifier, [], dedup.KEEP_FIRST)
+        self.assertEquals(count, 2)
+        ds1 = datastore.get_dataset(ds_id)
+        self.assertTrue(os.path.isfile(os.path.join(DATASTORE_DIR, ds_id, VIEW_FILE)))
+        self.assertEquals(ds1.row_count, 4)
+        self.assertEquals([r.identifier for r in ds1.fetch_rows()], [0, 1, 3, 4])
+        # Keep the last row for each name
+        count, ds_id = vizual.deduplicate(ds.identifier, [0, 0], dedup.KEEP_LAST)
+        self.assertEquals(count, 3)
+        ds2 = datastore.get_dataset(ds_id)
+        self.assertEquals([r.identifier for r in ds2.fetch_rows()], [2, 4, 5])
+        # Remove duplicates from a deferred derived dataset
+        vizual = DefaultVizualEngine(datastore, fileserver, defer=True)
+        _, ds_id = vizual.update_cell(ds.identifier, 2, 4, 'NYC')
+        _, ds_id = vizual.insert_column(ds_id, 1, 'Dept')
+        self.assertTrue(os.path.isfile(os.path.join(DATASTORE_DIR, ds_id, DERIVATION_FILE)))
+        count, ds_id = vizual.deduplicate(ds_id, [0, 2], dedup.KEEP_LAST)
+        self.assertEquals(count, 3)
+        # The number of rows is only known once the rows have been written.
+        # The result is therefore materialized.
+        self.assertFalse(os.path.isfile(os.path.join(DATASTORE_DIR, ds_id, DERIVATION_FILE)))
+        ds3 = datastore.get_dataset(ds_id)
+        self.assertEquals(ds3.row_count, 3)
+        self.assertEquals([r.identifier for r in ds3.fetch_rows()], [2, 4, 5])
+        # Invalid columns and keep options
+        with self.assertRaises(ValueError):
+            vizual.deduplicate(ds.identifier, [10], dedup.KEEP_FIRST)
+        with self.assertRaises(ValueError):
+            vizual.deduplicate(ds.identifier, [], 'any')
+
+
+if __name__ == '__main__':
+    unittest.main()
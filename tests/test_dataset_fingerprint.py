@@ -0,0 +1,104 @@
+import os
+import shutil
+import unittest
+
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.filestore.base import DefaultFileServer
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+DATASTORE_DIR = './env/ds'
+FILESERVER_DIR = './env/fs'
+
+
+COLUMNS = [
+    DatasetColumn(0, 'Name'),
+    DatasetColumn(1, 'Age')
+]
+
+ROWS = [
+    DatasetRow(0, ['Alice', '23']),
+    DatasetRow(1, ['Bob', '32']),
+    DatasetRow(2, ['Claudia', '45'])
+]
+
+
+class TestDatasetFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        """Create empty directories for the data store and file server."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+            os.makedirs(d)
+
+    def tearDown(self):
+        """Delete all directories."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+
+    def test_dataset_fingerprint(self):
+        """Test fingerprints for datasets with data files."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        ds1 = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        ds2 = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        self.assertIsNotNone(ds1.fingerprint)
+        self.assertNotEquals(ds1.identifier, ds2.identifier)
+        self.assertEquals(ds1.fingerprint, ds2.fingerprint)
+        # Different values or columns result in different fingerprints
+        rows = [DatasetRow(0, ['Alice', '24'])] + ROWS[1:]
+        ds3 = datastore.create_dataset(columns=COLUMNS, rows=rows)
+        self.assertNotEquals(ds1.fingerprint, ds3.fingerprint)
+        columns = [DatasetColumn(0, 'Name'), DatasetColumn(1, 'Years')]
+        ds4 = datastore.create_dataset(columns=columns, rows=ROWS)
+        self.assertNotEquals(ds1.fingerprint, ds4.fingerprint)
+        # The fingerprint is kept with the dataset handle
+        ds = FileSystemDataStore(DATASTORE_DIR).get_dataset(ds1.identifier)
+        self.assertEquals(ds.fingerprint, ds1.fingerprint)
+        # Annotations are part of the fingerprint. Modifying them removes the
+        # fingerprint from the dataset handle.
+        datastore.update_annotation(
+            ds1.identifier,
+            column_id=0,
+            row_id=0,
+            key='comment',
+            value='Some comment'
+        )
+        ds = FileSystemDataStore(DATASTORE_DIR).get_dataset(ds1.identifier)
+        self.assertIsNone(ds.fingerprint)
+
+    def test_derived_fingerprint(self):
+        """Test fingerprints for datasets that are modified by VizUAL
+        commands."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        vizual = DefaultVizualEngine(datastore, fileserver)
+        ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        _, id1 = vizual.update_cell(ds.identifier, 1, 0, '24')
+        _, id2 = vizual.update_cell(ds.identifier, 1, 0, '24')
+        _, id3 = vizual.update_cell(ds.identifier, 1, 0, '25')
+        _, id4 = vizual.rename_column(ds.identifier, 1, 'Years')
+        ds1 = datastore.get_dataset(id1)
+        ds2 = datastore.get_dataset(id2)
+        self.assertIsNotNone(ds1.fingerprint)
+        self.assertNotEquals(ds1.fingerprint, ds.fingerprint)
+        # The same commands on the same dataset result in the same fingerprint
+        self.assertEquals(ds1.fingerprint, ds2.fingerprint)
+        self.assertNotEquals(
+            ds1.fingerprint,
+            datastore.get_dataset(id3).fingerprint
+        )
+        self.assertNotEquals(
+            ds1.fingerprint,
+            datastore.get_dataset(id4).fingerprint
+        )
+        # Deferred datasets have fingerprints as well
+        vizual = DefaultVizualEngine(datastore, fileserver, defer=True)
+        _, id5 = vizual.update_cell(ds.identifier, 1, 0, '24')
+        self.assertIsNotNone(datastore.get_dataset(id5).fingerprint)
+
+
+if __name__ == '__main__':
+    unittest.main()
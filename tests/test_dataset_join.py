@@ -0,0 +1,156 @@
+import os
+import shutil
+import unittest
+
+import vizier.datastore.join as join
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.datastore.join import hash_join
+from vizier.filestore.base import DefaultFileServer
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+DATASTORE_DIR = './env/ds'
+FILESERVER_DIR = './env/fs'
+SPILL_DIR = './env/spill'
+
+
+class TestDatasetJoin(unittest.TestCase):
+
+    def setUp(self):
+        """Create empty directories for the data store, file server, and
+        partition files."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, SPILL_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+            os.makedirs(d)
+
+    def tearDown(self):
+        """Delete all directories."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, SPILL_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+
+    def test_hash_join(self):
+        """Test in-memory and partitioned hash joins."""
+        left = [[i, i % 7, 'L' + str(i)] for i in range(1000)]
+        left.append([1000, None, 'L1000'])
+        right = [[i % 5, 'R' + str(i)] for i in range(100)]
+        right.append([None, 'R100'])
+        expected = list()
+        for l in left:
+            for r in right:
+                if not l[1] is None and l[1] == r[0]:
+                    expected.append(l + r)
+        unmatched = [l + [None, None] for l in left if l[1] is None or l[1] > 4]
+        for build_left in [True, False]:
+            # Inner join in memory
+            result = list(hash_join(
+                iter(left), iter(right), [1], [0], 3, 2,
+                build_left=build_left
+            ))
+            self.assertEquals(sorted(result), sorted(expected))
+            # Left outer join in memory
+            result = list(hash_join(
+                iter(left), iter(right), [1], [0], 3, 2,
+                join_type=join.JOIN_LEFT,
+                build_left=build_left
+            ))
+            self.assertEquals(sorted(result), sorted(expected + unmatched))
+            # Left outer join with partitions and a recursion depth of two
+            max_depth = join.MAX_JOIN_DEPTH
+            join.MAX_JOIN_DEPTH = 2
+            try:
+                result = list(hash_join(
+                    iter(left), iter(right), [1], [0], 3, 2,
+                    join_type=join.JOIN_LEFT,
+                    build_left=build_left,
+                    buffer_size=1000,
+                    tmp_dir=SPILL_DIR
+                ))
+            finally:
+                join.MAX_JOIN_DEPTH = max_depth
+            self.assertEquals(sorted(result), sorted(expected + unmatched))
+            # All partition files are deleted
+            self.assertEquals(os.listdir(SPILL_DIR), [])
+        # Invalid join type and join columns
+        with self.assertRaises(ValueError):
+            list(hash_join(iter(left), iter(right), [1], [0], 3, 2, join_type='full'))
+        with self.assertRaises(ValueError):
+            list(hash_join(iter(left), iter(right), [1], [0, 1], 3, 2))
+
+    def test_join_datasets(self):
+        """Test joining datasets using the default VizUAL engine."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        vizual = DefaultVizualEngine(datastore, fileserver, join_buffer_size=100)
+        employees = datastore.create_dataset(
+            columns=[
+                DatasetColumn(0, 'Name'),
+                DatasetColumn(3, 'Dept'),
+                DatasetColumn(4, 'City')
+            ],
+            rows=[
+                DatasetRow(0, ['Alice', 1, 'NYC']),
+                DatasetRow(5, ['Bob', 2, 'NYC']),
+                DatasetRow(7, ['Claudia', 1, 'Buffalo']),
+                DatasetRow(9, ['Dave', None, 'NYC']),
+                DatasetRow(11, ['Eileen', 3, 'Chicago'])
+            ]
+        )
+        depts = datastore.create_dataset(
+            columns=[
+                DatasetColumn(1, 'Id'),
+                DatasetColumn(2, 'City'),
+                DatasetColumn(6, 'Title')
+            ],
+            rows=[
+                DatasetRow(2, [1, 'NYC', 'Sales']),
+                DatasetRow(4, [2, 'NYC', 'R&D']),
+                DatasetRow(6, [1, 'Buffalo', 'Support'])
+            ]
+        )
+        count, ds_id = vizual.join_datasets(
+            employees.identifier,
+            depts.identifier,
+            [3, 4],
+            [1, 2],
+            join.JOIN_INNER
+        )
+        self.assertEquals(count, 3)
+        ds = datastore.get_dataset(ds_id)
+        self.assertEquals(
+            [col.name for col in ds.columns],
+            ['Name', 'Dept', 'City', 'Id', 'City', 'Title']
+        )
+        self.assertEquals([col.identifier for col in ds.columns], range(6))
+        rows = ds.fetch_rows()
+        self.assertEquals(sorted([row.identifier for row in rows]), [0, 1, 2])
+        titles = dict([(row.values[0], row.values[5]) for row in rows])
+        self.assertEquals(
+            titles,
+            {'Alice': 'Sales', 'Bob': 'R&D', 'Claudia': 'Support'}
+        )
+        # Left outer join
+        count, ds_id = vizual.join_datasets(
+            employees.identifier,
+            depts.identifier,
+            [3],
+            [1],
+            join.JOIN_LEFT
+        )
+        self.assertEquals(count, 7)
+        rows = datastore.get_dataset(ds_id).fetch_rows()
+        names = sorted([row.values[0] for row in rows if row.values[3] is None])
+        self.assertEquals(names, ['Dave', 'Eileen'])
+        # Invalid join columns and join types
+        with self.assertRaises(ValueError):
+            vizual.join_datasets(employees.identifier, depts.identifier, [3], [0], 'inner')
+        with self.assertRaises(ValueError):
+            vizual.join_datasets(employees.identifier, depts.identifier, [], [], 'inner')
+        with self.assertRaises(ValueError):
+            vizual.join_datasets(employees.identifier, depts.identifier, [3], [1], 'full')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import sqlite3
+import unittest
+
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.mem import InMemDataStore
+from vizier.datastore.query import parse_predicate
+
+
+class MimirColumn(object):
+    """Column with a name in the database (for SQL translation)."""
+    def __init__(self, name_in_rdb):
+        self.name_in_rdb = name_in_rdb
+
+
+class TestDatasetQuery(unittest.TestCase):
+
+    def setUp(self):
+        """Create dataset with three columns."""
+        self.dataset = InMemDataStore().create_dataset(
+            columns=[
+                DatasetColumn(0, 'Name'),
+                DatasetColumn(1, 'Age'),
+                DatasetColumn(5, 'State')
+            ],
+            rows=[
+                DatasetRow(0, ['Alice', '23', 'NY']),
+                DatasetRow(1, ['Bob', 32, 'NJ']),
+                DatasetRow(2, ['Claire', '', 'NY']),
+                DatasetRow(3, ['David', '45', None])
+            ]
+        )
+
+    def test_evaluate_predicates(self):
+        """Test evaluating predicates on dataset rows."""
+        self.assertEquals(self.query({'column': 5, 'op': 'eq', 'value': 'NY'}), [0, 2])
+        self.assertEquals(self.query({'column': 1, 'op': 'eq', 'value': 32}), [1])
+        self.assertEquals(self.query({'column': 1, 'op': 'ge', 'value': 30}), [1, 3])
+        self.assertEquals(self.query({'column': 0, 'op': 'lt', 'value': 'C'}), [0, 1])
+        self.assertEquals(self.query({'column': 0, 'op': 'contains', 'value': 'i'}), [0, 2, 3])
+        self.assertEquals(self.query({'column': 1, 'op': 'contains', 'value': 3}), [0, 1])
+        self.assertEquals(self.query({'column': 1, 'op': 'isnull'}), [2])
+        self.assertEquals(self.query({'column': 5, 'op': 'isnull'}), [3])
+        self.assertEquals(
+            self.query({'and': [
+                {'column': 1, 'op': 'gt', 'value': 20},
+                {'column': 1, 'op': 'lt', 'value': 40}
+            ]}),
+            [0, 1]
+        )
+        self.assertEquals(
+            self.query({'or': [
+                {'column': 5, 'op': 'eq', 'value': 'NJ'},
+                {'column': 1, 'op': 'isnull'}
+            ]}),
+            [1, 2]
+        )
+        # Evaluate on columns
+        pred = parse_predicate(
+            {'or': [
+                {'column': 5, 'op': 'eq', 'value': 'NJ'},
+                {'column': 0, 'op': 'eq', 'value': 'David'}
+            ]},
+            self.dataset
+        )
+        columns = {
+            0: [row.values[0] for row in self.dataset.fetch_rows()],
+            2: [row.values[2] for row in self.dataset.fetch_rows()]
+        }
+        self.assertEquals(pred.columns(), set([0, 2]))
+        self.assertEquals(pred.filter(columns, range(4)), [1, 3])
+
+    def test_invalid_predicates(self):
+        """Test parsing invalid predicates."""
+        for obj in [
+            {'column': 2, 'op': 'eq', 'value': 'NY'},
+            {'column': 5, 'op': 'like', 'value': 'NY'},
+            {'column': 5, 'op': 'eq'},
+            {'op': 'eq', 'value': 'NY'},
+            {'and': []},
+            'NY'
+        ]:
+            with self.assertRaises(ValueError):
+                parse_predicate(obj, self.dataset)
+
+    def test_sql_predicates(self):
+        """Test translating predicates into SQL."""
+        columns = [MimirColumn('COL0'), MimirColumn('COL1'), MimirColumn('COL5')]
+        pred = parse_predicate(
+            {'and': [
+                {'column': 5, 'op': 'eq', 'value': 'O\'Hare'},
+                {'or': [
+                    {'column': 1, 'op': 'le', 'value': 10},
+                    {'column': 0, 'op': 'isnull'},
+                    {'column': 0, 'op': 'contains', 'value': 'A'}
+                ]}
+            ]},
+            self.dataset
+        )
+        self.assertEquals(
+            pred.to_sql(columns),
+            '(COL5 = \'O\'\'Hare\' AND (COL1 <= 10 OR COL0 IS NULL OR instr(COL0, \'A\') > 0))'
+        )
+        # The contains operator returns the same rows as the evaluation on
+        # dataset rows. Matching is case-sensitive and without wildcards.
+        con = sqlite3.connect(':memory:')
+        con.execute('CREATE TABLE T(ROWID_ INT, COL0 TEXT, COL1 INT)')
+        rows = [(0, 'Alice', 23), (1, 'alice', 32), (2, 'A_%e', 10), (3, 'Bob', 35)]
+        con.executemany('INSERT INTO T VALUES(?, ?, ?)', rows)
+        dataset = InMemDataStore().create_dataset(
+            columns=[DatasetColumn(0, 'Name'), DatasetColumn(1, 'Age')],
+            rows=[DatasetRow(r[0], list(r[1:])) for r in rows]
+        )
+        for obj in [
+            {'column': 0, 'op': 'contains', 'value': 'A'},
+            {'column': 0, 'op': 'contains', 'value': '_'},
+            {'column': 0, 'op': 'contains', 'value': '%'},
+            {'column': 1, 'op': 'contains', 'value': 3}
+        ]:
+            pred = parse_predicate(obj, dataset)
+            sql = 'SELECT ROWID_ FROM T WHERE ' + pred.to_sql(columns)
+            self.assertEquals(
+                [row[0] for row in con.execute(sql + ' ORDER BY ROWID_')],
+                [row.identifier for row in dataset.fetch_rows(predicate=pred)]
+            )
+        con.close()
+
+    def query(self, obj):
+        """Get identifier of rows that satisfy the given predicate."""
+        pred = parse_predicate(obj, self.dataset)
+        return [row.identifier for row in self.dataset.fetch_rows(predicate=pred)]
+
+
+if __name__ == '__main__':
+    unittest.main()
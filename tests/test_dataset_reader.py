@@ -1,9 +1,14 @@
+from array import array
+import json
 import os
 import tempfile
 import unittest
 
 from vizier.datastore.base import DatasetRow
 from vizier.datastore.reader import DelimitedFileReader, DefaultJsonDatasetReader
+from vizier.datastore.reader import JsonRowParser, ROW_INDEX_BLOCK_SIZE
+from vizier.datastore.reader import RowIdIndex, load_row_index
+from vizier.datastore.reader import write_rowid_index
 
 
 CSV_FILE = './data/dataset.csv'
@@ -70,6 +75,111 @@ class TestDataset(unittest.TestCase):
         self.assertEquals(count, len(rows))
         os.remove(tmp_file)
 
+    def test_streaming_json_reader(self):
+        """Test incremental parsing of Json dataset files with offset, limit
+        and row identifier constraints."""
+        tmp_file = tempfile.mkstemp()[1]
+        rows = [DatasetRow(i, ['A' * i, i, float(i)]) for i in range(100)]
+        DefaultJsonDatasetReader(tmp_file).write(rows)
+        # Small buffer size to force rows to span multiple chunks
+        with open(tmp_file, 'r') as fh:
+            parser = JsonRowParser(fh, buffer_size=7)
+            for i in range(100):
+                self.assertEquals(parser.next_row()['id'], i)
+            self.assertIsNone(parser.next_row())
+        for streaming in [True, False]:
+            result = self.read_rows(tmp_file, streaming=streaming)
+            self.assertEquals([r.identifier for r in result], range(100))
+            self.assertEquals(result[10].values, ['A' * 10, 10, 10.0])
+            result = self.read_rows(
+                tmp_file,
+                offset=95,
+                limit=10,
+                streaming=streaming
+            )
+            self.assertEquals([r.identifier for r in result], range(95, 100))
+            result = self.read_rows(tmp_file, limit=3, streaming=streaming)
+            self.assertEquals([r.identifier for r in result], [0, 1, 2])
+            result = self.read_rows(tmp_file, rowid=42, streaming=streaming)
+            self.assertEquals([r.identifier for r in result], [42])
+        # Read a file that contains the whole document in a single line
+        with open(tmp_file, 'w') as f:
+            json.dump({'rows': [r.to_dict() for r in rows]}, f)
+        result = self.read_rows(tmp_file, offset=50, limit=2)
+        self.assertEquals([r.identifier for r in result], [50, 51])
+        # Empty dataset
+        DefaultJsonDatasetReader(tmp_file).write([])
+        self.assertEquals(self.read_rows(tmp_file), [])
+        os.remove(tmp_file)
+
+    def test_json_reader_row_index(self):
+        """Test reading pages using the row offset index."""
+        tmp_file = tempfile.mkstemp()[1]
+        index_file = tmp_file + '.idx'
+        rows = [DatasetRow(i, ['A' * i, i]) for i in range(100)]
+        DefaultJsonDatasetReader(tmp_file, index_file=index_file).write(
+            rows,
+            block_size=8
+        )
+        block_size, offsets = load_row_index(index_file, tmp_file)
+        self.assertEquals(block_size, 8)
+        self.assertEquals(len(offsets), 13)
+        for offset in [0, 1, 7, 8, 9, 63, 64, 99, 100, 150]:
+            result = self.read_rows(
+                tmp_file,
+                offset=offset,
+                limit=10,
+                index_file=index_file
+            )
+            self.assertEquals(
+                [r.identifier for r in result],
+                range(offset, min(offset + 10, 100))
+            )
+        # Index is created on first read if it does not exist
+        os.remove(index_file)
+        result = self.read_rows(tmp_file, offset=50, index_file=index_file)
+        self.assertEquals([r.identifier for r in result], range(50, 100))
+        self.assertTrue(os.path.isfile(index_file))
+        block_size, offsets = load_row_index(index_file, tmp_file)
+        self.assertEquals(block_size, ROW_INDEX_BLOCK_SIZE)
+        self.assertEquals(len(offsets), 1)
+        os.remove(index_file)
+        os.remove(tmp_file)
+
+    def test_rowid_index(self):
+        """Test lookups in the row identifier index."""
+        tmp_file = tempfile.mkstemp()[1]
+        rowids = [(i * 7919) % 1000 for i in range(1000)]
+        write_rowid_index(tmp_file, rowids)
+        index = RowIdIndex(tmp_file)
+        for pos in [0, 1, 500, 999]:
+            self.assertEquals(index.position(rowids[pos]), pos)
+        self.assertEquals(index.position(1000), -1)
+        self.assertEquals(index.position(-1), -1)
+        # Sort row identifier in multiple runs
+        write_rowid_index(tmp_file, rowids, run_size=64)
+        index = RowIdIndex(tmp_file)
+        for pos in range(1000):
+            self.assertEquals(index.position(rowids[pos]), pos)
+        self.assertEquals(index.position(1000), -1)
+        # Row identifier in ascending order
+        write_rowid_index(tmp_file, array('l', range(0, 2000, 2)))
+        index = RowIdIndex(tmp_file)
+        self.assertEquals(index.position(0), 0)
+        self.assertEquals(index.position(1998), 999)
+        self.assertEquals(index.position(3), -1)
+        # Duplicate row identifier
+        for run_size in [64, 2000]:
+            with self.assertRaises(ValueError):
+                write_rowid_index(tmp_file, rowids + [500], run_size=run_size)
+            self.assertFalse(os.path.isfile(tmp_file + '.tmp'))
+            self.assertFalse(os.path.isfile(tmp_file + '.pos'))
+        self.assertEquals(RowIdIndex(tmp_file).position(1998), 999)
+        # Empty index
+        write_rowid_index(tmp_file, [])
+        self.assertEquals(RowIdIndex(tmp_file).position(0), -1)
+        os.remove(tmp_file)
+
     def read_dataset(self, reader):
         """The reader should contain three rows with three values each."""
         count = 0
@@ -82,6 +192,11 @@ class TestDataset(unittest.TestCase):
         with self.assertRaises(StopIteration):
             reader.next()
 
+    def read_rows(self, filename, **kwargs):
+        """Read all rows from a Json dataset file."""
+        with DefaultJsonDatasetReader(filename, **kwargs).open() as reader:
+            return [row for row in reader]
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,155 @@
+import os
+import shutil
+import unittest
+
+import vizier.datastore.sort as sort
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.fs import FileSystemDataStore, VIEW_FILE
+from vizier.datastore.sort import DatasetSortCache, external_sort, sort_key
+from vizier.filestore.base import DefaultFileServer
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+DATASTORE_DIR = './env/ds'
+FILESERVER_DIR = './env/fs'
+RUN_DIR = './env/runs'
+
+
+class TestDatasetSort(unittest.TestCase):
+
+    def setUp(self):
+        """Create empty directories for the data store, file server, and run
+        files."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, RUN_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+            os.makedirs(d)
+
+    def tearDown(self):
+        """Delete all directories."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR, RUN_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+
+    def test_external_sort(self):
+        """Test external merge sort with multiple runs and merge passes."""
+        rows = [DatasetRow(i, [i % 7, str(i % 5), i]) for i in range(5000)]
+        key = sort_key([1, 0], [False, True])
+        expected = sorted(rows, key=lambda r: (r.values[1], -r.values[0]))
+        # Sort in memory
+        result = list(external_sort(iter(rows), key))
+        self.assertEquals(
+            [r.identifier for r in result],
+            [r.identifier for r in expected]
+        )
+        # Sort with runs of about 100 rows and multiple merge passes
+        max_runs = sort.MAX_MERGE_RUNS
+        sort.MAX_MERGE_RUNS = 4
+        try:
+            result = list(external_sort(
+                iter(rows),
+                key,
+                buffer_size=100 * sort.row_size(rows[0]),
+                tmp_dir=RUN_DIR
+            ))
+        finally:
+            sort.MAX_MERGE_RUNS = max_runs
+        self.assertEquals(
+            [r.identifier for r in result],
+            [r.identifier for r in expected]
+        )
+        self.assertEquals(result[0].values, expected[0].values)
+        # All run files are deleted
+        self.assertEquals(os.listdir(RUN_DIR), [])
+
+    def test_sort_dataset(self):
+        """Test sorting a dataset using the default VizUAL engine with a small
+        sort buffer."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        vizual = DefaultVizualEngine(datastore, fileserver, sort_buffer_size=500)
+        columns = [
+            DatasetColumn(0, 'Name'),
+            DatasetColumn(1, 'Age'),
+            DatasetColumn(2, 'Salary')
+        ]
+        rows = [
+            DatasetRow(0, ['Alice', 23, 35.32]),
+            DatasetRow(1, ['Bob', 23, 45.4]),
+            DatasetRow(2, ['Claudia', None, 'A']),
+            DatasetRow(3, ['Dave', 33, 30.89]),
+            DatasetRow(4, ['Eileen', None, 45.90]),
+            DatasetRow(5, ['Frank', 34, 56.7]),
+            DatasetRow(6, ['Gertrud', 34, 56.7])
+        ]
+        ds = datastore.create_dataset(columns=columns, rows=rows)
+        count, ds_id = vizual.sort_dataset(ds.identifier, [2, 1, 0], [True, False, True])
+        self.assertEquals(count, ds.row_count)
+        ds = datastore.get_dataset(ds_id)
+        names = [row.values[0] for row in ds.fetch_rows()]
+        names = [n for n in names if n in ['Gertrud', 'Frank', 'Bob', 'Alice', 'Dave']]
+        self.assertEquals(names, ['Gertrud', 'Frank', 'Bob', 'Alice', 'Dave'])
+        # Invalid rows are rejected without leaving a dataset directory
+        columns = [DatasetColumn(0, 'A')]
+        with self.assertRaises(ValueError):
+            datastore.create_dataset(
+                columns=columns,
+                rows=iter([DatasetRow(0, [1]), DatasetRow(0, [2])])
+            )
+        with self.assertRaises(ValueError):
+            datastore.create_dataset(columns=columns, rows=[DatasetRow(1, [1, 2])])
+        self.assertEquals(len(os.listdir(DATASTORE_DIR)), 2)
+
+    def test_sort_permutation(self):
+        """Test that sorted row views and the sort cache compute permutations
+        with the external merge sort."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [
+            DatasetRow(i, [(i * 7919) % 13, None if i % 11 == 0 else str(i % 5)])
+                for i in range(2000)
+        ]
+        ds = datastore.create_dataset(columns=columns, rows=rows)
+        expected = sorted(rows, key=lambda r: (r.values[1], -r.values[0]))
+        runs = list()
+        write_run = sort.write_run
+        def count_runs(run_dir, index, rows):
+            runs.append(index)
+            return write_run(run_dir, index, rows)
+        sort.write_run = count_runs
+        try:
+            # Sorted row view
+            vizual = DefaultVizualEngine(datastore, fileserver, sort_buffer_size=5000)
+            _, ds_id = vizual.sort_dataset(ds.identifier, [1, 0], [False, True])
+            view_dir = datastore.get_dataset_dir(ds_id)
+            self.assertTrue(os.path.isfile(os.path.join(view_dir, VIEW_FILE)))
+            self.assertTrue(len(runs) > 1)
+            self.assertEquals(
+                [r.identifier for r in datastore.get_dataset(ds_id).fetch_rows()],
+                [r.identifier for r in expected]
+            )
+            # Sorted view on a view that contains an inserted row
+            _, ds_id = vizual.insert_row(ds_id, 5)
+            _, ds_id = vizual.sort_dataset(ds_id, [0], [False])
+            result = datastore.get_dataset(ds_id).fetch_rows()
+            self.assertEquals(result[0].values, [None, None])
+            self.assertEquals(
+                [r.identifier for r in result[1:]],
+                [r.identifier for r in sorted(expected, key=lambda r: r.values[0])]
+            )
+            # Sort cache
+            del runs[:]
+            cache = DatasetSortCache(directory=RUN_DIR + '/cache', buffer_size=5000)
+            positions = cache.fetch_positions(ds, [(1, False), (0, True)])
+            self.assertTrue(len(runs) > 1)
+            self.assertEquals(
+                [rows[pos].identifier for pos in positions],
+                [r.identifier for r in expected]
+            )
+        finally:
+            sort.write_run = write_run
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,521 @@
+import os
+import shutil
+import unittest
+
+import vizier.datastore.derived as derived
+import vizier.datastore.fs as fs
+import vizier.datastore.view as view
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.datastore.fs import COLUMN_MAP_FILE, COLUMNAR_DATA_FILE, DERIVATION_FILE
+from vizier.datastore.fs import PATCH_FILE, POSITION_FILE, VIEW_FILE
+from vizier.datastore.mem import InMemDataStore
+from vizier.datastore.query import Comparison, OP_GT
+from vizier.filestore.base import DefaultFileServer
+from vizier.workflow.vizual.base import DefaultVizualEngine
+
+
+DATASTORE_DIR = './env/ds'
+FILESERVER_DIR = './env/fs'
+
+
+COLUMNS = [
+    DatasetColumn(0, 'Name'),
+    DatasetColumn(1, 'Age'),
+    DatasetColumn(2, 'Salary')
+]
+
+ROWS = [
+    DatasetRow(0, ['Alice', 23, 35.32]),
+    DatasetRow(1, ['Bob', 32, 45.4]),
+    DatasetRow(2, ['Claudia', None, 50.1]),
+    DatasetRow(3, ['Dave', 33, 30.89])
+]
+
+
+class TestDerivedDataset(unittest.TestCase):
+
+    def setUp(self):
+        """Create empty directories for the data store and file server."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+            os.makedirs(d)
+
+    def tearDown(self):
+        """Delete all directories."""
+        for d in [DATASTORE_DIR, FILESERVER_DIR]:
+            if os.path.isdir(d):
+                shutil.rmtree(d)
+
+    def test_apply_operations(self):
+        """Test applying sequences of operations to a stream of rows."""
+        rows = list(derived.apply_operations(
+            iter(ROWS),
+            [
+                {'type': derived.OP_DELETE_COLUMN, 'position': 2},
+                {'type': derived.OP_INSERT_COLUMN, 'position': 0},
+                {'type': derived.OP_MOVE_COLUMN, 'source': 1, 'target': 2},
+                {'type': derived.OP_INSERT_ROW, 'position': 4, 'rowid': 4, 'columnCount': 3},
+                {'type': derived.OP_UPDATE_CELL, 'row': 4, 'column': 0, 'value': 'X'},
+                {'type': derived.OP_DELETE_ROW, 'position': 1}
+            ]
+        ))
+        self.assertEquals([r.identifier for r in rows], [0, 2, 3, 4])
+        self.assertEquals(rows[0].values, [None, 23, 'Alice'])
+        self.assertEquals(rows[3].values, ['X', None, None])
+        # Source rows are not modified
+        self.assertEquals(ROWS[0].values, ['Alice', 23, 35.32])
+        # Move rows in both directions
+        for source in range(len(ROWS)):
+            for target in range(len(ROWS)):
+                expected = list(ROWS)
+                expected.insert(target, expected.pop(source))
+                rows = derived.apply_operations(
+                    iter(ROWS),
+                    [{'type': derived.OP_MOVE_ROW, 'source': source, 'target': target}]
+                )
+                self.assertEquals(
+                    [r.identifier for r in rows],
+                    [r.identifier for r in expected]
+                )
+        # Filter and sort
+        rows = list(derived.apply_operations(
+            iter(ROWS),
+            [
+                {'type': derived.OP_FILTER_COLUMNS, 'positions': [2, 0]},
+                {'type': derived.OP_SORT, 'positions': [0], 'reversed': [True]}
+            ]
+        ))
+        self.assertEquals([r.identifier for r in rows], [2, 1, 0, 3])
+        self.assertEquals(rows[0].values, [50.1, 'Claudia'])
+        # Fill, find and replace, and fill down
+        rows = list(derived.apply_operations(
+            iter(ROWS),
+            [
+                {'type': derived.OP_FILL_DOWN, 'position': 1},
+                {'type': derived.OP_REPLACE_VALUES, 'position': 2, 'pattern': '\\.[0-9]+$', 'replacement': ''},
+                {'type': derived.OP_FILL_COLUMN, 'position': 0, 'value': 'X'}
+            ]
+        ))
+        self.assertEquals([r.values[1] for r in rows], [23, 32, 32, 33])
+        self.assertEquals([r.values[2] for r in rows], ['35', '45', '50', '30'])
+        self.assertEquals([r.values[0] for r in rows], ['X', 'X', 'X', 'X'])
+        with self.assertRaises(ValueError):
+            list(derived.apply_operations(iter(ROWS), [{'type': 'unknown'}]))
+
+    def test_column_commands(self):
+        """Test VizUAL commands that modify all values in a column for
+        deferred and materialized datasets."""
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        rows = ROWS + [
+            DatasetRow(4, ['Eileen', None, 45.9]),
+            DatasetRow(5, ['Frank', 34, 56.7])
+        ]
+        for datastore in [FileSystemDataStore(DATASTORE_DIR), InMemDataStore()]:
+            for defer in [True, False]:
+                vizual = DefaultVizualEngine(datastore, fileserver, defer=defer)
+                ds = datastore.create_dataset(
+                    columns=COLUMNS,
+                    rows=rows,
+                    column_counter=3,
+                    row_counter=6
+                )
+                # FILL DOWN
+                count, ds_id = vizual.fill_down(ds.identifier, 1)
+                self.assertEquals(count, 6)
+                fill_ds = datastore.get_dataset(ds_id)
+                self.assertEquals(
+                    [int(r.values[1]) for r in fill_ds.fetch_rows()],
+                    [23, 32, 32, 33, 33, 34]
+                )
+                # FILL COLUMN
+                count, ds_id = vizual.fill_column(ds.identifier, 2, '40K')
+                self.assertEquals(count, 6)
+                fill_ds = datastore.get_dataset(ds_id)
+                fill_rows = fill_ds.fetch_rows()
+                self.assertEquals(
+                    [r.values[2] for r in fill_rows],
+                    ['40K'] * 6
+                )
+                self.assertEquals(fill_rows[0].values[0], 'Alice')
+                # Row identifiers do not change
+                self.assertEquals(
+                    [r.identifier for r in fill_rows],
+                    [r.identifier for r in rows]
+                )
+                # REPLACE VALUES
+                count, ds_id = vizual.replace_values(ds_id, 2, 'K$', '000')
+                self.assertEquals(count, 6)
+                repl_ds = datastore.get_dataset(ds_id)
+                self.assertEquals(
+                    [r.values[2] for r in repl_ds.fetch_rows()],
+                    ['40000'] * 6
+                )
+                # Unknown columns and invalid patterns raise ValueError
+                with self.assertRaises(ValueError):
+                    vizual.fill_column(ds.identifier, 100, '40K')
+                with self.assertRaises(ValueError):
+                    vizual.fill_down(ds.identifier, 100)
+                with self.assertRaises(ValueError):
+                    vizual.replace_values(ds.identifier, 100, 'K', '')
+                with self.assertRaises(ValueError):
+                    vizual.replace_values(ds.identifier, 2, '(K', '')
+
+    def test_column_mapping(self):
+        """Test column operations that reference the data file of the source
+        dataset through a column mapping."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        vizual = DefaultVizualEngine(datastore, DefaultFileServer(FILESERVER_DIR))
+        ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        _, ds_id = vizual.rename_column(ds.identifier, 1, 'Years')
+        _, ds_id = vizual.move_column(ds_id, 2, 0)
+        _, ds_id = vizual.delete_column(ds_id, 0)
+        _, ds_id = vizual.filter_columns(ds_id, [2, 1], [None, 'Income'])
+        ds_dir = datastore.get_dataset_dir(ds_id)
+        self.assertFalse(os.path.isfile(os.path.join(ds_dir, COLUMNAR_DATA_FILE)))
+        self.assertTrue(os.path.isfile(os.path.join(ds_dir, COLUMN_MAP_FILE)))
+        mapped = datastore.get_dataset(ds_id)
+        self.assertEquals(mapped.mapping['source'], ds.identifier)
+        self.assertEquals(mapped.column_map, [2, 1])
+        self.assertEquals([c.name for c in mapped.columns], ['Salary', 'Income'])
+        rows = mapped.fetch_rows()
+        self.assertEquals(rows[0].values, [35.32, 23])
+        self.assertEquals(rows[2].values, [50.1, None])
+        self.assertEquals(mapped.fetch_rows_at([3])[0].values, [30.89, 33])
+        with mapped.reader(predicate=Comparison(1, OP_GT, 30), columns=[1]) as r:
+            self.assertEquals([(row.identifier, row.values) for row in r], [(1, [32]), (3, [33])])
+        with mapped.reader(rowid=2) as r:
+            self.assertEquals([row.values for row in r], [[50.1, None]])
+        # Deleting the source dataset writes the data file of the dataset
+        datastore.delete_dataset(ds.identifier)
+        self.assertTrue(os.path.isfile(os.path.join(ds_dir, COLUMNAR_DATA_FILE)))
+        self.assertFalse(os.path.isfile(os.path.join(ds_dir, COLUMN_MAP_FILE)))
+        mapped = datastore.get_dataset(ds_id)
+        self.assertIsNone(mapped.mapping)
+        self.assertEquals(
+            [(r.identifier, r.values) for r in mapped.fetch_rows()],
+            [(r.identifier, r.values) for r in rows]
+        )
+        self.assertEquals(mapped.get_row_position(3), 3)
+
+    def test_delete_source(self):
+        """Test that deleting a dataset only materializes and invalidates the
+        datasets that reference it."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        vizual = DefaultVizualEngine(datastore, DefaultFileServer(FILESERVER_DIR))
+        ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        other = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        _, mapped_id = vizual.filter_columns(ds.identifier, [2, 0], [None, None])
+        _, view_id = vizual.sort_dataset(ds.identifier, [1], [True])
+        _, view_mapped_id = vizual.filter_columns(view_id, [0], [None])
+        # Datasets are recorded in the list of children of their source
+        ds_dir = datastore.get_dataset_dir(ds.identifier)
+        self.assertEquals(fs.read_children(ds_dir), [mapped_id, view_id])
+        view_dir = datastore.get_dataset_dir(view_id)
+        self.assertEquals(fs.read_children(view_dir), [view_mapped_id])
+        # Handles of datasets that do not reference the deleted dataset remain
+        # in the handle cache
+        datastore.get_dataset(other.identifier)
+        datastore.get_dataset(view_mapped_id)
+        self.assertTrue(datastore.delete_dataset(ds.identifier))
+        cache = datastore.handle_cache
+        self.assertTrue(datastore.get_dataset_dir(other.identifier) in cache)
+        self.assertFalse(datastore.get_dataset_dir(view_mapped_id) in cache)
+        self.assertEquals(
+            [r.values for r in datastore.get_dataset(view_mapped_id).fetch_rows()],
+            [['Dave'], ['Bob'], ['Alice'], ['Claudia']]
+        )
+        self.assertIsNone(datastore.get_dataset(mapped_id).mapping)
+        # Datasets that were created by earlier versions have no list of
+        # children. All datasets are checked when they are deleted.
+        _, mapped_id = vizual.filter_columns(other.identifier, [1], [None])
+        os.remove(os.path.join(datastore.get_dataset_dir(other.identifier), fs.CHILDREN_FILE))
+        self.assertTrue(datastore.delete_dataset(other.identifier))
+        mapped = datastore.get_dataset(mapped_id)
+        self.assertIsNone(mapped.mapping)
+        self.assertEquals([r.values for r in mapped.fetch_rows()], [[23], [32], [None], [33]])
+
+    def test_fs_derived_dataset(self):
+        """Test creating chains of derived datasets in the file system data
+        store that are materialized on first access."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        ds1 = datastore.create_derived_dataset(
+            ds,
+            columns=COLUMNS,
+            operations=[
+                {'type': derived.OP_SORT, 'positions': [0], 'reversed': [False]},
+                {'type': derived.OP_UPDATE_CELL, 'row': 1, 'column': 0, 'value': 'Bo'}
+            ],
+            row_count=4,
+            column_counter=ds.column_counter,
+            row_counter=ds.row_counter,
+            materialize=False
+        )
+        ds2 = datastore.create_derived_dataset(
+            datastore.get_dataset(ds1.identifier),
+            columns=COLUMNS,
+            operations=[{'type': derived.OP_DELETE_ROW, 'position': 0}],
+            row_count=3,
+            column_counter=ds.column_counter,
+            row_counter=ds.row_counter,
+            materialize=False
+        )
+        # The chain is collapsed into operations on the original dataset
+        self.assertEquals(ds2.derivation['source'], ds.identifier)
+        self.assertEquals(len(ds2.derivation['operations']), 3)
+        # Deleting the original dataset materializes all derived datasets
+        self.assertTrue(datastore.delete_dataset(ds.identifier))
+        for ds_id in [ds1.identifier, ds2.identifier]:
+            ds_dir = datastore.get_dataset_dir(ds_id)
+            self.assertFalse(os.path.isfile(os.path.join(ds_dir, DERIVATION_FILE)))
+        ds2 = datastore.get_dataset(ds2.identifier)
+        self.assertIsNone(ds2.derivation)
+        rows = ds2.fetch_rows()
+        self.assertEquals([r.identifier for r in rows], [1, 2, 3])
+        self.assertEquals(rows[0].values, ['Bo', 32, 45.4])
+        self.assertEquals(ds2.get_row_position(3), 2)
+        # Derived datasets are materialized when rows are read
+        ds3 = datastore.create_derived_dataset(
+            ds2,
+            columns=COLUMNS,
+            operations=[
+                {'type': derived.OP_SORT, 'positions': [0], 'reversed': [False]},
+                {'type': derived.OP_UPDATE_CELL, 'row': 2, 'column': 1, 'value': 40}
+            ],
+            row_count=3,
+            column_counter=ds.column_counter,
+            row_counter=ds.row_counter,
+            materialize=False
+        )
+        ds3 = datastore.get_dataset(ds3.identifier)
+        self.assertIsNotNone(ds3.derivation)
+        self.assertEquals(
+            [r.values[1] for r in ds3.fetch_rows_at([2, 0])],
+            [40, 32]
+        )
+        self.assertIsNone(datastore.get_dataset(ds3.identifier).derivation)
+
+    def test_row_view(self):
+        """Test row operations that create views on the rows of the source
+        dataset."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        vizual = DefaultVizualEngine(datastore, DefaultFileServer(FILESERVER_DIR))
+        ds = datastore.create_dataset(
+            columns=COLUMNS,
+            rows=ROWS,
+            column_counter=3,
+            row_counter=4
+        )
+        _, ds_id = vizual.insert_row(ds.identifier, 2)
+        _, ds_id = vizual.move_row(ds_id, 0, 4)
+        _, ds_id = vizual.delete_row(ds_id, 2)
+        _, ds_id = vizual.sort_dataset(ds_id, [1], [True])
+        ds_dir = datastore.get_dataset_dir(ds_id)
+        self.assertFalse(os.path.isfile(os.path.join(ds_dir, COLUMNAR_DATA_FILE)))
+        self.assertTrue(os.path.isfile(os.path.join(ds_dir, POSITION_FILE)))
+        self.assertTrue(os.path.isfile(os.path.join(ds_dir, VIEW_FILE)))
+        dataset = datastore.get_dataset(ds_id)
+        self.assertEquals(dataset.view_depth, 4)
+        self.assertEquals(dataset.row_count, 4)
+        # Resolve rows in multiple blocks
+        block_size = view.VIEW_BLOCK_SIZE
+        view.VIEW_BLOCK_SIZE = 2
+        try:
+            rows = dataset.fetch_rows()
+            self.assertEquals([r.identifier for r in rows], [3, 1, 0, 4])
+            self.assertEquals(rows[3].values, [None, None, None])
+            self.assertEquals(
+                [r.identifier for r in dataset.fetch_rows(offset=1, limit=2)],
+                [1, 0]
+            )
+            self.assertEquals(
+                [r.identifier for r in dataset.fetch_rows_at([2, 0, 7])],
+                [0, 3]
+            )
+            self.assertEquals(dataset.get_row_position(0), 2)
+            with dataset.reader(rowid=1, columns=[0]) as r:
+                self.assertEquals([row.values for row in r], [['Bob']])
+            predicate = Comparison(1, OP_GT, 30)
+            with dataset.reader(predicate=predicate, offset=1) as r:
+                self.assertEquals([row.identifier for row in r], [1])
+        finally:
+            view.VIEW_BLOCK_SIZE = block_size
+        # Column mapping on a row view
+        _, mapped_id = vizual.filter_columns(ds_id, [2, 0], [None, None])
+        mapped = datastore.get_dataset(mapped_id)
+        self.assertEquals(mapped.mapping['source'], ds_id)
+        self.assertEquals(
+            [r.values for r in mapped.fetch_rows()],
+            [[30.89, 'Dave'], [45.4, 'Bob'], [35.32, 'Alice'], [None, None]]
+        )
+        # Row views on a dataset with a column mapping
+        _, sorted_id = vizual.sort_dataset(mapped_id, [0], [False])
+        self.assertEquals(
+            [r.identifier for r in datastore.get_dataset(sorted_id).fetch_rows()],
+            [4, 0, 1, 3]
+        )
+        # Chains of views are compacted
+        max_depth = fs.MAX_VIEW_DEPTH
+        fs.MAX_VIEW_DEPTH = 4
+        try:
+            _, compact_id = vizual.move_row(ds_id, 3, 0)
+        finally:
+            fs.MAX_VIEW_DEPTH = max_depth
+        compact_dir = datastore.get_dataset_dir(compact_id)
+        self.assertTrue(os.path.isfile(os.path.join(compact_dir, COLUMNAR_DATA_FILE)))
+        self.assertEquals(datastore.get_dataset(compact_id).view_depth, 0)
+        # Deleting the source dataset materializes the views
+        datastore.delete_dataset(ds.identifier)
+        for identifier in [ds_id, mapped_id, sorted_id]:
+            dataset = datastore.get_dataset(identifier)
+            self.assertTrue(dataset.view is None or dataset.view['source'] != ds.identifier)
+        self.assertEquals(
+            [r.identifier for r in datastore.get_dataset(ds_id).fetch_rows()],
+            [3, 1, 0, 4]
+        )
+        self.assertEquals(
+            [r.values for r in datastore.get_dataset(mapped_id).fetch_rows()],
+            [[30.89, 'Dave'], [45.4, 'Bob'], [35.32, 'Alice'], [None, None]]
+        )
+
+    def test_overlay(self):
+        """Test cell updates and single row operations that create patch
+        overlays on the source dataset."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        vizual = DefaultVizualEngine(datastore, DefaultFileServer(FILESERVER_DIR))
+        ds = datastore.create_dataset(
+            columns=COLUMNS,
+            rows=ROWS,
+            column_counter=3,
+            row_counter=4
+        )
+        _, ds_id = vizual.update_cell(ds.identifier, 0, 1, 'Bo')
+        _, ds_id = vizual.insert_row(ds_id, 2)
+        _, ds_id = vizual.update_cell(ds_id, 0, 2, 'Eve')
+        _, ds_id = vizual.delete_row(ds_id, 0)
+        _, ds_id = vizual.update_cell(ds_id, 1, 2, 41)
+        ds_dir = datastore.get_dataset_dir(ds_id)
+        self.assertFalse(os.path.isfile(os.path.join(ds_dir, COLUMNAR_DATA_FILE)))
+        self.assertTrue(os.path.isfile(os.path.join(ds_dir, PATCH_FILE)))
+        dataset = datastore.get_dataset(ds_id)
+        # Overlays on overlays extend the patch of their source
+        self.assertEquals(dataset.overlay['source'], ds.identifier)
+        self.assertEquals(dataset.view_depth, 1)
+        self.assertEquals(dataset.row_count, 4)
+        rows = dataset.fetch_rows()
+        self.assertEquals([r.identifier for r in rows], [1, 4, 2, 3])
+        self.assertEquals(rows[0].values, ['Bo', 32, 45.4])
+        self.assertEquals(rows[1].values, ['Eve', None, None])
+        self.assertEquals(rows[2].values, ['Claudia', 41, 50.1])
+        self.assertEquals(
+            [r.identifier for r in dataset.fetch_rows(offset=1, limit=2)],
+            [4, 2]
+        )
+        self.assertEquals(
+            [r.values[0] for r in dataset.fetch_rows_at([1, 0, 7])],
+            ['Eve', 'Bo']
+        )
+        self.assertEquals(dataset.get_row_position(2), 2)
+        self.assertEquals(dataset.get_row_position(0), -1)
+        with dataset.reader(rowid=4, columns=[0]) as r:
+            self.assertEquals([row.values for row in r], [['Eve']])
+        predicate = Comparison(1, OP_GT, 35)
+        with dataset.reader(predicate=predicate) as r:
+            self.assertEquals([row.identifier for row in r], [2])
+        # Column mapping on an overlay
+        _, mapped_id = vizual.filter_columns(ds_id, [1, 0], [None, None])
+        mapped = datastore.get_dataset(mapped_id)
+        self.assertEquals(
+            [r.values for r in mapped.fetch_rows()],
+            [[32, 'Bo'], [None, 'Eve'], [41, 'Claudia'], [33, 'Dave']]
+        )
+        # Row view on an overlay
+        _, sorted_id = vizual.sort_dataset(ds_id, [0], [False])
+        self.assertEquals(
+            [r.identifier for r in datastore.get_dataset(sorted_id).fetch_rows()],
+            [1, 2, 3, 4]
+        )
+        # Overlays are folded once the patch gets too large
+        max_size = fs.MAX_PATCH_SIZE
+        fs.MAX_PATCH_SIZE = 4
+        try:
+            _, folded_id = vizual.update_cell(ds_id, 2, 3, 1.0)
+        finally:
+            fs.MAX_PATCH_SIZE = max_size
+        folded_dir = datastore.get_dataset_dir(folded_id)
+        self.assertTrue(os.path.isfile(os.path.join(folded_dir, COLUMNAR_DATA_FILE)))
+        folded = datastore.get_dataset(folded_id)
+        self.assertIsNone(folded.overlay)
+        self.assertEquals(folded.fetch_rows()[3].values, ['Dave', 33, 1.0])
+        # Deleting the parent dataset materializes the overlays
+        datastore.delete_dataset(ds.identifier)
+        self.assertIsNone(datastore.get_dataset(ds_id).overlay)
+        self.assertFalse(os.path.isfile(os.path.join(ds_dir, PATCH_FILE)))
+        self.assertEquals(
+            [(r.identifier, r.values) for r in datastore.get_dataset(ds_id).fetch_rows()],
+            [(r.identifier, r.values) for r in rows]
+        )
+        self.assertEquals(
+            [r.values[1] for r in datastore.get_dataset(mapped_id).fetch_rows()],
+            ['Bo', 'Eve', 'Claudia', 'Dave']
+        )
+
+    def test_vizual_engine(self):
+        """Test that deferred VizUAL commands produce the same datasets as
+        commands that are materialized immediately."""
+        fileserver = DefaultFileServer(FILESERVER_DIR)
+        for datastore in [FileSystemDataStore(DATASTORE_DIR), InMemDataStore()]:
+            results = list()
+            for defer in [True, False]:
+                vizual = DefaultVizualEngine(datastore, fileserver, defer=defer)
+                ds = datastore.create_dataset(
+                    columns=COLUMNS,
+                    rows=ROWS,
+                    column_counter=3,
+                    row_counter=4
+                )
+                _, ds_id = vizual.insert_row(ds.identifier, 1)
+                _, ds_id = vizual.update_cell(ds_id, 0, 1, 'Eve')
+                _, ds_id = vizual.insert_column(ds_id, 3, 'Dept')
+                _, ds_id = vizual.rename_column(ds_id, 1, 'Years')
+                _, ds_id = vizual.move_row(ds_id, 0, 3)
+                _, ds_id = vizual.delete_column(ds_id, 2)
+                _, ds_id = vizual.sort_dataset(ds_id, [1], [True])
+                count, ds_id = vizual.filter_columns(ds_id, [3, 0], ['Department', None])
+                self.assertEquals(count, 5)
+                ds = datastore.get_dataset(ds_id)
+                self.assertEquals(ds.row_count, 5)
+                self.assertEquals(ds.column_counter, 4)
+                self.assertEquals(ds.row_counter, 5)
+                results.append((
+                    [c.name for c in ds.columns],
+                    [(r.identifier, r.values) for r in ds.fetch_rows()]
+                ))
+            self.assertEquals(results[0], results[1])
+            self.assertEquals(results[0][0], ['Department', 'Name'])
+            self.assertEquals(
+                [r[1][1] for r in results[0][1]],
+                ['Dave', 'Bob', 'Alice', 'Eve', 'Claudia']
+            )
+        # Invalid row positions are detected without reading the dataset
+        vizual = DefaultVizualEngine(datastore, fileserver, defer=True)
+        with self.assertRaises(ValueError):
+            vizual.delete_row(ds_id, 5)
+        with self.assertRaises(ValueError):
+            vizual.insert_row(ds_id, 6)
+        # Invalid replacement strings are detected before the dataset is
+        # derived
+        for pattern, replacement in [('a', '\\1'), ('(a)', '\\g<x>'), ('a', '\\g<1')]:
+            with self.assertRaises(ValueError):
+                vizual.replace_values(ds_id, 0, pattern, replacement)
+        _, ds_id = vizual.replace_values(ds_id, 0, '(a)(v)', '\\2\\g<1>')
+        self.assertEquals(
+            [r.values[1] for r in datastore.get_dataset(ds_id).fetch_rows()],
+            ['Dvae', 'Bob', 'Alice', 'Eve', 'Claudia']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import unittest
+
+import vizier.workflow.command as cmd
+import vizier.workflow.context as ctx
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.fs import FileSystemDataStore
+from vizier.workflow.engine.viztrails import replace_identical_datasets
+from vizier.workflow.module import ModuleHandle
+
+
+DATASTORE_DIR = './env/ds'
+
+
+COLUMNS = [
+    DatasetColumn(0, 'Name'),
+    DatasetColumn(1, 'Age')
+]
+
+ROWS = [
+    DatasetRow(0, ['Alice', '23']),
+    DatasetRow(1, ['Bob', '32'])
+]
+
+
+def dataset_context(identifier, count):
+    """Get a workflow context where the dataset mapping of each module maps
+    the dataset name to the given identifier."""
+    return {
+        ctx.VZRENV_DATASETS: [{
+                ctx.VZRENV_DATASETS_MODULEID: i,
+                ctx.VZRENV_DATASETS_MAPPING: {'ds': identifier}
+            } for i in range(count)
+        ]
+    }
+
+
+class TestEarlyCutoff(unittest.TestCase):
+
+    def setUp(self):
+        """Create an empty data store directory."""
+        if os.path.isdir(DATASTORE_DIR):
+            shutil.rmtree(DATASTORE_DIR)
+        os.makedirs(DATASTORE_DIR)
+
+    def tearDown(self):
+        """Delete the data store directory."""
+        if os.path.isdir(DATASTORE_DIR):
+            shutil.rmtree(DATASTORE_DIR)
+
+    def test_chained_modules(self):
+        """Test replacing a reproduced dataset in the mappings of a chain of
+        three modules."""
+        datastore = FileSystemDataStore(DATASTORE_DIR)
+        prev_ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        new_ds = datastore.create_dataset(columns=COLUMNS, rows=ROWS)
+        # The first module has been executed again and wrote a dataset with
+        # the same content as in the previous workflow version. The two
+        # following modules read the dataset in the previous version.
+        module = ModuleHandle(
+            0,
+            cmd.python_cell('x = 1'),
+            datasets={'ds': new_ds.identifier},
+            datasets_read={},
+            datasets_written={'ds': new_ds.identifier}
+        )
+        following = [
+            ModuleHandle(
+                i,
+                cmd.python_cell('x = 1'),
+                datasets={'ds': prev_ds.identifier},
+                datasets_read={'ds': prev_ds.identifier},
+                datasets_written={}
+            ) for i in [1, 2]
+        ]
+        context = dataset_context(new_ds.identifier, 3)
+        replaced = replace_identical_datasets(
+            datastore,
+            module,
+            following,
+            context,
+            0
+        )
+        self.assertEquals(replaced, ['ds'])
+        self.assertEquals(module.datasets['ds'], prev_ds.identifier)
+        self.assertEquals(module.datasets_written['ds'], prev_ds.identifier)
+        for mapping in context[ctx.VZRENV_DATASETS]:
+            self.assertEquals(
+                mapping[ctx.VZRENV_DATASETS_MAPPING]['ds'],
+                prev_ds.identifier
+            )
+        # Datasets with different content are not replaced
+        rows = [DatasetRow(0, ['Alice', '24'])] + ROWS[1:]
+        other_ds = datastore.create_dataset(columns=COLUMNS, rows=rows)
+        module.datasets_written['ds'] = other_ds.identifier
+        context = dataset_context(other_ds.identifier, 3)
+        replaced = replace_identical_datasets(
+            datastore,
+            module,
+            following,
+            context,
+            0
+        )
+        self.assertEquals(replaced, [])
+        for mapping in context[ctx.VZRENV_DATASETS]:
+            self.assertEquals(
+                mapping[ctx.VZRENV_DATASETS_MAPPING]['ds'],
+                other_ds.identifier
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,15 +2,25 @@ import os
 import shutil
 import unittest
 
+from vizier.datastore.base import DatasetColumn, DatasetRow
+from vizier.datastore.cache import PAGE_CACHE
 from vizier.datastore.fs import FileSystemDataStore
-from vizier.datastore.fs import DATA_FILE, METADATA_FILE
+from vizier.datastore.fs import COLUMNAR_DATA_FILE, DATA_FILE, INDEX_FILE
+from vizier.datastore.fs import METADATA_FILE, FORMAT_COLUMNAR, FORMAT_JSON
+from vizier.datastore.fs import ROWID_INDEX_FILE
+from vizier.datastore.mem import InMemDataStore
+from vizier.datastore.query import parse_predicate
+from vizier.datastore.reader import DefaultJsonDatasetReader
+from vizier.datastore.sort import DatasetSortCache, parse_sort_order
 from vizier.filestore.base import DefaultFileServer
+from vizier.plot.view import ChartViewHandle, DataSeriesHandle
 
 
 CSV_FILE = './data/dataset.csv'
 
 DATASTORE_DIRECTORY = './env/ds'
 FILESERVER_DIR = './env/fs'
+SORT_CACHE_DIRECTORY = './env/sort'
 
 class TestDataStore(unittest.TestCase):
 
@@ -30,10 +40,27 @@ class TestDataStore(unittest.TestCase):
     def tearDown(self):
         """Delete data store directory.
         """
-        for d in [DATASTORE_DIRECTORY, FILESERVER_DIR]:
+        for d in [DATASTORE_DIRECTORY, FILESERVER_DIR, SORT_CACHE_DIRECTORY]:
             if os.path.isdir(d):
                 shutil.rmtree(d)
 
+    def test_create_dataset_error(self):
+        """Test that failed dataset creation does not leave an incomplete
+        dataset directory behind."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        def rows():
+            for i in range(10):
+                yield DatasetRow(i, [i, str(i)])
+            raise IOError('read failed')
+        with self.assertRaises(IOError):
+            self.db.create_dataset(columns=columns, rows=rows())
+        with self.assertRaises(ValueError):
+            self.db.create_dataset(
+                columns=columns,
+                rows=[DatasetRow(0, [0, '0']), DatasetRow(0, [1, '1'])]
+            )
+        self.assertEquals(os.listdir(DATASTORE_DIRECTORY), [])
+
     def test_datastore(self):
         """Test functionality of the file server data store."""
         ds = self.db.load_dataset(self.fileserver.upload_file(CSV_FILE))
@@ -65,6 +92,229 @@ class TestDataStore(unittest.TestCase):
             self.assertEquals(row.identifier, i)
         self.assertEquals(rows[0].values[0], 'Jane')
 
+    def test_fetch_rows(self):
+        """Test reading subsets of dataset rows."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [DatasetRow(i, [i, str(i)]) for i in range(50)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        ds = self.db.get_dataset(ds.identifier)
+        self.assertEquals(len(ds.fetch_rows()), 50)
+        rows = ds.fetch_rows(offset=45, limit=10)
+        self.assertEquals([r.identifier for r in rows], range(45, 50))
+        rows = ds.fetch_rows(rowid='12')
+        self.assertEquals(len(rows), 1)
+        self.assertEquals(rows[0].values, [12, '12'])
+        self.assertEquals(ds.fetch_rows(rowid=100), [])
+
+    def test_column_projection(self):
+        """Test reading subsets of dataset columns."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B'), DatasetColumn(2, 'C')]
+        rows = [DatasetRow(i, [i, str(i), i * 2]) for i in range(50)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        self.db.update_annotation(ds.identifier, column_id=2, row_id=3, key='A', value='B')
+        ds = self.db.get_dataset(ds.identifier)
+        rows = ds.fetch_rows(offset=2, limit=2, columns=[2, 0])
+        self.assertEquals([r.values for r in rows], [[4, 2], [6, 3]])
+        self.assertEquals(rows[1].cell_annotations, [True, False])
+        rows = ds.fetch_rows(rowid=10, columns=[1])
+        self.assertEquals(rows[0].values, ['10'])
+        with self.assertRaises(ValueError):
+            ds.fetch_rows(columns=[3])
+        # Projection on datasets in Json format
+        rows = ds.fetch_rows()
+        dataset_dir = self.db.get_dataset_dir(ds.identifier)
+        os.remove(os.path.join(dataset_dir, COLUMNAR_DATA_FILE))
+        DefaultJsonDatasetReader(os.path.join(dataset_dir, DATA_FILE)).write(rows)
+        self.db.handle_cache.remove(dataset_dir)
+        ds = self.db.get_dataset(ds.identifier)
+        self.assertEquals(ds.data_format, FORMAT_JSON)
+        rows = ds.fetch_rows(offset=2, limit=2, columns=[2, 0])
+        self.assertEquals([r.values for r in rows], [[4, 2], [6, 3]])
+        self.assertEquals(rows[1].cell_annotations, [True, False])
+        # Charts only read the columns of the data series
+        view = ChartViewHandle(dataset_name='DS', x_axis=0)
+        view.data.append(DataSeriesHandle(column=1, range_end=2))
+        view.data.append(DataSeriesHandle(column=2, range_start=1, range_end=3))
+        data = self.db.get_dataset_chart(ds.identifier, view)
+        self.assertEquals(data, [['0', 2], ['1', 4], ['2', 6]])
+
+    def test_query(self):
+        """Test reading rows that satisfy a query predicate."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [DatasetRow(i, [i, str(i % 10)]) for i in range(10000)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        pred = parse_predicate(
+            {'and': [
+                {'column': 1, 'op': 'eq', 'value': '7'},
+                {'column': 0, 'op': 'ge', 'value': 5000}
+            ]},
+            ds
+        )
+        rows = ds.fetch_rows(predicate=pred)
+        self.assertEquals([r.identifier for r in rows], range(5007, 10000, 10))
+        # Offset and limit refer to the matching rows
+        rows = ds.fetch_rows(offset=410, limit=5, predicate=pred, columns=[0])
+        self.assertEquals([r.values for r in rows], [[9107], [9117], [9127], [9137], [9147]])
+        self.assertEquals(ds.fetch_rows(rowid=17, predicate=pred), [])
+        self.assertEquals(len(ds.fetch_rows(rowid=5017, predicate=pred)), 1)
+        # Datasets in Json format
+        dataset_dir = self.db.get_dataset_dir(ds.identifier)
+        os.remove(os.path.join(dataset_dir, COLUMNAR_DATA_FILE))
+        DefaultJsonDatasetReader(os.path.join(dataset_dir, DATA_FILE)).write(
+            [DatasetRow(i, [i, str(i % 10)]) for i in range(10000)]
+        )
+        self.db.handle_cache.remove(dataset_dir)
+        ds = self.db.get_dataset(ds.identifier)
+        rows = ds.fetch_rows(offset=410, limit=5, predicate=pred, columns=[0])
+        self.assertEquals([r.values for r in rows], [[9107], [9117], [9127], [9137], [9147]])
+
+    def test_sort(self):
+        """Test reading pages of sorted datasets using the sort cache."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [DatasetRow(i, [i % 3, str(i % 7)]) for i in range(10000)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        cache = DatasetSortCache(directory=SORT_CACHE_DIRECTORY)
+        order = parse_sort_order('0:desc,1', ds)
+        self.assertEquals(order, [(0, True), (1, False)])
+        with self.assertRaises(ValueError):
+            parse_sort_order('0:up', ds)
+        with self.assertRaises(ValueError):
+            parse_sort_order('5', ds)
+        expected = sorted(rows, key=lambda r: (-r.values[0], r.values[1]))
+        positions = cache.fetch_positions(ds, order, offset=20, limit=10)
+        result = ds.fetch_rows_at(positions)
+        self.assertEquals(
+            [r.identifier for r in result],
+            [r.identifier for r in expected[20:30]]
+        )
+        self.assertEquals(result[0].values, expected[20].values)
+        # The permutation file is reused by caches for the same directory
+        self.assertEquals(len(os.listdir(SORT_CACHE_DIRECTORY)), 1)
+        cache = DatasetSortCache(directory=SORT_CACHE_DIRECTORY)
+        self.assertEquals(len(cache), 1)
+        positions = cache.fetch_positions(ds, order, offset=9995)
+        self.assertEquals(len(positions), 5)
+        self.assertEquals(cache.hits, 1)
+        cache.invalidate(ds.identifier)
+        self.assertEquals(len(os.listdir(SORT_CACHE_DIRECTORY)), 0)
+        # Datasets in Json format
+        dataset_dir = self.db.get_dataset_dir(ds.identifier)
+        os.remove(os.path.join(dataset_dir, COLUMNAR_DATA_FILE))
+        DefaultJsonDatasetReader(os.path.join(dataset_dir, DATA_FILE)).write(rows)
+        self.db.handle_cache.remove(dataset_dir)
+        ds = self.db.get_dataset(ds.identifier)
+        positions = cache.fetch_positions(ds, order, offset=20, limit=10)
+        self.assertEquals(
+            [r.identifier for r in ds.fetch_rows_at(positions)],
+            [r.identifier for r in expected[20:30]]
+        )
+
+    def test_row_position(self):
+        """Test point lookups and row positions using the row identifier
+        index."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [DatasetRow(100 - i, [i, str(i)]) for i in range(100)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        dataset_dir = self.db.get_dataset_dir(ds.identifier)
+        rowid_file = os.path.join(dataset_dir, ROWID_INDEX_FILE)
+        self.assertTrue(os.path.isfile(rowid_file))
+        ds = self.db.get_dataset(ds.identifier)
+        self.assertEquals(ds.get_row_position(100), 0)
+        self.assertEquals(ds.get_row_position('60'), 40)
+        self.assertEquals(ds.get_row_position(0), -1)
+        result = ds.fetch_rows(rowid=60)
+        self.assertEquals(result[0].identifier, 60)
+        self.assertEquals(result[0].values, [40, '40'])
+        self.assertEquals(ds.fetch_rows(rowid=0), [])
+        # The index is created for datasets that have been created without one
+        os.remove(rowid_file)
+        self.assertEquals(ds.get_row_position(1), 99)
+        self.assertTrue(os.path.isfile(rowid_file))
+        # In-memory datasets
+        ds = InMemDataStore().create_dataset(columns=columns, rows=rows)
+        self.assertEquals(ds.get_row_position(60), 40)
+        self.assertEquals(ds.get_row_position(101), -1)
+        self.assertEquals(ds.fetch_rows(rowid='60')[0].values, [40, '40'])
+
+    def test_page_cache(self):
+        """Test reading dataset rows through the page cache."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [DatasetRow(i, [i, str(i)]) for i in range(250)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        PAGE_CACHE.clear()
+        hits = PAGE_CACHE.hits
+        rows = ds.fetch_rows(offset=90, limit=20)
+        self.assertEquals([r.identifier for r in rows], range(90, 110))
+        self.assertEquals(len(PAGE_CACHE), 2)
+        self.assertTrue(PAGE_CACHE.size > 0)
+        # Modifying returned rows does not affect the cached rows
+        rows[0].values[0] = 'X'
+        rows = ds.fetch_rows(offset=90, limit=5)
+        self.assertEquals(rows[0].values[0], 90)
+        self.assertEquals(PAGE_CACHE.hits, hits + 1)
+        # Last page
+        rows = ds.fetch_rows(offset=240, limit=25)
+        self.assertEquals([r.identifier for r in rows], range(240, 250))
+        # Annotation updates invalidate cached pages of the dataset
+        self.db.update_annotation(ds.identifier, column_id=0, row_id=91, key='A', value='B')
+        self.assertEquals(len(PAGE_CACHE), 0)
+        rows = self.db.get_dataset(ds.identifier).fetch_rows(offset=90, limit=5)
+        self.assertEquals(rows[1].cell_annotations, [True, False])
+
+    def test_handle_cache(self):
+        """Test caching of dataset handles."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [DatasetRow(i, [i, str(i)]) for i in range(10)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        cache = self.db.handle_cache
+        hits = cache.hits
+        # Changes to the returned handle do not affect the cached handle
+        ds1 = self.db.get_dataset(ds.identifier)
+        del ds1.columns[0]
+        ds2 = FileSystemDataStore(DATASTORE_DIRECTORY).get_dataset(ds.identifier)
+        self.assertEquals(len(ds2.columns), 2)
+        self.assertEquals(cache.hits, hits + 2)
+        # Updating annotations invalidates the cached handle
+        self.db.update_annotation(ds.identifier, column_id=0, row_id=1, key='A', value='B')
+        misses = cache.misses
+        ds = self.db.get_dataset(ds.identifier)
+        self.assertEquals(cache.misses, misses + 1)
+        self.assertTrue(ds.annotations.has_cell_annotation(0, 1))
+        # Deleted datasets are removed from the cache
+        self.assertTrue(self.db.delete_dataset(ds.identifier))
+        self.assertIsNone(self.db.get_dataset(ds.identifier))
+
+    def test_json_datasets(self):
+        """Test reading and converting datasets that store rows in Json
+        format."""
+        columns = [DatasetColumn(0, 'A'), DatasetColumn(1, 'B')]
+        rows = [DatasetRow(i, [i, str(i)]) for i in range(150)]
+        ds = self.db.create_dataset(columns=columns, rows=rows)
+        self.assertEquals(ds.data_format, FORMAT_COLUMNAR)
+        # Replace the data file with a Json file without row index
+        dataset_dir = self.db.get_dataset_dir(ds.identifier)
+        os.remove(os.path.join(dataset_dir, COLUMNAR_DATA_FILE))
+        DefaultJsonDatasetReader(os.path.join(dataset_dir, DATA_FILE)).write(rows)
+        self.db.handle_cache.remove(dataset_dir)
+        ds = self.db.get_dataset(ds.identifier)
+        self.assertEquals(ds.data_format, FORMAT_JSON)
+        # The row index is created on first read
+        index_file = os.path.join(dataset_dir, INDEX_FILE)
+        self.assertFalse(os.path.isfile(index_file))
+        rows = ds.fetch_rows(offset=120, limit=2)
+        self.assertEquals([r.identifier for r in rows], [120, 121])
+        self.assertTrue(os.path.isfile(index_file))
+        # Convert dataset
+        self.assertEquals(self.db.convert_datasets(), 1)
+        self.assertFalse(self.db.convert_dataset(ds.identifier))
+        self.assertFalse(os.path.isfile(index_file))
+        self.assertFalse(os.path.isfile(os.path.join(dataset_dir, DATA_FILE)))
+        ds = self.db.get_dataset(ds.identifier)
+        self.assertEquals(ds.data_format, FORMAT_COLUMNAR)
+        rows = ds.fetch_rows()
+        self.assertEquals([r.identifier for r in rows], range(150))
+        self.assertEquals(rows[10].values, [10, '10'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from vizier.core.jobs import JobQueue
+from vizier.workflow.base import WorkflowHandle
+from vizier.workflow.command import python_cell
+from vizier.workflow.module import ModuleHandle
+from vizier.workflow.module import MODULE_CANCELED, MODULE_ERROR, MODULE_PENDING
+from vizier.workflow.module import MODULE_RUNNING, MODULE_SUCCESS
+
+
+def fail():
+    """Job that raises an exception."""
+    raise ValueError('job failed')
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def test_job_queue(self):
+        """Test executing jobs in submission order."""
+        queue = JobQueue()
+        self.assertIsNone(queue.worker)
+        result = list()
+        release = threading.Event()
+        queue.submit(release.wait)
+        for i in range(5):
+            queue.submit(result.append, i)
+        # Failing jobs do not affect the following jobs
+        queue.submit(fail)
+        queue.submit(result.append, 5)
+        self.assertEquals(result, [])
+        release.set()
+        queue.join()
+        self.assertEquals(result, range(6))
+        self.assertTrue(queue.worker.daemon)
+
+    def test_workflow_state(self):
+        """Test execution state of modules and workflows."""
+        m1 = ModuleHandle(0, python_cell('x = 1'))
+        m2 = ModuleHandle(1, python_cell('y'), stderr=[{'type': 'text/plain', 'data': 'Error'}])
+        m3 = ModuleHandle(2, python_cell('z = 2'), state=MODULE_PENDING)
+        self.assertEquals(m1.state, MODULE_SUCCESS)
+        self.assertEquals(m2.state, MODULE_ERROR)
+        self.assertTrue(m3.is_active)
+        self.assertFalse(m1.is_active)
+        # The state is kept by copies and the serialization
+        self.assertEquals(m3.copy().state, MODULE_PENDING)
+        self.assertEquals(ModuleHandle.from_dict(m3.to_dict()).state, MODULE_PENDING)
+        doc = m1.to_dict()
+        del doc['state']
+        self.assertEquals(ModuleHandle.from_dict(doc).state, MODULE_SUCCESS)
+        # Workflow state
+        wf = WorkflowHandle('master', 1, None, [m1, m3])
+        self.assertTrue(wf.is_active)
+        self.assertEquals(wf.state, MODULE_PENDING)
+        m4 = ModuleHandle(3, python_cell('z = 2'), state=MODULE_RUNNING)
+        wf = WorkflowHandle('master', 1, None, [m1, m4, m3])
+        self.assertEquals(wf.state, MODULE_RUNNING)
+        wf = WorkflowHandle('master', 1, None, [m1, m2])
+        self.assertFalse(wf.is_active)
+        self.assertEquals(wf.state, MODULE_ERROR)
+        wf = WorkflowHandle('master', 1, None, [m1])
+        self.assertEquals(wf.state, MODULE_SUCCESS)
+        # Modules that follow a failed module are canceled. The state is
+        # persisted with the module.
+        m5 = ModuleHandle(4, python_cell('z = 3'), state=MODULE_CANCELED)
+        self.assertFalse(m5.is_active)
+        self.assertFalse(m5.has_error)
+        self.assertEquals(ModuleHandle.from_dict(m5.to_dict()).state, MODULE_CANCELED)
+        wf = WorkflowHandle('master', 1, None, [m1, m2, m5])
+        self.assertEquals(wf.state, MODULE_ERROR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import vizier.workflow.command as cmd
+from vizier.workflow.engine.cache import ModuleExecutionCache, is_cacheable
+from vizier.workflow.module import ModuleHandle
+
+
+ENV = 'DEFAULT'
+
+
+def executed_module(identifier, command, read, written, stderr=None):
+    """Get handle for an executed module."""
+    return ModuleHandle(
+        identifier,
+        command,
+        stdout=[{'type': 'text/plain', 'data': 'OUT' + str(identifier)}],
+        stderr=stderr,
+        command_text='CMD',
+        datasets_read=read,
+        datasets_written=written
+    )
+
+
+class TestModuleExecutionCache(unittest.TestCase):
+
+    def test_cacheable_modules(self):
+        """Test which executed modules can be cached."""
+        rename = cmd.rename_column('ds', 1, 'Name')
+        self.assertTrue(is_cacheable(executed_module(0, rename, {}, {})))
+        self.assertFalse(is_cacheable(executed_module(0, rename, None, None)))
+        self.assertFalse(
+            is_cacheable(executed_module(0, rename, {}, {}, stderr=['Error']))
+        )
+        python = cmd.python_cell('x = 1')
+        self.assertFalse(is_cacheable(executed_module(0, python, {}, {})))
+        python = cmd.python_cell('# Vizier: pure\nprint 1')
+        self.assertTrue(is_cacheable(executed_module(0, python, {}, {})))
+
+    def test_find_module(self):
+        """Test finding cached executions for modules with given inputs."""
+        cache = ModuleExecutionCache()
+        rename = cmd.rename_column('ds', 1, 'Name')
+        cache.add_module(ENV, executed_module(1, rename, {'ds': 'A'}, {'ds': 'B'}))
+        cache.add_module(ENV, executed_module(2, rename, {'ds': 'C'}, {'ds': 'D'}))
+        self.assertEquals(len(cache), 1)
+        m = cache.find_module(ENV, ModuleHandle(5, rename), {'ds': 'C', 'x': 'E'})
+        self.assertEquals(m.identifier, 5)
+        self.assertEquals(m.stdout[0]['data'], 'OUT2')
+        self.assertEquals(m.datasets_written, {'ds': 'D'})
+        self.assertIsNone(cache.find_module(ENV, ModuleHandle(5, rename), {'ds': 'E'}))
+        self.assertIsNone(cache.find_module('MIMIR', ModuleHandle(5, rename), {'ds': 'A'}))
+        other = cmd.rename_column('ds', 1, 'Age')
+        self.assertIsNone(cache.find_module(ENV, ModuleHandle(5, other), {'ds': 'A'}))
+        # Executions with the same inputs replace each other
+        cache.add_module(ENV, executed_module(3, rename, {'ds': 'A'}, {'ds': 'F'}))
+        m = cache.find_module(ENV, ModuleHandle(5, rename), {'ds': 'A'})
+        self.assertEquals(m.datasets_written, {'ds': 'F'})
+        # Entries are evicted when the memory budget is exceeded
+        size = cache.size
+        cache.set_budget(size)
+        cache.add_module(ENV, executed_module(4, other, {'ds': 'A'}, {'ds': 'G'}))
+        self.assertIsNone(cache.find_module(ENV, ModuleHandle(5, rename), {'ds': 'A'}))
+        self.assertEquals(cache.evictions, 1)
+        # Nothing is cached if the budget is zero
+        cache.set_budget(0)
+        cache.add_module(ENV, executed_module(4, other, {'ds': 'A'}, {'ds': 'G'}))
+        self.assertEquals(len(cache), 0)
+        self.assertIsNone(cache.find_module(ENV, ModuleHandle(5, other), {'ds': 'A'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
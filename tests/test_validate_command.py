@@ -139,8 +139,83 @@ class TestValidateCommand(unittest.TestCase):
         with self.assertRaises(ValueError):
             cmd.validate_command(self.command_repository, obj)
 
+    def test_validate_vizual_column_commands(self):
+        """Test validation of VizUAL commands that modify all values in a
+        column or that sort a dataset."""
+        # FILL COLUMN
+        obj = cmd.fill_column('dataset', 'A', 'X')
+        cmd.validate_command(self.command_repository, obj)
+        del obj.arguments[cmd.PARA_COLUMN]
+        with self.assertRaises(ValueError):
+            cmd.validate_command(self.command_repository, obj)
+        # FILL DOWN
+        obj = cmd.fill_down('dataset', 'A')
+        cmd.validate_command(self.command_repository, obj)
+        obj.arguments['value'] = 'X'
+        with self.assertRaises(ValueError):
+            cmd.validate_command(self.command_repository, obj)
+        # REPLACE VALUES
+        obj = cmd.replace_values('dataset', 'A', '[0-9]+', 'X')
+        cmd.validate_command(self.command_repository, obj)
+        obj = cmd.replace_values('dataset', 'A', '[0-9]+', 'X')
+        del obj.arguments[cmd.PARA_PATTERN]
+        with self.assertRaises(ValueError):
+            cmd.validate_command(self.command_repository, obj)
+        # SORT
+        obj = ModuleSpecification(
+            cmd.PACKAGE_VIZUAL,
+            cmd.VIZUAL_SORT,
+            {
+                cmd.PARA_DATASET: 'dataset',
+                cmd.PARA_COLUMNS: [
+                    {
+                        cmd.PARA_COLUMNS_COLUMN: 'A',
+                        cmd.PARA_COLUMNS_ORDER: cmd.SORT_DESC
+                    }
+                ]
+            }
+        )
+        cmd.validate_command(self.command_repository, obj)
+        del obj.arguments[cmd.PARA_COLUMNS][0][cmd.PARA_COLUMNS_ORDER]
+        with self.assertRaises(ValueError):
+            cmd.validate_command(self.command_repository, obj)
+
     def test_validate_vizual(self):
         """Test validation ofVizUAL cell command specifications."""
+        # AGGREGATE
+        obj = cmd.aggregate_dataset(
+            'dataset',
+            ['A'],
+            [
+                {cmd.PARA_AGGREGATES_FUNCTION: 'count'},
+                {
+                    cmd.PARA_AGGREGATES_FUNCTION: 'sum',
+                    cmd.PARA_AGGREGATES_COLUMN: 'B',
+                    cmd.PARA_AGGREGATES_NAME: 'total'
+                }
+            ],
+            'result'
+        )
+        cmd.validate_command(self.command_repository, obj)
+        obj = cmd.aggregate_dataset(
+            'dataset',
+            [],
+            [{cmd.PARA_AGGREGATES_COLUMN: 'B'}],
+            'result'
+        )
+        with self.assertRaises(ValueError):
+            cmd.validate_command(self.command_repository, obj)
+        # CAST COLUMN
+        obj = cmd.cast_column('dataset', 'A', 'int')
+        cmd.validate_command(self.command_repository, obj)
+        del obj.arguments['type']
+        with self.assertRaises(ValueError):
+            cmd.validate_command(self.command_repository, obj)
+        # DEDUPLICATE
+        obj = cmd.deduplicate('dataset')
+        cmd.validate_command(self.command_repository, obj)
+        obj = cmd.deduplicate('dataset', columns=['A', 'B'], keep='last')
+        cmd.validate_command(self.command_repository, obj)
         # DELETE COLUMN
         obj = cmd.delete_column('dataset', 'column')
         cmd.validate_command(self.command_repository, obj)
@@ -164,6 +239,13 @@ class TestValidateCommand(unittest.TestCase):
         # INSERT ROW
         obj = cmd.insert_row('dataset', 1)
         cmd.validate_command(self.command_repository, obj)
+        # JOIN
+        obj = cmd.join_datasets('dataset', 'other', [('A', 'B')], 'result')
+        cmd.validate_command(self.command_repository, obj)
+        obj = cmd.join_datasets('dataset', 'other', [('A', 'B')], 'result')
+        del obj.arguments[cmd.PARA_KEYS][0][cmd.PARA_KEYS_JOIN_COLUMN]
+        with self.assertRaises(ValueError):
+            cmd.validate_command(self.command_repository, obj)
         # LOAD DATASET
         obj = cmd.load_dataset('file', 'dataset', filename='My File')
         cmd.validate_command(self.command_repository, obj)
@@ -0,0 +1,76 @@
+import os
+import shutil
+import unittest
+
+import vizier.workflow.command as cmd
+from vizier.workflow.engine.snapshot import VariableSnapshotStore, snapshot_key
+from vizier.workflow.module import ModuleHandle
+
+
+SNAPSHOT_DIR = './env/snapshots'
+
+
+class TestVariableSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        """Delete the snapshot directory if it exists."""
+        if os.path.isdir(SNAPSHOT_DIR):
+            shutil.rmtree(SNAPSHOT_DIR)
+
+    def tearDown(self):
+        """Delete the snapshot directory."""
+        if os.path.isdir(SNAPSHOT_DIR):
+            shutil.rmtree(SNAPSHOT_DIR)
+
+    def test_snapshot_keys(self):
+        """Test keys for sequences of Python cells."""
+        m1 = ModuleHandle(0, cmd.python_cell('x = 1'), datasets_read={})
+        m2 = ModuleHandle(1, cmd.python_cell('y = x + 1'), datasets_read={})
+        m3 = ModuleHandle(1, cmd.python_cell('y = x + 2'), datasets_read={})
+        m4 = ModuleHandle(2, cmd.python_cell('y = x + 1'), datasets_read={})
+        key = snapshot_key(snapshot_key('', m1), m2)
+        self.assertEquals(key, snapshot_key(snapshot_key('', m1), m2))
+        # Keys depend on the module command, identifier, and the preceding
+        # Python cells
+        self.assertNotEquals(key, snapshot_key(snapshot_key('', m1), m3))
+        self.assertNotEquals(key, snapshot_key(snapshot_key('', m1), m4))
+        self.assertNotEquals(key, snapshot_key(snapshot_key('', m4), m2))
+        # Keys depend on the datasets that were read by the cell
+        m5 = ModuleHandle(
+            1,
+            cmd.python_cell('y = x + 1'),
+            datasets_read={'people': 'DS1'}
+        )
+        self.assertNotEquals(key, snapshot_key(snapshot_key('', m1), m5))
+        # Keys are None if the datasets that were read are unknown
+        self.assertIsNone(snapshot_key('', ModuleHandle(0, cmd.python_cell('x = 1'))))
+        self.assertIsNone(snapshot_key(None, m1))
+
+    def test_snapshot_store(self):
+        """Test writing and reading snapshots of Python variables."""
+        store = VariableSnapshotStore(SNAPSHOT_DIR)
+        self.assertIsNone(store.get('A'))
+        self.assertFalse(store.has_snapshot('A'))
+        self.assertFalse(store.has_snapshot(None))
+        variables = dict()
+        exec 'import math\nx = 1\ny = [math.floor(2.5), \'a\']' in variables, variables
+        variables['vizierdb'] = object()
+        self.assertTrue(store.put('A', variables))
+        self.assertTrue(store.has_snapshot('A'))
+        state = store.get('A')
+        self.assertEquals(sorted(state.keys()), ['math', 'x', 'y'])
+        self.assertEquals(state['y'], [2.0, 'a'])
+        exec 'z = math.sqrt(x + 3)' in state, state
+        self.assertEquals(state['z'], 2.0)
+        # Variables that cannot be pickled remove existing snapshots
+        variables['f'] = lambda x: x
+        self.assertFalse(store.put('A', variables))
+        self.assertIsNone(store.get('A'))
+        # Snapshots that cannot be read are ignored
+        with open(store.snapshot_file('B'), 'w') as f:
+            f.write('not a snapshot')
+        self.assertIsNone(store.get('B'))
+
+
+if __name__ == '__main__':
+    unittest.main()
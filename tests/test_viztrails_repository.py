@@ -6,9 +6,13 @@ import os
 import shutil
 import unittest
 
+import threading
+
 from vizier.config import TestEnv
+from vizier.core.jobs import JobQueue
 from vizier.workflow.base import DEFAULT_BRANCH
 from vizier.workflow.module import ModuleSpecification
+from vizier.workflow.module import MODULE_CANCELED, MODULE_PENDING, MODULE_SUCCESS
 from vizier.workflow.command import PACKAGE_PYTHON, PYTHON_CODE, PYTHON_SOURCE, python_cell
 from vizier.workflow.command import PACKAGE_VIZUAL, VIZUAL_LOAD, load_dataset, PARA_FILE, PARA_NAME
 from vizier.workflow.repository.fs import FileSystemViztrailRepository
@@ -104,6 +108,111 @@ class TestFileSystemViztrailRepository(unittest.TestCase):
         self.assertEquals(wf.modules[1].command.module_type, PACKAGE_PYTHON)
         self.assertEquals(wf.version, 3)
 
+    def test_background_execution(self):
+        """Test executing workflows in the background."""
+        executor = JobQueue()
+        db = FileSystemViztrailRepository(
+            VIZTRAILS_DIRECTORY,
+            {ENV.identifier: ENV},
+            executor=executor
+        )
+        vt = db.create_viztrail(ENV.identifier, {'name' : 'My Project'})
+        # Block the worker thread to ensure that the new workflow versions are
+        # pending
+        release = threading.Event()
+        executor.submit(release.wait)
+        db.append_workflow_module(viztrail_id=vt.identifier, command=python_cell('abc'))
+        db.append_workflow_module(viztrail_id=vt.identifier, command=python_cell('def'))
+        self.assertEquals(len(vt.branches[DEFAULT_BRANCH].workflows), 2)
+        head = db.get_workflow(viztrail_id=vt.identifier)
+        self.assertTrue(head.is_active)
+        self.assertEquals(head.state, MODULE_PENDING)
+        self.assertEquals(len(head.modules), 2)
+        for m in head.modules:
+            self.assertEquals(m.state, MODULE_PENDING)
+            self.assertEquals(len(m.stdout), 0)
+        # Cannot branch from a workflow that is being executed
+        with self.assertRaises(ValueError):
+            db.create_branch(vt.identifier, DEFAULT_BRANCH)
+        # Modify the pending workflow. The modification is applied to the
+        # executed workflow.
+        db.replace_workflow_module(
+            viztrail_id=vt.identifier,
+            module_id=head.modules[0].identifier,
+            command=python_cell('xyz')
+        )
+        release.set()
+        executor.join()
+        workflows = vt.branches[DEFAULT_BRANCH].workflows
+        self.assertEquals(len(workflows), 3)
+        for wf_desc in workflows:
+            wf = db.get_workflow(
+                viztrail_id=vt.identifier,
+                workflow_version=wf_desc.version
+            )
+            self.assertFalse(wf.is_active)
+            self.assertEquals(wf.state, MODULE_SUCCESS)
+            for m in wf.modules:
+                self.assertEquals(m.state, MODULE_SUCCESS)
+                self.assertEquals(m.stdout[-1]['data'], 'SUCCESS ' + str(m.identifier))
+        head = db.get_workflow(viztrail_id=vt.identifier)
+        self.assertEquals(len(head.modules), 2)
+        self.assertEquals(head.modules[0].command.arguments[PYTHON_SOURCE], 'xyz')
+        self.assertEquals(head.modules[1].command.arguments[PYTHON_SOURCE], 'def')
+        # The state is persisted with the workflow
+        db = FileSystemViztrailRepository(
+            VIZTRAILS_DIRECTORY,
+            {ENV.identifier: ENV}
+        )
+        head = db.get_workflow(viztrail_id=vt.identifier)
+        self.assertEquals(head.state, MODULE_SUCCESS)
+
+    def test_background_execution_restart(self):
+        """Test that workflows which are pending when the repository is
+        loaded are canceled."""
+        executor = JobQueue()
+        db = FileSystemViztrailRepository(
+            VIZTRAILS_DIRECTORY,
+            {ENV.identifier: ENV},
+            executor=executor
+        )
+        vt = db.create_viztrail(ENV.identifier, {'name' : 'My Project'})
+        db.append_workflow_module(viztrail_id=vt.identifier, command=python_cell('abc'))
+        executor.join()
+        branch = db.create_branch(vt.identifier, DEFAULT_BRANCH)
+        # Block the worker thread to ensure that the new workflow versions are
+        # pending. The branch is created after the versions in the master
+        # branch.
+        release = threading.Event()
+        executor.submit(release.wait)
+        db.append_workflow_module(viztrail_id=vt.identifier, command=python_cell('def'))
+        db.append_workflow_module(viztrail_id=vt.identifier, command=python_cell('ghi'))
+        db.create_branch(vt.identifier, branch.identifier)
+        # Loading the repository simulates a restart of the process that
+        # executes the workflows
+        restarted = FileSystemViztrailRepository(
+            VIZTRAILS_DIRECTORY,
+            {ENV.identifier: ENV}
+        )
+        workflows = vt.branches[DEFAULT_BRANCH].workflows
+        self.assertEquals(len(workflows), 3)
+        wf = restarted.get_workflow(
+            viztrail_id=vt.identifier,
+            workflow_version=workflows[0].version
+        )
+        self.assertEquals(wf.state, MODULE_SUCCESS)
+        for wf_desc in workflows[1:]:
+            wf = restarted.get_workflow(
+                viztrail_id=vt.identifier,
+                workflow_version=wf_desc.version
+            )
+            self.assertFalse(wf.is_active)
+            self.assertEquals(wf.modules[0].state, MODULE_SUCCESS)
+            for m in wf.modules[1:]:
+                self.assertEquals(m.state, MODULE_CANCELED)
+        release.set()
+        executor.join()
+
     def test_branching(self):
         """Test functionality to execute a workflow module."""
         # Create new viztrail and ensure that it contains exactly one branch
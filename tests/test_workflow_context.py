@@ -3,7 +3,9 @@
 import unittest
 
 from vizier.config import TestEnv
-from vizier.workflow.context import WorkflowContext
+from vizier.workflow.context import VizierDBClient, WorkflowContext
+from vizier.workflow.module import ModuleHandle
+import vizier.workflow.command as cmd
 import vizier.workflow.context as ctx
 
 VZRENV_DATASETS_MODULEID = 'moduleId'
@@ -62,6 +64,47 @@ class TestDataset(unittest.TestCase):
         with self.assertRaises(ValueError):
             context = WorkflowContext(TestEnv(), context_type='UNKNOWN')
 
+    def test_dataset_access(self):
+        """Test recording the datasets that are accessed by a module."""
+        vizierdb = VizierDBClient(None, {'a': 'DS0', 'b': 'DS1'}, None)
+        self.assertEquals(vizierdb.get_dataset_identifier('A'), 'DS0')
+        vizierdb.set_dataset_identifier('A', 'DS2')
+        self.assertEquals(vizierdb.get_dataset_identifier('a'), 'DS2')
+        self.assertFalse(vizierdb.has_dataset_identifier('c'))
+        vizierdb.set_dataset_identifier('c', 'DS3')
+        vizierdb.rename_dataset('b', 'd')
+        self.assertEquals(
+            vizierdb.datasets_read,
+            {'a': 'DS0', 'b': 'DS1', 'c': None, 'd': None}
+        )
+        self.assertEquals(
+            vizierdb.datasets_written,
+            {'a': 'DS2', 'b': None, 'c': 'DS3', 'd': 'DS1'}
+        )
+        # The recorded access is part of the module serialization
+        module = ModuleHandle(
+            1,
+            cmd.python_cell('x = 1'),
+            datasets=dict(vizierdb.datasets),
+            datasets_read=vizierdb.datasets_read,
+            datasets_written=vizierdb.datasets_written
+        )
+        module = ModuleHandle.from_dict(module.copy().to_dict())
+        self.assertEquals(module.datasets_read, vizierdb.datasets_read)
+        self.assertEquals(module.datasets_written, vizierdb.datasets_written)
+        module = ModuleHandle.from_dict(ModuleHandle(1, module.command).to_dict())
+        self.assertIsNone(module.datasets_read)
+        self.assertIsNone(module.datasets_written)
+        # Access for modules in the dataset mappings
+        mappings = DATASET_MAPPINGS()
+        mappings[1][ctx.VZRENV_DATASETS_READ] = {'a': 'DS0'}
+        mappings[1][ctx.VZRENV_DATASETS_WRITTEN] = {'b': 'DS1'}
+        self.assertEquals(
+            ctx.get_dataset_access(mappings, 5),
+            ({'a': 'DS0'}, {'b': 'DS1'})
+        )
+        self.assertEquals(ctx.get_dataset_access(mappings, 3), (None, None))
+
     def validate_keys(self, obj, keys):
         self.assertEquals(len(obj), len(keys))
         for key in keys:
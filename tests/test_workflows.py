@@ -16,6 +16,7 @@ from vizier.datastore.mimir import MimirDataStore
 from vizier.filestore.base import DefaultFileServer
 from vizier.workflow.command import PACKAGE_VIZUAL, PACKAGE_PYTHON, PACKAGE_MIMIR
 from vizier.workflow.engine.viztrails import DefaultViztrailsEngine
+from vizier.workflow.module import MODULE_CANCELED, MODULE_ERROR, MODULE_SUCCESS
 from vizier.workflow.repository.fs import FileSystemViztrailRepository
 from vizier.workflow.vizual.base import DefaultVizualEngine
 from vizier.workflow.vizual.mimir import MimirVizualEngine
@@ -235,6 +236,12 @@ class TestWorkflows(unittest.TestCase):
         )
         wf = self.db.get_workflow(viztrail_id=vt.identifier)
         self.assertTrue(wf.has_error)
+        # Modules that follow the failed module are canceled
+        self.assertEquals(
+            [m.state for m in wf.modules],
+            [MODULE_SUCCESS, MODULE_SUCCESS, MODULE_ERROR, MODULE_CANCELED]
+        )
+        self.assertEquals(wf.state, MODULE_ERROR)
         # Make sure that all workflow modules have a non-negative identifier
         # and that they are all unique
         identifier = set()
@@ -23,6 +23,9 @@ between different components such as the notbook repository that manages
 noretbook metadata and the VizTrails module.
 """
 
+from vizier.datastore.query import parse_predicate
+from vizier.datastore.sort import SORT_CACHE, parse_sort_order
+from vizier.datastore.sort import sort_order_to_string
 from vizier.hateoas import UrlFactory
 from vizier.plot.view import ChartViewHandle
 from vizier.workflow.base import DEFAULT_BRANCH
@@ -200,10 +203,29 @@ class VizierWebService(object):
     # --------------------------------------------------------------------------
     # Datasets
     # --------------------------------------------------------------------------
-    def get_dataset(self, dataset_id, offset=None, limit=None, rowid=None):
+    def get_dataset(
+        self, dataset_id, offset=None, limit=None, rowid=None, contains=None,
+        after=None, before=None, sort=None
+    ):
         """Get dataset with given identifier. The result is None if no dataset
         with the given identifier exists.
 
+        If the contains parameter is given the result is the page of rows that
+        contains the row with the given identifier, i.e., the offset parameter
+        is ignored. Raises ValueError if the dataset does not contain the row.
+
+        The after and before parameters are row cursors for keyset pagination.
+        The result contains the rows that follow (or precede) the row with the
+        given identifier. Pagination Urls in the result use row cursors if
+        either parameter is given. Raises ValueError if the dataset does not
+        contain the row.
+
+        The sort parameter is a comma separated list of column identifier and
+        sort directions (e.g., '1:asc,0:desc'). If given, the offset refers to
+        the sorted dataset. The sort permutation is computed once and kept in
+        the sort cache. Sorting cannot be combined with the contains or row
+        cursor parameters.
+
         Parameters
         ----------
         dataset_id : string
@@ -212,6 +234,16 @@ class VizierWebService(object):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        contains: int, optional
+            Identifier of row that is contained in the returned page
+        after: int, optional
+            Identifier of the row that precedes the returned page
+        before: int, optional
+            Identifier of the row that follows the returned page
+        sort: string, optional
+            Sort order specification
 
         Returns
         -------
@@ -235,14 +267,117 @@ class VizierWebService(object):
                 result_size = self.config.defaults.max_row_limit
             elif self.config.defaults.max_row_limit >= 0:
                 result_size = min(result_size, self.config.defaults.max_row_limit)
+            # Get the offset for the page that contains the requested row
+            if not contains is None:
+                pos = dataset.get_row_position(contains)
+                if pos < 0:
+                    raise ValueError('unknown row \'' + str(contains) + '\'')
+                if result_size > 0:
+                    offset = (pos // result_size) * result_size
+                else:
+                    offset = 0
+            # Get offset and limit for row cursors. Row positions are read
+            # from the row identifier index of the dataset.
+            cursor = not after is None or not before is None
+            if not after is None:
+                pos = dataset.get_row_position(after)
+                if pos < 0:
+                    raise ValueError('unknown row \'' + str(after) + '\'')
+                offset = pos + 1
+            elif not before is None:
+                pos = dataset.get_row_position(before)
+                if pos < 0:
+                    raise ValueError('unknown row \'' + str(before) + '\'')
+                if result_size >= 0:
+                    offset = max(0, pos - result_size)
+                else:
+                    offset = 0
+                result_size = pos - offset
             # Serialize the dataset schema and cells
+            if not sort is None:
+                if cursor or not contains is None or not rowid is None:
+                    raise ValueError('sort cannot be combined with row lookup')
+                order = parse_sort_order(sort, dataset)
+                sort = sort_order_to_string(order)
+                if result_size != 0:
+                    positions = SORT_CACHE.fetch_positions(
+                        dataset,
+                        order,
+                        offset=offset,
+                        limit=result_size
+                    )
+                    rows = dataset.fetch_rows_at(positions)
+                else:
+                    rows = list()
+            elif result_size != 0:
+                rows = dataset.fetch_rows(
+                    offset=offset,
+                    limit=result_size,
+                    rowid=rowid
+                )
+            else:
+                rows = list()
             return serialize.DATASET(
                 dataset=dataset,
-                rows=dataset.fetch_rows(offset=offset, limit=result_size, rowid=rowid),
+                rows=rows,
                 config=self.config,
                 urls=self.urls,
                 offset=offset,
-                limit=limit
+                limit=limit,
+                cursor=cursor,
+                sort=sort
+            )
+
+    def query_dataset(self, dataset_id, query, offset=None, limit=None):
+        """Get the rows of the dataset with given identifier that satisfy the
+        given query predicate. The result is None if no dataset with the given
+        identifier exists.
+
+        Raises ValueError if the query predicate is invalid.
+
+        Parameters
+        ----------
+        dataset_id : string
+            Unique dataset identifier
+        query: dict
+            Dictionary serialization of the query predicate (see
+            vizier.datastore.query.parse_predicate)
+        offset: int, optional
+            Number of matching rows that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+
+        Returns
+        -------
+        dict
+        """
+        dataset = self.get_dataset_handle(dataset_id)
+        if not dataset is None:
+            predicate = parse_predicate(query, dataset)
+            # Determine offset and limits
+            if not offset is None:
+                offset = max(0, int(offset))
+            else:
+                offset = 0
+            if not limit is None:
+                result_size = int(limit)
+            else:
+                result_size = self.config.defaults.row_limit
+            if result_size < 0 and self.config.defaults.max_row_limit > 0:
+                result_size = self.config.defaults.max_row_limit
+            elif self.config.defaults.max_row_limit >= 0:
+                result_size = min(result_size, self.config.defaults.max_row_limit)
+            return serialize.DATASET_QUERY(
+                dataset=dataset,
+                rows=dataset.fetch_rows(
+                    offset=offset,
+                    limit=result_size,
+                    predicate=predicate
+                ),
+                query=query,
+                urls=self.urls,
+                offset=offset,
+                limit=result_size
             )
 
     def get_dataset_annotations(self, dataset_id, column_id=-1, row_id='-1'):
@@ -822,6 +957,41 @@ class VizierWebService(object):
             read_only=(workflow_version != -1)
         )
 
+    def get_workflow_status(self, project_id, branch_id, workflow_version=-1):
+        """Get the execution status of a workflow and its modules. Workflows
+        are pending or running while they are executed in the background.
+
+        Returns None if no project, branch, or workflow with given identifiers
+        exists.
+
+        Parameters
+        ----------
+        project_id : string
+            Unique project identifier
+        branch_id: string
+            Unique workflow branch identifier
+        workflow_version: int, optional
+            Version number of the workflow
+
+        Returns
+        -------
+        dict
+        """
+        # Get viztrail to ensure that it exist.
+        viztrail = self.viztrails.get_viztrail(viztrail_id=project_id)
+        if viztrail is None:
+            return None
+        # Retrieve workflow from repository. The result is None if the branch
+        # does not exist.
+        workflow = self.viztrails.get_workflow(
+            viztrail_id=project_id,
+            branch_id=branch_id,
+            workflow_version=workflow_version
+        )
+        if workflow is None:
+            return None
+        return serialize.WORKFLOW_STATUS(viztrail, workflow, self.urls)
+
     def get_workflow_modules(self, project_id, branch_id, workflow_version=-1):
         """Get list of module handles for a workflow from a given project.
 
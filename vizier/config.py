@@ -53,6 +53,10 @@ or be located (as file config.yaml) in the current working directory.
 import os
 import yaml
 
+from vizier.datastore.cache import DEFAULT_PAGE_CACHE_SIZE
+from vizier.datastore.sort import DEFAULT_SORT_CACHE_SIZE
+from vizier.workflow.engine.cache import DEFAULT_MODULE_CACHE_SIZE
+
 import vizier.workflow.command as cmd
 
 
@@ -105,8 +109,13 @@ class AppConfig(object):
         defaults:
             row_limit
             max_row_limit
+            page_cache_size
+            sort_cache_size
+            sort_cache_dir
+            module_cache_size
         settings:
             log_engine
+            background_execution
         name
         debug
         logs
@@ -333,6 +342,13 @@ class APIDefaults(object):
         """Initialize default values."""
         self.row_limit = DEFAULT_ROW_LIMIT 
         self.max_row_limit = DEFAULT_MAX_ROW_LIMIT 
+        # Memory budget (in bytes) for the cache of decoded dataset rows
+        self.page_cache_size = DEFAULT_PAGE_CACHE_SIZE
+        # Disk budget (in bytes) and directory for cached sort permutations
+        self.sort_cache_size = DEFAULT_SORT_CACHE_SIZE
+        self.sort_cache_dir = None
+        # Memory budget (in bytes) for the cache of module execution outputs
+        self.module_cache_size = DEFAULT_MODULE_CACHE_SIZE
 
     def from_dict(self, doc):
         """Initialize from dictionary."""
@@ -340,6 +356,14 @@ class APIDefaults(object):
             self.row_limit = int(doc['row_limit'])
         if 'max_row_limit' in doc:
             self.max_row_limit = int(doc['max_row_limit'])
+        if 'page_cache_size' in doc:
+            self.page_cache_size = int(doc['page_cache_size'])
+        if 'sort_cache_size' in doc:
+            self.sort_cache_size = int(doc['sort_cache_size'])
+        if 'sort_cache_dir' in doc:
+            self.sort_cache_dir = doc['sort_cache_dir']
+        if 'module_cache_size' in doc:
+            self.module_cache_size = int(doc['module_cache_size'])
 
 
 class APISettings(object):
@@ -347,11 +371,16 @@ class APISettings(object):
     def __init__(self):
         """Initialize default values."""
         self.log_engine = False
+        # Execute workflows in the background instead of blocking the request
+        # that modified the workflow
+        self.background_execution = False
 
     def from_dict(self, doc):
         """Initialize from dictionary."""
         if 'log_engine' in doc:
             self.log_engine = doc['log_engine']
+        if 'background_execution' in doc:
+            self.background_execution = doc['background_execution']
 
 
 class FSObjectConfig(object):
@@ -0,0 +1,321 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded in-memory caches that are shared between components of the Vizier
+web service. All caches are thread-safe.
+"""
+
+from collections import OrderedDict
+import threading
+
+
+class LRUCache(object):
+    """Cache with a maximum number of entries. The least recently used entry
+    is evicted when the cache is full. Keeps counters for cache hits, misses,
+    and evictions.
+
+    Attributes
+    ----------
+    capacity: int
+        Maximum number of entries in the cache
+    evictions: int
+        Number of entries that have been evicted
+    hits: int
+        Number of successful lookups
+    misses: int
+        Number of lookups for keys that were not in the cache
+    """
+    def __init__(self, capacity):
+        """Initialize the cache capacity.
+
+        Raises ValueError if the capacity is not positive.
+
+        Parameters
+        ----------
+        capacity: int
+            Maximum number of entries in the cache
+        """
+        if capacity <= 0:
+            raise ValueError('invalid cache capacity \'' + str(capacity) + '\'')
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        """Test if an entry for the given key is in the cache. Does not affect
+        the cache statistics.
+
+        Parameters
+        ----------
+        key: any
+
+        Returns
+        -------
+        bool
+        """
+        return key in self.entries
+
+    def __len__(self):
+        """Number of entries in the cache.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.entries)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self.lock:
+            self.entries.clear()
+
+    def get(self, key):
+        """Get the cached value for the given key. Returns None if the key is
+        not in the cache.
+
+        Parameters
+        ----------
+        key: any
+
+        Returns
+        -------
+        any
+        """
+        with self.lock:
+            if key in self.entries:
+                # Move the entry to the end of the list of entries
+                value = self.entries.pop(key)
+                self.entries[key] = value
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def hit_ratio(self):
+        """Fraction of lookups that were cache hits. The result is 0 if no
+        lookups have been made.
+
+        Returns
+        -------
+        float
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups > 0 else 0.0
+
+    def put(self, key, value):
+        """Add a value to the cache. Evicts the least recently used entries if
+        the cache is full.
+
+        Parameters
+        ----------
+        key: any
+        value: any
+        """
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+            self.entries[key] = value
+            while self.is_full():
+                self.evict()
+
+    def evict(self):
+        """Remove the least recently used entry from the cache. Expects the
+        lock to be held by the caller.
+
+        Returns
+        -------
+        any, any
+        """
+        self.evictions += 1
+        return self.entries.popitem(last=False)
+
+    def is_full(self):
+        """Test if the cache exceeds its capacity. Expects the lock to be held
+        by the caller.
+
+        Returns
+        -------
+        bool
+        """
+        return len(self.entries) > self.capacity
+
+    def remove(self, key):
+        """Remove the entry for the given key. Returns True if the key was in
+        the cache.
+
+        Parameters
+        ----------
+        key: any
+
+        Returns
+        -------
+        bool
+        """
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+                return True
+            return False
+
+    def stats(self):
+        """Dictionary of cache statistics.
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hitRatio': self.hit_ratio()
+        }
+
+
+class MemoryBudgetCache(LRUCache):
+    """LRU cache that is bounded by the total size of the cached values in
+    bytes instead of the number of entries. The size of each value is given
+    by the caller when the value is added to the cache.
+
+    Attributes
+    ----------
+    budget: int
+        Maximum number of bytes held by the cache. The cache is disabled if
+        the budget is zero.
+    size: int
+        Number of bytes currently held by the cache
+    """
+    def __init__(self, budget):
+        """Initialize the memory budget.
+
+        Raises ValueError if the budget is negative.
+
+        Parameters
+        ----------
+        budget: int
+            Maximum number of bytes held by the cache
+        """
+        super(MemoryBudgetCache, self).__init__(capacity=1)
+        self.capacity = None
+        self.sizes = dict()
+        self.size = 0
+        self.set_budget(budget)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.size = 0
+
+    def evict(self):
+        """Remove the least recently used entry from the cache. Expects the
+        lock to be held by the caller.
+
+        Returns
+        -------
+        any, any
+        """
+        key, value = super(MemoryBudgetCache, self).evict()
+        self.size -= self.sizes.pop(key)
+        return key, value
+
+    def is_full(self):
+        """Test if the cache exceeds its memory budget. Expects the lock to be
+        held by the caller.
+
+        Returns
+        -------
+        bool
+        """
+        return self.size > self.budget
+
+    def put(self, key, value, size=0):
+        """Add a value of the given size to the cache. Evicts the least
+        recently used entries if the cache exceeds its memory budget. Values
+        that are larger than the budget are not cached.
+
+        Parameters
+        ----------
+        key: any
+        value: any
+        size: int
+            Size of the value in bytes
+        """
+        if size > self.budget:
+            return
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+                self.size -= self.sizes.pop(key)
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.size += size
+            while self.is_full():
+                self.evict()
+
+    def remove(self, key):
+        """Remove the entry for the given key. Returns True if the key was in
+        the cache.
+
+        Parameters
+        ----------
+        key: any
+
+        Returns
+        -------
+        bool
+        """
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+                self.size -= self.sizes.pop(key)
+                return True
+            return False
+
+    def set_budget(self, budget):
+        """Change the memory budget. Evicts entries if the cache exceeds the
+        new budget.
+
+        Raises ValueError if the budget is negative.
+
+        Parameters
+        ----------
+        budget: int
+            Maximum number of bytes held by the cache
+        """
+        if budget < 0:
+            raise ValueError('invalid cache budget \'' + str(budget) + '\'')
+        with self.lock:
+            self.budget = budget
+            while self.is_full():
+                self.evict()
+
+    def stats(self):
+        """Dictionary of cache statistics.
+
+        Returns
+        -------
+        dict
+        """
+        stats = super(MemoryBudgetCache, self).stats()
+        stats['bytes'] = self.size
+        stats['budget'] = self.budget
+        return stats
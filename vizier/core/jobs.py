@@ -0,0 +1,82 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Queue for jobs that are executed in the background by a worker thread.
+
+Jobs are executed one at a time in the order in which they were submitted.
+A job may therefore rely on all jobs that were submitted before it to have
+finished. The worker thread is started when the first job is submitted.
+"""
+
+import logging
+import Queue
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue(object):
+    """First-in first-out queue of jobs that are executed by a single
+    background worker thread. Each job is a function together with the
+    arguments for the function call. Exceptions that are raised by a job are
+    logged and do not affect the execution of other jobs.
+    """
+    def __init__(self):
+        """Initialize the job queue. The worker thread is not started until
+        the first job is submitted.
+        """
+        self.jobs = Queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def join(self):
+        """Block until all submitted jobs have been executed."""
+        self.jobs.join()
+
+    def run(self):
+        """Execute jobs from the queue. This method is run by the worker
+        thread and does not return.
+        """
+        while True:
+            func, args, kwargs = self.jobs.get()
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception('job \'' + func.__name__ + '\' failed')
+            finally:
+                self.jobs.task_done()
+
+    def submit(self, func, *args, **kwargs):
+        """Add a job to the queue. The given function is called with the
+        given arguments by the worker thread once all previously submitted
+        jobs have been executed.
+
+        Parameters
+        ----------
+        func: function
+            Job function
+        args: list
+            Positional arguments for the function call
+        kwargs: dict
+            Keyword arguments for the function call
+        """
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run)
+                self.worker.daemon = True
+                self.worker.start()
+        self.jobs.put((func, args, kwargs))
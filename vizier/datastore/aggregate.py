@@ -0,0 +1,401 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Aggregating datasets.
+
+Hash aggregation: Rows are grouped by the values of one or more columns in a
+single pass over the dataset. A group table maps the values of the grouping
+columns to the running state of the aggregate functions. Only the group table
+is held in memory.
+
+Spilling: When the estimated size of the group table exceeds a memory budget,
+no further groups are added to the table. Rows that belong to groups that are
+not in the table are written to temporary partition files instead, based on
+the hash of their group key. Each partition is aggregated recursively after
+the pass over the rows is complete.
+"""
+
+import cPickle
+import os
+import shutil
+import sys
+import tempfile
+
+from vizier.core.util import cast
+
+
+"""Aggregate functions."""
+AGG_AVG = 'avg'
+AGG_COUNT = 'count'
+AGG_MAX = 'max'
+AGG_MIN = 'min'
+AGG_SUM = 'sum'
+
+AGGREGATE_FUNCTIONS = [AGG_AVG, AGG_COUNT, AGG_MAX, AGG_MIN, AGG_SUM]
+
+"""Default memory budget for the group table of a hash aggregation (in
+bytes)."""
+DEFAULT_AGGREGATE_BUFFER_SIZE = 64 * 1024 * 1024
+
+"""Maximum recursion depth for spilled partitions. Partitions at this depth
+are aggregated in memory regardless of the memory budget."""
+MAX_SPILL_DEPTH = 4
+
+"""Number of partition files that rows are spilled to."""
+SPILL_PARTITIONS = 16
+
+"""Number of rows per record in partition files."""
+SPILL_BLOCK_SIZE = 1024
+
+
+class SpillPartitions(object):
+    """Set of temporary partition files for rows that do not fit into the
+    group table. Rows are assigned to partitions by the hash of their group
+    key and the recursion depth, i.e., the rows in a partition are distributed
+    differently when the partition is spilled again.
+
+    Partitions are processed depth-first and deleted once they have been
+    read. File names therefore only need to be unique per depth and prefix.
+    """
+    def __init__(self, spill_dir, depth, prefix='part'):
+        """Create the partition files in the given directory.
+
+        Parameters
+        ----------
+        spill_dir: string
+            Directory for partition files
+        depth: int
+            Recursion depth of the operation that spills rows
+        prefix: string, optional
+            Prefix for partition file names
+        """
+        self.depth = depth
+        self.filenames = list()
+        self.files = list()
+        self.blocks = list()
+        for i in range(SPILL_PARTITIONS):
+            filename = os.path.join(
+                spill_dir,
+                prefix + str(depth) + '-' + str(i)
+            )
+            self.filenames.append(filename)
+            self.files.append(open(filename, 'wb'))
+            self.blocks.append(list())
+
+    def add(self, key, values):
+        """Add a row to the partition for the given group key.
+
+        Parameters
+        ----------
+        key: tuple
+            Values of the grouping columns
+        values: list
+            Row values
+        """
+        index = hash((self.depth, key)) % SPILL_PARTITIONS
+        block = self.blocks[index]
+        block.append(values)
+        if len(block) == SPILL_BLOCK_SIZE:
+            cPickle.dump(block, self.files[index], cPickle.HIGHEST_PROTOCOL)
+            self.blocks[index] = list()
+
+    def close(self):
+        """Write remaining rows and close all partition files. Returns the
+        paths to the partition files.
+
+        Returns
+        -------
+        list(string)
+        """
+        for i in range(SPILL_PARTITIONS):
+            if len(self.blocks[i]) > 0:
+                cPickle.dump(
+                    self.blocks[i],
+                    self.files[i],
+                    cPickle.HIGHEST_PROTOCOL
+                )
+            self.files[i].close()
+        self.blocks = None
+        self.files = None
+        return self.filenames
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def aggregate_partition(
+    rows, groups, aggregates, buffer_size, spill_dir, depth
+):
+    """Aggregate a stream of row values using a group table that is bounded
+    by the given buffer size. Rows of groups that are not in the table once
+    the buffer is full are spilled and aggregated recursively.
+
+    Parameters
+    ----------
+    rows: iterable(list)
+        Row values
+    groups: list(int)
+        Index positions of the grouping columns in the row values
+    aggregates: list((string, int))
+        Aggregate functions and the index positions of their input values
+    buffer_size: int
+        Memory budget for the group table (in bytes)
+    spill_dir: string
+        Directory for partition files
+    depth: int
+        Recursion depth
+
+    Returns
+    -------
+    iterator(list)
+    """
+    table = dict()
+    size = 0
+    partitions = None
+    for values in rows:
+        key = tuple([values[pos] for pos in groups])
+        state = table.get(key)
+        if state is None:
+            if size > buffer_size and depth < MAX_SPILL_DEPTH:
+                if partitions is None:
+                    partitions = SpillPartitions(spill_dir, depth)
+                partitions.add(key, values)
+                continue
+            state = initial_state(len(table), aggregates)
+            table[key] = state
+            size += group_size(key, state)
+        for i in range(len(aggregates)):
+            func, pos = aggregates[i]
+            if pos is None:
+                state[i + 1] += 1
+                continue
+            value = values[pos]
+            if value is None or value == '':
+                continue
+            if func == AGG_COUNT:
+                state[i + 1] += 1
+            elif func == AGG_SUM:
+                value = to_number(value)
+                if state[i + 1] is None:
+                    state[i + 1] = value
+                else:
+                    state[i + 1] += value
+            elif func == AGG_AVG:
+                acc = state[i + 1]
+                acc[0] += to_number(value)
+                acc[1] += 1
+            else:
+                # Values of numeric columns are compared without conversion
+                if isinstance(value, basestring):
+                    value = cast(value)
+                current = state[i + 1]
+                if current is None:
+                    state[i + 1] = value
+                elif func == AGG_MIN and value < current:
+                    state[i + 1] = value
+                elif func == AGG_MAX and value > current:
+                    state[i + 1] = value
+    # Return groups in order of their first occurrence
+    for key, state in sorted(table.iteritems(), key=lambda item: item[1][0]):
+        yield list(key) + final_values(state, aggregates)
+    table = None
+    if not partitions is None:
+        for filename in partitions.close():
+            partition = aggregate_partition(
+                read_partition(filename),
+                groups,
+                aggregates,
+                buffer_size,
+                spill_dir,
+                depth + 1
+            )
+            for values in partition:
+                yield values
+            os.remove(filename)
+
+
+def final_values(state, aggregates):
+    """Get the values of the aggregate functions from the state of a group.
+
+    Parameters
+    ----------
+    state: list
+        Group state as created by initial_state
+    aggregates: list((string, int))
+        Aggregate functions and the index positions of their input values
+
+    Returns
+    -------
+    list
+    """
+    values = list()
+    for i in range(len(aggregates)):
+        if aggregates[i][0] == AGG_AVG:
+            total, count = state[i + 1]
+            values.append(float(total) / count if count > 0 else None)
+        else:
+            values.append(state[i + 1])
+    return values
+
+
+def group_size(key, state):
+    """Estimate the memory size (in bytes) of an entry in the group table.
+
+    Parameters
+    ----------
+    key: tuple
+        Values of the grouping columns
+    state: list
+        Group state
+
+    Returns
+    -------
+    int
+    """
+    size = sys.getsizeof(key) + sys.getsizeof(state)
+    for value in key:
+        size += sys.getsizeof(value)
+    for value in state:
+        size += sys.getsizeof(value)
+    return size
+
+
+def hash_aggregate(
+    rows, groups, aggregates, buffer_size=DEFAULT_AGGREGATE_BUFFER_SIZE,
+    tmp_dir=None
+):
+    """Group a stream of row values by the values at the given grouping
+    positions and compute the given aggregate functions for each group. Rows
+    are read in a single pass. Groups whose entries do not fit into the
+    buffer are spilled to temporary partition files (see
+    aggregate_partition).
+
+    Each aggregate is a pair of function name and index position of the
+    aggregated value. The position is None for a count of all rows in a group.
+    Missing values (None or empty strings) are ignored by all other
+    aggregates. Sum and average raise ValueError for non-numeric values.
+
+    Returns an iterator over the result rows. Each row contains the group
+    values followed by the aggregate values. Groups are returned in order of
+    their first occurrence unless rows have been spilled. Temporary files are
+    deleted when the iterator is exhausted or closed.
+
+    Parameters
+    ----------
+    rows: iterable(list)
+        Row values
+    groups: list(int)
+        Index positions of the grouping columns in the row values
+    aggregates: list((string, int))
+        Aggregate functions and the index positions of their input values
+    buffer_size: int, optional
+        Memory budget for the group table (in bytes)
+    tmp_dir: string, optional
+        Parent directory for temporary partition files
+
+    Returns
+    -------
+    iterator(list)
+    """
+    for func, pos in aggregates:
+        if not func in AGGREGATE_FUNCTIONS:
+            raise ValueError('unknown aggregate function \'' + str(func) + '\'')
+        if pos is None and func != AGG_COUNT:
+            raise ValueError('missing argument for \'' + func + '\'')
+    spill_dir = tempfile.mkdtemp(dir=tmp_dir)
+    try:
+        result = aggregate_partition(
+            rows,
+            groups,
+            aggregates,
+            buffer_size,
+            spill_dir,
+            0
+        )
+        for values in result:
+            yield values
+    finally:
+        shutil.rmtree(spill_dir)
+
+
+def initial_state(index, aggregates):
+    """Get the initial state for a new group. The first element is the index
+    of the group in the group table followed by one accumulator for each
+    aggregate.
+
+    Parameters
+    ----------
+    index: int
+        Index of the group in order of first occurrence
+    aggregates: list((string, int))
+        Aggregate functions and the index positions of their input values
+
+    Returns
+    -------
+    list
+    """
+    state = [index]
+    for func, _ in aggregates:
+        if func == AGG_COUNT:
+            state.append(0)
+        elif func == AGG_AVG:
+            state.append([0, 0])
+        else:
+            state.append(None)
+    return state
+
+
+def read_partition(filename):
+    """Read the rows in a partition file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the partition file
+
+    Returns
+    -------
+    iterator(list)
+    """
+    with open(filename, 'rb') as f:
+        while True:
+            try:
+                block = cPickle.load(f)
+            except EOFError:
+                return
+            for values in block:
+                yield values
+
+
+def to_number(value):
+    """Convert a value to integer or float. Raises ValueError if the value is
+    not numeric.
+
+    Parameters
+    ----------
+    value: any
+
+    Returns
+    -------
+    int, long, or float
+    """
+    if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+        return value
+    number = cast(value)
+    if not isinstance(number, (int, long, float)):
+        raise ValueError('not a number \'' + unicode(value) + '\'')
+    return number
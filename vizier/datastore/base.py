@@ -24,6 +24,7 @@ import csv
 import yaml
 
 from vizier.core.system import component_descriptor, VizierSystemComponent
+from vizier.datastore.cache import PAGE_CACHE
 from vizier.datastore.metadata import DatasetMetadata
 from vizier.datastore.query import DataStreamConsumer
 
@@ -49,6 +50,9 @@ class DatasetHandle(object):
         List of dataset columns
     column_counter: int
         Counter to generate unique column identifier
+    fingerprint: string
+        Fingerprint of the dataset content. Datasets with the same fingerprint
+        have the same schema, rows, and annotations. None if unknown.
     row_count: int
         Number of rows in the dataset
     row_counter: int
@@ -56,7 +60,14 @@ class DatasetHandle(object):
     identifier: string
         Unique dataset identifier
     """
-    def __init__(self, identifier, columns, row_count=0, column_counter=0, row_counter=0, annotations=None):
+    # Flag indicating whether pages of dataset rows may be kept in the shared
+    # page cache. Only set for handles of immutable datasets.
+    cache_pages = False
+
+    def __init__(
+        self, identifier, columns, row_count=0, column_counter=0,
+        row_counter=0, annotations=None, fingerprint=None
+    ):
         """Initialize the dataset.
 
         Raises ValueError if dataset columns or rows do not have unique
@@ -77,8 +88,11 @@ class DatasetHandle(object):
             Counter to generate unique row identifier
         annotations: vizier.datastore.metadata.DatasetMetadata
             Annotations for dataset components
+        fingerprint: string, optional
+            Fingerprint of the dataset content
         """
         self.identifier = identifier
+        self.fingerprint = fingerprint
         # Ensure that all columns have a unique identifier
         ids = set()
         for col in columns:
@@ -170,16 +184,30 @@ class DatasetHandle(object):
         """
         return get_column_index(self.columns, column_id)
 
-    def fetch_rows(self, offset=0, limit=-1, rowid=None):
+    def fetch_rows(
+        self, offset=0, limit=-1, rowid=None, columns=None, predicate=None
+    ):
         """Get list of dataset rows. The offset and limit parameters are
         intended for pagination.
 
+        Pages of rows for handles of immutable datasets (with the cache_pages
+        flag set) are read through the shared page cache.
+
         Parameters
         ----------
         offset: int, optional
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        columns: list(int), optional
+            Identifier of columns that are included in the returned rows. The
+            row values are in order of the given list. All columns are
+            included if None.
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate. Offset and limit
+            refer to the list of matching rows.
 
         Result
         ------
@@ -188,14 +216,56 @@ class DatasetHandle(object):
         # Return empty list for special case that limit is 0
         if limit == 0:
             return list()
+        # Use the page cache for requests with a limit. Return copies of the
+        # cached rows since callers may modify the returned rows.
+        use_cache = self.cache_pages and PAGE_CACHE.budget > 0
+        is_page = rowid is None and columns is None and predicate is None
+        if use_cache and limit > 0 and is_page:
+            return [
+                DatasetRow(
+                    row.identifier,
+                    list(row.values),
+                    list(row.cell_annotations)
+                ) for row in PAGE_CACHE.fetch_rows(self, offset, limit)
+            ]
         # Collect rows in result list. Skip first rows if offset is greater than
         # zero
         rows = list()
-        with self.reader(offset=offset, limit=limit, rowid=rowid) as reader:
-            for row in reader:
+        reader = self.reader(
+            offset=offset,
+            limit=limit,
+            rowid=rowid,
+            columns=columns,
+            predicate=predicate
+        )
+        with reader as r:
+            for row in r:
                 rows.append(row)
         return rows
 
+    def fetch_rows_at(self, positions):
+        """Get list of dataset rows at the given index positions. Rows are
+        returned in the order of the given list of positions. Positions that
+        are outside the dataset are ignored.
+
+        The default implementation reads each row separately. Implementations
+        are expected to override this method if they can read a set of rows
+        in a single pass over the data.
+
+        Parameters
+        ----------
+        positions: list(int)
+            Index positions of rows in the dataset
+
+        Returns
+        -------
+        list(vizier.dataset.base.DatasetRow)
+        """
+        rows = list()
+        for pos in positions:
+            rows.extend(self.fetch_rows(offset=pos, limit=1))
+        return rows
+
     @abstractmethod
     def get_annotations(self, column_id=-1, row_id=-1):
         """Get list of annotations for a dataset component. Expects at least one
@@ -214,11 +284,58 @@ class DatasetHandle(object):
         """
         raise NotImplementedError
 
+    def get_row_position(self, rowid):
+        """Get the index position of the row with the given identifier in the
+        dataset. Returns -1 if the dataset does not contain the row.
+
+        The default implementation scans the row identifier of the dataset.
+        Implementations are expected to override this method with a lookup in
+        a row identifier index.
+
+        Parameters
+        ----------
+        rowid: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        rowid = int(rowid)
+        with self.reader(columns=[]) as reader:
+            pos = 0
+            for row in reader:
+                if row.identifier == rowid:
+                    return pos
+                pos += 1
+        return -1
+
+    def get_column_positions(self, columns):
+        """Get index positions in the dataset schema for the columns with the
+        given identifier.
+
+        Raises ValueError if any of the columns does not exist.
+
+        Parameters
+        ----------
+        columns: list(int)
+            Unique column identifier
+
+        Returns
+        -------
+        list(int)
+        """
+        return [get_index_for_column(self, col_id) for col_id in columns]
+
     @abstractmethod
-    def reader(self, offset=0, limit=-1, rowid=None):
+    def reader(
+        self, offset=0, limit=-1, rowid=None, columns=None, predicate=None
+    ):
         """Get reader for the dataset to access the dataset rows. The optional
         offset amd limit parameters are used to retrieve only a subset of
-        rows.
+        rows. The optional list of column identifier is used to retrieve only
+        a subset of the values in each row. The optional predicate is used to
+        retrieve only rows that satisfy the predicate.
 
         Parameters
         ----------
@@ -226,6 +343,12 @@ class DatasetHandle(object):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        columns: list(int), optional
+            Identifier of columns that are included in the returned rows
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate
 
         Returns
         -------
@@ -245,8 +368,11 @@ class DatasetColumn(object):
         Unique column identifier
     name: string
         Column name
+    data_type: string
+        Data type of the column values. The type is None for columns that
+        have not been converted to a specific type.
     """
-    def __init__(self, identifier=None, name=None):
+    def __init__(self, identifier=None, name=None, data_type=None):
         """Initialize the column object.
 
         Parameters
@@ -255,9 +381,12 @@ class DatasetColumn(object):
             Unique column identifier
         name: string, optional
             Column name
+        data_type: string, optional
+            Data type of the column values
         """
         self.identifier = identifier if not identifier is None else -1
         self.name = name
+        self.data_type = data_type
 
     def __str__(self):
         """Human-readable string representation for the column.
@@ -276,16 +405,37 @@ class DatasetColumn(object):
         -------
         vizier.datastore.base.DatasetColumn
         """
-        return DatasetColumn(int(obj['id']), obj['name'])
+        return DatasetColumn(
+            int(obj['id']),
+            obj['name'],
+            data_type=obj.get('dataType')
+        )
 
     def to_dict(self):
-        """Dictionary serialization of the dataset column object.
+        """Dictionary serialization of the dataset column object. The data
+        type is only included for typed columns.
 
         Returns
         -------
         dict
         """
-        return {'id': self.identifier, 'name': self.name}
+        obj = {'id': self.identifier, 'name': self.name}
+        if not self.data_type is None:
+            obj['dataType'] = self.data_type
+        return obj
+
+    def is_numeric(self):
+        """Flag indicating if the data type of this column is numeric, i.e.,
+        integer or real. Values of numeric columns do not need to be converted
+        before they are used as numbers.
+
+        Returns
+        -------
+        bool
+        """
+        if self.data_type is None:
+            return False
+        return self.data_type.lower() in ['int', 'real']
 
 
 class DatasetRow(object):
@@ -399,6 +549,56 @@ class DataStore(VizierSystemComponent):
         """
         raise NotImplementedError
 
+    def create_derived_dataset(
+        self, source, columns, operations, row_count, column_counter,
+        row_counter, annotations=None, materialize=True
+    ):
+        """Create a new dataset whose rows are the result of applying the
+        given sequence of operations (see vizier.datastore.derived) to the
+        rows of the source dataset.
+
+        The default implementation applies the operations in a single pass
+        over the source rows and creates the new dataset immediately. Data
+        stores that support lazy materialization create the new dataset
+        without writing its rows if materialize is False.
+
+        Parameters
+        ----------
+        source: vizier.datastore.base.DatasetHandle
+            Handle for the source dataset
+        columns: list(vizier.datastore.base.DatasetColumn)
+            List of columns in the derived dataset
+        operations: list(dict)
+            Sequence of operations
+        row_count: int
+            Number of rows in the derived dataset. None if the number is not
+            known in advance. The data store then determines the number when
+            the rows are written
+        column_counter: int
+            Counter to generate unique column identifier
+        row_counter: int
+            Counter to generate unique row identifier
+        annotations: vizier.datastore.metadata.DatasetMetadata, optional
+            Annotations for dataset components
+        materialize: bool, optional
+            Write the rows of the derived dataset immediately
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetHandle
+        """
+        # Import here to avoid a circular dependency (the operations module
+        # depends on the dataset row class defined in this module)
+        from vizier.datastore.derived import apply_operations
+        with source.reader() as reader:
+            return self.create_dataset(
+                columns=columns,
+                rows=apply_operations(reader, operations),
+                column_counter=column_counter,
+                row_counter=row_counter,
+                annotations=annotations
+            )
+
     @abstractmethod
     def delete_dataset(self, identifier):
         """Delete dataset with given identifier. Returns True if dataset existed
@@ -499,25 +699,40 @@ class DataStore(VizierSystemComponent):
         x_axis = -1
         if not view.x_axis is None:
             x_axis = view.x_axis
-        # Create a list of data consumers, one for each data series
+        # Create a list of data consumers, one for each data series. Only the
+        # columns that are used by data series are read from the dataset. The
+        # column index of each consumer refers to the position of the column
+        # in the projected rows.
         consumers = list()
+        columns = list()
+        limit = 0
         for s_idx in range(len(view.data)):
             s = view.data[s_idx]
-            c_idx = get_index_for_column(dataset, s.column)
+            # Raise ValueError if the column does not exist
+            col = dataset.columns[get_index_for_column(dataset, s.column)]
+            if not s.column in columns:
+                columns.append(s.column)
             consumers.append(
                 DataStreamConsumer(
-                    column_index=c_idx,
+                    column_index=columns.index(s.column),
                     range_start=s.range_start,
                     range_end=s.range_end,
-                    cast_to_number=(s_idx != x_axis)
+                    cast_to_number=(s_idx != x_axis and not col.is_numeric())
                 )
             )
-        # Consume all dataset rows
-        rows = dataset.fetch_rows()
-        for row_index in range(len(rows)):
-            row = rows[row_index]
-            for c in consumers:
-                c.consume(row=row, row_index=row_index)
+            # Only read rows up to the end of the longest data series range
+            if s.range_end is None or limit < 0:
+                limit = -1
+            else:
+                limit = max(limit, s.range_end + 1)
+        # Consume dataset rows
+        if len(columns) > 0:
+            with dataset.reader(limit=limit, columns=columns) as reader:
+                row_index = 0
+                for row in reader:
+                    for c in consumers:
+                        c.consume(row=row, row_index=row_index)
+                    row_index += 1
         # the size of the result set is determined by the longest data series
         max_values = -1
         for c in consumers:
@@ -0,0 +1,135 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Dataset page cache - Shared cache for decoded dataset rows.
+
+Rows are cached in pages of fixed size. Each page is identified by the dataset
+identifier and the page number. The cache is bounded by a memory budget (in
+bytes) and evicts the least recently used pages first.
+"""
+
+import sys
+
+from vizier.core.cache import MemoryBudgetCache
+
+
+"""Default memory budget for the page cache (in bytes)."""
+DEFAULT_PAGE_CACHE_SIZE = 64 * 1024 * 1024
+
+"""Number of rows in a cached page."""
+PAGE_SIZE = 100
+
+
+class DatasetPageCache(MemoryBudgetCache):
+    """Cache for pages of decoded dataset rows. The cache key is a tuple of
+    dataset identifier and page number.
+    """
+    def __init__(self, budget=DEFAULT_PAGE_CACHE_SIZE, page_size=PAGE_SIZE):
+        """Initialize the memory budget and page size.
+
+        Parameters
+        ----------
+        budget: int, optional
+            Maximum number of bytes held by the cache
+        page_size: int, optional
+            Number of rows in a cached page
+        """
+        super(DatasetPageCache, self).__init__(budget)
+        self.page_size = page_size
+
+    def fetch_rows(self, dataset, offset, limit):
+        """Get list of rows from the given dataset. Rows are read from cached
+        pages. Pages that are not in the cache are read using the dataset
+        reader and added to the cache.
+
+        Rows in the returned list are the cached row objects. They should not
+        be modified by the caller.
+
+        Parameters
+        ----------
+        dataset: vizier.datastore.base.DatasetHandle
+            Handle for the dataset
+        offset: int
+            Number of rows at the beginning of the list that are skipped.
+        limit: int
+            Limits the number of rows that are returned. Expected to be
+            positive.
+
+        Returns
+        -------
+        list(vizier.datastore.base.DatasetRow)
+        """
+        rows = list()
+        first_page = offset // self.page_size
+        last_page = (offset + limit - 1) // self.page_size
+        for page in range(first_page, last_page + 1):
+            key = (dataset.identifier, page)
+            page_rows = self.get(key)
+            if page_rows is None:
+                page_rows = list()
+                reader = dataset.reader(
+                    offset=page * self.page_size,
+                    limit=self.page_size
+                )
+                with reader.open() as r:
+                    for row in r:
+                        page_rows.append(row)
+                self.put(key, page_rows, size=rows_size(page_rows))
+            rows.extend(page_rows)
+            # Stop at the end of the dataset
+            if len(page_rows) < self.page_size:
+                break
+        start = offset - first_page * self.page_size
+        return rows[start:start + limit]
+
+    def invalidate(self, identifier):
+        """Remove all pages of the dataset with the given identifier from the
+        cache.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        """
+        for key in list(self.entries.keys()):
+            if key[0] == identifier:
+                self.remove(key)
+
+
+"""Page cache that is shared by all dataset handles."""
+PAGE_CACHE = DatasetPageCache()
+
+
+def rows_size(rows):
+    """Estimate the memory size (in bytes) of a list of dataset rows.
+
+    Parameters
+    ----------
+    rows: list(vizier.datastore.base.DatasetRow)
+        List of dataset rows
+
+    Returns
+    -------
+    int
+    """
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sys.getsizeof(row.__dict__)
+        size += sys.getsizeof(row.identifier)
+        size += sys.getsizeof(row.values) + sys.getsizeof(row.cell_annotations)
+        for value in row.values:
+            size += sys.getsizeof(value)
+    return size
@@ -0,0 +1,699 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Columnar dataset files - Chunked columnar storage format for datasets in the
+file system data store.
+
+Dataset rows are split into row groups of fixed size. Within each row group the
+values of each column are stored in a separate block together with a block for
+the row identifier. Each block is encoded depending on the values in it and
+compressed. The file ends with a Json footer that contains the byte offset,
+length and encoding of every block, followed by the length of the footer and
+a magic number:
+
+    [block]* [footer] [footer length (8 bytes)] [magic (8 bytes)]
+
+Blocks can be read independently, i.e., readers only decode the row groups and
+columns that are requested. Parsed footers are kept in a cache that is shared by
+all readers, i.e., the footer of a file is only parsed when the file is opened
+for the first time.
+
+Blocks of numeric values are stored as arrays of 64-bit integers or floats.
+Blocks of numeric values that contain missing values (e.g., in columns that
+have been converted to a numeric type) are stored as an array of the positions
+of the missing values followed by the array of values:
+
+    [null count (8 bytes)] [null positions]* [values]*
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+import json
+import os
+import struct
+import zlib
+
+from vizier.core.cache import LRUCache
+from vizier.datastore.base import DatasetRow
+from vizier.datastore.reader import DatasetReader, DefaultJsonDatasetReader
+from vizier.datastore.reader import pack_int_array, unpack_int_array
+from vizier.datastore.reader import set_cell_annotations
+
+
+"""Magic number at the end of columnar dataset files."""
+MAGIC = 'VZCOL001'
+
+"""Default number of rows per row group."""
+ROW_GROUP_SIZE = 4096
+
+"""Block encodings."""
+ENC_DICT = 'dict'
+ENC_FLOAT = 'float'
+ENC_INT = 'int'
+ENC_JSON = 'json'
+ENC_NULL_FLOAT = 'nfloat'
+ENC_NULL_INT = 'nint'
+
+"""Range of values that can be stored using the integer encoding."""
+MAX_INT = 2 ** 63 - 1
+MIN_INT = -(2 ** 63)
+
+"""Maximum number of parsed file footers that are kept in memory."""
+FOOTER_CACHE_SIZE = 256
+
+"""Cache for parsed file footers and row group offsets that is shared by all
+readers. Entries are keyed by the file path together with the inode, size, and
+modification time of the file. Replacing a data file therefore does not return
+the footer of the previous file."""
+FOOTER_CACHE = LRUCache(FOOTER_CACHE_SIZE)
+
+
+class ColumnarDatasetReader(DatasetReader):
+    """Dataset reader for datasets in columnar format. Only the row groups that
+    contain requested rows are read. If a projection is given only the values
+    of the projected columns are decoded.
+
+    If a predicate is given it is evaluated on the decoded values of the
+    referenced columns for each row group. The remaining columns are only
+    decoded for row groups that contain matching rows, and row objects are
+    only created for matching rows.
+
+    If a list of row positions is given only the rows at these positions are
+    returned (in order of their position). Row groups that do not contain any
+    of the positions are not read.
+
+    If a column map is given the dataset schema differs from the columns in
+    the stored rows. The map contains for each column in the schema the
+    position of the column in the stored rows. Projection and predicate then
+    reference columns by their position in the schema.
+    """
+    def __init__(
+        self, filename, columns=None, offset=0, limit=-1, rowid=None,
+        annotations=None, projection=None, predicate=None, positions=None,
+        column_map=None
+    ):
+        """Initialize information about the data file.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the file on disk
+        columns: list(vizier.datastore.base.DatasetColumn), optional
+            List of columns for the values that are returned by the reader.
+            If a projection is given the list contains the projected columns.
+        offset: int, optional
+            Number of rows at the beginning of the list that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        annotations: vizier.datastore.metadata.DatasetMetadata, optional
+            Annotations for dataset components
+        projection: list(int), optional
+            Positions of the columns (in the stored rows) whose values are
+            returned by the reader. All columns are returned if None.
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate. The predicate
+            references columns by their position in the stored rows.
+        positions: list(int), optional
+            Sorted list of index positions of the rows that are returned
+        column_map: list(int), optional
+            Positions of the schema columns in the stored rows
+        """
+        self.filename = filename
+        self.columns = columns
+        self.offset = offset
+        self.limit = limit
+        self.rowid = rowid
+        self.annotations = annotations
+        self.projection = projection
+        self.predicate = predicate
+        self.positions = positions
+        self.column_map = column_map
+        # Variables that maintain the internal state of the reader, i.e., the
+        # opened file, the file footer and the values in the current row group.
+        # The list of group rows contains the index of the rows in the current
+        # row group that are returned by the reader. If the is_open flag is
+        # True the file handle (fh) and footer should not be None.
+        self.is_open = False
+        self.fh = None
+        self.footer = None
+        self.group_index = None
+        self.group_rowids = None
+        self.group_rows = None
+        self.group_starts = None
+        self.group_values = None
+        self.group_pos = 0
+        self.read_index = None
+        self.skip = 0
+
+    def close(self):
+        """Close any open files and set the is_open flag to False."""
+        if self.is_open:
+            self.fh.close()
+        self.fh = None
+        self.footer = None
+        self.group_index = None
+        self.group_rowids = None
+        self.group_rows = None
+        self.group_starts = None
+        self.group_values = None
+        self.read_index = None
+        self.is_open = False
+
+    def next(self):
+        """Return the next row in the dataset iterator. Raises StopIteration if
+        end of file is reached or file has been closed.
+
+        Automatically closes any open file when end of iteration is reached for
+        the first time.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        if self.is_open:
+            if self.limit < 0 or self.read_index < self.limit:
+                row = self.next_row()
+                if not row is None:
+                    set_cell_annotations(row, self.columns, self.annotations)
+                    self.read_index += 1
+                    return row
+            self.close()
+        raise StopIteration
+
+    def next_row(self):
+        """Get the next row that satisfies the row identifier and predicate
+        constraints of the reader. Reads the next row group if necessary.
+        Returns None if the end of the file has been reached.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        while self.group_rows is None or self.group_pos >= len(self.group_rows):
+            self.group_index += 1
+            groups = self.footer['rowGroups']
+            if self.group_index >= len(groups):
+                return None
+            group = groups[self.group_index]
+            if not self.positions is None:
+                # Only read groups that contain any of the requested positions
+                start = self.group_starts[self.group_index]
+                lo = bisect_left(self.positions, start)
+                hi = bisect_left(self.positions, start + group['rows'])
+                if lo == hi:
+                    continue
+                rows = [pos - start for pos in self.positions[lo:hi]]
+            else:
+                rows = None
+            rowids = read_block(self.fh, group['rowIds'])
+            if not self.rowid is None:
+                # Only read column values for groups that contain the row
+                if not self.rowid in rowids:
+                    continue
+                pos = rowids.index(self.rowid)
+                if not rows is None and not pos in rows:
+                    continue
+                rows = [pos]
+            elif rows is None:
+                rows = range(len(rowids))
+            # Evaluate the predicate on the values of the referenced columns
+            values = dict()
+            if not self.predicate is None:
+                for pos in self.predicate.columns():
+                    values[pos] = read_block(
+                        self.fh,
+                        group['columns'][self.stored_position(pos)]
+                    )
+                rows = self.predicate.filter(values, rows)
+            # Do not decode the remaining columns or create row objects for
+            # skipped rows
+            if self.skip >= len(rows):
+                self.skip -= len(rows)
+                continue
+            self.group_pos = self.skip
+            self.skip = 0
+            self.group_rowids = rowids
+            self.group_rows = rows
+            self.group_values = self.read_values(group, values)
+        pos = self.group_rows[self.group_pos]
+        self.group_pos += 1
+        return DatasetRow(
+            self.group_rowids[pos],
+            [values[pos] for values in self.group_values]
+        )
+
+    def open(self):
+        """Setup the reader by opening the associated file and reading the file
+        footer. Positions the reader at the row group that contains the first
+        requested row.
+
+        Returns
+        -------
+        vizier.datastore.columnar.ColumnarDatasetReader
+        """
+        # Only open if flag is false. Otherwise, return immediately
+        if not self.is_open:
+            self.fh = open(self.filename, 'rb')
+            self.footer, starts = load_footer(self.fh, self.filename)
+            self.group_index = -1
+            self.group_rowids = None
+            self.group_rows = None
+            self.skip = self.offset
+            self.group_starts = starts
+            skip_groups = self.rowid is None and self.predicate is None
+            skip_groups = skip_groups and self.positions is None
+            if skip_groups and self.offset > 0 and len(starts) > 0:
+                # Skip row groups that end before the first requested row
+                group = bisect_right(starts, self.offset) - 1
+                self.group_index = group - 1
+                self.skip = self.offset - starts[group]
+            self.read_index = 0
+            self.is_open = True
+        return self
+
+    def read_values(self, group, values=None):
+        """Read the values of the projected columns in the given row group.
+
+        Parameters
+        ----------
+        group: dict
+            Row group information from the file footer
+        values: dict, optional
+            Lists of column values that have already been decoded, keyed by
+            column position
+
+        Returns
+        -------
+        list(list)
+        """
+        blocks = group['columns']
+        if not self.projection is None:
+            positions = self.projection
+        elif not self.column_map is None:
+            positions = range(len(self.column_map))
+        else:
+            positions = range(len(blocks))
+        result = list()
+        for pos in positions:
+            if not values is None and pos in values:
+                result.append(values[pos])
+            else:
+                result.append(
+                    read_block(self.fh, blocks[self.stored_position(pos)])
+                )
+        return result
+
+    def stored_position(self, pos):
+        """Get the position of the column with the given schema position in
+        the stored rows.
+
+        Parameters
+        ----------
+        pos: int
+            Column position in the dataset schema
+
+        Returns
+        -------
+        int
+        """
+        if not self.column_map is None:
+            return self.column_map[pos]
+        return pos
+
+
+class ColumnarDatasetWriter(object):
+    """Writer for dataset files in columnar format. Rows are buffered in memory
+    until a row group is complete.
+    """
+    def __init__(self, filename, column_count, row_group_size=ROW_GROUP_SIZE):
+        """Initialize the output file and the row group size.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the output file
+        column_count: int
+            Number of values in each row
+        row_group_size: int, optional
+            Number of rows per row group
+        """
+        self.filename = filename
+        self.column_count = column_count
+        self.row_group_size = row_group_size
+
+    def write(self, rows):
+        """Write the given rows to file. Returns the number of rows that were
+        written.
+
+        Parameters
+        ----------
+        rows: iterable(vizier.datastore.base.DatasetRow)
+            Rows in the dataset
+
+        Returns
+        -------
+        int
+        """
+        footer = {
+            'rowCount': 0,
+            'columnCount': self.column_count,
+            'rowGroups': list()
+        }
+        # Write to a temporary file first. Readers will only see complete
+        # data files.
+        tmp_file = self.filename + '.tmp'
+        with open(tmp_file, 'wb') as fh:
+            rowids = list()
+            columns = [list() for i in range(self.column_count)]
+            for row in rows:
+                rowids.append(row.identifier)
+                for i in range(self.column_count):
+                    columns[i].append(row.values[i])
+                if len(rowids) == self.row_group_size:
+                    footer['rowGroups'].append(
+                        write_group(fh, rowids, columns)
+                    )
+                    footer['rowCount'] += len(rowids)
+                    rowids = list()
+                    columns = [list() for i in range(self.column_count)]
+            if len(rowids) > 0:
+                footer['rowGroups'].append(write_group(fh, rowids, columns))
+                footer['rowCount'] += len(rowids)
+            doc = json.dumps(footer)
+            fh.write(doc)
+            fh.write(pack_int_array([len(doc)]))
+            fh.write(MAGIC)
+        os.rename(tmp_file, self.filename)
+        return footer['rowCount']
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def convert_json_file(json_file, columnar_file, column_count, row_group_size=ROW_GROUP_SIZE):
+    """Convert a dataset file in default Json format into columnar format.
+    Returns the number of rows in the converted file.
+
+    Parameters
+    ----------
+    json_file: string
+        Path to the Json dataset file
+    columnar_file: string
+        Path to the output file
+    column_count: int
+        Number of values in each row
+    row_group_size: int, optional
+        Number of rows per row group
+
+    Returns
+    -------
+    int
+    """
+    writer = ColumnarDatasetWriter(
+        columnar_file,
+        column_count,
+        row_group_size=row_group_size
+    )
+    with DefaultJsonDatasetReader(json_file).open() as reader:
+        return writer.write(reader)
+
+
+def decode_block(data, encoding):
+    """Decode the values in a data block.
+
+    Parameters
+    ----------
+    data: string
+        Encoded (uncompressed) block data
+    encoding: string
+        Block encoding
+
+    Returns
+    -------
+    list
+    """
+    if encoding == ENC_INT:
+        return unpack_int_array(data).tolist()
+    elif encoding == ENC_FLOAT:
+        return array('d', struct.unpack('<%dd' % (len(data) // 8), data)).tolist()
+    elif encoding in [ENC_NULL_FLOAT, ENC_NULL_INT]:
+        null_count = unpack_int_array(data[:8])[0]
+        nulls = unpack_int_array(data[8:8 * (null_count + 1)])
+        data = data[8 * (null_count + 1):]
+        if encoding == ENC_NULL_INT:
+            values = unpack_int_array(data).tolist()
+        else:
+            values = list(struct.unpack('<%dd' % (len(data) // 8), data))
+        for pos in nulls:
+            values[pos] = None
+        return values
+    elif encoding == ENC_DICT:
+        doc = json.loads(data)
+        dictionary = doc['dictionary']
+        return [dictionary[code] for code in doc['codes']]
+    else:
+        return json.loads(data)
+
+
+def encode_block(values):
+    """Encode a list of values. The encoding is chosen depending on the type
+    of the values. Returns the encoded data and the encoding.
+
+    Parameters
+    ----------
+    values: list
+        List of values
+
+    Returns
+    -------
+    string, string
+    """
+    if is_int_list(values):
+        return pack_int_array(values), ENC_INT
+    if all(type(v) == float for v in values):
+        return struct.pack('<%dd' % len(values), *values), ENC_FLOAT
+    # Use typed arrays for numeric values with missing values. Blocks that
+    # only contain missing values are encoded as Json.
+    nulls = [i for i in range(len(values)) if values[i] is None]
+    if 0 < len(nulls) < len(values):
+        present = [v for v in values if not v is None]
+        header = pack_int_array([len(nulls)] + nulls)
+        if is_int_list(present):
+            data = pack_int_array([0 if v is None else v for v in values])
+            return header + data, ENC_NULL_INT
+        if all(type(v) == float for v in present):
+            data = struct.pack(
+                '<%dd' % len(values),
+                *[0.0 if v is None else v for v in values]
+            )
+            return header + data, ENC_NULL_FLOAT
+    # Use dictionary encoding for string values with few distinct values.
+    if all(isinstance(v, basestring) for v in values):
+        dictionary = dict()
+        codes = list()
+        for v in values:
+            if not v in dictionary:
+                dictionary[v] = len(dictionary)
+            codes.append(dictionary[v])
+        if len(dictionary) <= len(values) / 2:
+            terms = [None] * len(dictionary)
+            for v in dictionary:
+                terms[dictionary[v]] = v
+            doc = {'dictionary': terms, 'codes': codes}
+            return json.dumps(doc), ENC_DICT
+    return json.dumps(values), ENC_JSON
+
+
+def group_offsets(footer):
+    """Get the index positions of the first row in each row group.
+
+    Parameters
+    ----------
+    footer: dict
+        File footer
+
+    Returns
+    -------
+    list(int)
+    """
+    starts = list()
+    count = 0
+    for group in footer['rowGroups']:
+        starts.append(count)
+        count += group['rows']
+    return starts
+
+
+def is_columnar_file(filename):
+    """Test if the given file is a dataset file in columnar format.
+
+    Parameters
+    ----------
+    filename: string
+        Path to file
+
+    Returns
+    -------
+    bool
+    """
+    if not os.path.isfile(filename) or os.path.getsize(filename) < 16:
+        return False
+    with open(filename, 'rb') as f:
+        f.seek(-len(MAGIC), os.SEEK_END)
+        return f.read() == MAGIC
+
+
+def is_int_list(values):
+    """Test if all values in the given list are integers in the range of
+    64-bit integers.
+
+    Parameters
+    ----------
+    values: list
+
+    Returns
+    -------
+    bool
+    """
+    for v in values:
+        if not type(v) in [int, long] or v > MAX_INT or v < MIN_INT:
+            return False
+    return True
+
+
+def load_footer(fh, filename):
+    """Get the footer and the row group offsets (see group_offsets) of a
+    columnar dataset file. The footer is read from the file if it is not in
+    the footer cache. The returned objects are shared and should not be
+    modified by the caller.
+
+    Raises ValueError if the file is not a valid columnar dataset file.
+
+    Parameters
+    ----------
+    fh: file
+        Handle for the data file
+    filename: string
+        Path to the data file
+
+    Returns
+    -------
+    dict, list(int)
+    """
+    stat = os.fstat(fh.fileno())
+    key = (
+        os.path.abspath(filename),
+        stat.st_ino,
+        stat.st_size,
+        stat.st_mtime
+    )
+    entry = FOOTER_CACHE.get(key)
+    if entry is None:
+        footer = read_footer(fh)
+        entry = (footer, group_offsets(footer))
+        FOOTER_CACHE.put(key, entry)
+    return entry
+
+
+def read_block(fh, block):
+    """Read and decode the values in a data block.
+
+    Parameters
+    ----------
+    fh: file
+        Handle for the data file
+    block: list
+        Triple of byte offset, length and encoding of the block
+
+    Returns
+    -------
+    list
+    """
+    offset, length, encoding = block
+    fh.seek(offset)
+    return decode_block(zlib.decompress(fh.read(length)), encoding)
+
+
+def read_footer(fh):
+    """Read the footer of a columnar dataset file.
+
+    Raises ValueError if the file is not a valid columnar dataset file.
+
+    Parameters
+    ----------
+    fh: file
+        Handle for the data file
+
+    Returns
+    -------
+    dict
+    """
+    fh.seek(-(len(MAGIC) + 8), os.SEEK_END)
+    trailer = fh.read()
+    if trailer[8:] != MAGIC:
+        raise ValueError('invalid columnar dataset file')
+    length = unpack_int_array(trailer[:8])[0]
+    fh.seek(-(len(MAGIC) + 8 + length), os.SEEK_END)
+    return json.loads(fh.read(length))
+
+
+def write_block(fh, values):
+    """Encode, compress, and write a list of values. Returns the triple of
+    byte offset, length and encoding of the written block.
+
+    Parameters
+    ----------
+    fh: file
+        Handle for the output file
+    values: list
+        List of values
+
+    Returns
+    -------
+    list
+    """
+    data, encoding = encode_block(values)
+    data = zlib.compress(data, 1)
+    offset = fh.tell()
+    fh.write(data)
+    return [offset, len(data), encoding]
+
+
+def write_group(fh, rowids, columns):
+    """Write a row group to file. Returns the row group information for the
+    file footer.
+
+    Parameters
+    ----------
+    fh: file
+        Handle for the output file
+    rowids: list(int)
+        Row identifier
+    columns: list(list)
+        List of values for each column
+
+    Returns
+    -------
+    dict
+    """
+    return {
+        'rows': len(rowids),
+        'rowIds': write_block(fh, rowids),
+        'columns': [write_block(fh, values) for values in columns]
+    }
@@ -0,0 +1,183 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Column type conversion.
+
+Values are converted in batches, i.e., a conversion function is applied to
+all values of a column chunk at once. Values of the chunk are only examined
+individually if the conversion of the whole chunk fails. Missing values (None
+or empty strings) and values that cannot be converted become None.
+
+The column data types are the same as the types of columns in Mimir datasets.
+"""
+
+from vizier.datastore.base import DatasetRow
+from vizier.datastore.columnar import ROW_GROUP_SIZE
+
+
+"""Column data types."""
+DT_INT = 'int'
+DT_REAL = 'real'
+DT_VARCHAR = 'varchar'
+
+DATA_TYPES = [DT_INT, DT_REAL, DT_VARCHAR]
+
+"""Default number of rows that are converted in a single batch. Batches have
+the size of the row groups in columnar data files."""
+CAST_BATCH_SIZE = ROW_GROUP_SIZE
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def cast_batch(rows, position, data_type):
+    """Convert the values at the given column position in a list of rows.
+    Returns a list of new row objects.
+
+    Parameters
+    ----------
+    rows: list(vizier.datastore.base.DatasetRow)
+        Dataset rows
+    position: int
+        Index position of the converted column
+    data_type: string
+        Target data type
+
+    Returns
+    -------
+    list(vizier.datastore.base.DatasetRow)
+    """
+    values, _ = cast_values([row.values[position] for row in rows], data_type)
+    result = list()
+    for i in range(len(rows)):
+        row_values = list(rows[i].values)
+        row_values[position] = values[i]
+        result.append(DatasetRow(rows[i].identifier, row_values))
+    return result
+
+
+def cast_column(rows, position, data_type, batch_size=CAST_BATCH_SIZE):
+    """Convert the values at the given column position in a stream of
+    dataset rows. Rows are buffered in batches of the given size.
+
+    Parameters
+    ----------
+    rows: iterable(vizier.datastore.base.DatasetRow)
+        Dataset rows
+    position: int
+        Index position of the converted column
+    data_type: string
+        Target data type
+    batch_size: int, optional
+        Number of rows in each batch
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    batch = list()
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            for r in cast_batch(batch, position, data_type):
+                yield r
+            batch = list()
+    for r in cast_batch(batch, position, data_type):
+        yield r
+
+
+def cast_value(value, data_type):
+    """Convert a single value to the given data type. Returns None if the
+    value is missing or cannot be converted.
+
+    Parameters
+    ----------
+    value: any
+        Cell value
+    data_type: string
+        Target data type
+
+    Returns
+    -------
+    int, long, float, string, or None
+    """
+    if value is None or value == '':
+        return None
+    if data_type == DT_VARCHAR:
+        if isinstance(value, basestring):
+            return value
+        return unicode(value)
+    elif not data_type in [DT_INT, DT_REAL]:
+        raise ValueError('unknown data type \'' + str(data_type) + '\'')
+    try:
+        if data_type == DT_REAL:
+            return float(value)
+        try:
+            return int(value)
+        except ValueError:
+            # Strings with a decimal point are truncated like numbers
+            return int(float(value))
+    except (OverflowError, TypeError, ValueError):
+        return None
+
+
+def cast_values(values, data_type):
+    """Convert a list of values to the given data type. Returns the list of
+    converted values and the number of values that could not be converted.
+    Missing values are not counted as invalid values.
+
+    Parameters
+    ----------
+    values: list
+        List of cell values
+    data_type: string
+        Target data type
+
+    Returns
+    -------
+    list, int
+    """
+    if not data_type in DATA_TYPES:
+        raise ValueError('unknown data type \'' + str(data_type) + '\'')
+    present = [v for v in values if not v is None and v != '']
+    converted = None
+    if data_type == DT_VARCHAR:
+        converted = [
+            v if isinstance(v, basestring) else unicode(v) for v in present
+        ]
+    else:
+        try:
+            converted = map(int if data_type == DT_INT else float, present)
+        except (OverflowError, TypeError, ValueError):
+            pass
+    if not converted is None:
+        if len(converted) == len(values):
+            return converted, 0
+        converted = iter(converted)
+        return [
+            None if v is None or v == '' else next(converted) for v in values
+        ], 0
+    # Convert values individually if the batch contains invalid values
+    result = list()
+    invalid = 0
+    for v in values:
+        value = cast_value(v, data_type)
+        if value is None and not v is None and v != '':
+            invalid += 1
+        result.append(value)
+    return result, invalid
+
@@ -0,0 +1,236 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Removing duplicate rows.
+
+Rows are identified by a fingerprint of their key values instead of the
+values themselves. A fingerprint is a 64-bit hash of the key values plus a
+second, independent 64-bit check value. Rows with the same hash but different
+check values are distinct (i.e., hash collisions are detected). The memory
+that is required to detect duplicates is therefore proportional to the number
+of distinct keys and independent of the size of the rows.
+
+Keeping the first occurrence of each key only requires a single pass over the
+rows. Keeping the last occurrence requires the fingerprints of all rows,
+which are held in compact integer arrays.
+"""
+
+from array import array
+import hashlib
+import shutil
+import struct
+import tempfile
+
+from vizier.datastore.sort import read_run, write_run
+
+
+"""Options for the row that is kept for each key."""
+KEEP_FIRST = 'first'
+KEEP_LAST = 'last'
+
+KEEP_OPTIONS = [KEEP_FIRST, KEEP_LAST]
+
+
+class FingerprintSet(object):
+    """Set of row fingerprints. Maps each 64-bit hash to the check value of
+    the first fingerprint with that hash. Fingerprints that collide with an
+    existing hash are kept in a separate set.
+    """
+    def __init__(self):
+        """Initialize the empty set."""
+        self.checks = dict()
+        self.collisions = set()
+
+    def __len__(self):
+        """Number of distinct fingerprints in the set.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.checks) + len(self.collisions)
+
+    def add(self, fingerprint, check):
+        """Add a fingerprint to the set. Returns True if the fingerprint was
+        not in the set before.
+
+        Parameters
+        ----------
+        fingerprint: int
+            64-bit hash of the key values
+        check: int
+            64-bit check value of the key values
+
+        Returns
+        -------
+        bool
+        """
+        value = self.checks.get(fingerprint)
+        if value is None:
+            self.checks[fingerprint] = check
+            return True
+        elif value == check:
+            return False
+        elif (fingerprint, check) in self.collisions:
+            return False
+        self.collisions.add((fingerprint, check))
+        return True
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def deduplicate(rows, positions, keep=KEEP_FIRST, tmp_dir=None):
+    """Remove duplicate rows from a stream of dataset rows. Rows are
+    duplicates if they have equal values at the given index positions. The
+    remaining rows are returned in their original order.
+
+    Rows are buffered in a temporary run file if the last occurrence of each
+    key is kept. The file is deleted when the iterator is exhausted or closed.
+
+    Parameters
+    ----------
+    rows: iterable(vizier.datastore.base.DatasetRow)
+        Dataset rows
+    positions: list(int)
+        Index positions of the key columns
+    keep: string, optional
+        Keep the first or last row for each key
+    tmp_dir: string, optional
+        Parent directory for temporary files
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    if not keep in KEEP_OPTIONS:
+        raise ValueError('invalid keep option \'' + str(keep) + '\'')
+    if keep == KEEP_FIRST:
+        keys = FingerprintSet()
+        for row in rows:
+            fp, check = fingerprint([row.values[pos] for pos in positions])
+            if keys.add(fp, check):
+                yield row
+        return
+    fps = array('l')
+    checks = array('l')
+    def buffer_rows():
+        for row in rows:
+            fp, check = fingerprint([row.values[pos] for pos in positions])
+            fps.append(fp)
+            checks.append(check)
+            yield row
+    run_dir = tempfile.mkdtemp(dir=tmp_dir)
+    try:
+        filename = write_run(run_dir, 0, buffer_rows())
+        kept = iter(distinct_positions(fps, checks, keep=keep))
+        next_pos = next(kept, None)
+        for pos, row in enumerate(read_run(filename)):
+            if pos == next_pos:
+                yield row
+                next_pos = next(kept, None)
+    finally:
+        shutil.rmtree(run_dir)
+
+
+def distinct_positions(fingerprints, checks, keep=KEEP_FIRST):
+    """Get the positions of the rows that remain after removing duplicates.
+    Expects two sequences with the fingerprint and check value of each row.
+    The returned positions are in ascending order.
+
+    Parameters
+    ----------
+    fingerprints: array or list(int)
+        64-bit hashes of the row keys
+    checks: array or list(int)
+        64-bit check values of the row keys
+    keep: string, optional
+        Keep the first or last row for each key
+
+    Returns
+    -------
+    array
+    """
+    if not keep in KEEP_OPTIONS:
+        raise ValueError('invalid keep option \'' + str(keep) + '\'')
+    keys = FingerprintSet()
+    result = array('l')
+    if keep == KEEP_FIRST:
+        for pos in xrange(len(fingerprints)):
+            if keys.add(fingerprints[pos], checks[pos]):
+                result.append(pos)
+    else:
+        for pos in xrange(len(fingerprints) - 1, -1, -1):
+            if keys.add(fingerprints[pos], checks[pos]):
+                result.append(pos)
+        result.reverse()
+    return result
+
+
+def fingerprint(values):
+    """Compute the fingerprint and check value for a list of key values. Both
+    are taken from the MD5 digest of an unambiguous encoding of the values.
+    Equal numbers have the same encoding regardless of their type. Unicode and
+    byte strings with the same UTF-8 encoding are equal.
+
+    Parameters
+    ----------
+    values: list
+        Key values
+
+    Returns
+    -------
+    int, int
+    """
+    md5 = hashlib.md5()
+    for value in values:
+        if value is None:
+            token = 'N'
+        elif isinstance(value, unicode):
+            token = 'S' + value.encode('utf-8')
+        elif isinstance(value, str):
+            token = 'S' + value
+        elif isinstance(value, float) and value.is_integer():
+            token = 'I' + str(int(value))
+        elif isinstance(value, (int, long)):
+            token = 'I' + str(value)
+        else:
+            token = 'O' + repr(value)
+        md5.update(str(len(token)) + ':' + token)
+    return struct.unpack('<qq', md5.digest())
+
+
+def row_fingerprints(rows):
+    """Get arrays with the fingerprints and check values for a stream of key
+    value lists.
+
+    Parameters
+    ----------
+    rows: iterable(list)
+        Key values for each row
+
+    Returns
+    -------
+    array, array
+    """
+    fps = array('l')
+    checks = array('l')
+    for values in rows:
+        fp, check = fingerprint(values)
+        fps.append(fp)
+        checks.append(check)
+    return fps, checks
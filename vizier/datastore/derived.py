@@ -0,0 +1,303 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Derived datasets - Datasets whose rows are defined by a sequence of
+operations on the rows of a source dataset.
+
+Operations are dictionaries that can be serialized as Json. Each operation
+transforms a stream of dataset rows. Column and row positions in an operation
+refer to the rows that are output by the previous operation in the sequence.
+A sequence of operations is applied in a single pass over the rows of the
+source dataset. Only row moves (and sorting) buffer rows in memory.
+Removing duplicates keeps one fingerprint per distinct key in memory. Column
+type conversions buffer one batch of rows at a time.
+
+Sequences that only delete, filter, or move columns do not change the rows of
+the source dataset. They can be represented by a column mapping instead (see
+column_positions).
+"""
+
+import re
+
+from vizier.datastore.base import DatasetRow
+from vizier.datastore.convert import cast_column
+from vizier.datastore.dedup import KEEP_FIRST, deduplicate
+from vizier.datastore.sort import DEFAULT_SORT_BUFFER_SIZE
+from vizier.datastore.sort import external_sort, sort_key
+
+
+"""Operation types."""
+OP_CAST_COLUMN = 'castColumn'
+OP_DEDUPLICATE = 'deduplicate'
+OP_DELETE_COLUMN = 'deleteColumn'
+OP_DELETE_ROW = 'deleteRow'
+OP_FILL_COLUMN = 'fillColumn'
+OP_FILL_DOWN = 'fillDown'
+OP_FILTER_COLUMNS = 'filterColumns'
+OP_INSERT_COLUMN = 'insertColumn'
+OP_INSERT_ROW = 'insertRow'
+OP_MOVE_COLUMN = 'moveColumn'
+OP_MOVE_ROW = 'moveRow'
+OP_REPLACE_VALUES = 'replaceValues'
+OP_SORT = 'sort'
+OP_UPDATE_CELL = 'updateCell'
+
+
+def apply_operations(rows, operations):
+    """Apply a sequence of operations to a stream of dataset rows. Rows in the
+    given stream are not modified.
+
+    Raises ValueError if an operation type is unknown.
+
+    Parameters
+    ----------
+    rows: iterable(vizier.datastore.base.DatasetRow)
+        Rows of the source dataset
+    operations: list(dict)
+        Sequence of operations
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    for op in operations:
+        op_type = op['type']
+        if op_type == OP_CAST_COLUMN:
+            rows = cast_column(rows, op['position'], op['dataType'])
+        elif op_type == OP_DEDUPLICATE:
+            rows = deduplicate(
+                rows,
+                op['positions'],
+                keep=op.get('keep', KEEP_FIRST)
+            )
+        elif op_type == OP_DELETE_COLUMN:
+            rows = delete_column(rows, op['position'])
+        elif op_type == OP_DELETE_ROW:
+            rows = delete_row(rows, op['position'])
+        elif op_type == OP_FILL_COLUMN:
+            rows = fill_column(rows, op['position'], op['value'])
+        elif op_type == OP_FILL_DOWN:
+            rows = fill_down(rows, op['position'])
+        elif op_type == OP_FILTER_COLUMNS:
+            rows = filter_columns(rows, op['positions'])
+        elif op_type == OP_INSERT_COLUMN:
+            rows = insert_column(rows, op['position'])
+        elif op_type == OP_INSERT_ROW:
+            rows = insert_row(rows, op['position'], op['rowid'], op['columnCount'])
+        elif op_type == OP_MOVE_COLUMN:
+            rows = move_column(rows, op['source'], op['target'])
+        elif op_type == OP_MOVE_ROW:
+            rows = move_row(rows, op['source'], op['target'])
+        elif op_type == OP_REPLACE_VALUES:
+            rows = replace_values(
+                rows,
+                op['position'],
+                op['pattern'],
+                op['replacement']
+            )
+        elif op_type == OP_SORT:
+            rows = external_sort(
+                rows,
+                key=sort_key(op['positions'], op['reversed']),
+                buffer_size=op.get('bufferSize', DEFAULT_SORT_BUFFER_SIZE)
+            )
+        elif op_type == OP_UPDATE_CELL:
+            rows = update_cell(rows, op['row'], op['column'], op['value'])
+        else:
+            raise ValueError('unknown operation \'' + str(op_type) + '\'')
+    return rows
+
+
+def column_positions(operations, column_count):
+    """Get the column mapping for a sequence of operations that only delete,
+    filter, or move columns. The result contains for each column in the
+    derived dataset the position of the column in the source dataset. Returns
+    None if any of the operations modifies the dataset rows.
+
+    Parameters
+    ----------
+    operations: list(dict)
+        Sequence of operations
+    column_count: int
+        Number of columns in the source dataset
+
+    Returns
+    -------
+    list(int)
+    """
+    positions = range(column_count)
+    for op in operations:
+        op_type = op['type']
+        if op_type == OP_DELETE_COLUMN:
+            del positions[op['position']]
+        elif op_type == OP_FILTER_COLUMNS:
+            positions = [positions[pos] for pos in op['positions']]
+        elif op_type == OP_MOVE_COLUMN:
+            positions.insert(op['target'], positions.pop(op['source']))
+        else:
+            return None
+    return positions
+
+
+# ------------------------------------------------------------------------------
+# Operations
+# ------------------------------------------------------------------------------
+
+def delete_column(rows, position):
+    """Remove the value at the given column position from each row."""
+    for row in rows:
+        values = list(row.values)
+        del values[position]
+        yield DatasetRow(row.identifier, values)
+
+
+def delete_row(rows, position):
+    """Remove the row at the given position."""
+    index = 0
+    for row in rows:
+        if index != position:
+            yield row
+        index += 1
+
+
+def fill_column(rows, position, value):
+    """Set the value at the given column position in each row."""
+    for row in rows:
+        values = list(row.values)
+        values[position] = value
+        yield DatasetRow(row.identifier, values)
+
+
+def fill_down(rows, position):
+    """Replace missing values (None or empty strings) at the given column
+    position with the last non-missing value in a preceding row."""
+    last_value = None
+    for row in rows:
+        value = row.values[position]
+        if not value is None and value != '':
+            last_value = value
+        elif not last_value is None:
+            values = list(row.values)
+            values[position] = last_value
+            row = DatasetRow(row.identifier, values)
+        yield row
+
+
+def filter_columns(rows, positions):
+    """Keep only the values at the given column positions (in the given
+    order)."""
+    for row in rows:
+        values = row.values
+        yield DatasetRow(row.identifier, [values[pos] for pos in positions])
+
+
+def insert_column(rows, position):
+    """Insert an empty value at the given column position into each row."""
+    for row in rows:
+        values = list(row.values)
+        values.insert(position, None)
+        yield DatasetRow(row.identifier, values)
+
+
+def insert_row(rows, position, rowid, column_count):
+    """Insert an empty row with the given identifier at the given position.
+    """
+    index = 0
+    for row in rows:
+        if index == position:
+            yield DatasetRow(rowid, [None] * column_count)
+        yield row
+        index += 1
+    if index <= position:
+        yield DatasetRow(rowid, [None] * column_count)
+
+
+def move_row(rows, source, target):
+    """Move the row at the source position to the target position. The
+    target position refers to the list of rows after the moved row has been
+    removed. Buffers the rows between the target and the source position if
+    a row is moved towards the beginning.
+    """
+    if source == target:
+        for row in rows:
+            yield row
+        return
+    moved = None
+    buffered = list()
+    index = 0
+    count = 0
+    for row in rows:
+        if index == source:
+            moved = row
+            # Release rows that were buffered while looking for the moved row
+            if target < source:
+                yield moved
+                for r in buffered:
+                    yield r
+                buffered = None
+        elif target < source and count >= target and index < source:
+            buffered.append(row)
+            count += 1
+        else:
+            if target > source and count == target and not moved is None:
+                yield moved
+            yield row
+            count += 1
+        index += 1
+    if target > source and count <= target and not moved is None:
+        yield moved
+
+
+def move_column(rows, source, target):
+    """Move the value at the source column position to the target column
+    position in each row."""
+    for row in rows:
+        values = list(row.values)
+        values.insert(target, values.pop(source))
+        yield DatasetRow(row.identifier, values)
+
+
+def replace_values(rows, position, pattern, replacement):
+    """Replace all matches of a regular expression in the value at the given
+    column position with the replacement string. Non-string values are
+    matched against their string representation and are only replaced if
+    the value is modified."""
+    regex = re.compile(pattern)
+    for row in rows:
+        value = row.values[position]
+        if not value is None:
+            if isinstance(value, basestring):
+                text = value
+            else:
+                text = str(value)
+            new_text = regex.sub(replacement, text)
+            if new_text != text:
+                values = list(row.values)
+                values[position] = new_text
+                row = DatasetRow(row.identifier, values)
+        yield row
+
+
+def update_cell(rows, position, column, value):
+    """Set the value of the given column in the row at the given position."""
+    index = 0
+    for row in rows:
+        if index == position:
+            values = list(row.values)
+            values[column] = value
+            row = DatasetRow(row.identifier, values)
+        yield row
+        index += 1
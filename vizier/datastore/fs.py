@@ -18,27 +18,108 @@
 dataset store.
 
 Maintains individual datasets in individual sub-folders of a base directory.
-For each dataset two files are maintained: info.yaml contains the dataset
-handle and data.tsv.gz contains the tab-delimited data file.
+For each dataset three files are maintained: handle.json contains the dataset
+handle, annotation.json contains the dataset annotations, and data.col contains
+the dataset rows in columnar format (see vizier.datastore.columnar). In
+addition, rowids.bin contains an index of row positions by row identifier.
+
+Derived datasets (see vizier.datastore.derived) are created without a data
+file. Their rows are defined by a sequence of operations on a source dataset
+that are stored in derivation.json. The rows of a derived dataset are
+materialized on first access.
+
+Datasets that only differ from their source in the schema (i.e., columns were
+renamed, moved, filtered, or deleted) do not have their own data file either.
+The column manifest columns.json references the source dataset and contains
+for each column the position of the column in the source data file. Reads
+apply the column mapping to the rows in the source data file.
+
+Datasets that only differ from their source in the order or selection of rows
+(i.e., rows were sorted, moved, deleted, or inserted) are stored as row views
+(see vizier.datastore.view). The view manifest view.json references the parent
+dataset and contains the inserted rows. The file positions.bin contains the
+position vector of the view. Chains of row views are limited in length. Views
+that would exceed the maximum depth are materialized instead.
+
+Datasets that only differ from their source in a few cells or rows (i.e.,
+cells were updated, or individual rows were inserted or deleted) are stored as
+patch overlays (see vizier.datastore.overlay). The overlay manifest patch.json
+references the parent dataset and contains the patch. Overlays whose patch
+grows past a maximum size are folded into a new dataset with its own data
+file.
+
+Datasets that were created by earlier versions store their rows in Json format
+in data.json instead. These datasets can be converted into columnar format
+using FileSystemDataStore.convert_datasets().
+
+Datasets that reference a source dataset (i.e., derived datasets, datasets
+with a column mapping, row views, and overlays) are recorded in the file
+children.txt of the source dataset. When a dataset is deleted only the datasets
+in this list are materialized.
+
+The dataset handle contains a fingerprint of the dataset content. For datasets
+with a data file the fingerprint is computed from the rows while they are
+written. For all other datasets it is computed from the fingerprint of the
+source dataset and the operations that define the dataset.
 """
 
+from array import array
+import hashlib
 import json
 import os
 import shutil
+import threading
 
+from vizier.core.cache import LRUCache
 from vizier.core.system import build_info
 from vizier.core.util import get_unique_identifier
 from vizier.datastore.base import DatasetHandle, DatasetColumn, DataStore
-from vizier.datastore.base import validate_schema
+from vizier.datastore.cache import PAGE_CACHE
+from vizier.datastore.columnar import ColumnarDatasetReader
+from vizier.datastore.columnar import ColumnarDatasetWriter, convert_json_file
+from vizier.datastore.derived import apply_operations, column_positions
 from vizier.datastore.mem import InMemDatasetHandle
+from vizier.datastore.overlay import MAX_PATCH_SIZE, OVERLAY_OPERATIONS
+from vizier.datastore.overlay import DatasetPatch, OverlayReader, patch_dataset
 from vizier.datastore.reader import DefaultJsonDatasetReader
+from vizier.datastore.reader import InMemDatasetReader, RowIdIndex
+from vizier.datastore.reader import write_rowid_index
+from vizier.datastore.sort import SORT_CACHE
+from vizier.datastore.view import MAX_VIEW_DEPTH, ROW_OPERATIONS
+from vizier.datastore.view import RowViewReader, read_positions_at
+from vizier.datastore.view import row_view_positions, write_positions
 from vizier.datastore.metadata import DatasetMetadata
 
 
 """Constants for data file names."""
+CHILDREN_FILE = 'children.txt'
+COLUMN_MAP_FILE = 'columns.json'
+COLUMNAR_DATA_FILE = 'data.col'
 DATA_FILE = 'data.json'
+DERIVATION_FILE = 'derivation.json'
 HANDLE_FILE = 'handle.json'
+INDEX_FILE = 'index.bin'
 METADATA_FILE = 'annotation.json'
+PATCH_FILE = 'patch.json'
+POSITION_FILE = 'positions.bin'
+ROWID_INDEX_FILE = 'rowids.bin'
+VIEW_FILE = 'view.json'
+
+"""Storage formats for dataset rows."""
+FORMAT_COLUMNAR = 'columnar'
+FORMAT_JSON = 'json'
+
+"""Maximum number of dataset handles that are kept in the handle cache."""
+HANDLE_CACHE_SIZE = 1024
+
+"""Cache for handles of datasets that have been read from disk. Datasets are
+immutable. Only their annotations may change. The cache is shared by all data
+store instances and is keyed by the dataset directory.
+"""
+HANDLE_CACHE = LRUCache(HANDLE_CACHE_SIZE)
+
+"""Lock that serializes the materialization of derived datasets."""
+MATERIALIZE_LOCK = threading.Lock()
 
 
 class FileSystemDatasetHandle(DatasetHandle):
@@ -47,17 +128,51 @@ class FileSystemDatasetHandle(DatasetHandle):
     The dataset handle keeps counters for columns and rows id's to generate
     unique unique identifier.
 
-    The dataset rows are stored in a separate file. The file format is JSON with
-    the following structure:
+    The dataset rows are stored in a separate file. The default file format is
+    columnar (see vizier.datastore.columnar). Older datasets are stored in JSON
+    format with the following structure:
         {
             'rows': [
                 {'id': int, 'values': [...]}
             ]
         }
+
+    For Json data files the optional index file contains the byte offsets of
+    every n-th row in the data file. It is used to seek directly to the
+    requested page of rows.
+
+    The optional row identifier index maps row identifier to row positions.
+    It is used for point lookups of individual rows.
+
+    Handles for derived datasets contain the derivation, i.e., the identifier
+    of the source dataset and the list of operations that define the dataset
+    rows. The data file and row identifier index of a derived dataset are
+    written when the rows are accessed for the first time.
+
+    Handles for datasets with a column mapping reference the data file and
+    row identifier index of the source dataset. The mapping contains the
+    identifier of the source dataset and the position of each column in the
+    source data file.
+
+    Handles for row views contain the view information, i.e., the identifier
+    of the parent dataset, the length of the chain of views, and the list of
+    inserted rows, as well as the path to the position vector file. Datasets
+    with a column mapping on a row view share the view information and the
+    position vector of their source.
+
+    Handles for patch overlays contain the overlay information, i.e., the
+    identifier of the parent dataset, the length of the chain of views and
+    overlays, and the patch. Datasets with a column mapping on an overlay
+    share the overlay information of their source.
     """
+    cache_pages = True
+
     def __init__(
         self, identifier, columns, datafile, row_count=0, column_counter=0,
-        row_counter=0, annotations=None
+        row_counter=0, annotations=None, indexfile=None,
+        data_format=FORMAT_COLUMNAR, rowidfile=None, derivation=None,
+        mapping=None, view=None, positionfile=None, overlay=None,
+        fingerprint=None
     ):
         """Initialize the dataset handle.
 
@@ -69,8 +184,7 @@ class FileSystemDatasetHandle(DatasetHandle):
             List of columns. It is expected that each column has a unique
             identifier.
         datafile: string
-            Path to the file that contains the dataset rows. The data is stored
-            in Json format.
+            Path to the file that contains the dataset rows.
         column_counter: int, optional
             Counter to generate unique column identifier
         rows: int, optional
@@ -79,6 +193,30 @@ class FileSystemDatasetHandle(DatasetHandle):
             Counter to generate unique row identifier
         annotations: vizier.datastore.metadata.DatasetMetadata, optional
             Annotations for dataset components
+        indexfile: string, optional
+            Path to the row offset index for the data file. The index is
+            created on first use if the file does not exist.
+        data_format: string, optional
+            Storage format of the data file
+        rowidfile: string, optional
+            Path to the row identifier index. The index is created on first
+            use if the file does not exist.
+        derivation: dict, optional
+            Source dataset identifier and operations for derived datasets
+            that have not been materialized
+        mapping: dict, optional
+            Source dataset identifier and column positions for datasets that
+            reference the data file of the source dataset
+        view: dict, optional
+            Parent dataset identifier, view depth, and inserted rows for row
+            views
+        positionfile: string, optional
+            Path to the position vector file of a row view
+        overlay: dict, optional
+            Parent dataset identifier, chain length, and patch for patch
+            overlays
+        fingerprint: string, optional
+            Fingerprint of the dataset content
         """
         super(FileSystemDatasetHandle, self).__init__(
             identifier=identifier,
@@ -86,12 +224,54 @@ class FileSystemDatasetHandle(DatasetHandle):
             row_count=row_count,
             column_counter=column_counter,
             row_counter=row_counter,
-            annotations=annotations
+            annotations=annotations,
+            fingerprint=fingerprint
         )
         self.datafile = datafile
+        self.indexfile = indexfile
+        self.data_format = data_format
+        self.rowidfile = rowidfile
+        self.derivation = derivation
+        self.mapping = mapping
+        self.view = view
+        self.positionfile = positionfile
+        self.overlay = overlay
+
+    @property
+    def column_map(self):
+        """Positions of the dataset columns in the data file. The result is
+        None if the dataset has its own data file.
+
+        Returns
+        -------
+        list(int)
+        """
+        if not self.mapping is None:
+            return self.mapping['columns']
+        return None
+
+    @property
+    def view_depth(self):
+        """Length of the chain of row views and overlays that the dataset
+        rows are resolved through. The result is 0 if the dataset is neither
+        a row view nor an overlay.
+
+        Returns
+        -------
+        int
+        """
+        if not self.view is None:
+            return self.view['depth']
+        elif not self.overlay is None:
+            return self.overlay['depth']
+        return 0
 
     @staticmethod
-    def from_file(filename, datafile, annotations=None):
+    def from_file(
+        filename, datafile, annotations=None, indexfile=None,
+        data_format=FORMAT_COLUMNAR, rowidfile=None, derivation=None,
+        mapping=None, view=None, positionfile=None, overlay=None
+    ):
         """Read dataset from file. Expects the file to be in Json format which
         is the default serialization format used by to_file().
 
@@ -100,10 +280,29 @@ class FileSystemDatasetHandle(DatasetHandle):
         filename: string
             Name of the file to read.
         datafile: string
-            Path to the file that contains the dataset rows. The data is stored
-            in Json format.
+            Path to the file that contains the dataset rows.
         annotations: vizier.datastore.metadata.DatasetMetadata, optional
             Annotations for dataset components
+        indexfile: string, optional
+            Path to the row offset index for the data file
+        data_format: string, optional
+            Storage format of the data file
+        rowidfile: string, optional
+            Path to the row identifier index
+        derivation: dict, optional
+            Source dataset identifier and operations for derived datasets
+        mapping: dict, optional
+            Source dataset identifier and column positions for datasets that
+            reference the data file of the source dataset
+        view: dict, optional
+            Parent dataset identifier, view depth, and inserted rows for row
+            views
+        positionfile: string, optional
+            Path to the position vector file of a row view
+        overlay: dict, optional
+            Parent dataset identifier, chain length, and patch for patch
+            overlays
+
         Returns
         -------
         vizier.datastore.base.Dataset
@@ -119,8 +318,99 @@ class FileSystemDatasetHandle(DatasetHandle):
             row_count=doc['rows'],
             column_counter=doc['columnCounter'],
             row_counter=doc['rowCounter'],
-            annotations=annotations
+            annotations=annotations,
+            indexfile=indexfile,
+            data_format=data_format,
+            rowidfile=rowidfile,
+            derivation=derivation,
+            mapping=mapping,
+            view=view,
+            positionfile=positionfile,
+            overlay=overlay,
+            fingerprint=doc.get('fingerprint')
+        )
+
+    def copy(self):
+        """Get a copy of the dataset handle. The columns and annotations of the
+        copy can be modified without affecting the original handle.
+
+        Returns
+        -------
+        vizier.datastore.fs.FileSystemDatasetHandle
+        """
+        return FileSystemDatasetHandle(
+            identifier=self.identifier,
+            columns=[DatasetColumn.from_dict(col.to_dict()) for col in self.columns],
+            datafile=self.datafile,
+            row_count=self.row_count,
+            column_counter=self.column_counter,
+            row_counter=self.row_counter,
+            annotations=self.annotations.copy_metadata(),
+            indexfile=self.indexfile,
+            data_format=self.data_format,
+            rowidfile=self.rowidfile,
+            derivation=self.derivation,
+            mapping=self.mapping,
+            view=self.view,
+            positionfile=self.positionfile,
+            overlay=self.overlay,
+            fingerprint=self.fingerprint
+        )
+
+    def fetch_rows_at(self, positions):
+        """Get list of dataset rows at the given index positions. Rows are
+        returned in the order of the given list of positions. Positions that
+        are outside the dataset are ignored.
+
+        For datasets in columnar format all rows are read in a single pass
+        that only decodes the row groups that contain any of the requested
+        rows.
+
+        Parameters
+        ----------
+        positions: list(int)
+            Index positions of rows in the dataset
+
+        Returns
+        -------
+        list(vizier.dataset.base.DatasetRow)
+        """
+        self.materialize()
+        if not self.view is None:
+            reader = RowViewReader(
+                self.get_parent(),
+                self.view['rows'],
+                entries=read_positions_at(self.positionfile, positions),
+                columns=self.columns,
+                annotations=self.annotations,
+                column_map=self.column_map
+            )
+            with reader.open() as r:
+                return [row for row in r]
+        if not self.overlay is None:
+            reader = OverlayReader(
+                self.get_parent(),
+                DatasetPatch.from_dict(self.overlay['patch']),
+                positions=positions,
+                columns=self.columns,
+                annotations=self.annotations,
+                column_map=self.column_map
+            )
+            with reader.open() as r:
+                return [row for row in r]
+        if self.data_format != FORMAT_COLUMNAR:
+            return super(FileSystemDatasetHandle, self).fetch_rows_at(positions)
+        sorted_positions = sorted(set(positions))
+        reader = ColumnarDatasetReader(
+            self.datafile,
+            columns=self.columns,
+            annotations=self.annotations,
+            positions=sorted_positions,
+            column_map=self.column_map
         )
+        with reader.open() as r:
+            rows = dict(zip(sorted_positions, r))
+        return [rows[pos] for pos in positions if pos in rows]
 
     def get_annotations(self, column_id=-1, row_id=-1):
         """Get list of annotations for a dataset component. Expects at least one
@@ -140,10 +430,109 @@ class FileSystemDatasetHandle(DatasetHandle):
         annos = self.annotations.for_object(column_id=column_id, row_id=row_id)
         return annos.values()
 
-    def reader(self, offset=0, limit=-1):
+    def get_parent(self):
+        """Get the handle for the parent dataset of a row view or an
+        overlay.
+
+        Returns
+        -------
+        vizier.datastore.fs.FileSystemDatasetHandle
+        """
+        base_dir = os.path.dirname(os.path.dirname(self.datafile))
+        if not self.view is None:
+            return get_handle(os.path.join(base_dir, self.view['source']))
+        return get_handle(os.path.join(base_dir, self.overlay['source']))
+
+    def get_row_position(self, rowid):
+        """Get the index position of the row with the given identifier in the
+        dataset. Returns -1 if the dataset does not contain the row.
+
+        Uses the row identifier index. The index is created if it does not
+        exist. For overlays the position is computed from the patch and the
+        position of the row in the parent dataset.
+
+        Parameters
+        ----------
+        rowid: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        if not self.overlay is None:
+            patch = DatasetPatch.from_dict(self.overlay['patch'])
+            return patch.position(self.get_parent(), int(rowid))
+        if self.rowidfile is None:
+            return super(FileSystemDatasetHandle, self).get_row_position(rowid)
+        self.materialize()
+        if not os.path.isfile(self.rowidfile):
+            # Build index for datasets that have been created without one
+            with self.reader(columns=[]) as reader:
+                rowids = [row.identifier for row in reader]
+            write_rowid_index(self.rowidfile, rowids)
+        return RowIdIndex(self.rowidfile).position(int(rowid))
+
+    def materialize(self):
+        """Write the data file and row identifier index for a derived
+        dataset. The rows are computed in a single pass over the rows of the
+        source dataset. Returns True if the dataset was materialized by this
+        call and False if the dataset is not a derived dataset or has been
+        materialized before.
+
+        Returns
+        -------
+        bool
+        """
+        if self.derivation is None:
+            return False
+        dataset_dir = os.path.dirname(self.datafile)
+        derivation_file = os.path.join(dataset_dir, DERIVATION_FILE)
+        with MATERIALIZE_LOCK:
+            # The dataset may have been materialized by a different handle
+            if not os.path.isfile(derivation_file):
+                self.derivation = None
+                return False
+            source = read_handle(
+                os.path.join(
+                    os.path.dirname(dataset_dir),
+                    self.derivation['source']
+                )
+            )
+            if source is None:
+                raise ValueError(
+                    'unknown source dataset \'' + self.derivation['source'] + '\''
+                )
+            # Write the data file to a temporary file first so that a failed
+            # materialization does not leave an incomplete data file behind.
+            tmpfile = self.datafile + '.tmp'
+            rowids = array('l')
+            with source.reader() as reader:
+                ColumnarDatasetWriter(tmpfile, len(self.columns)).write(
+                    validate_rows(
+                        self.columns,
+                        apply_operations(reader, self.derivation['operations']),
+                        rowids,
+                        row_counter=self.row_counter
+                    )
+                )
+            write_rowid_index(self.rowidfile, rowids)
+            os.rename(tmpfile, self.datafile)
+            os.remove(derivation_file)
+            self.derivation = None
+            HANDLE_CACHE.remove(dataset_dir)
+        return True
+
+    def reader(
+        self, offset=0, limit=-1, rowid=None, columns=None, predicate=None
+    ):
         """Get reader for the dataset to access the dataset rows. The optional
         offset amd limit parameters are used to retrieve only a subset of
-        rows.
+        rows. Only the parts of the data file that contain the requested rows
+        are read. If a list of columns is given only the values of these
+        columns are returned. For data files in columnar format only these
+        values are decoded. If a predicate is given it is evaluated by the
+        reader before row objects are created.
 
         Parameters
         ----------
@@ -151,17 +540,83 @@ class FileSystemDatasetHandle(DatasetHandle):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        columns: list(int), optional
+            Identifier of columns that are included in the returned rows
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate
 
         Returns
         -------
-        vizier.datastore.reader.DefaultJsonDatasetReader
+        vizier.datastore.reader.DatasetReader
         """
+        self.materialize()
+        # Use the row identifier index to read only the requested row
+        if not rowid is None:
+            pos = self.get_row_position(rowid)
+            if pos < 0 or offset > 0:
+                return InMemDatasetReader(list())
+            if predicate is None:
+                offset = pos
+                limit = 1
+                rowid = None
+            else:
+                rowid = int(rowid)
+        projection = None
+        schema = self.columns
+        if not columns is None:
+            projection = self.get_column_positions(columns)
+            schema = [self.columns[pos] for pos in projection]
+        if not self.view is None:
+            return RowViewReader(
+                self.get_parent(),
+                self.view['rows'],
+                positionfile=self.positionfile,
+                columns=schema,
+                offset=offset,
+                limit=limit,
+                rowid=rowid,
+                annotations=self.annotations,
+                column_map=self.column_map,
+                projection=projection,
+                predicate=predicate
+            )
+        if not self.overlay is None:
+            return OverlayReader(
+                self.get_parent(),
+                DatasetPatch.from_dict(self.overlay['patch']),
+                columns=schema,
+                offset=offset,
+                limit=limit,
+                rowid=rowid,
+                annotations=self.annotations,
+                column_map=self.column_map,
+                projection=projection,
+                predicate=predicate
+            )
+        if self.data_format == FORMAT_COLUMNAR:
+            return ColumnarDatasetReader(
+                self.datafile,
+                columns=schema,
+                offset=offset,
+                limit=limit,
+                rowid=rowid,
+                annotations=self.annotations,
+                projection=projection,
+                predicate=predicate,
+                column_map=self.column_map
+            )
         return DefaultJsonDatasetReader(
             self.datafile,
-            columns=self.columns,
+            columns=schema,
             offset=offset,
             limit=limit,
-            annotations=self.annotations
+            rowid=rowid,
+            annotations=self.annotations,
+            index_file=self.indexfile,
+            projection=projection,
+            predicate=predicate
         )
 
     def to_file(self, filename):
@@ -181,6 +636,8 @@ class FileSystemDatasetHandle(DatasetHandle):
             'columnCounter': self.column_counter,
             'rowCounter': self.row_counter
         }
+        if not self.fingerprint is None:
+            doc['fingerprint'] = self.fingerprint
         with open(filename, 'w') as f:
             json.dump(doc, f)
 
@@ -188,6 +645,10 @@ class FileSystemDatasetHandle(DatasetHandle):
 class FileSystemDataStore(DataStore):
     """Implementation of Vizier data store. Uses the file system to maintain
     datasets.
+
+    Handles for datasets that have been read are kept in a shared LRU cache
+    (see HANDLE_CACHE). The cache statistics are accessible via the
+    handle_cache property.
     """
     def __init__(self, base_dir):
         """Initialize the base directory that contains datasets. Each dataset is
@@ -204,6 +665,7 @@ class FileSystemDataStore(DataStore):
         self.base_dir = os.path.abspath(base_dir)
         if not os.path.isdir(self.base_dir):
             os.makedirs(self.base_dir)
+        self.handle_cache = HANDLE_CACHE
 
     def create_dataset(
         self, identifier=None, columns=None, rows=None, column_counter=None,
@@ -215,6 +677,10 @@ class FileSystemDataStore(DataStore):
         negative value, or (2) if the given column or row counter have value
         lower or equal to any of the column or row identifier.
 
+        Rows are validated while they are written to the data file, i.e., the
+        given rows are consumed in a single pass and may be any iterable
+        (e.g., the output of an external sort).
+
         Parameters
         ----------
         identifier: string, optional
@@ -222,8 +688,8 @@ class FileSystemDataStore(DataStore):
         columns: list(vizier.datastore.base.DatasetColumn)
             List of columns. It is expected that each column has a unique
             identifier.
-        rows: list(vizier.datastore.base.DatasetRow)
-            List of dataset rows.
+        rows: iterable(vizier.datastore.base.DatasetRow)
+            Dataset rows.
         column_counter: int, optional
             Counter to generate unique column identifier
         row_counter: int, optional
@@ -240,9 +706,6 @@ class FileSystemDataStore(DataStore):
             columns = list()
         if rows is None:
             rows = list()
-        else:
-            # Validate the number of values in the given rows
-            validate_schema(columns, rows)
         # Validate that all column identifier are smaller that the given
         # column counter
         if not column_counter is None:
@@ -256,49 +719,356 @@ class FileSystemDataStore(DataStore):
                 if col.identifier > column_counter:
                     column_counter = col.identifier
             column_counter += 1
-        # Validate that all row ids are non-negative, unique, lower that the
-        # given row_counter
-        max_rowid = -1
-        row_ids = set()
-        for row in rows:
-            if row.identifier < 0:
-                raise ValueError('invalid row identifier \'' + str(row.identifier) + '\'')
-            elif not row_counter is None and row.identifier >= row_counter:
-                raise ValueError('invalid row counter')
-            elif row.identifier in row_ids:
-                raise ValueError('duplicate row identifier \'' + str(row.identifier) + '\'')
-            row_ids.add(row.identifier)
-            if row_counter is None and row.identifier > max_rowid:
-                max_rowid = row.identifier
-        if row_counter is None:
-            row_counter = max_rowid + 1
         # Get new identifier and create directory for new dataset
         identifier = get_unique_identifier()
-        dataset_dir = self.get_dataset_dir(identifier)
-        os.makedirs(dataset_dir)
-        # Write rows to data file
-        datafile = os.path.join(dataset_dir, DATA_FILE)
-        DefaultJsonDatasetReader(datafile).write(rows)
+        dataset_dir = self.create_dataset_dir(identifier)
+        # Write rows to data file and create the row identifier index. The
+        # index raises ValueError for duplicate row identifier. Remove the
+        # dataset directory if any of the rows is invalid or if reading the
+        # rows or writing the files fails.
+        datafile = os.path.join(dataset_dir, COLUMNAR_DATA_FILE)
+        rowidfile = os.path.join(dataset_dir, ROWID_INDEX_FILE)
+        rowids = array('l')
+        digest = hashlib.md5()
+        try:
+            row_count = ColumnarDatasetWriter(datafile, len(columns)).write(
+                digest_rows(
+                    validate_rows(columns, rows, rowids, row_counter=row_counter),
+                    digest
+                )
+            )
+            write_rowid_index(rowidfile, rowids)
+        except Exception:
+            shutil.rmtree(dataset_dir)
+            raise
+        if row_counter is None:
+            row_counter = max(rowids) + 1 if len(rowids) > 0 else 0
         # Create dataset an write dataset file
         dataset = FileSystemDatasetHandle(
             identifier=identifier,
             columns=columns,
-            row_count=len(rows),
+            row_count=row_count,
             datafile=datafile,
             column_counter=column_counter,
             row_counter=row_counter,
-            annotations=annotations
+            annotations=annotations,
+            rowidfile=rowidfile
         )
+        dataset.fingerprint = dataset_fingerprint(dataset, digest)
         dataset.to_file(os.path.join(dataset_dir, HANDLE_FILE))
         # Write metadata file
         dataset.annotations.to_file(os.path.join(dataset_dir, METADATA_FILE))
+        self.handle_cache.put(dataset_dir, dataset.copy())
         # Return handle for new dataset
         return dataset
 
+    def create_dataset_dir(self, identifier):
+        """Create the directory for a new dataset with the given identifier.
+        The directory contains an empty list of children. Returns the path to
+        the created directory.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+
+        Returns
+        -------
+        string
+        """
+        dataset_dir = self.get_dataset_dir(identifier)
+        os.makedirs(dataset_dir)
+        open(os.path.join(dataset_dir, CHILDREN_FILE), 'w').close()
+        return dataset_dir
+
+    def create_derived_dataset(
+        self, source, columns, operations, row_count, column_counter,
+        row_counter, annotations=None, materialize=True
+    ):
+        """Create a new dataset whose rows are the result of applying the
+        given sequence of operations to the rows of the source dataset.
+
+        If the source dataset is a derived dataset that has not been
+        materialized the operations are appended to the operations of the
+        source. Derived datasets therefore always reference a materialized
+        dataset and all operations are applied in a single pass over its rows.
+
+        If materialize is False the new dataset is created without a data
+        file. The rows are materialized when they are accessed for the first
+        time. Datasets whose number of rows is not given are materialized
+        unless they are row views.
+
+        If the operations only delete, filter, or move columns of a dataset
+        that has a data file in columnar format, the new dataset references
+        the data file of the source through a column mapping. Rows are neither
+        read nor written in this case.
+
+        If the operations only update cells, or insert or delete individual
+        rows, the new dataset is a patch overlay on the source dataset. Only
+        the patch is written. Overlays whose patch would exceed the maximum
+        size are materialized.
+
+        If the operations only sort, move, delete, insert, or deduplicate rows,
+        the new dataset is a row view on the source dataset. Only the position
+        vector of the view is written. Row views that would exceed the maximum
+        chain length are materialized.
+
+        Parameters
+        ----------
+        source: vizier.datastore.fs.FileSystemDatasetHandle
+            Handle for the source dataset
+        columns: list(vizier.datastore.base.DatasetColumn)
+            List of columns in the derived dataset
+        operations: list(dict)
+            Sequence of operations (see vizier.datastore.derived)
+        row_count: int
+            Number of rows in the derived dataset. None if the number is not
+            known in advance
+        column_counter: int
+            Counter to generate unique column identifier
+        row_counter: int
+            Counter to generate unique row identifier
+        annotations: vizier.datastore.metadata.DatasetMetadata, optional
+            Annotations for dataset components
+        materialize: bool, optional
+            Write the rows of the derived dataset immediately
+
+        Returns
+        -------
+        vizier.datastore.fs.FileSystemDatasetHandle
+        """
+        # Use a column mapping if the dataset rows remain unchanged
+        mapping = None
+        is_columnar = source.data_format == FORMAT_COLUMNAR
+        if source.derivation is None and is_columnar:
+            positions = column_positions(operations, len(source.columns))
+            if not positions is None:
+                if not source.mapping is None:
+                    # Reference the data file of the source directly
+                    mapping = {
+                        'source': source.mapping['source'],
+                        'columns': [source.column_map[p] for p in positions]
+                    }
+                else:
+                    mapping = {
+                        'source': source.identifier,
+                        'columns': positions
+                    }
+        if not mapping is None:
+            identifier = get_unique_identifier()
+            dataset_dir = self.create_dataset_dir(identifier)
+            with open(os.path.join(dataset_dir, COLUMN_MAP_FILE), 'w') as f:
+                json.dump(mapping, f)
+            add_child(self.get_dataset_dir(mapping['source']), identifier)
+            dataset = FileSystemDatasetHandle(
+                identifier=identifier,
+                columns=columns,
+                row_count=row_count,
+                datafile=source.datafile,
+                column_counter=column_counter,
+                row_counter=row_counter,
+                annotations=annotations,
+                rowidfile=source.rowidfile,
+                mapping=mapping,
+                view=source.view,
+                positionfile=source.positionfile,
+                overlay=source.overlay
+            )
+            dataset.fingerprint = derived_fingerprint(dataset, source, operations)
+            dataset.to_file(os.path.join(dataset_dir, HANDLE_FILE))
+            dataset.annotations.to_file(os.path.join(dataset_dir, METADATA_FILE))
+            return dataset
+        # Use a patch overlay if the operations only update cells or insert
+        # and delete individual rows. Overlays on overlays extend the patch of
+        # the source. Fold overlays whose patch gets too large.
+        is_overlay = source.derivation is None and is_columnar
+        is_overlay = is_overlay and len(operations) > 0
+        for op in operations:
+            if not op['type'] in OVERLAY_OPERATIONS:
+                is_overlay = False
+        if is_overlay:
+            if not source.overlay is None and source.mapping is None:
+                parent = source.get_parent()
+                patch = patch_dataset(
+                    parent,
+                    operations,
+                    patch=DatasetPatch.from_dict(source.overlay['patch'])
+                )
+                depth = source.view_depth
+            elif source.view_depth < MAX_VIEW_DEPTH:
+                parent = source
+                patch = patch_dataset(parent, operations)
+                depth = source.view_depth + 1
+            else:
+                patch = None
+            if patch is None or patch.size() > MAX_PATCH_SIZE:
+                is_overlay = False
+                materialize = True
+        if is_overlay:
+            identifier = get_unique_identifier()
+            dataset_dir = self.create_dataset_dir(identifier)
+            overlay = {
+                'source': parent.identifier,
+                'depth': depth,
+                'patch': patch.to_dict()
+            }
+            with open(os.path.join(dataset_dir, PATCH_FILE), 'w') as f:
+                json.dump(overlay, f)
+            add_child(self.get_dataset_dir(parent.identifier), identifier)
+            dataset = FileSystemDatasetHandle(
+                identifier=identifier,
+                columns=columns,
+                row_count=patch.row_count(),
+                datafile=os.path.join(dataset_dir, COLUMNAR_DATA_FILE),
+                column_counter=column_counter,
+                row_counter=row_counter,
+                annotations=annotations,
+                rowidfile=os.path.join(dataset_dir, ROWID_INDEX_FILE),
+                overlay=overlay
+            )
+            dataset.fingerprint = derived_fingerprint(dataset, source, operations)
+            dataset.to_file(os.path.join(dataset_dir, HANDLE_FILE))
+            dataset.annotations.to_file(os.path.join(dataset_dir, METADATA_FILE))
+            return dataset
+        # Use a row view if the operations only change the order or selection
+        # of rows. Compact chains of views that get too long.
+        is_row_view = source.derivation is None and is_columnar
+        is_row_view = is_row_view and len(operations) > 0
+        for op in operations:
+            if not op['type'] in ROW_OPERATIONS:
+                is_row_view = False
+        if is_row_view and source.view_depth >= MAX_VIEW_DEPTH:
+            is_row_view = False
+            materialize = True
+        if is_row_view:
+            positions, new_rows = row_view_positions(source, operations)
+            identifier = get_unique_identifier()
+            dataset_dir = self.create_dataset_dir(identifier)
+            positionfile = os.path.join(dataset_dir, POSITION_FILE)
+            write_positions(positionfile, positions)
+            view = {
+                'source': source.identifier,
+                'depth': source.view_depth + 1,
+                'rows': new_rows
+            }
+            with open(os.path.join(dataset_dir, VIEW_FILE), 'w') as f:
+                json.dump(view, f)
+            add_child(self.get_dataset_dir(source.identifier), identifier)
+            dataset = FileSystemDatasetHandle(
+                identifier=identifier,
+                columns=columns,
+                row_count=len(positions),
+                datafile=os.path.join(dataset_dir, COLUMNAR_DATA_FILE),
+                column_counter=column_counter,
+                row_counter=row_counter,
+                annotations=annotations,
+                rowidfile=os.path.join(dataset_dir, ROWID_INDEX_FILE),
+                view=view,
+                positionfile=positionfile
+            )
+            dataset.fingerprint = derived_fingerprint(dataset, source, operations)
+            dataset.to_file(os.path.join(dataset_dir, HANDLE_FILE))
+            dataset.annotations.to_file(os.path.join(dataset_dir, METADATA_FILE))
+            return dataset
+        # Collapse chains of derived datasets. Use the source dataset as is if
+        # its own source has been deleted in the meantime.
+        if not source.derivation is None:
+            base = self.get_dataset(source.derivation['source'])
+            if not base is None:
+                operations = source.derivation['operations'] + operations
+                source = base
+        # The handle of a deferred dataset needs the number of rows. Counting
+        # the rows would take the same pass over the source as writing them.
+        if row_count is None:
+            materialize = True
+        if materialize:
+            with source.reader() as reader:
+                return self.create_dataset(
+                    columns=columns,
+                    rows=apply_operations(reader, operations),
+                    column_counter=column_counter,
+                    row_counter=row_counter,
+                    annotations=annotations
+                )
+        identifier = get_unique_identifier()
+        dataset_dir = self.create_dataset_dir(identifier)
+        derivation = {'source': source.identifier, 'operations': operations}
+        with open(os.path.join(dataset_dir, DERIVATION_FILE), 'w') as f:
+            json.dump(derivation, f)
+        add_child(self.get_dataset_dir(source.identifier), identifier)
+        dataset = FileSystemDatasetHandle(
+            identifier=identifier,
+            columns=columns,
+            row_count=row_count,
+            datafile=os.path.join(dataset_dir, COLUMNAR_DATA_FILE),
+            column_counter=column_counter,
+            row_counter=row_counter,
+            annotations=annotations,
+            rowidfile=os.path.join(dataset_dir, ROWID_INDEX_FILE),
+            derivation=derivation
+        )
+        dataset.fingerprint = derived_fingerprint(dataset, source, operations)
+        dataset.to_file(os.path.join(dataset_dir, HANDLE_FILE))
+        dataset.annotations.to_file(os.path.join(dataset_dir, METADATA_FILE))
+        return dataset
+
+    def convert_dataset(self, identifier):
+        """Convert the data file of a dataset that is stored in Json format
+        into columnar format. Returns True if the dataset was converted and
+        False if the dataset does not exist or is already in columnar format.
+
+        Parameters
+        ----------
+        identifier : string
+            Unique dataset identifier.
+
+        Returns
+        -------
+        bool
+        """
+        dataset = self.get_dataset(identifier)
+        if dataset is None or dataset.data_format != FORMAT_JSON:
+            return False
+        dataset_dir = self.get_dataset_dir(identifier)
+        convert_json_file(
+            dataset.datafile,
+            os.path.join(dataset_dir, COLUMNAR_DATA_FILE),
+            len(dataset.columns)
+        )
+        self.handle_cache.remove(dataset_dir)
+        PAGE_CACHE.invalidate(identifier)
+        # Remove Json data file and row index
+        os.remove(dataset.datafile)
+        if os.path.isfile(dataset.indexfile):
+            os.remove(dataset.indexfile)
+        return True
+
+    def convert_datasets(self):
+        """Convert all datasets in the data store that are stored in Json
+        format into columnar format. Returns the number of converted datasets.
+
+        Returns
+        -------
+        int
+        """
+        count = 0
+        for identifier in os.listdir(self.base_dir):
+            if os.path.isdir(self.get_dataset_dir(identifier)):
+                if self.convert_dataset(identifier):
+                    count += 1
+        return count
+
     def delete_dataset(self, identifier):
         """Delete dataset with given identifier. Returns True if dataset existed
         and False otherwise.
 
+        Derived datasets, datasets with a column mapping, row views, and
+        overlays that use the deleted dataset as their source are materialized
+        before the dataset is deleted. These datasets are read from the list
+        of children of the deleted dataset. All datasets in the data store are
+        checked for datasets that were created by earlier versions and do not
+        have a list of children.
+
         Parameters
         ----------
         identifier : string
@@ -309,7 +1079,39 @@ class FileSystemDataStore(DataStore):
         bool
         """
         dataset_dir = self.get_dataset_dir(identifier)
+        self.handle_cache.remove(dataset_dir)
+        PAGE_CACHE.invalidate(identifier)
+        SORT_CACHE.invalidate(identifier)
         if os.path.isdir(dataset_dir):
+            children = read_children(dataset_dir)
+            if children is None:
+                children = os.listdir(self.base_dir)
+            materialized = list()
+            for ds_id in children:
+                ds_dir = self.get_dataset_dir(ds_id)
+                # The list of children may contain datasets that have been
+                # deleted or materialized in the meantime
+                derivation_file = os.path.join(ds_dir, DERIVATION_FILE)
+                if os.path.isfile(derivation_file):
+                    with open(derivation_file, 'r') as f:
+                        source_id = json.load(f)['source']
+                    if source_id == identifier:
+                        self.read_dataset_handle(ds_id).materialize()
+                        materialized.append(ds_id)
+                for filename in [COLUMN_MAP_FILE, VIEW_FILE, PATCH_FILE]:
+                    manifest = os.path.join(ds_dir, filename)
+                    if os.path.isfile(manifest):
+                        with open(manifest, 'r') as f:
+                            source_id = json.load(f)['source']
+                        if source_id == identifier:
+                            write_data_file(
+                                self.read_dataset_handle(ds_id),
+                                ds_dir
+                            )
+                            materialized.append(ds_id)
+            # Handles for datasets with a column mapping on a materialized
+            # row view or overlay are outdated
+            self.invalidate_descendants(materialized)
             shutil.rmtree(dataset_dir)
             return True
         return False
@@ -334,6 +1136,9 @@ class FileSystemDataStore(DataStore):
         """Read a full dataset from the data store. Returns None if no dataset
         with the given identifier exists.
 
+        Handles are read from the handle cache if present. The returned handle
+        is always a copy that can be modified by the caller.
+
         Parameters
         ----------
         identifier : string
@@ -344,16 +1149,54 @@ class FileSystemDataStore(DataStore):
         vizier.datastore.base.DatasetHandle
         """
         dataset_dir = self.get_dataset_dir(identifier)
-        datafile = os.path.join(dataset_dir, DATA_FILE)
-        if os.path.isdir(dataset_dir):
-            return FileSystemDatasetHandle.from_file(
-                filename=os.path.join(dataset_dir, HANDLE_FILE),
-                datafile=os.path.join(dataset_dir, DATA_FILE),
-                annotations=DatasetMetadata.from_file(
-                    os.path.join(dataset_dir, METADATA_FILE)
-                )
-            )
-        return None
+        dataset = self.handle_cache.get(dataset_dir)
+        if dataset is None:
+            dataset = self.read_dataset_handle(identifier)
+            if dataset is None:
+                return None
+            self.handle_cache.put(dataset_dir, dataset)
+        return dataset.copy()
+
+    def invalidate_descendants(self, identifiers):
+        """Remove the handles of all datasets that directly or indirectly
+        reference any of the given datasets from the handle cache. Clears the
+        handle cache if any of these datasets has no list of children.
+
+        Parameters
+        ----------
+        identifiers: list(string)
+            Unique dataset identifier
+        """
+        visited = set(identifiers)
+        stack = list(identifiers)
+        while len(stack) > 0:
+            ds_dir = self.get_dataset_dir(stack.pop())
+            if not os.path.isdir(ds_dir):
+                continue
+            children = read_children(ds_dir)
+            if children is None:
+                self.handle_cache.clear()
+                return
+            for ds_id in children:
+                if not ds_id in visited:
+                    visited.add(ds_id)
+                    self.handle_cache.remove(self.get_dataset_dir(ds_id))
+                    stack.append(ds_id)
+
+    def read_dataset_handle(self, identifier):
+        """Read the handle for the dataset with the given identifier from disk.
+        Returns None if no dataset with the given identifier exists.
+
+        Parameters
+        ----------
+        identifier : string
+            Unique dataset identifier
+
+        Returns
+        -------
+        vizier.datastore.fs.FileSystemDatasetHandle
+        """
+        return read_handle(self.get_dataset_dir(identifier))
 
     def load_dataset(self, f_handle):
         """Create a new dataset from a given file.
@@ -412,6 +1255,278 @@ class FileSystemDataStore(DataStore):
         # Get object annotations and update
         obj_annos = annotations.for_object(column_id=column_id, row_id=row_id)
         result = obj_annos.update(identifier=anno_id, key=key, value=value)
-        # Write modified annotations to file
+        # Write modified annotations to file. The dataset fingerprint no
+        # longer matches the dataset content.
         annotations.to_file(os.path.join(dataset_dir, METADATA_FILE))
+        dataset = read_handle(dataset_dir)
+        if not dataset.fingerprint is None:
+            dataset.fingerprint = None
+            dataset.to_file(os.path.join(dataset_dir, HANDLE_FILE))
+        # Cached handles and rows contain outdated annotation information
+        self.handle_cache.remove(dataset_dir)
+        PAGE_CACHE.invalidate(identifier)
         return result
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def add_child(dataset_dir, identifier):
+    """Add a dataset to the list of children of the dataset in the given
+    directory. Nothing is done if the dataset has no list of children, i.e.,
+    it was created by an earlier version.
+
+    Parameters
+    ----------
+    dataset_dir: string
+        Path to the directory of the source dataset
+    identifier: string
+        Unique identifier of the dataset that references the source
+    """
+    children_file = os.path.join(dataset_dir, CHILDREN_FILE)
+    if os.path.isfile(children_file):
+        with open(children_file, 'a') as f:
+            f.write(identifier + '\n')
+
+
+def dataset_fingerprint(dataset, digest):
+    """Get the fingerprint for a dataset. The given digest is expected to
+    contain the dataset rows (or the definition of the rows). It is updated
+    with the schema, counters, and annotations of the dataset.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.fs.FileSystemDatasetHandle
+        Handle for the dataset
+    digest: hashlib.md5
+        Digest of the dataset rows
+
+    Returns
+    -------
+    string
+    """
+    digest.update(json.dumps([col.to_dict() for col in dataset.columns]))
+    digest.update(str(dataset.column_counter) + ':' + str(dataset.row_counter))
+    digest.update(json.dumps(dataset.annotations.to_dict(), sort_keys=True))
+    return digest.hexdigest()
+
+
+def derived_fingerprint(dataset, source, operations):
+    """Get the fingerprint for a dataset whose rows are defined by a sequence
+    of operations on a source dataset. The result is None if the fingerprint
+    of the source dataset is unknown.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.fs.FileSystemDatasetHandle
+        Handle for the derived dataset
+    source: vizier.datastore.fs.FileSystemDatasetHandle
+        Handle for the source dataset
+    operations: list(dict)
+        Sequence of operations (see vizier.datastore.derived)
+
+    Returns
+    -------
+    string
+    """
+    if source.fingerprint is None:
+        return None
+    digest = hashlib.md5()
+    digest.update(source.fingerprint)
+    digest.update(json.dumps(operations, sort_keys=True))
+    return dataset_fingerprint(dataset, digest)
+
+
+def digest_rows(rows, digest):
+    """Update the given digest with the identifier and values of the rows in
+    a stream of dataset rows.
+
+    Parameters
+    ----------
+    rows: iterable(vizier.datastore.base.DatasetRow)
+        Dataset rows
+    digest: hashlib.md5
+        Digest of the dataset rows
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    for row in rows:
+        digest.update(repr((row.identifier, row.values)))
+        yield row
+
+
+def get_handle(dataset_dir):
+    """Get the handle for the dataset in the given directory from the handle
+    cache. Reads the handle from disk if it is not cached. Returns None if the
+    directory does not exist.
+
+    Parameters
+    ----------
+    dataset_dir: string
+        Path to the dataset directory
+
+    Returns
+    -------
+    vizier.datastore.fs.FileSystemDatasetHandle
+    """
+    dataset = HANDLE_CACHE.get(dataset_dir)
+    if dataset is None:
+        dataset = read_handle(dataset_dir)
+        if not dataset is None:
+            HANDLE_CACHE.put(dataset_dir, dataset)
+    return dataset
+
+
+def read_handle(dataset_dir):
+    """Read the handle for the dataset in the given directory. Returns None
+    if the directory does not exist.
+
+    Parameters
+    ----------
+    dataset_dir: string
+        Path to the dataset directory
+
+    Returns
+    -------
+    vizier.datastore.fs.FileSystemDatasetHandle
+    """
+    if not os.path.isdir(dataset_dir):
+        return None
+    datafile = os.path.join(dataset_dir, COLUMNAR_DATA_FILE)
+    rowidfile = os.path.join(dataset_dir, ROWID_INDEX_FILE)
+    data_format = FORMAT_COLUMNAR
+    derivation = None
+    mapping = None
+    view = None
+    positionfile = None
+    overlay = None
+    view_dir = dataset_dir
+    derivation_file = os.path.join(dataset_dir, DERIVATION_FILE)
+    column_map_file = os.path.join(dataset_dir, COLUMN_MAP_FILE)
+    if os.path.isfile(column_map_file):
+        # Use the data file (or row view or overlay) and row index of the
+        # source dataset
+        with open(column_map_file, 'r') as f:
+            mapping = json.load(f)
+        view_dir = os.path.join(os.path.dirname(dataset_dir), mapping['source'])
+        datafile = os.path.join(view_dir, COLUMNAR_DATA_FILE)
+        rowidfile = os.path.join(view_dir, ROWID_INDEX_FILE)
+    elif os.path.isfile(derivation_file):
+        # Derived dataset that has not been materialized
+        with open(derivation_file, 'r') as f:
+            derivation = json.load(f)
+    view_file = os.path.join(view_dir, VIEW_FILE)
+    if os.path.isfile(view_file):
+        # Row view (or column mapping on a row view)
+        with open(view_file, 'r') as f:
+            view = json.load(f)
+        positionfile = os.path.join(view_dir, POSITION_FILE)
+    elif os.path.isfile(os.path.join(view_dir, PATCH_FILE)):
+        # Patch overlay (or column mapping on an overlay)
+        with open(os.path.join(view_dir, PATCH_FILE), 'r') as f:
+            overlay = json.load(f)
+    elif derivation is None and not os.path.isfile(datafile):
+        # Datasets that were created by earlier versions store their rows in
+        # Json format
+        datafile = os.path.join(dataset_dir, DATA_FILE)
+        data_format = FORMAT_JSON
+    return FileSystemDatasetHandle.from_file(
+        filename=os.path.join(dataset_dir, HANDLE_FILE),
+        datafile=datafile,
+        annotations=DatasetMetadata.from_file(
+            os.path.join(dataset_dir, METADATA_FILE)
+        ),
+        indexfile=os.path.join(dataset_dir, INDEX_FILE),
+        data_format=data_format,
+        rowidfile=rowidfile,
+        derivation=derivation,
+        mapping=mapping,
+        view=view,
+        positionfile=positionfile,
+        overlay=overlay
+    )
+
+
+def read_children(dataset_dir):
+    """Read the list of children of the dataset in the given directory.
+    Returns None if the dataset has no list of children.
+
+    Parameters
+    ----------
+    dataset_dir: string
+        Path to the dataset directory
+
+    Returns
+    -------
+    list(string)
+    """
+    children_file = os.path.join(dataset_dir, CHILDREN_FILE)
+    if not os.path.isfile(children_file):
+        return None
+    with open(children_file, 'r') as f:
+        return [line.strip() for line in f if line.strip() != '']
+
+
+def validate_rows(columns, rows, rowids, row_counter=None):
+    """Validate dataset rows while they are consumed. Rows are expected to
+    contain exactly one value for each column and row identifier have to be
+    non-negative and lower than the given row counter. The identifier of the
+    returned rows are appended to the given array.
+
+    Raises ValueError for the first invalid row.
+
+    Parameters
+    ----------
+    columns: list(vizier.datastore.base.DatasetColumn)
+        List of columns in the dataset schema
+    rows: iterable(vizier.datastore.base.DatasetRow)
+        Dataset rows
+    rowids: array
+        Array of row identifier in order of their position in the dataset
+    row_counter: int, optional
+        Counter to generate unique row identifier
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    for row in rows:
+        if len(row.values) != len(columns):
+            raise ValueError('schema violation for row \'' + str(len(rowids)) + '\'')
+        if row.identifier < 0:
+            raise ValueError('invalid row identifier \'' + str(row.identifier) + '\'')
+        elif not row_counter is None and row.identifier >= row_counter:
+            raise ValueError('invalid row counter')
+        rowids.append(row.identifier)
+        yield row
+
+
+def write_data_file(dataset, dataset_dir):
+    """Write the data file and row identifier index for a dataset that
+    references the rows of another dataset, i.e., a dataset with a column
+    mapping, a row view, or an overlay. Removes the column manifest, view, and
+    patch files once the data file has been written.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.fs.FileSystemDatasetHandle
+        Handle for a dataset with a column mapping, a row view, or an overlay
+    dataset_dir: string
+        Path to the dataset directory
+    """
+    datafile = os.path.join(dataset_dir, COLUMNAR_DATA_FILE)
+    tmpfile = datafile + '.tmp'
+    rowids = array('l')
+    with dataset.reader() as reader:
+        ColumnarDatasetWriter(tmpfile, len(dataset.columns)).write(
+            validate_rows(dataset.columns, reader, rowids)
+        )
+    write_rowid_index(os.path.join(dataset_dir, ROWID_INDEX_FILE), rowids)
+    os.rename(tmpfile, datafile)
+    for filename in [COLUMN_MAP_FILE, VIEW_FILE, POSITION_FILE, PATCH_FILE]:
+        if os.path.isfile(os.path.join(dataset_dir, filename)):
+            os.remove(os.path.join(dataset_dir, filename))
+    HANDLE_CACHE.remove(dataset_dir)
@@ -0,0 +1,256 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Joining datasets.
+
+Hash join: The rows of the smaller input (build side) are loaded into a hash
+table on the values of the join columns. The rows of the larger input (probe
+side) are streamed and matched against the table. Rows with missing values in
+any of the join columns do not match any other row.
+
+Grace hash join: If the build side does not fit into the memory budget, both
+inputs are written to temporary partition files based on the hash of their
+join keys. Matching rows end up in partitions with the same index. Each pair
+of partitions is joined recursively.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+from vizier.datastore.aggregate import SpillPartitions, read_partition
+
+
+"""Join types."""
+JOIN_INNER = 'inner'
+JOIN_LEFT = 'left'
+
+JOIN_TYPES = [JOIN_INNER, JOIN_LEFT]
+
+"""Default memory budget for the hash table of the build side (in bytes)."""
+DEFAULT_JOIN_BUFFER_SIZE = 64 * 1024 * 1024
+
+"""Maximum recursion depth for partitions. Partitions at this depth are joined
+in memory regardless of the memory budget."""
+MAX_JOIN_DEPTH = 4
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def hash_join(
+    left_rows, right_rows, left_keys, right_keys, left_width, right_width,
+    join_type=JOIN_INNER, build_left=False,
+    buffer_size=DEFAULT_JOIN_BUFFER_SIZE, tmp_dir=None
+):
+    """Join two streams of row values on the values at the given key
+    positions. The build_left flag determines which of the inputs is loaded
+    into the hash table. Both inputs are read once unless the build side
+    exceeds the buffer size. In that case both inputs are partitioned into
+    temporary files (see join_partition).
+
+    For a left outer join, rows in the left input that have no match are
+    returned with missing values (None) for all columns of the right input.
+
+    Returns an iterator over the joined rows. Each row contains the values of
+    the left row followed by the values of the right row. The order of the
+    result rows is undefined. Temporary files are deleted when the iterator is
+    exhausted or closed.
+
+    Parameters
+    ----------
+    left_rows: iterable(list)
+        Row values of the left input
+    right_rows: iterable(list)
+        Row values of the right input
+    left_keys: list(int)
+        Index positions of the join columns in the left row values
+    right_keys: list(int)
+        Index positions of the join columns in the right row values
+    left_width: int
+        Number of values in left rows
+    right_width: int
+        Number of values in right rows
+    join_type: string, optional
+        Join type (inner or left)
+    build_left: bool, optional
+        Load the left input into the hash table if True
+    buffer_size: int, optional
+        Memory budget for the hash table (in bytes)
+    tmp_dir: string, optional
+        Parent directory for temporary partition files
+
+    Returns
+    -------
+    iterator(list)
+    """
+    if not join_type in JOIN_TYPES:
+        raise ValueError('unknown join type \'' + str(join_type) + '\'')
+    if len(left_keys) != len(right_keys):
+        raise ValueError('number of join columns does not match')
+    if build_left:
+        build = (left_rows, left_keys, left_width)
+        probe = (right_rows, right_keys, right_width)
+    else:
+        build = (right_rows, right_keys, right_width)
+        probe = (left_rows, left_keys, left_width)
+    spill_dir = tempfile.mkdtemp(dir=tmp_dir)
+    try:
+        result = join_partition(
+            build[0],
+            probe[0],
+            build[1],
+            probe[1],
+            outer_build=(join_type == JOIN_LEFT and build_left),
+            outer_probe=(join_type == JOIN_LEFT and not build_left),
+            buffer_size=buffer_size,
+            spill_dir=spill_dir,
+            depth=0
+        )
+        for build_values, probe_values in result:
+            if build_values is None:
+                build_values = [None] * build[2]
+            if probe_values is None:
+                probe_values = [None] * probe[2]
+            if build_left:
+                yield build_values + probe_values
+            else:
+                yield probe_values + build_values
+    finally:
+        shutil.rmtree(spill_dir)
+
+
+def join_partition(
+    build_rows, probe_rows, build_keys, probe_keys, outer_build, outer_probe,
+    buffer_size, spill_dir, depth
+):
+    """Join a build and probe input using a hash table that is bounded by the
+    given buffer size. If the buffer is exceeded, the rows that are in the
+    table, the remaining build rows, and all probe rows are spilled to
+    partition files. Pairs of partitions are joined recursively.
+
+    Returns pairs of build and probe row values. Either element is None for
+    rows of an outer input that have no match.
+
+    Parameters
+    ----------
+    build_rows: iterable(list)
+        Row values of the build input
+    probe_rows: iterable(list)
+        Row values of the probe input
+    build_keys: list(int)
+        Index positions of the join columns in the build row values
+    probe_keys: list(int)
+        Index positions of the join columns in the probe row values
+    outer_build: bool
+        Return build rows without a match
+    outer_probe: bool
+        Return probe rows without a match
+    buffer_size: int
+        Memory budget for the hash table (in bytes)
+    spill_dir: string
+        Directory for partition files
+    depth: int
+        Recursion depth
+
+    Returns
+    -------
+    iterator((list, list))
+    """
+    # Load the build input into the hash table. Each entry is a pair of row
+    # values and a flag indicating whether the row had a match.
+    table = dict()
+    size = 0
+    overflow = False
+    build_iter = iter(build_rows)
+    for values in build_iter:
+        key = tuple([values[pos] for pos in build_keys])
+        entries = table.get(key)
+        if entries is None:
+            entries = list()
+            table[key] = entries
+        entries.append([values, False])
+        size += values_size(values)
+        if size > buffer_size and depth < MAX_JOIN_DEPTH:
+            overflow = True
+            break
+    if overflow:
+        # Partition both inputs by the hash of their join keys
+        build_parts = SpillPartitions(spill_dir, depth, prefix='build')
+        for key, entries in table.iteritems():
+            for values, _ in entries:
+                build_parts.add(key, values)
+        table = None
+        for values in build_iter:
+            build_parts.add(tuple([values[pos] for pos in build_keys]), values)
+        probe_parts = SpillPartitions(spill_dir, depth, prefix='probe')
+        for values in probe_rows:
+            probe_parts.add(tuple([values[pos] for pos in probe_keys]), values)
+        partitions = zip(build_parts.close(), probe_parts.close())
+        for build_file, probe_file in partitions:
+            result = join_partition(
+                read_partition(build_file),
+                read_partition(probe_file),
+                build_keys,
+                probe_keys,
+                outer_build,
+                outer_probe,
+                buffer_size,
+                spill_dir,
+                depth + 1
+            )
+            for pair in result:
+                yield pair
+            os.remove(build_file)
+            os.remove(probe_file)
+        return
+    # Stream the probe input. Keys with missing values do not match.
+    for values in probe_rows:
+        key = tuple([values[pos] for pos in probe_keys])
+        entries = None
+        if not None in key:
+            entries = table.get(key)
+        if not entries is None:
+            for entry in entries:
+                entry[1] = True
+                yield entry[0], values
+        elif outer_probe:
+            yield None, values
+    if outer_build:
+        for key, entries in table.iteritems():
+            for values, matched in entries:
+                if not matched:
+                    yield values, None
+
+
+def values_size(values):
+    """Estimate the memory size (in bytes) of a list of row values.
+
+    Parameters
+    ----------
+    values: list
+        Row values
+
+    Returns
+    -------
+    int
+    """
+    size = sys.getsizeof(values)
+    for value in values:
+        size += sys.getsizeof(value)
+    return size
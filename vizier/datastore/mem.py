@@ -62,6 +62,10 @@ class InMemDatasetHandle(DatasetHandle):
             annotations=annotations
         )
         self.datarows = rows
+        # Index of row positions by row identifier
+        self.row_index = dict()
+        for pos in range(len(rows)):
+            self.row_index[rows[pos].identifier] = pos
 
     @staticmethod
     def from_file(f_handle):
@@ -118,10 +122,29 @@ class InMemDatasetHandle(DatasetHandle):
         annos = self.annotations.for_object(column_id=column_id, row_id=row_id)
         return annos.values()
 
-    def reader(self, offset=0, limit=-1):
+    def get_row_position(self, rowid):
+        """Get the index position of the row with the given identifier in the
+        dataset. Returns -1 if the dataset does not contain the row.
+
+        Parameters
+        ----------
+        rowid: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        return self.row_index.get(int(rowid), -1)
+
+    def reader(
+        self, offset=0, limit=-1, rowid=None, columns=None, predicate=None
+    ):
         """Get reader for the dataset to access the dataset rows. The optional
         offset amd limit parameters are used to retrieve only a subset of
-        rows.
+        rows. The optional list of column identifier is used to retrieve only
+        a subset of the values in each row. The optional predicate is used to
+        retrieve only rows that satisfy the predicate.
 
         Parameters
         ----------
@@ -129,6 +152,12 @@ class InMemDatasetHandle(DatasetHandle):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        columns: list(int), optional
+            Identifier of columns that are included in the returned rows
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate
 
         Returns
         -------
@@ -136,10 +165,16 @@ class InMemDatasetHandle(DatasetHandle):
         """
         # Select the set of dataset rows for the reader depending on whether
         # offset or limit arguments are given.
+        datarows = self.datarows
+        if not rowid is None:
+            pos = self.get_row_position(rowid)
+            datarows = [datarows[pos]] if pos >= 0 else list()
+        if not predicate is None:
+            datarows = [row for row in datarows if predicate.eval(row.values)]
         if offset > 0 or limit > 0:
             rows = list()
             skip = offset
-            for row in self.datarows:
+            for row in datarows:
                 if skip > 0:
                     skip -= 1
                 else:
@@ -155,7 +190,18 @@ class InMemDatasetHandle(DatasetHandle):
                     if limit > 0 and len(rows) >= limit:
                         break
         else:
-            rows = self.datarows
+            rows = datarows
+        # Create copies of the selected rows that only contain the values of
+        # the projected columns
+        if not columns is None:
+            projection = self.get_column_positions(columns)
+            rows = [
+                DatasetRow(
+                    row.identifier,
+                    [row.values[pos] for pos in projection],
+                    [row.cell_annotations[pos] for pos in projection]
+                ) for row in rows
+            ]
         return InMemDatasetReader(rows)
 
 
@@ -205,6 +251,7 @@ class InMemDataStore(DataStore):
             rows = list()
         else:
             # Validate the number of values in the given rows
+            rows = list(rows)
             validate_schema(columns, rows)
         # Validate the given dataset schema. Will raise ValueError in case of
         # schema violations
@@ -264,7 +311,7 @@ class InMemDataStore(DataStore):
             return InMemDatasetHandle(
                 identifier=identifier,
                 columns=[
-                    DatasetColumn(col.identifier, col.name)
+                    DatasetColumn(col.identifier, col.name, col.data_type)
                         for col in dataset.columns
                 ],
                 rows=[
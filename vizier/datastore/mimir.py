@@ -37,8 +37,10 @@ from vizier.core.system import build_info
 from vizier.core.util import get_unique_identifier, min_max
 from vizier.datastore.base import DatasetHandle, DatasetColumn, DatasetRow
 from vizier.datastore.base import DataStore, encode_values, max_column_id
+from vizier.datastore.cache import PAGE_CACHE
 from vizier.datastore.metadata import Annotation, DatasetMetadata, ObjectMetadataSet
-from vizier.datastore.reader import DatasetReader
+from vizier.datastore.reader import DatasetReader, InMemDatasetReader
+from vizier.datastore.sort import SORT_CACHE
 from vizier.core.timestamp import get_current_time
 
 
@@ -242,6 +244,8 @@ class MimirDatasetHandle(DatasetHandle):
     in a relational and a reference to the table or view that contains the
     dataset.
     """
+    cache_pages = True
+
     def __init__(
         self, identifier, columns, rowid_column, table_name, row_ids,
         column_counter, row_counter, annotations=None
@@ -279,6 +283,44 @@ class MimirDatasetHandle(DatasetHandle):
         self.rowid_column = rowid_column
         self.table_name = table_name
         self.row_ids = row_ids
+        # Index of row positions by row identifier. Created on first use.
+        self.row_index = None
+
+    def fetch_rows_at(self, positions):
+        """Get list of dataset rows at the given index positions. Rows are
+        returned in the order of the given list of positions. Positions that
+        are outside the dataset are ignored.
+
+        Positions are translated into row identifier. All rows are retrieved
+        using a single database query.
+
+        Parameters
+        ----------
+        positions: list(int)
+            Index positions of rows in the dataset
+
+        Returns
+        -------
+        list(vizier.dataset.base.DatasetRow)
+        """
+        row_ids = [
+            str(self.row_ids[pos]) for pos in positions
+                if pos >= 0 and pos < len(self.row_ids)
+        ]
+        if len(row_ids) == 0:
+            return list()
+        where = ' OR '.join(['ROWID() = ' + r for r in set(row_ids)])
+        reader = MimirDatasetReader(
+            table_name=self.table_name,
+            columns=self.columns,
+            row_ids=self.row_ids,
+            rowid_column_numeric=self.rowid_column.is_numeric(),
+            annotations=self.annotations,
+            where='(' + where + ')'
+        )
+        with reader.open() as r:
+            rows = dict([(str(row.identifier), row) for row in r])
+        return [rows[r] for r in row_ids if r in rows]
 
     @staticmethod
     def from_file(filename, annotations=None):
@@ -312,6 +354,27 @@ class MimirDatasetHandle(DatasetHandle):
             annotations=annotations
         )
 
+    def get_row_position(self, rowid):
+        """Get the index position of the row with the given identifier in the
+        dataset. Returns -1 if the dataset does not contain the row.
+
+        Positions are determined by the order of rows in the row_ids list.
+
+        Parameters
+        ----------
+        rowid: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        if self.row_index is None:
+            self.row_index = dict()
+            for pos in range(len(self.row_ids)):
+                self.row_index[str(self.row_ids[pos])] = pos
+        return self.row_index.get(str(rowid), -1)
+
     def get_annotations(self, column_id=-1, row_id='-1'):
         """Get list of annotations for a dataset component. Expects at least one
         of the given identifier to be a valid identifier (>= 0).
@@ -381,10 +444,14 @@ class MimirDatasetHandle(DatasetHandle):
             raise ValueError('invalid component identifier')
         return annotations.values()
 
-    def reader(self, offset=0, limit=-1, rowid=None):
+    def reader(
+        self, offset=0, limit=-1, rowid=None, columns=None, predicate=None
+    ):
         """Get reader for the dataset to access the dataset rows. The optional
         offset amd limit parameters are used to retrieve only a subset of
-        rows.
+        rows. If a list of columns is given only these columns are included
+        in the database query. The optional predicate is translated into the
+        WHERE clause of the database query.
 
         Parameters
         ----------
@@ -392,20 +459,33 @@ class MimirDatasetHandle(DatasetHandle):
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        columns: list(int), optional
+            Identifier of columns that are included in the returned rows
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate
 
         Returns
         -------
         vizier.datastore.mimir.MimirDatasetReader
         """
+        # Avoid querying the database for rows that are not in the dataset
+        if not rowid is None and self.get_row_position(rowid) < 0:
+            return InMemDatasetReader(list())
+        schema = self.columns
+        if not columns is None:
+            schema = [self.columns[pos] for pos in self.get_column_positions(columns)]
         return MimirDatasetReader(
             table_name=self.table_name,
-            columns=self.columns,
+            columns=schema,
             row_ids=self.row_ids,
             rowid_column_numeric=self.rowid_column.is_numeric(),
             offset=offset,
             limit=limit,
             rowid=rowid,
-            annotations=self.annotations
+            annotations=self.annotations,
+            where=predicate.to_sql(self.columns) if not predicate is None else None
         )
 
     def to_file(self, filename):
@@ -432,7 +512,7 @@ class MimirDatasetHandle(DatasetHandle):
 
 class MimirDatasetReader(DatasetReader):
     """Dataset reader for Mimir datasets."""
-    def __init__(self, table_name, columns, row_ids, rowid_column_numeric=True, offset=0, limit=-1, rowid=None, annotations=None):
+    def __init__(self, table_name, columns, row_ids, rowid_column_numeric=True, offset=0, limit=-1, rowid=None, annotations=None, where=None):
         """Initialize information about the delimited file and the file format.
 
         Parameters
@@ -452,6 +532,8 @@ class MimirDatasetReader(DatasetReader):
             Limits the number of rows that are returned.
         annotations: vizier.datastore.metadata.DatasetMetadata, optional
             Annotations for dataset components
+        where: string, optional
+            Condition for the WHERE clause of the database query
         """
         self.table_name = table_name
         self.columns = columns
@@ -460,6 +542,7 @@ class MimirDatasetReader(DatasetReader):
         self.offset = offset
         self.limit = limit
         self.rowid = rowid
+        self.where = where
         # Convert row id list into row position index. Depending on whether
         # offset or limit parameters are given we also limit the entries in the
         # dictionary. The internal flag .is_range_query keeps track of whether
@@ -517,8 +600,13 @@ class MimirDatasetReader(DatasetReader):
             # Query the database to get the list of rows. Sort rows according to
             # order in row_ids and return a InMemReader
             sql = get_select_query(self.table_name, columns=self.columns)
+            conditions = list()
             if self.rowid != None:
-                sql += ' WHERE ROWID() = ' + str(self.rowid) 
+                conditions.append('ROWID() = ' + str(self.rowid))
+            if not self.where is None:
+                conditions.append(self.where)
+            if len(conditions) > 0:
+                sql += ' WHERE ' + ' AND '.join(conditions)
             if self.is_range_query:
                 sql +=  ' LIMIT ' + str(self.limit) + ' OFFSET ' + str(self.offset)
             rs = json.loads(
@@ -682,6 +770,8 @@ class MimirDataStore(DataStore):
         bool
         """
         dataset_dir = self.get_dataset_dir(identifier)
+        PAGE_CACHE.invalidate(identifier)
+        SORT_CACHE.invalidate(identifier)
         if os.path.isdir(dataset_dir):
             shutil.rmtree(dataset_dir)
             return True
@@ -1005,6 +1095,7 @@ class MimirDataStore(DataStore):
         result = obj_annos.update(identifier=anno_id, key=key, value=value)
         # Write modified annotations to file
         annotations.to_file(os.path.join(metadata_file))
+        PAGE_CACHE.invalidate(identifier)
         return annotations
 
 
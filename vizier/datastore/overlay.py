@@ -0,0 +1,590 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Patch overlays - Datasets that differ from a parent dataset in a small
+number of cells and rows.
+
+An overlay is defined by the parent dataset and a patch. The patch contains a
+list of segments and the modified cell values. Each segment is either a range
+[start, end) of row positions in the parent dataset or a single inserted row
+[None, rowid]. The rows of the overlay are the rows of all segments in order.
+Modified cell values are keyed by the row identifier and the column
+identifier. Readers merge the modified values into the rows of the parent
+dataset on the fly.
+
+Overlays are created for sequences of operations that only update cells, or
+insert or delete individual rows (see vizier.datastore.derived). The size of
+the patch grows with the number of modified cells and rows, independently of
+the number of rows in the parent dataset.
+"""
+
+from bisect import bisect_right
+from itertools import islice
+
+from vizier.datastore.base import DatasetRow
+from vizier.datastore.derived import OP_DELETE_ROW, OP_INSERT_ROW
+from vizier.datastore.derived import OP_UPDATE_CELL
+from vizier.datastore.reader import DatasetReader, set_cell_annotations
+
+
+"""Maximum number of segments and modified cells in a patch. Overlays whose
+patch would exceed the maximum size are folded into a new dataset instead."""
+MAX_PATCH_SIZE = 1024
+
+"""Operations that can be represented by a patch overlay."""
+OVERLAY_OPERATIONS = set([OP_DELETE_ROW, OP_INSERT_ROW, OP_UPDATE_CELL])
+
+"""Number of rows for which the reader predicate is evaluated at a time."""
+PATCH_BLOCK_SIZE = 65536
+
+
+class DatasetPatch(object):
+    """Segments and modified cell values of a patch overlay. Modified values
+    are maintained in a dictionary of dictionaries that is keyed by the row
+    identifier and then by the column identifier.
+    """
+    def __init__(self, segments, cells=None):
+        """Initialize the segments and the modified cell values.
+
+        Parameters
+        ----------
+        segments: list
+            Parent row ranges and inserted rows
+        cells: dict, optional
+            Modified cell values keyed by row and column identifier
+        """
+        self.segments = segments
+        self.cells = cells if not cells is None else dict()
+
+    def delete_row(self, position):
+        """Remove the row at the given position from the overlay. Returns the
+        parent position of the deleted row or None if the row was inserted
+        by the patch.
+
+        Parameters
+        ----------
+        position: int
+            Row position in the overlay
+
+        Returns
+        -------
+        int
+        """
+        index, start = self.locate(position)
+        first, last = self.segments[index]
+        if first is None:
+            del self.segments[index]
+            self.cells.pop(last, None)
+            return None
+        pos = first + position - start
+        parts = [[first, pos], [pos + 1, last]]
+        self.segments[index:index + 1] = [s for s in parts if s[0] < s[1]]
+        return pos
+
+    @staticmethod
+    def from_dict(doc):
+        """Create patch from the dictionary serialization that is returned
+        by to_dict().
+
+        Parameters
+        ----------
+        doc: dict
+            Dictionary serialization of a patch
+
+        Returns
+        -------
+        vizier.datastore.overlay.DatasetPatch
+        """
+        cells = dict()
+        for rowid, column_id, value in doc['cells']:
+            cells.setdefault(rowid, dict())[column_id] = value
+        return DatasetPatch(
+            segments=[list(s) for s in doc['segments']],
+            cells=cells
+        )
+
+    def insert_row(self, position, rowid):
+        """Insert an empty row with the given identifier at the given
+        position.
+
+        Parameters
+        ----------
+        position: int
+            Row position in the overlay
+        rowid: int
+            Identifier of the inserted row
+        """
+        if position >= self.row_count():
+            self.segments.append([None, rowid])
+            return
+        index, start = self.locate(position)
+        first, last = self.segments[index]
+        parts = [[None, rowid]]
+        if not first is None and position > start:
+            pos = first + position - start
+            parts = [[first, pos], [None, rowid], [pos, last]]
+            index_end = index + 1
+        else:
+            index_end = index
+        self.segments[index:index_end] = parts
+
+    def locate(self, position):
+        """Get the index of the segment that contains the row at the given
+        position and the position of the first row in that segment.
+
+        Raises ValueError if the position is outside of the overlay.
+
+        Parameters
+        ----------
+        position: int
+            Row position in the overlay
+
+        Returns
+        -------
+        int, int
+        """
+        start = 0
+        for index in range(len(self.segments)):
+            size = segment_size(self.segments[index])
+            if position < start + size:
+                return index, start
+            start += size
+        raise ValueError('invalid row index \'' + str(position) + '\'')
+
+    def merge(self, row, columns):
+        """Merge the modified cell values into a row. Returns a new row if
+        any of the row values has been modified.
+
+        Parameters
+        ----------
+        row: vizier.datastore.base.DatasetRow
+            Row in the schema of the parent dataset
+        columns: dict
+            Column positions keyed by the column identifier
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        cells = self.cells.get(row.identifier)
+        if cells is None:
+            return row
+        values = list(row.values)
+        for column_id, value in cells.iteritems():
+            if column_id in columns:
+                values[columns[column_id]] = value
+        return DatasetRow(row.identifier, values)
+
+    def position(self, parent, rowid):
+        """Get the position of the row with the given identifier in the
+        overlay. Returns -1 if the overlay does not contain the row.
+
+        Parameters
+        ----------
+        parent: vizier.datastore.base.DatasetHandle
+            Handle for the parent dataset
+        rowid: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        parent_pos = None
+        start = 0
+        for first, last in self.segments:
+            if first is None:
+                if last == rowid:
+                    return start
+                start += 1
+                continue
+            if parent_pos is None:
+                parent_pos = parent.get_row_position(rowid)
+            if parent_pos >= first and parent_pos < last:
+                return start + parent_pos - first
+            start += last - first
+        return -1
+
+    def row_count(self):
+        """Get the number of rows in the overlay.
+
+        Returns
+        -------
+        int
+        """
+        return sum([segment_size(s) for s in self.segments])
+
+    def rows(self, parent, offset=0):
+        """Get an iterator over the rows of the overlay starting at the
+        given position. Rows are in the schema of the parent dataset. Only
+        the parent rows from the requested position onwards are read.
+
+        Parameters
+        ----------
+        parent: vizier.datastore.base.DatasetHandle
+            Handle for the parent dataset
+        offset: int, optional
+            Position of the first returned row
+
+        Returns
+        -------
+        iterator(vizier.datastore.base.DatasetRow)
+        """
+        columns = column_index(parent.columns)
+        start = 0
+        for first, last in self.segments:
+            size = segment_size([first, last])
+            if start + size <= offset:
+                start += size
+                continue
+            if first is None:
+                row = DatasetRow(last, [None] * len(parent.columns))
+                yield self.merge(row, columns)
+            else:
+                skip = max(offset - start, 0)
+                with parent.reader(offset=first + skip, limit=size - skip) as r:
+                    for row in r:
+                        yield self.merge(row, columns)
+            start += size
+
+    def rows_at(self, parent, positions):
+        """Get the rows at the given positions of the overlay. Reads all
+        referenced rows of the parent dataset at once. Positions that are
+        outside of the overlay are ignored.
+
+        Parameters
+        ----------
+        parent: vizier.datastore.base.DatasetHandle
+            Handle for the parent dataset
+        positions: list(int)
+            Row positions in the overlay
+
+        Returns
+        -------
+        list(vizier.datastore.base.DatasetRow)
+        """
+        starts = list()
+        start = 0
+        for segment in self.segments:
+            starts.append(start)
+            start += segment_size(segment)
+        entries = list()
+        for pos in positions:
+            if pos < 0 or pos >= start:
+                continue
+            index = bisect_right(starts, pos) - 1
+            first, last = self.segments[index]
+            if first is None:
+                entries.append((None, last))
+            else:
+                entries.append((first + pos - starts[index], None))
+        parent_positions = sorted(
+            set([pos for pos, _ in entries if not pos is None])
+        )
+        rows = dict(zip(parent_positions, parent.fetch_rows_at(parent_positions)))
+        columns = column_index(parent.columns)
+        result = list()
+        for pos, rowid in entries:
+            if pos is None:
+                row = DatasetRow(rowid, [None] * len(parent.columns))
+            else:
+                row = rows[pos]
+            result.append(self.merge(row, columns))
+        return result
+
+    def size(self):
+        """Get the number of segments and modified cell values in the patch.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.segments) + sum([len(c) for c in self.cells.values()])
+
+    def to_dict(self):
+        """Get dictionary serialization of the patch. Modified cell values are
+        serialized as a list of [rowid, column_id, value] triples.
+
+        Returns
+        -------
+        dict
+        """
+        cells = list()
+        for rowid in sorted(self.cells):
+            row_cells = self.cells[rowid]
+            for column_id in sorted(row_cells):
+                cells.append([rowid, column_id, row_cells[column_id]])
+        return {'segments': self.segments, 'cells': cells}
+
+    def update_cell(self, rowid, column_id, value):
+        """Set the value of a cell.
+
+        Parameters
+        ----------
+        rowid: int
+            Unique row identifier
+        column_id: int
+            Unique column identifier
+        value: string|int|float
+            New cell value
+        """
+        self.cells.setdefault(rowid, dict())[column_id] = value
+
+
+class OverlayReader(DatasetReader):
+    """Dataset reader for patch overlays. Reads the rows of the parent
+    dataset and merges the modified cell values of the patch.
+
+    If a column map is given the overlay schema differs from the columns in
+    the parent dataset. Projection and predicate reference columns by their
+    position in the overlay schema.
+    """
+    def __init__(
+        self, parent, patch, positions=None, columns=None, offset=0, limit=-1,
+        rowid=None, annotations=None, column_map=None, projection=None,
+        predicate=None
+    ):
+        """Initialize the parent dataset and the patch.
+
+        Parameters
+        ----------
+        parent: vizier.datastore.base.DatasetHandle
+            Handle for the parent dataset
+        patch: vizier.datastore.overlay.DatasetPatch
+            Segments and modified cell values of the overlay
+        positions: list(int), optional
+            Positions of the returned rows. All rows are returned if None.
+        columns: list(vizier.datastore.base.DatasetColumn), optional
+            List of columns for the values that are returned by the reader
+        offset: int, optional
+            Number of rows at the beginning of the list that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        annotations: vizier.datastore.metadata.DatasetMetadata, optional
+            Annotations for dataset components
+        column_map: list(int), optional
+            Positions of the schema columns in the parent rows
+        projection: list(int), optional
+            Positions of the schema columns whose values are returned by the
+            reader. All columns are returned if None.
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate
+        """
+        self.parent = parent
+        self.patch = patch
+        self.positions = positions
+        self.columns = columns
+        self.offset = offset
+        self.limit = limit
+        self.rowid = rowid
+        self.annotations = annotations
+        self.column_map = column_map
+        self.projection = projection
+        self.predicate = predicate
+        # Internal reader state
+        self.is_open = False
+        self.rows = None
+        self.block_rows = None
+        self.block_pos = 0
+        self.read_index = 0
+        self.skip = 0
+
+    def close(self):
+        """Release the row iterator and set the is_open flag to False."""
+        self.rows = None
+        self.block_rows = None
+        self.is_open = False
+
+    def next(self):
+        """Return the next row in the dataset iterator. Raises StopIteration if
+        end of the overlay is reached or the reader has been closed.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        if self.is_open:
+            if self.limit < 0 or self.read_index < self.limit:
+                row = self.next_row()
+                if not row is None:
+                    set_cell_annotations(row, self.columns, self.annotations)
+                    self.read_index += 1
+                    return row
+            self.close()
+        raise StopIteration
+
+    def next_row(self):
+        """Get the next row that satisfies the row identifier and predicate
+        constraints of the reader. Returns None if the end of the overlay is
+        reached.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        while self.block_rows is None or self.block_pos >= len(self.block_rows):
+            rows = list(islice(self.rows, PATCH_BLOCK_SIZE))
+            if len(rows) == 0:
+                return None
+            if not self.column_map is None:
+                rows = [
+                    DatasetRow(
+                        row.identifier,
+                        [row.values[pos] for pos in self.column_map]
+                    ) for row in rows
+                ]
+            if not self.rowid is None:
+                rows = [row for row in rows if row.identifier == self.rowid]
+            if not self.predicate is None:
+                values = dict()
+                for pos in self.predicate.columns():
+                    values[pos] = [row.values[pos] for row in rows]
+                rows = [
+                    rows[i] for i in self.predicate.filter(
+                        values,
+                        range(len(rows))
+                    )
+                ]
+            if self.skip >= len(rows):
+                self.skip -= len(rows)
+                continue
+            self.block_pos = self.skip
+            self.skip = 0
+            self.block_rows = rows
+        row = self.block_rows[self.block_pos]
+        self.block_pos += 1
+        if not self.projection is None:
+            row = DatasetRow(
+                row.identifier,
+                [row.values[pos] for pos in self.projection]
+            )
+        return row
+
+    def open(self):
+        """Setup the reader state. Positions the reader at the first requested
+        row of the overlay if rows are not filtered.
+
+        Returns
+        -------
+        vizier.datastore.overlay.OverlayReader
+        """
+        if not self.is_open:
+            self.block_rows = None
+            self.block_pos = 0
+            self.read_index = 0
+            self.skip = self.offset
+            if not self.positions is None:
+                rows = self.patch.rows_at(self.parent, self.positions)
+                self.rows = iter(rows[self.offset:])
+                self.skip = 0
+            elif self.rowid is None and self.predicate is None:
+                self.rows = self.patch.rows(self.parent, offset=self.offset)
+                self.skip = 0
+            else:
+                self.rows = self.patch.rows(self.parent)
+            self.is_open = True
+        return self
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def column_index(columns):
+    """Get dictionary that maps column identifier to column positions.
+
+    Parameters
+    ----------
+    columns: list(vizier.datastore.base.DatasetColumn)
+        List of dataset columns
+
+    Returns
+    -------
+    dict
+    """
+    return dict([(columns[i].identifier, i) for i in range(len(columns))])
+
+
+def patch_dataset(parent, operations, patch=None):
+    """Apply a sequence of overlay operations to the patch of an overlay on
+    the given parent dataset. Returns the modified patch. The patch covers
+    all rows of the parent dataset without modifications if not given.
+    Expects that all operations are in OVERLAY_OPERATIONS.
+
+    Only the rows that are deleted or updated are read from the parent
+    dataset to get their identifier.
+
+    Parameters
+    ----------
+    parent: vizier.datastore.base.DatasetHandle
+        Handle for the parent dataset
+    operations: list(dict)
+        Sequence of overlay operations
+    patch: vizier.datastore.overlay.DatasetPatch, optional
+        Patch of an existing overlay on the parent dataset
+
+    Returns
+    -------
+    vizier.datastore.overlay.DatasetPatch
+    """
+    if patch is None:
+        segments = list()
+        if parent.row_count > 0:
+            segments.append([0, parent.row_count])
+        patch = DatasetPatch(segments)
+    for op in operations:
+        op_type = op['type']
+        if op_type == OP_DELETE_ROW:
+            pos = patch.delete_row(op['position'])
+            if not pos is None and len(patch.cells) > 0:
+                # Drop modified values of the deleted row
+                for row in parent.fetch_rows_at([pos]):
+                    patch.cells.pop(row.identifier, None)
+        elif op_type == OP_INSERT_ROW:
+            patch.insert_row(op['position'], op['rowid'])
+        elif op_type == OP_UPDATE_CELL:
+            index, start = patch.locate(op['row'])
+            first, last = patch.segments[index]
+            if first is None:
+                rowid = last
+            else:
+                row = parent.fetch_rows_at([first + op['row'] - start])[0]
+                rowid = row.identifier
+            column_id = parent.columns[op['column']].identifier
+            patch.update_cell(rowid, column_id, op['value'])
+        else:
+            raise ValueError('not an overlay operation \'' + str(op_type) + '\'')
+    return patch
+
+
+def segment_size(segment):
+    """Get the number of rows in a patch segment.
+
+    Parameters
+    ----------
+    segment: list
+        Parent row range or inserted row
+
+    Returns
+    -------
+    int
+    """
+    first, last = segment
+    if first is None:
+        return 1
+    return last - first
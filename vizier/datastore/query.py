@@ -34,9 +34,9 @@ class DataStreamConsumer(object):
             if self.range_end is None or row_index <= self.range_end:
                 val = row.values[self.column_index]
                 if self.cast_to_number:
-                    # Only convert if not already a numeric value. Assumes a
-                    # string if not numeric
-                    if not isinstance(val, int) and not isinstance(val, float):
+                    # Only convert string values. Numbers and missing values
+                    # are kept as is.
+                    if isinstance(val, basestring):
                         # Try to cast to integer first. Remove commas.
                         try:
                             val = int(val.replace(',', ''))
@@ -47,3 +47,472 @@ class DataStreamConsumer(object):
                             except ValueError:
                                 pass
                 self.values.append(val)
+
+
+# ------------------------------------------------------------------------------
+# Predicates
+# ------------------------------------------------------------------------------
+
+"""Comparison operators for dataset row predicates."""
+OP_CONTAINS = 'contains'
+OP_EQ = 'eq'
+OP_GE = 'ge'
+OP_GT = 'gt'
+OP_ISNULL = 'isnull'
+OP_LE = 'le'
+OP_LT = 'lt'
+
+OPERATORS = [OP_CONTAINS, OP_EQ, OP_GE, OP_GT, OP_ISNULL, OP_LE, OP_LT]
+
+"""SQL operators for comparison operators."""
+SQL_OPERATORS = {OP_EQ: '=', OP_GE: '>=', OP_GT: '>', OP_LE: '<=', OP_LT: '<'}
+
+
+class Predicate(object):
+    """Predicate over the values in a dataset row. Predicates reference
+    columns by their index position in the dataset schema.
+
+    Predicates are evaluated either on individual rows (eval) or on the values
+    of a set of rows that are stored by column (filter). The latter allows
+    readers to evaluate predicates without creating row objects.
+    """
+    def columns(self):
+        """Get index positions of all columns that are referenced by the
+        predicate.
+
+        Returns
+        -------
+        set(int)
+        """
+        raise NotImplementedError
+
+    def eval(self, values):
+        """Evaluate the predicate on a list of row values.
+
+        Parameters
+        ----------
+        values: list
+            Values in a dataset row
+
+        Returns
+        -------
+        bool
+        """
+        raise NotImplementedError
+
+    def filter(self, columns, rows):
+        """Get the subset of rows that satisfy the predicate. Rows are given
+        by their index in the lists of column values.
+
+        Parameters
+        ----------
+        columns: dict
+            Lists of column values keyed by the column position. Contains
+            values for (at least) all columns that are referenced by the
+            predicate.
+        rows: list(int)
+            Index of rows that are evaluated
+
+        Returns
+        -------
+        list(int)
+        """
+        raise NotImplementedError
+
+    def to_sql(self, columns):
+        """Get SQL expression for the predicate.
+
+        Parameters
+        ----------
+        columns: list(vizier.datastore.mimir.MimirDatasetColumn)
+            Columns in the dataset schema
+
+        Returns
+        -------
+        string
+        """
+        raise NotImplementedError
+
+
+class Comparison(Predicate):
+    """Comparison of the value in a column with a constant. Numeric constants
+    are compared with the numeric representation of column values. Other
+    constants are compared with the string representation of column values.
+    The contains operator always compares the string representation of the
+    constant with the string representation of column values. Null values (None
+    or empty strings) only satisfy the is-null comparison.
+    """
+    def __init__(self, column, op, value=None):
+        """Initialize the column position, operator and constant.
+
+        Parameters
+        ----------
+        column: int
+            Index position of the column in the dataset schema
+        op: string
+            Comparison operator
+        value: any, optional
+            Constant. Ignored for the is-null operator.
+        """
+        self.column = column
+        self.op = op
+        self.value = value
+        self.is_numeric = is_number(value) and op != OP_CONTAINS
+        if not self.is_numeric and not value is None:
+            self.value = unicode(value)
+
+    def columns(self):
+        """Get index positions of all columns that are referenced by the
+        predicate.
+
+        Returns
+        -------
+        set(int)
+        """
+        return set([self.column])
+
+    def eval(self, values):
+        """Evaluate the predicate on a list of row values.
+
+        Parameters
+        ----------
+        values: list
+            Values in a dataset row
+
+        Returns
+        -------
+        bool
+        """
+        return self.test(values[self.column])
+
+    def filter(self, columns, rows):
+        """Get the subset of rows that satisfy the predicate.
+
+        Parameters
+        ----------
+        columns: dict
+            Lists of column values keyed by the column position
+        rows: list(int)
+            Index of rows that are evaluated
+
+        Returns
+        -------
+        list(int)
+        """
+        values = columns[self.column]
+        test = self.test
+        return [row for row in rows if test(values[row])]
+
+    def test(self, val):
+        """Test whether a column value satisfies the comparison.
+
+        Parameters
+        ----------
+        val: any
+            Column value
+
+        Returns
+        -------
+        bool
+        """
+        if val is None or val == '':
+            return self.op == OP_ISNULL
+        elif self.op == OP_ISNULL:
+            return False
+        elif self.op == OP_CONTAINS:
+            return self.value in unicode(val)
+        if self.is_numeric:
+            val = to_number(val)
+            if val is None:
+                return False
+        else:
+            val = unicode(val)
+        if self.op == OP_EQ:
+            return val == self.value
+        elif self.op == OP_LT:
+            return val < self.value
+        elif self.op == OP_LE:
+            return val <= self.value
+        elif self.op == OP_GT:
+            return val > self.value
+        else:
+            return val >= self.value
+
+    def to_sql(self, columns):
+        """Get SQL expression for the predicate. The contains operator is
+        translated using instr() instead of LIKE. The constant is matched
+        case-sensitively and without any wildcard characters, i.e., the same
+        as when evaluating the predicate on dataset rows.
+
+        Parameters
+        ----------
+        columns: list(vizier.datastore.mimir.MimirDatasetColumn)
+            Columns in the dataset schema
+
+        Returns
+        -------
+        string
+        """
+        name = columns[self.column].name_in_rdb
+        if self.op == OP_ISNULL:
+            return name + ' IS NULL'
+        elif self.op == OP_CONTAINS:
+            return 'instr(' + name + ', ' + sql_string(self.value) + ') > 0'
+        if self.is_numeric:
+            const = str(self.value)
+        else:
+            const = sql_string(self.value)
+        return name + ' ' + SQL_OPERATORS[self.op] + ' ' + const
+
+
+class Conjunction(Predicate):
+    """Conjunction (AND) of predicates."""
+    def __init__(self, children):
+        """Initialize the list of predicates.
+
+        Parameters
+        ----------
+        children: list(vizier.datastore.query.Predicate)
+            List of predicates
+        """
+        self.children = children
+
+    def columns(self):
+        """Get index positions of all columns that are referenced by the
+        predicate.
+
+        Returns
+        -------
+        set(int)
+        """
+        return set().union(*[p.columns() for p in self.children])
+
+    def eval(self, values):
+        """Evaluate the predicate on a list of row values.
+
+        Parameters
+        ----------
+        values: list
+            Values in a dataset row
+
+        Returns
+        -------
+        bool
+        """
+        for p in self.children:
+            if not p.eval(values):
+                return False
+        return True
+
+    def filter(self, columns, rows):
+        """Get the subset of rows that satisfy the predicate. Each predicate
+        is only evaluated on the rows that satisfy all previous predicates.
+
+        Parameters
+        ----------
+        columns: dict
+            Lists of column values keyed by the column position
+        rows: list(int)
+            Index of rows that are evaluated
+
+        Returns
+        -------
+        list(int)
+        """
+        for p in self.children:
+            if len(rows) == 0:
+                break
+            rows = p.filter(columns, rows)
+        return rows
+
+    def to_sql(self, columns):
+        """Get SQL expression for the predicate.
+
+        Parameters
+        ----------
+        columns: list(vizier.datastore.mimir.MimirDatasetColumn)
+            Columns in the dataset schema
+
+        Returns
+        -------
+        string
+        """
+        return '(' + ' AND '.join([p.to_sql(columns) for p in self.children]) + ')'
+
+
+class Disjunction(Predicate):
+    """Disjunction (OR) of predicates."""
+    def __init__(self, children):
+        """Initialize the list of predicates.
+
+        Parameters
+        ----------
+        children: list(vizier.datastore.query.Predicate)
+            List of predicates
+        """
+        self.children = children
+
+    def columns(self):
+        """Get index positions of all columns that are referenced by the
+        predicate.
+
+        Returns
+        -------
+        set(int)
+        """
+        return set().union(*[p.columns() for p in self.children])
+
+    def eval(self, values):
+        """Evaluate the predicate on a list of row values.
+
+        Parameters
+        ----------
+        values: list
+            Values in a dataset row
+
+        Returns
+        -------
+        bool
+        """
+        for p in self.children:
+            if p.eval(values):
+                return True
+        return False
+
+    def filter(self, columns, rows):
+        """Get the subset of rows that satisfy the predicate. Each predicate
+        is only evaluated on the rows that do not satisfy any of the previous
+        predicates.
+
+        Parameters
+        ----------
+        columns: dict
+            Lists of column values keyed by the column position
+        rows: list(int)
+            Index of rows that are evaluated
+
+        Returns
+        -------
+        list(int)
+        """
+        matches = set()
+        candidates = rows
+        for p in self.children:
+            matches.update(p.filter(columns, candidates))
+            candidates = [row for row in candidates if not row in matches]
+        return [row for row in rows if row in matches]
+
+    def to_sql(self, columns):
+        """Get SQL expression for the predicate.
+
+        Parameters
+        ----------
+        columns: list(vizier.datastore.mimir.MimirDatasetColumn)
+            Columns in the dataset schema
+
+        Returns
+        -------
+        string
+        """
+        return '(' + ' OR '.join([p.to_sql(columns) for p in self.children]) + ')'
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def is_number(value):
+    """Test if the given value is an integer or float (booleans are not
+    considered numbers).
+
+    Parameters
+    ----------
+    value: any
+
+    Returns
+    -------
+    bool
+    """
+    return type(value) in [int, long, float]
+
+
+def parse_predicate(obj, dataset):
+    """Create a predicate from its dictionary serialization. Predicates are
+    either comparisons or AND/OR combinations of predicates:
+
+        {'column': int, 'op': string, 'value': any}
+        {'and': [...]}
+        {'or': [...]}
+
+    Columns are referenced by their identifier. Valid comparison operators are
+    contains, eq, ge, gt, isnull, le, and lt.
+
+    Raises ValueError if the serialization is invalid or if a referenced
+    column does not exist in the given dataset.
+
+    Parameters
+    ----------
+    obj: dict
+        Dictionary serialization of the predicate
+    dataset: vizier.datastore.base.DatasetHandle
+        Handle for the queried dataset
+
+    Returns
+    -------
+    vizier.datastore.query.Predicate
+    """
+    if not isinstance(obj, dict):
+        raise ValueError('invalid predicate \'' + str(obj) + '\'')
+    for key, cls in [('and', Conjunction), ('or', Disjunction)]:
+        if key in obj:
+            if not isinstance(obj[key], list) or len(obj[key]) == 0:
+                raise ValueError('expected list of predicates for \'' + key + '\'')
+            return cls([parse_predicate(p, dataset) for p in obj[key]])
+    for key in ['column', 'op']:
+        if not key in obj:
+            raise ValueError('missing element \'' + key + '\' in predicate')
+    op = obj['op']
+    if not op in OPERATORS:
+        raise ValueError('unknown operator \'' + str(op) + '\'')
+    if op != OP_ISNULL and obj.get('value') is None:
+        raise ValueError('missing value for operator \'' + op + '\'')
+    try:
+        col_id = int(obj['column'])
+    except (TypeError, ValueError):
+        raise ValueError('invalid column identifier \'' + str(obj['column']) + '\'')
+    column = dataset.get_column_positions([col_id])[0]
+    return Comparison(column, op, value=obj.get('value'))
+
+
+def sql_string(value):
+    """Get SQL string literal for the given value.
+
+    Parameters
+    ----------
+    value: string
+
+    Returns
+    -------
+    string
+    """
+    return '\'' + value.replace('\'', '\'\'') + '\''
+
+
+def to_number(value):
+    """Convert a column value to a number. Returns None if the value cannot
+    be converted.
+
+    Parameters
+    ----------
+    value: any
+
+    Returns
+    -------
+    int or float
+    """
+    if is_number(value):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
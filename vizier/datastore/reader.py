@@ -21,13 +21,41 @@ Dataset reader implement the context manager interface and the iterator
 interface.
 """
 from abc import abstractmethod
+from array import array
 import csv
 import gzip
+import heapq
 import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
 
 from vizier.datastore.base import DatasetHandle, DatasetColumn, DatasetRow
 
 
+"""Number of bytes that are read at a time when parsing Json dataset files
+incrementally."""
+READ_BUFFER_SIZE = 65536
+
+"""Number of rows per block in the row offset index of Json dataset files."""
+ROW_INDEX_BLOCK_SIZE = 1024
+
+"""Number of integer values that are serialized at a time when writing index
+files."""
+INT_ARRAY_CHUNK_SIZE = 65536
+
+"""Maximum number of row identifier that are sorted in memory when writing the
+row identifier index. Larger lists are sorted using an external merge sort."""
+ROWID_SORT_RUN_SIZE = 1024 * 1024
+
+"""Flag indicating whether native integer arrays have the serialization format
+of pack_int_array, i.e., little-endian 64-bit values."""
+NATIVE_INT64 = array('l').itemsize == 8 and sys.byteorder == 'little'
+
+
 class DatasetReader(object):
     """Reader for datasets. Allows to iterate over the the rows in a dataset.
     Rows are lists of values, one for each column.
@@ -187,8 +215,25 @@ class DefaultJsonDatasetReader(DatasetReader):
                 {'id': int, 'values': [...]}
             ]
         }
+
+    Files are written with one row per line. By default the reader parses the
+    file incrementally (streaming mode), i.e., rows are decoded one at a time
+    and reading stops as soon as the limit is reached. Memory usage is bounded
+    by the size of the read buffer independently of the size of the dataset.
+
+    If an index file is given the reader uses the row offset index to seek to
+    the block that contains the first row in the requested page. The index is
+    created if the file does not exist.
+
+    Each row is decoded as a whole. A projection therefore only reduces the
+    values in the returned rows, not the cost of parsing the file. Datasets in
+    columnar format only decode the values of the projected columns.
     """
-    def __init__(self, filename, columns=None, compressed=False, offset=0, limit=-1, annotations=None):
+    def __init__(
+        self, filename, columns=None, compressed=False, offset=0, limit=-1,
+        rowid=None, annotations=None, streaming=True, index_file=None,
+        projection=None, predicate=None
+    ):
         """Initialize information about the Json file.
 
         Parameters
@@ -197,30 +242,52 @@ class DefaultJsonDatasetReader(DatasetReader):
             Path to the file on disk
         columns: list(vizier.datastore.base.DatasetColumn), optional
             List of columns. It is expected that each column has a unique
-            identifier.
+            identifier. If a projection is given the list contains the
+            projected columns.
         compressed: bool, optional
             Flag indicating if the file is compressed (gzip)
         offset: int, optional
             Number of rows at the beginning of the list that are skipped.
         limit: int, optional
             Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
         annotations: vizier.datastore.metadata.DatasetMetadata, optional
             Annotations for dataset components
+        streaming: bool, optional
+            Parse rows incrementally instead of loading the whole file into
+            memory
+        index_file: string, optional
+            Path to the row offset index for the data file
+        projection: list(int), optional
+            Positions of the columns (in the stored rows) whose values are
+            returned by the reader. All columns are returned if None. All
+            values of a row are parsed regardless of the projection.
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate. The predicate is
+            evaluated on the parsed values before row objects are created.
         """
         self.filename = filename
         self.columns = columns
         self.compressed = compressed
         self.offset = offset
         self.limit = limit
+        self.rowid = rowid
         self.annotations = annotations
+        self.streaming = streaming
+        self.index_file = index_file
+        self.projection = projection
+        self.predicate = predicate
         # Variables that maintain the internal state of the reader, i.e., the
-        # opened file and the list of rows (in original Json format). If the
-        # is_open flag is True the file handle (fd) and row list and read index
-        # should not be None.
+        # opened file and the list of rows (in original Json format) or the
+        # incremental row parser. If the is_open flag is True the file handle
+        # (fd) and row list (or parser) and read index should not be None.
         self.is_open = False
         self.fh = None
         self.read_index = None
         self.rows = None
+        self.parser = None
+        self.skip = 0
 
     def close(self):
         """Close any open files and set the is_open flag to False."""
@@ -228,6 +295,7 @@ class DefaultJsonDatasetReader(DatasetReader):
             self.fh.close()
         self.fh = None
         self.rows = None
+        self.parser = None
         self.read_index = None
         self.is_open = False
 
@@ -243,22 +311,52 @@ class DefaultJsonDatasetReader(DatasetReader):
         vizier.datastore.base.DatasetRow
         """
         if self.is_open:
-            if self.read_index < len(self.rows):
-                row = DatasetRow.from_dict(self.rows[self.read_index])
-                # Set the annotation flags in the dataset row
-                if not self.annotations is None:
-                    for i in range(len(self.columns)):
-                        col = self.columns[i]
-                        has_anno = self.annotations.has_cell_annotation(
-                            col.identifier,
-                            row.identifier
-                        )
-                        if has_anno:
-                            row.cell_annotations[i] = True
-                self.read_index += 1
-                return row
+            if self.streaming:
+                doc = self.next_streaming_row()
+            elif self.read_index < len(self.rows):
+                doc = self.rows[self.read_index]
+            else:
+                doc = None
+            if doc is None:
+                self.close()
+                raise StopIteration
+            if not self.projection is None:
+                values = doc['values']
+                row = DatasetRow(
+                    doc['id'],
+                    [values[pos] for pos in self.projection]
+                )
+            else:
+                row = DatasetRow.from_dict(doc)
+            set_cell_annotations(row, self.columns, self.annotations)
+            self.read_index += 1
+            return row
         raise StopIteration
 
+    def next_streaming_row(self):
+        """Get the Json object for the next row that satisfies the offset, limit
+        and row identifier constraints of the reader. Returns None if no such
+        row exists.
+
+        Returns
+        -------
+        dict
+        """
+        if self.limit > 0 and self.read_index >= self.limit:
+            return None
+        while True:
+            doc = self.parser.next_row()
+            if doc is None:
+                return None
+            if not self.rowid is None and doc['id'] != self.rowid:
+                continue
+            if not self.predicate is None and not self.predicate.eval(doc['values']):
+                continue
+            if self.skip > 0:
+                self.skip -= 1
+                continue
+            return doc
+
     def open(self):
         """Setup the reader by opening the associacted file and instantiating
         the csv reader.
@@ -273,42 +371,528 @@ class DefaultJsonDatasetReader(DatasetReader):
                 self.fh = gzip.open(self.filename, 'rb')
             else:
                 self.fh = open(self.filename, 'r')
-            # Read the Json file and get the array of rows. Depending on whether
-            # offset or limit arguments were given we may select only a subset
-            # of the rows in the file.
-            ds_rows = json.loads(self.fh.read())['rows']
-            if self.offset > 0 or self.limit > 0:
-                self.rows = list()
-                skip = self.offset
-                for row in ds_rows:
-                    if skip > 0:
-                        skip -= 1
-                    else:
-                        self.rows.append(row)
-                        if self.limit > 0 and len(self.rows) >= self.limit:
-                            break
+            if self.streaming:
+                # Rows are parsed on demand in next(). Use the row offset index
+                # (if given) to start parsing at the block that contains the
+                # first requested row.
+                position = None
+                self.skip = self.offset
+                use_index = self.offset > 0 and self.rowid is None
+                use_index = use_index and self.predicate is None
+                if use_index and not self.index_file is None:
+                    block_size, offsets = load_row_index(
+                        self.index_file,
+                        self.filename,
+                        compressed=self.compressed
+                    )
+                    if len(offsets) > 0:
+                        block = min(self.offset // block_size, len(offsets) - 1)
+                        position = offsets[block]
+                        self.skip = self.offset - (block * block_size)
+                self.parser = JsonRowParser(self.fh, position=position)
             else:
-                self.rows = ds_rows
+                # Read the Json file and get the array of rows. Depending on
+                # whether offset or limit arguments were given we may select
+                # only a subset of the rows in the file.
+                ds_rows = json.loads(self.fh.read())['rows']
+                if not self.rowid is None:
+                    ds_rows = [r for r in ds_rows if r['id'] == self.rowid]
+                if not self.predicate is None:
+                    ds_rows = [
+                        r for r in ds_rows if self.predicate.eval(r['values'])
+                    ]
+                if self.offset > 0 or self.limit > 0:
+                    self.rows = list()
+                    skip = self.offset
+                    for row in ds_rows:
+                        if skip > 0:
+                            skip -= 1
+                        else:
+                            self.rows.append(row)
+                            if self.limit > 0 and len(self.rows) >= self.limit:
+                                break
+                else:
+                    self.rows = ds_rows
             self.read_index = 0
             self.is_open = True
         return self
 
-    def write(self, rows):
+    def write(self, rows, block_size=ROW_INDEX_BLOCK_SIZE):
         """Write the given list of dataset rows to file in default Json format.
+        Each row is written on a separate line. If the reader has an index file
+        the row offset index is written as well.
 
         Parameters
         ----------
         rows: list(vizier.datastore.base.DatasetRow)
             List of dataset rows
+        block_size: int, optional
+            Number of rows per block in the row offset index
         """
         # Open file handle
         if self.compressed:
             fh = gzip.open(self.filename, 'wb')
         else:
             fh = open(self.filename, 'w')
-        # Write dataset rows
-        json.dump({'rows': [row.to_dict() for row in rows]}, fh)
+        # Write dataset rows. Keep track of the byte offset of every n-th row
+        # for the row index.
+        offsets = array('l')
+        position = 0
+        line = '{"rows": ['
+        row_count = 0
+        for row in rows:
+            line += '\n' if row_count == 0 else ',\n'
+            fh.write(line)
+            position += len(line)
+            if row_count % block_size == 0:
+                offsets.append(position)
+            line = json.dumps(row.to_dict())
+            row_count += 1
+        fh.write(line + '\n]}')
         fh.close()
+        if not self.index_file is None:
+            write_row_index(self.index_file, block_size, offsets)
+
+
+class JsonRowParser(object):
+    """Incremental parser for the list of rows in a dataset file that is in
+    default Json format. Reads the file in chunks of fixed size and decodes one
+    row object at a time. Works for files that were written with one row per
+    line as well as for files that contain the whole document in a single line.
+    """
+    def __init__(self, fh, position=None, buffer_size=READ_BUFFER_SIZE):
+        """Initialize the file handle and position the parser at the beginning
+        of the row list or at the given byte offset.
+
+        Raises ValueError if the file does not contain a list of rows.
+
+        Parameters
+        ----------
+        fh: file
+            Handle for the opened dataset file
+        position: int, optional
+            Byte offset of the first row that is read (as recorded in the row
+            offset index)
+        buffer_size: int, optional
+            Number of bytes that are read from file at a time
+        """
+        self.fh = fh
+        self.buffer_size = buffer_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        # Byte offset of the first character in the buffer and of the most
+        # recently parsed row
+        self.buffer_offset = 0
+        self.row_offset = None
+        self.eof = False
+        self.is_done = False
+        if not position is None:
+            self.fh.seek(position)
+            self.buffer_offset = position
+            return
+        # Skip everything up to the opening bracket of the row list
+        key_pos = -1
+        while True:
+            if key_pos < 0:
+                key_pos = self.buffer.find('"rows"')
+            if key_pos >= 0:
+                pos = self.buffer.find('[', key_pos)
+                if pos >= 0:
+                    self.pos = pos + 1
+                    break
+            if not self.read_chunk():
+                raise ValueError('invalid dataset file format')
+
+    def next_row(self):
+        """Decode the next row object in the list. Returns None when the end of
+        the row list has been reached.
+
+        Returns
+        -------
+        dict
+        """
+        if self.is_done:
+            return None
+        while True:
+            # Skip whitespaces and the separator between row objects
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ', \t\r\n':
+                self.pos += 1
+            if self.pos >= len(self.buffer):
+                if not self.read_chunk():
+                    raise ValueError('unexpected end of dataset file')
+                continue
+            if self.buffer[self.pos] == ']':
+                self.is_done = True
+                return None
+            try:
+                doc, end = self.decoder.raw_decode(self.buffer, self.pos)
+                self.row_offset = self.buffer_offset + self.pos
+                self.pos = end
+                return doc
+            except ValueError as ex:
+                # The row object may be incomplete. Read the next chunk and
+                # try again.
+                if not self.read_chunk():
+                    raise ex
+
+    def read_chunk(self):
+        """Append the next chunk from the file to the buffer. Drops the part
+        of the buffer that has already been parsed. Returns False if the end
+        of the file has been reached.
+
+        Returns
+        -------
+        bool
+        """
+        if self.eof:
+            return False
+        chunk = self.fh.read(self.buffer_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.buffer_offset += self.pos
+        self.pos = 0
+        return True
+
+
+def load_row_index(index_file, data_file, compressed=False):
+    """Read the row offset index for a Json dataset file. If the index file
+    does not exist the index is created from the data file and written to
+    disk.
+
+    Returns a pair of block size and the array of byte offsets for the first
+    row in each block.
+
+    Parameters
+    ----------
+    index_file: string
+        Path to the index file
+    data_file: string
+        Path to the Json dataset file
+    compressed: bool, optional
+        Flag indicating if the data file is compressed (gzip)
+
+    Returns
+    -------
+    int, array
+    """
+    if os.path.isfile(index_file):
+        with open(index_file, 'rb') as f:
+            values = unpack_int_array(f.read())
+        return values[0], values[1:]
+    # Build index for datasets that have been created without one
+    block_size = ROW_INDEX_BLOCK_SIZE
+    offsets = array('l')
+    if compressed:
+        fh = gzip.open(data_file, 'rb')
+    else:
+        fh = open(data_file, 'r')
+    try:
+        parser = JsonRowParser(fh)
+        row_count = 0
+        while not parser.next_row() is None:
+            if row_count % block_size == 0:
+                offsets.append(parser.row_offset)
+            row_count += 1
+    finally:
+        fh.close()
+    write_row_index(index_file, block_size, offsets)
+    return block_size, offsets
+
+
+class RowIdIndex(object):
+    """Persistent index that maps row identifier to the index position of the
+    row in the dataset. The index file contains the sorted list of row
+    identifier followed by the list of corresponding row positions (as 64-bit
+    integers). Lookups use binary search on the memory-mapped file, i.e., the
+    index is not loaded into memory.
+    """
+    def __init__(self, index_file):
+        """Initialize the path to the index file.
+
+        Parameters
+        ----------
+        index_file: string
+            Path to the index file
+        """
+        self.index_file = index_file
+
+    def position(self, rowid):
+        """Get the index position of the row with the given identifier.
+        Returns -1 if the index does not contain the row.
+
+        Parameters
+        ----------
+        rowid: int
+            Unique row identifier
+
+        Returns
+        -------
+        int
+        """
+        size = os.path.getsize(self.index_file)
+        if size == 0:
+            return -1
+        count = size // 16
+        with open(self.index_file, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                lo = 0
+                hi = count
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    value = struct.unpack_from('<q', buf, mid * 8)[0]
+                    if value < rowid:
+                        lo = mid + 1
+                    elif value > rowid:
+                        hi = mid
+                    else:
+                        return struct.unpack_from('<q', buf, (count + mid) * 8)[0]
+                return -1
+            finally:
+                buf.close()
+
+
+def write_rowid_index(index_file, rowids, run_size=ROWID_SORT_RUN_SIZE):
+    """Write the row identifier index for a dataset to file (see RowIdIndex).
+    If the row identifier are in ascending order (which is the case for most
+    datasets) they are written as is. Otherwise, the row identifier are sorted
+    in runs of at most run_size values that are merged (see sorted_rowids).
+
+    Raises ValueError if the list of row identifier contains duplicates.
+
+    Parameters
+    ----------
+    index_file: string
+        Path to the index file
+    rowids: array or list(int)
+        Row identifier in order of their position in the dataset
+    run_size: int, optional
+        Maximum number of row identifier that are sorted in memory
+    """
+    # Write to temporary file first to avoid readers seeing a partial index
+    tmp_file = index_file + '.tmp'
+    if is_ascending(rowids):
+        with open(tmp_file, 'wb') as f:
+            write_int_array(f, rowids)
+            for start in xrange(0, len(rowids), INT_ARRAY_CHUNK_SIZE):
+                end = min(start + INT_ARRAY_CHUNK_SIZE, len(rowids))
+                f.write(pack_int_array(array('l', xrange(start, end))))
+        os.rename(tmp_file, index_file)
+        return
+    # The sorted row identifier are written to the index file and the
+    # corresponding positions to a separate file that is appended to the
+    # index file at the end.
+    pos_file = index_file + '.pos'
+    try:
+        with open(tmp_file, 'wb') as f, open(pos_file, 'wb') as f_pos:
+            values = array('l')
+            positions = array('l')
+            last_rowid = None
+            for rowid, pos in sorted_rowids(
+                rowids,
+                run_size,
+                tmp_dir=os.path.dirname(os.path.abspath(index_file))
+            ):
+                if rowid == last_rowid:
+                    raise ValueError('duplicate row identifier \'' + str(rowid) + '\'')
+                last_rowid = rowid
+                values.append(rowid)
+                positions.append(pos)
+                if len(values) >= INT_ARRAY_CHUNK_SIZE:
+                    f.write(pack_int_array(values))
+                    f_pos.write(pack_int_array(positions))
+                    values = array('l')
+                    positions = array('l')
+            f.write(pack_int_array(values))
+            f_pos.write(pack_int_array(positions))
+        with open(tmp_file, 'ab') as f, open(pos_file, 'rb') as f_pos:
+            shutil.copyfileobj(f_pos, f)
+        os.rename(tmp_file, index_file)
+    finally:
+        for filename in [tmp_file, pos_file]:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+
+def write_int_array(f, values):
+    """Write a list of integers to file as little-endian 64-bit values (see
+    pack_int_array). Values are serialized in chunks.
+
+    Parameters
+    ----------
+    f: file
+        File that is open for writing
+    values: array or list(int)
+        List of integer values
+    """
+    for start in xrange(0, len(values), INT_ARRAY_CHUNK_SIZE):
+        f.write(pack_int_array(values[start:start + INT_ARRAY_CHUNK_SIZE]))
+
+
+def write_row_index(index_file, block_size, offsets):
+    """Write row offset index to file. The index is an array of 64-bit integers.
+    The first value is the block size followed by the byte offsets of the first
+    row in each block.
+
+    Parameters
+    ----------
+    index_file: string
+        Path to the index file
+    block_size: int
+        Number of rows per block
+    offsets: array
+        Byte offsets for the first row in each block
+    """
+    # Write to temporary file first to avoid readers seeing a partial index
+    tmp_file = index_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(pack_int_array([block_size]))
+        write_int_array(f, offsets)
+    os.rename(tmp_file, index_file)
+
+
+def is_ascending(values):
+    """Test whether the given values are in strictly ascending order.
+
+    Parameters
+    ----------
+    values: array or list(int)
+        List of integer values
+
+    Returns
+    -------
+    bool
+    """
+    for i in xrange(1, len(values)):
+        if values[i - 1] >= values[i]:
+            return False
+    return True
+
+
+def read_int_pairs(filename):
+    """Read pairs of integers from a file that was written using
+    pack_int_array. The file is read in chunks.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the file
+
+    Returns
+    -------
+    iterator((int, int))
+    """
+    with open(filename, 'rb') as f:
+        while True:
+            buf = f.read(INT_ARRAY_CHUNK_SIZE * 16)
+            if not buf:
+                break
+            values = unpack_int_array(buf)
+            for i in xrange(0, len(values), 2):
+                yield values[i], values[i + 1]
+
+
+def set_cell_annotations(row, columns, annotations):
+    """Set the annotation flags for the cells in a dataset row.
+
+    Parameters
+    ----------
+    row: vizier.datastore.base.DatasetRow
+        Dataset row
+    columns: list(vizier.datastore.base.DatasetColumn)
+        Columns for the values in the row
+    annotations: vizier.datastore.metadata.DatasetMetadata
+        Annotations for dataset components. Nothing is done if None.
+    """
+    if not annotations is None:
+        for i in range(len(columns)):
+            col = columns[i]
+            if annotations.has_cell_annotation(col.identifier, row.identifier):
+                row.cell_annotations[i] = True
+
+
+def pack_int_array(values):
+    """Serialize a list of integers as little-endian 64-bit values. Uses a
+    fixed byte order and value size to make files portable.
+
+    Parameters
+    ----------
+    values: list(int)
+        List of integer values
+
+    Returns
+    -------
+    string
+    """
+    if NATIVE_INT64:
+        return array('l', values).tostring()
+    return struct.pack('<%dq' % len(values), *values)
+
+
+def sorted_rowids(rowids, run_size, tmp_dir=None):
+    """Get pairs of row identifier and row position in order of the row
+    identifier. If the number of row identifier exceeds the run size the
+    list is sorted in runs that are written to temporary files and merged.
+
+    Parameters
+    ----------
+    rowids: array or list(int)
+        Row identifier in order of their position in the dataset
+    run_size: int
+        Maximum number of row identifier that are sorted in memory
+    tmp_dir: string, optional
+        Parent directory for temporary run files
+
+    Returns
+    -------
+    iterator((int, int))
+    """
+    if len(rowids) <= run_size:
+        for pos in sorted(xrange(len(rowids)), key=rowids.__getitem__):
+            yield rowids[pos], pos
+        return
+    run_dir = tempfile.mkdtemp(dir=tmp_dir)
+    try:
+        runs = list()
+        for start in xrange(0, len(rowids), run_size):
+            end = min(start + run_size, len(rowids))
+            positions = sorted(xrange(start, end), key=rowids.__getitem__)
+            filename = os.path.join(run_dir, str(len(runs)) + '.bin')
+            with open(filename, 'wb') as f:
+                for i in xrange(0, len(positions), INT_ARRAY_CHUNK_SIZE):
+                    pairs = array('l')
+                    for pos in positions[i:i + INT_ARRAY_CHUNK_SIZE]:
+                        pairs.append(rowids[pos])
+                        pairs.append(pos)
+                    f.write(pack_int_array(pairs))
+            runs.append(filename)
+            positions = None
+        for pair in heapq.merge(*[read_int_pairs(f) for f in runs]):
+            yield pair
+    finally:
+        shutil.rmtree(run_dir)
+
+
+def unpack_int_array(buf):
+    """Deserialize a list of little-endian 64-bit integers.
+
+    Parameters
+    ----------
+    buf: string
+        Serialized integer values (as returned by pack_int_array)
+
+    Returns
+    -------
+    array
+    """
+    if NATIVE_INT64:
+        values = array('l')
+        values.fromstring(buf)
+        return values
+    return array('l', struct.unpack('<%dq' % (len(buf) // 8), buf))
 
 
 class InMemDatasetReader(DatasetReader):
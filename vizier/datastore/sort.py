@@ -0,0 +1,590 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sorting datasets.
+
+Sort-on-read: Sorted views of a dataset are represented by a permutation of
+the dataset rows, i.e., the list of row positions in sort order. Permutations
+are computed once and kept in an on-disk cache that is keyed by the dataset
+identifier and the sort order. Pages of sorted rows are read by seeking to the
+requested part of the permutation.
+
+Permutations (for the sort cache and for sorted row views) are computed by
+sorting pairs of sort values and row position with the external merge sort
+(see sort_positions), i.e., within the same memory budget as sorted datasets.
+
+External merge sort: Datasets that are sorted into new datasets are sorted in
+runs that fit into a memory budget. Sorted runs are spilled to temporary files
+and merged. The sorted rows are returned as a stream that can be written
+directly to the data file of the new dataset.
+"""
+
+from array import array
+import cPickle
+import hashlib
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+
+from vizier.core.cache import MemoryBudgetCache
+from vizier.datastore.base import DatasetRow
+from vizier.datastore.reader import pack_int_array, unpack_int_array
+
+
+"""Default disk budget for the sort permutation cache (in bytes)."""
+DEFAULT_SORT_CACHE_SIZE = 256 * 1024 * 1024
+
+"""Default memory budget for sorted runs of an external sort (in bytes)."""
+DEFAULT_SORT_BUFFER_SIZE = 64 * 1024 * 1024
+
+"""Maximum number of runs that are merged in a single pass."""
+MAX_MERGE_RUNS = 64
+
+"""Number of rows per record in run files."""
+RUN_BLOCK_SIZE = 1024
+
+"""Number of row positions that are written at a time to permutation files."""
+PERMUTATION_CHUNK_SIZE = 65536
+
+"""Sort directions."""
+SORT_ASC = 'asc'
+SORT_DESC = 'desc'
+
+
+class DatasetSortCache(MemoryBudgetCache):
+    """On-disk cache for sort permutations. Each permutation is stored in a
+    separate file in the cache directory. The file contains the row positions
+    in sort order as 64-bit integers. The cache is bounded by the total size
+    of the files and deletes the least recently used files first.
+
+    Files that exist in the cache directory when the directory is set are
+    added to the cache, i.e., permutations are reused across restarts.
+
+    Permutations are computed using an external merge sort that is bounded
+    by the given sort buffer size.
+    """
+    def __init__(
+        self, directory=None, budget=DEFAULT_SORT_CACHE_SIZE,
+        buffer_size=DEFAULT_SORT_BUFFER_SIZE
+    ):
+        """Initialize the cache directory, the disk budget, and the memory
+        budget for computing permutations.
+
+        Parameters
+        ----------
+        directory: string, optional
+            Path to the cache directory. Uses a directory in the system's
+            temporary directory if None.
+        budget: int, optional
+            Maximum number of bytes held by the cache
+        buffer_size: int, optional
+            Memory budget for sorted runs when computing a permutation (in
+            bytes)
+        """
+        super(DatasetSortCache, self).__init__(budget)
+        self.buffer_size = buffer_size
+        self.directory = None
+        self.set_directory(directory)
+
+    def clear(self):
+        """Remove all entries from the cache and delete the permutation
+        files.
+        """
+        for filename in list(self.entries.values()):
+            delete_file(filename)
+        super(DatasetSortCache, self).clear()
+
+    def evict(self):
+        """Remove the least recently used entry from the cache and delete the
+        permutation file. Expects the lock to be held by the caller.
+
+        Returns
+        -------
+        any, any
+        """
+        key, filename = super(DatasetSortCache, self).evict()
+        delete_file(filename)
+        return key, filename
+
+    def fetch_positions(self, dataset, order, offset=0, limit=-1):
+        """Get positions of the rows in the given page of the sorted dataset.
+        The permutation is computed and added to the cache if it is not in
+        the cache.
+
+        Parameters
+        ----------
+        dataset: vizier.datastore.base.DatasetHandle
+            Handle for the dataset
+        order: list((int, bool))
+            List of column identifier and reverse flags (see parse_sort_order)
+        offset: int, optional
+            Number of rows at the beginning of the sorted dataset that are
+            skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+
+        Returns
+        -------
+        list(int)
+        """
+        spec = sort_order_to_string(order)
+        key = dataset.identifier + '-' + hashlib.md5(spec).hexdigest()
+        filename = self.get(key)
+        if filename is None or not os.path.isfile(filename):
+            filename = os.path.join(self.directory, key + '.bin')
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            # Write to temporary file first to avoid readers seeing a partial
+            # permutation
+            tmp_file = filename + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                chunk = array('l')
+                for pos in sort_permutation(dataset, order, self.buffer_size):
+                    chunk.append(pos)
+                    if len(chunk) == PERMUTATION_CHUNK_SIZE:
+                        f.write(pack_int_array(chunk))
+                        chunk = array('l')
+                f.write(pack_int_array(chunk))
+            os.rename(tmp_file, filename)
+            self.put(key, filename, size=os.path.getsize(filename))
+        with open(filename, 'rb') as f:
+            f.seek(offset * 8)
+            if limit >= 0:
+                buf = f.read(limit * 8)
+            else:
+                buf = f.read()
+        return unpack_int_array(buf).tolist()
+
+    def invalidate(self, identifier):
+        """Remove all permutations for the dataset with the given identifier
+        from the cache.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        """
+        for key in list(self.entries.keys()):
+            if key.startswith(identifier + '-'):
+                self.remove(key)
+
+    def remove(self, key):
+        """Remove the entry for the given key and delete the permutation file.
+        Returns True if the key was in the cache.
+
+        Parameters
+        ----------
+        key: any
+
+        Returns
+        -------
+        bool
+        """
+        filename = self.entries.get(key)
+        if super(DatasetSortCache, self).remove(key):
+            delete_file(filename)
+            return True
+        return False
+
+    def set_directory(self, directory):
+        """Set the cache directory. Replaces all cache entries with the
+        permutation files in the given directory (in order of their last
+        modification).
+
+        Parameters
+        ----------
+        directory: string
+            Path to the cache directory. Uses a directory in the system's
+            temporary directory if None.
+        """
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), 'vizier-sort')
+        self.directory = os.path.abspath(directory)
+        super(DatasetSortCache, self).clear()
+        if os.path.isdir(self.directory):
+            files = list()
+            for name in os.listdir(self.directory):
+                filename = os.path.join(self.directory, name)
+                if name.endswith('.bin') and os.path.isfile(filename):
+                    files.append((os.path.getmtime(filename), name, filename))
+            for _, name, filename in sorted(files):
+                self.put(name[:-4], filename, size=os.path.getsize(filename))
+
+
+class ReverseKey(object):
+    """Wrapper for sort key values that reverses the sort order of the wrapped
+    value. Used for columns with descending sort order in composite sort keys.
+    """
+    __slots__ = ['value']
+
+    def __init__(self, value):
+        """Initialize the wrapped value.
+
+        Parameters
+        ----------
+        value: any
+        """
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __ne__(self, other):
+        return self.value != other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __gt__(self, other):
+        return other.value > self.value
+
+
+"""Sort permutation cache that is shared by all data stores."""
+SORT_CACHE = DatasetSortCache()
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def delete_file(filename):
+    """Delete the given file if it exists.
+
+    Parameters
+    ----------
+    filename: string
+        Path to file
+    """
+    if not filename is None and os.path.isfile(filename):
+        os.remove(filename)
+
+
+def external_sort(rows, key, buffer_size=DEFAULT_SORT_BUFFER_SIZE, tmp_dir=None):
+    """Sort a stream of dataset rows using an external merge sort. Rows are
+    collected in a buffer until the estimated size of the buffered rows
+    exceeds the buffer size. Each full buffer is sorted and written to a
+    temporary run file. The runs are merged in one or more passes (of at most
+    MAX_MERGE_RUNS runs each). Rows are sorted in memory if all rows fit into
+    the buffer. The sort is stable.
+
+    Returns an iterator over the sorted rows. Temporary files are deleted when
+    the iterator is exhausted or closed.
+
+    Parameters
+    ----------
+    rows: iterable(vizier.datastore.base.DatasetRow)
+        Rows that are sorted
+    key: func
+        Function that returns the sort key for a dataset row
+    buffer_size: int, optional
+        Memory budget for sorted runs (in bytes)
+    tmp_dir: string, optional
+        Parent directory for temporary run files
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    run_dir = None
+    try:
+        runs = list()
+        buf = list()
+        size = 0
+        for row in rows:
+            buf.append(row)
+            size += row_size(row)
+            if size > buffer_size:
+                if run_dir is None:
+                    run_dir = tempfile.mkdtemp(dir=tmp_dir)
+                buf.sort(key=key)
+                runs.append(write_run(run_dir, len(runs), buf))
+                buf = list()
+                size = 0
+        buf.sort(key=key)
+        if len(runs) == 0:
+            for row in buf:
+                yield row
+            return
+        runs.append(write_run(run_dir, len(runs), buf))
+        buf = None
+        # Merge runs until the remaining runs can be merged in a single pass
+        run_count = len(runs)
+        while len(runs) > MAX_MERGE_RUNS:
+            merged = list()
+            for i in range(0, len(runs), MAX_MERGE_RUNS):
+                group = runs[i:i + MAX_MERGE_RUNS]
+                merged.append(
+                    write_run(run_dir, run_count, merge_runs(group, key))
+                )
+                run_count += 1
+                for filename in group:
+                    os.remove(filename)
+            runs = merged
+        for row in merge_runs(runs, key):
+            yield row
+    finally:
+        if not run_dir is None:
+            shutil.rmtree(run_dir)
+
+
+def merge_runs(runs, key):
+    """Merge sorted run files. Rows with equal sort keys are returned in order
+    of the runs that contain them.
+
+    Parameters
+    ----------
+    runs: list(string)
+        Paths to run files in order of their creation
+    key: func
+        Function that returns the sort key for a dataset row
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    readers = [read_run(filename) for filename in runs]
+    heap = list()
+    for i in range(len(readers)):
+        row = next(readers[i], None)
+        if not row is None:
+            heap.append((key(row), i, row))
+    heapq.heapify(heap)
+    while len(heap) > 0:
+        _, i, row = heap[0]
+        yield row
+        row = next(readers[i], None)
+        if row is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (key(row), i, row))
+
+
+def parse_sort_order(spec, dataset):
+    """Parse a sort order specification. The specification is a comma
+    separated list of column identifier, each optionally followed by ':asc' or
+    ':desc', e.g., '2:asc,0:desc'. The default sort direction is ascending.
+
+    Raises ValueError if the specification is invalid or references a column
+    that does not exist in the given dataset.
+
+    Parameters
+    ----------
+    spec: string
+        Sort order specification
+    dataset: vizier.datastore.base.DatasetHandle
+        Handle for the sorted dataset
+
+    Returns
+    -------
+    list((int, bool))
+    """
+    order = list()
+    for term in spec.split(','):
+        tokens = term.strip().split(':')
+        if len(tokens) > 2:
+            raise ValueError('invalid sort column \'' + term + '\'')
+        direction = tokens[1].strip().lower() if len(tokens) == 2 else SORT_ASC
+        if not direction in [SORT_ASC, SORT_DESC]:
+            raise ValueError('invalid sort direction \'' + tokens[1] + '\'')
+        try:
+            col_id = int(tokens[0])
+        except ValueError:
+            raise ValueError('invalid column identifier \'' + tokens[0] + '\'')
+        # Raise ValueError if the column does not exist
+        dataset.get_column_positions([col_id])
+        order.append((col_id, direction == SORT_DESC))
+    return order
+
+
+def read_run(filename):
+    """Read the rows in a run file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the run file
+
+    Returns
+    -------
+    iterator(vizier.datastore.base.DatasetRow)
+    """
+    with open(filename, 'rb') as f:
+        while True:
+            try:
+                block = cPickle.load(f)
+            except EOFError:
+                return
+            for rowid, values in block:
+                yield DatasetRow(rowid, values)
+
+
+def row_size(row):
+    """Estimate the memory size (in bytes) of a dataset row.
+
+    Parameters
+    ----------
+    row: vizier.datastore.base.DatasetRow
+        Dataset row
+
+    Returns
+    -------
+    int
+    """
+    size = sys.getsizeof(row) + sys.getsizeof(row.values)
+    for value in row.values:
+        size += sys.getsizeof(value)
+    return size
+
+
+def sort_positions(rows, reversed, buffer_size=DEFAULT_SORT_BUFFER_SIZE, tmp_dir=None):
+    """Sort a stream of pairs of row position and sort values using the
+    external merge sort. Returns an iterator over the row positions in sort
+    order. Rows with equal sort values are ordered by their position, i.e.,
+    the result does not depend on the order of the pairs in the stream.
+
+    Parameters
+    ----------
+    rows: iterable((int, list))
+        Pairs of row position and list of sort values
+    reversed: list(bool)
+        Flags indicating whether the sort order of the corresponding value is
+        reversed
+    buffer_size: int, optional
+        Memory budget for sorted runs (in bytes)
+    tmp_dir: string, optional
+        Parent directory for temporary run files
+
+    Returns
+    -------
+    iterator(int)
+    """
+    value_key = sort_key(range(len(reversed)), reversed)
+    def get_key(row):
+        return value_key(row) + (row.identifier,)
+    sorted_rows = external_sort(
+        (DatasetRow(pos, values) for pos, values in rows),
+        get_key,
+        buffer_size=buffer_size,
+        tmp_dir=tmp_dir
+    )
+    for row in sorted_rows:
+        yield row.identifier
+
+
+def sort_key(positions, reversed):
+    """Get function that returns the composite sort key for a dataset row.
+    Values of columns with reversed sort order are wrapped in ReverseKey
+    objects.
+
+    Parameters
+    ----------
+    positions: list(int)
+        Index positions of the sort columns in the dataset rows
+    reversed: list(bool)
+        Flags indicating whether the sort order of the corresponding column is
+        reversed
+
+    Returns
+    -------
+    func
+    """
+    columns = zip(positions, reversed)
+    def get_key(row):
+        values = row.values
+        return tuple([
+            ReverseKey(values[pos]) if rev else values[pos]
+                for pos, rev in columns
+        ])
+    return get_key
+
+
+def sort_order_to_string(order):
+    """Get the string representation for a sort order. The result is in the
+    format that is expected by parse_sort_order.
+
+    Parameters
+    ----------
+    order: list((int, bool))
+        List of column identifier and reverse flags
+
+    Returns
+    -------
+    string
+    """
+    terms = list()
+    for col_id, reverse in order:
+        terms.append(str(col_id) + ':' + (SORT_DESC if reverse else SORT_ASC))
+    return ','.join(terms)
+
+
+def sort_permutation(dataset, order, buffer_size=DEFAULT_SORT_BUFFER_SIZE):
+    """Compute the permutation of dataset rows for the given sort order. Only
+    the values of the sort columns are read. The permutation is computed
+    using the external merge sort (see sort_positions). The sort is stable,
+    i.e., rows with equal sort values remain in their original order.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.base.DatasetHandle
+        Handle for the dataset
+    order: list((int, bool))
+        List of column identifier and reverse flags
+    buffer_size: int, optional
+        Memory budget for sorted runs (in bytes)
+
+    Returns
+    -------
+    iterator(int)
+    """
+    with dataset.reader(columns=[col_id for col_id, _ in order]) as reader:
+        rows = ((pos, row.values) for pos, row in enumerate(reader))
+        for pos in sort_positions(
+            rows,
+            [reverse for _, reverse in order],
+            buffer_size=buffer_size
+        ):
+            yield pos
+
+
+def write_run(run_dir, index, rows):
+    """Write a sorted run to a temporary file. Returns the path to the file.
+
+    Parameters
+    ----------
+    run_dir: string
+        Directory for run files
+    index: int
+        Unique run index
+    rows: iterable(vizier.datastore.base.DatasetRow)
+        Sorted rows in the run
+
+    Returns
+    -------
+    string
+    """
+    filename = os.path.join(run_dir, 'run' + str(index))
+    with open(filename, 'wb') as f:
+        block = list()
+        for row in rows:
+            block.append((row.identifier, row.values))
+            if len(block) == RUN_BLOCK_SIZE:
+                cPickle.dump(block, f, cPickle.HIGHEST_PROTOCOL)
+                block = list()
+        if len(block) > 0:
+            cPickle.dump(block, f, cPickle.HIGHEST_PROTOCOL)
+    return filename
@@ -0,0 +1,460 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Row views - Datasets that select and reorder the rows of a parent dataset.
+
+A row view is defined by the parent dataset, a vector of row positions, and a
+(small) list of new rows. Each entry in the position vector is either the
+position of a row in the parent dataset (entries >= 0) or a reference to a new
+row (entry -1 refers to the first new row, -2 to the second, and so on). The
+position vector is stored as an array of 64-bit integers. Row values are
+resolved by reading the referenced rows from the parent dataset.
+
+Row views are created for sequences of operations that only sort, move,
+delete, insert, or deduplicate rows (see vizier.datastore.derived). Only one integer per
+row is written for these operations instead of all values.
+"""
+
+from array import array
+import mmap
+import os
+import struct
+
+from vizier.datastore.base import DatasetRow
+from vizier.datastore.dedup import KEEP_FIRST, distinct_positions
+from vizier.datastore.dedup import fingerprint, row_fingerprints
+from vizier.datastore.derived import OP_DEDUPLICATE
+from vizier.datastore.derived import OP_DELETE_ROW, OP_INSERT_ROW
+from vizier.datastore.derived import OP_MOVE_ROW, OP_SORT
+from vizier.datastore.reader import DatasetReader, set_cell_annotations
+from vizier.datastore.reader import pack_int_array, unpack_int_array
+from vizier.datastore.sort import DEFAULT_SORT_BUFFER_SIZE, sort_positions
+
+
+"""Maximum length of a chain of row views. Views that would exceed the maximum
+depth are materialized instead."""
+MAX_VIEW_DEPTH = 8
+
+"""Operations that can be represented by a row view."""
+ROW_OPERATIONS = set([
+    OP_DEDUPLICATE,
+    OP_DELETE_ROW,
+    OP_INSERT_ROW,
+    OP_MOVE_ROW,
+    OP_SORT
+])
+
+"""Number of position vector entries that are resolved at a time."""
+VIEW_BLOCK_SIZE = 65536
+
+
+class RowViewReader(DatasetReader):
+    """Dataset reader for row views. Reads the position vector in blocks and
+    resolves the rows in each block using a single read on the parent
+    dataset.
+
+    If a column map is given the view schema differs from the columns in the
+    parent dataset. Projection and predicate reference columns by their
+    position in the view schema.
+    """
+    def __init__(
+        self, parent, new_rows, positionfile=None, entries=None, columns=None,
+        offset=0, limit=-1, rowid=None, annotations=None, column_map=None,
+        projection=None, predicate=None
+    ):
+        """Initialize the parent dataset and the position vector. Either the
+        position vector file or a list of position vector entries is expected.
+
+        Parameters
+        ----------
+        parent: vizier.datastore.base.DatasetHandle
+            Handle for the parent dataset
+        new_rows: list
+            Identifier and values of new rows
+        positionfile: string, optional
+            Path to the file containing the position vector
+        entries: list(int), optional
+            Position vector entries for the returned rows
+        columns: list(vizier.datastore.base.DatasetColumn), optional
+            List of columns for the values that are returned by the reader
+        offset: int, optional
+            Number of rows at the beginning of the list that are skipped.
+        limit: int, optional
+            Limits the number of rows that are returned.
+        rowid: int, optional
+            Only return the row with the given identifier
+        annotations: vizier.datastore.metadata.DatasetMetadata, optional
+            Annotations for dataset components
+        column_map: list(int), optional
+            Positions of the schema columns in the parent rows
+        projection: list(int), optional
+            Positions of the schema columns whose values are returned by the
+            reader. All columns are returned if None.
+        predicate: vizier.datastore.query.Predicate, optional
+            Only return rows that satisfy the predicate
+        """
+        self.parent = parent
+        self.new_rows = new_rows
+        self.positionfile = positionfile
+        self.entries = entries
+        self.columns = columns
+        self.offset = offset
+        self.limit = limit
+        self.rowid = rowid
+        self.annotations = annotations
+        self.column_map = column_map
+        self.projection = projection
+        self.predicate = predicate
+        # Internal reader state. The block start is the index of the next
+        # position vector entry that is read.
+        self.is_open = False
+        self.block_rows = None
+        self.block_pos = 0
+        self.block_start = 0
+        self.read_index = 0
+        self.skip = 0
+
+    def close(self):
+        """Release the rows of the current block and set the is_open flag to
+        False."""
+        self.block_rows = None
+        self.is_open = False
+
+    def next(self):
+        """Return the next row in the dataset iterator. Raises StopIteration if
+        end of the view is reached or the reader has been closed.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        if self.is_open:
+            if self.limit < 0 or self.read_index < self.limit:
+                row = self.next_row()
+                if not row is None:
+                    set_cell_annotations(row, self.columns, self.annotations)
+                    self.read_index += 1
+                    return row
+            self.close()
+        raise StopIteration
+
+    def next_row(self):
+        """Get the next row that satisfies the row identifier and predicate
+        constraints of the reader. Resolves the next block of position vector
+        entries if necessary. Returns None if the end of the view is reached.
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetRow
+        """
+        while self.block_rows is None or self.block_pos >= len(self.block_rows):
+            if not self.entries is None:
+                entries = self.entries[
+                    self.block_start:self.block_start + VIEW_BLOCK_SIZE
+                ]
+            else:
+                entries = read_positions(
+                    self.positionfile,
+                    offset=self.block_start,
+                    limit=VIEW_BLOCK_SIZE
+                )
+            if len(entries) == 0:
+                return None
+            self.block_start += len(entries)
+            rows = resolve_rows(self.parent, entries, self.new_rows)
+            if not self.column_map is None:
+                rows = [
+                    DatasetRow(
+                        row.identifier,
+                        [row.values[pos] for pos in self.column_map]
+                    ) for row in rows
+                ]
+            if not self.rowid is None:
+                rows = [row for row in rows if row.identifier == self.rowid]
+            if not self.predicate is None:
+                values = dict()
+                for pos in self.predicate.columns():
+                    values[pos] = [row.values[pos] for row in rows]
+                rows = [
+                    rows[i] for i in self.predicate.filter(
+                        values,
+                        range(len(rows))
+                    )
+                ]
+            if self.skip >= len(rows):
+                self.skip -= len(rows)
+                continue
+            self.block_pos = self.skip
+            self.skip = 0
+            self.block_rows = rows
+        row = self.block_rows[self.block_pos]
+        self.block_pos += 1
+        if not self.projection is None:
+            row = DatasetRow(
+                row.identifier,
+                [row.values[pos] for pos in self.projection]
+            )
+        return row
+
+    def open(self):
+        """Setup the reader state. Positions the reader at the first requested
+        entry of the position vector if rows are not filtered.
+
+        Returns
+        -------
+        vizier.datastore.view.RowViewReader
+        """
+        if not self.is_open:
+            self.block_rows = None
+            self.block_pos = 0
+            self.read_index = 0
+            if self.rowid is None and self.predicate is None:
+                self.block_start = self.offset
+                self.skip = 0
+            else:
+                self.block_start = 0
+                self.skip = self.offset
+            self.is_open = True
+        return self
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def read_positions(filename, offset=0, limit=-1):
+    """Read a range of entries from a position vector file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the position vector file
+    offset: int, optional
+        Index of the first entry that is read
+    limit: int, optional
+        Maximum number of entries that are read
+
+    Returns
+    -------
+    array
+    """
+    with open(filename, 'rb') as f:
+        f.seek(offset * 8)
+        if limit < 0:
+            buf = f.read()
+        else:
+            buf = f.read(limit * 8)
+    return unpack_int_array(buf)
+
+
+def read_positions_at(filename, indexes):
+    """Read the entries at the given indexes from a position vector file.
+    Indexes that are outside of the position vector are ignored.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the position vector file
+    indexes: list(int)
+        Indexes of the entries that are read
+
+    Returns
+    -------
+    list(int)
+    """
+    count = os.path.getsize(filename) // 8
+    indexes = [i for i in indexes if i >= 0 and i < count]
+    if len(indexes) == 0:
+        return list()
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return [struct.unpack_from('<q', buf, i * 8)[0] for i in indexes]
+        finally:
+            buf.close()
+
+
+def resolve_rows(parent, entries, new_rows):
+    """Get the rows for a list of position vector entries. Reads all
+    referenced rows of the parent dataset at once.
+
+    Parameters
+    ----------
+    parent: vizier.datastore.base.DatasetHandle
+        Handle for the parent dataset
+    entries: list(int)
+        Position vector entries
+    new_rows: list
+        Identifier and values of new rows
+
+    Returns
+    -------
+    list(vizier.datastore.base.DatasetRow)
+    """
+    positions = sorted(set([pos for pos in entries if pos >= 0]))
+    rows = dict(zip(positions, parent.fetch_rows_at(positions)))
+    result = list()
+    for pos in entries:
+        if pos >= 0:
+            result.append(rows[pos])
+        else:
+            rowid, values = new_rows[-pos - 1]
+            result.append(DatasetRow(rowid, list(values)))
+    return result
+
+
+def row_view_positions(dataset, operations, positions=None, new_rows=None):
+    """Apply a sequence of row operations to the position vector of a view on
+    the given dataset. Returns the modified position vector and the list of
+    new rows. The position vector covers all rows of the dataset if not
+    given. Expects that all operations are in ROW_OPERATIONS.
+
+    Only the values of the sort columns are read from the dataset if any of
+    the operations sorts the rows. Only the fingerprints of the key columns
+    are kept if any of the operations removes duplicate rows.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.base.DatasetHandle
+        Handle for the parent dataset
+    operations: list(dict)
+        Sequence of row operations
+    positions: array, optional
+        Position vector
+    new_rows: list, optional
+        Identifier and values of new rows
+
+    Returns
+    -------
+    array, list
+    """
+    if positions is None:
+        positions = array('l', xrange(dataset.row_count))
+    if new_rows is None:
+        new_rows = list()
+    for op in operations:
+        op_type = op['type']
+        if op_type == OP_DEDUPLICATE:
+            key_columns = op['positions']
+            col_ids = [dataset.columns[pos].identifier for pos in key_columns]
+            with dataset.reader(columns=col_ids) as reader:
+                fps, checks = row_fingerprints(row.values for row in reader)
+            view_fps = array('l')
+            view_checks = array('l')
+            for pos in positions:
+                if pos >= 0:
+                    view_fps.append(fps[pos])
+                    view_checks.append(checks[pos])
+                else:
+                    row_values = new_rows[-pos - 1][1]
+                    fp, check = fingerprint([row_values[i] for i in key_columns])
+                    view_fps.append(fp)
+                    view_checks.append(check)
+            kept = distinct_positions(
+                view_fps,
+                view_checks,
+                keep=op.get('keep', KEEP_FIRST)
+            )
+            positions = array('l', [positions[i] for i in kept])
+        elif op_type == OP_DELETE_ROW:
+            del positions[op['position']]
+        elif op_type == OP_INSERT_ROW:
+            new_rows.append([op['rowid'], [None] * op['columnCount']])
+            positions.insert(op['position'], -len(new_rows))
+        elif op_type == OP_MOVE_ROW:
+            positions.insert(op['target'], positions.pop(op['source']))
+        elif op_type == OP_SORT:
+            # Sort pairs of view position and sort values within the memory
+            # budget of the external merge sort. The rows of the parent
+            # dataset are read in order and mapped to their position in the
+            # view.
+            sort_columns = op['positions']
+            col_ids = [dataset.columns[pos].identifier for pos in sort_columns]
+            view_index = array('l', [-1]) * dataset.row_count
+            for i in xrange(len(positions)):
+                if positions[i] >= 0:
+                    view_index[positions[i]] = i
+            permutation = sort_positions(
+                view_sort_values(
+                    dataset,
+                    col_ids,
+                    sort_columns,
+                    positions,
+                    view_index,
+                    new_rows
+                ),
+                op['reversed'],
+                buffer_size=op.get('bufferSize', DEFAULT_SORT_BUFFER_SIZE)
+            )
+            positions = array('l', (positions[i] for i in permutation))
+        else:
+            raise ValueError('not a row operation \'' + str(op_type) + '\'')
+    return positions, new_rows
+
+
+def view_sort_values(dataset, col_ids, sort_columns, positions, view_index, new_rows):
+    """Get pairs of view position and sort values for all rows in a row
+    view. Rows of the parent dataset are read in order of the parent dataset.
+    Only the values of the sort columns are read.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.base.DatasetHandle
+        Handle for the parent dataset
+    col_ids: list(int)
+        Identifier of the sort columns
+    sort_columns: list(int)
+        Positions of the sort columns
+    positions: array
+        Position vector of the view
+    view_index: array
+        Position of each parent dataset row in the view (-1 if the row is not
+        in the view)
+    new_rows: list
+        Identifier and values of new rows
+
+    Returns
+    -------
+    iterator((int, list))
+    """
+    with dataset.reader(columns=col_ids) as reader:
+        pos = 0
+        for row in reader:
+            i = view_index[pos]
+            if i >= 0:
+                yield i, row.values
+            pos += 1
+    for i in xrange(len(positions)):
+        if positions[i] < 0:
+            row_values = new_rows[-positions[i] - 1][1]
+            yield i, [row_values[c] for c in sort_columns]
+
+
+def write_positions(filename, positions):
+    """Write a position vector to file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the position vector file
+    positions: array
+        Position vector
+    """
+    # Write to temporary file first to avoid readers seeing a partial vector
+    tmp_file = filename + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(pack_int_array(positions))
+    os.rename(tmp_file, filename)
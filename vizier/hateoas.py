@@ -25,11 +25,22 @@ The URLFactory class in this s contains all methods to generate HATEOAS
 references for resources that are accessible via the Vizier Web API.
 """
 
+import json
+import urllib
+
 
 """Pagination query parameter."""
+PAGE_AFTER = 'after'
+PAGE_BEFORE = 'before'
+PAGE_COLUMNS = 'columns'
+PAGE_CONTAINS = 'contains'
 PAGE_LIMIT = 'limit'
 PAGE_OFFSET = 'offset'
 PAGE_ROWID = 'rowid'
+PAGE_SORT = 'sort'
+
+"""Dataset query parameter."""
+QUERY_FILTER = 'filter'
 
 """HATEOAS relation identifier."""
 REL_ANNOTATED = 'annotated'
@@ -57,9 +68,11 @@ REL_PAGE_NEXT = REL_PAGE + 'next'
 REL_PAGE_PREV = REL_PAGE + 'prev'
 REL_PROJECT = 'project'
 REL_PROJECTS = 'projects'
+REL_QUERY = 'query'
 REL_RENAME = 'rename'
 REL_REPLACE = 'replace'
 REL_SERVICE = 'home'
+REL_STATUS = 'status'
 REL_SYSTEM_BUILD = 'build'
 REL_UPDATE = 'update'
 REL_UPLOAD = 'upload'
@@ -190,28 +203,44 @@ class UrlFactory:
         """
         return self.datasets_url()
 
-    def dataset_pagination_url(self, dataset_id, offset=0, limit=None):
-        """Get Url for dataset row pagination.
+    def dataset_pagination_url(
+        self, dataset_id, offset=0, limit=None, after=None, before=None,
+        sort=None
+    ):
+        """Get Url for dataset row pagination. If a row cursor (after or
+        before) is given the Url contains the cursor instead of the offset.
 
         Parameters
         ----------
         dataset_id : string
             Unique dataset identifier
         offset: int, optional
-            Pagination offset. The returned Url always includes an offset
-            parameter
+            Pagination offset. The returned Url includes an offset parameter
+            if no cursor is given
         limit: int, optional
             Dataset row limit. Only included if not None
+        after: int, optional
+            Identifier of the row that precedes the page
+        before: int, optional
+            Identifier of the row that follows the page
+        sort: string, optional
+            Sort order specification. Only included if not None
 
         Returns
         -------
         string
         """
-        query = PAGE_OFFSET + '=' + str(offset)
+        if not after is None:
+            query = PAGE_AFTER + '=' + str(after)
+        elif not before is None:
+            query = PAGE_BEFORE + '=' + str(before)
+        else:
+            query = PAGE_OFFSET + '=' + str(offset)
         if not limit is None:
             query += '&' + PAGE_LIMIT + '=' + str(limit)
-        else:
-            return self.dataset_url(dataset_id) + '?' + query
+        if not sort is None:
+            query += '&' + PAGE_SORT + '=' + urllib.quote(sort, safe=',:')
+        return self.dataset_url(dataset_id) + '?' + query
 
     def dataset_url(self, dataset_id):
         """Url to retrieve dataset state in Json format.
@@ -255,6 +284,36 @@ class UrlFactory:
         """
         return self.dataset_url(dataset_id) + '/csv'
 
+    def dataset_query_url(self, dataset_id, query=None, offset=None, limit=None):
+        """Url to query the rows of a dataset.
+
+        Parameters
+        ----------
+        dataset_id : string
+            Unique dataset identifier
+        query: dict, optional
+            Dictionary serialization of the query predicate
+        offset: int, optional
+            Pagination offset. Only included if not None
+        limit: int, optional
+            Dataset row limit. Only included if not None
+
+        Returns
+        -------
+        string
+        """
+        url = self.dataset_url(dataset_id) + '/query'
+        args = list()
+        if not query is None:
+            args.append(QUERY_FILTER + '=' + urllib.quote(json.dumps(query)))
+        if not offset is None:
+            args.append(PAGE_OFFSET + '=' + str(offset))
+        if not limit is None:
+            args.append(PAGE_LIMIT + '=' + str(limit))
+        if len(args) > 0:
+            url += '?' + '&'.join(args)
+        return url
+
     def dataset_with_annotations_url(self, dataset_id):
         """Url to retrieve a dataset together with all of its annotations.
 
@@ -498,6 +557,24 @@ class UrlFactory:
         """
         return self.workflow_url(project_id, branch_id, version) + '/modules'
 
+    def workflow_status_url(self, project_id, branch_id, version):
+        """Url to retrieve (GET) the execution status of a given workflow.
+
+        Parameters
+        ----------
+        project_id : string
+            Unique project identifier
+        branch_id: string
+            Unique branch identifier
+        version: int
+            Workflow version identifier
+
+        Returns
+        -------
+        string
+        """
+        return self.workflow_url(project_id, branch_id, version) + '/status'
+
 
 
 # ------------------------------------------------------------------------------
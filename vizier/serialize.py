@@ -241,7 +241,9 @@ def COMMAND_REPOSITORY(command_repository):
     return modules
 
 
-def DATASET(dataset, rows, config, urls, offset=0, limit=-1):
+def DATASET(
+    dataset, rows, config, urls, offset=0, limit=-1, cursor=False, sort=None
+):
     """Dictionary serialization for (part of the ) dataset state.
 
     Parameters
@@ -258,26 +260,18 @@ def DATASET(dataset, rows, config, urls, offset=0, limit=-1):
         Number of rows at the beginning of the list that are skipped.
     limit: int, optional
         Limits the number of rows that are returned.
+    cursor: bool, optional
+        Use row cursors instead of offsets for pagination Urls
+    sort: string, optional
+        Sort order specification if the rows are from a sorted dataset. The
+        sort order is included in the pagination Urls.
 
     Returns
     -------
     dict
     """
     dataset_id = dataset.identifier
-    # Serialize rows. The default dictionary representation for a row does
-    # not include the row index position nor the annotation information.
-    serialized_rows = list()
-    annotated_cells = list()
-    for row in rows:
-        obj = row.to_dict()
-        obj['index'] = len(serialized_rows) + offset
-        serialized_rows.append(obj)
-        for i in range(len(dataset.columns)):
-            if row.cell_annotations[i] == True:
-                annotated_cells.append({
-                    'column': dataset.columns[i].identifier,
-                    'row': row.identifier
-                })
+    serialized_rows, annotated_cells = DATASET_ROWS(dataset, rows, offset)
     # Serialize the dataset schema and cells
     obj = {
         'id' : dataset_id,
@@ -288,6 +282,24 @@ def DATASET(dataset, rows, config, urls, offset=0, limit=-1):
         'annotatedCells': annotated_cells
     }
     # Add references if dataset exists
+    if cursor:
+        page_urls = DATASET_CURSOR_URLS(
+            dataset,
+            rows,
+            config,
+            urls,
+            offset=offset,
+            limit=limit
+        )
+    else:
+        page_urls = DATASET_PAGINATION_URLS(
+            dataset,
+            config,
+            urls,
+            offset=offset,
+            limit=limit,
+            sort=sort
+        )
     obj[JSON_REFERENCES] = [
         self_reference(urls.dataset_url(dataset_id)),
         reference(
@@ -297,11 +309,109 @@ def DATASET(dataset, rows, config, urls, offset=0, limit=-1):
         reference(
             hateoas.REL_ANNOTATIONS,
             urls.dataset_annotations_url(dataset_id)
+        ),
+        reference(hateoas.REL_QUERY, urls.dataset_query_url(dataset_id))
+    ] + page_urls
+    return obj
+
+
+def DATASET_QUERY(dataset, rows, query, urls, offset=0, limit=None):
+    """Dictionary serialization for the result of a dataset query. The result
+    contains Urls to fetch the previous and next page of matching rows.
+
+    Parameters
+    ----------
+    dataset : vizier.datastore.base.DatasetHandle
+        Handle for dataset
+    rows: list()
+        List of matching rows from the dataset
+    query: dict
+        Dictionary serialization of the query predicate
+    urls: vizier.hateoas.UrlFactory
+        Factory for resource urls
+    offset: int, optional
+        Number of matching rows that are skipped.
+    limit: int, optional
+        Limits the number of rows that are returned.
+
+    Returns
+    -------
+    dict
+    """
+    dataset_id = dataset.identifier
+    serialized_rows, annotated_cells = DATASET_ROWS(dataset, rows, offset)
+    obj = {
+        'id' : dataset_id,
+        'columns' : [col.to_dict() for col in dataset.columns],
+        'rows': serialized_rows,
+        'offset': offset,
+        'filter': query,
+        'annotatedCells': annotated_cells
+    }
+    url = urls.dataset_query_url
+    links = [
+        self_reference(url(dataset_id, query=query, offset=offset, limit=limit)),
+        reference(hateoas.REL_DATASET, urls.dataset_url(dataset_id))
+    ]
+    # PREV: If offset is greater than zero allow to fetch previous page
+    if offset > 0 and not limit is None and limit > 0:
+        links.append(
+            reference(
+                hateoas.REL_PAGE_PREV,
+                url(
+                    dataset_id,
+                    query=query,
+                    offset=max(offset - limit, 0),
+                    limit=limit
+                )
+            )
+        )
+    # NEXT: There may be more matching rows if the page is full
+    if not limit is None and limit > 0 and len(rows) == limit:
+        links.append(
+            reference(
+                hateoas.REL_PAGE_NEXT,
+                url(dataset_id, query=query, offset=offset + limit, limit=limit)
+            )
         )
-    ] + DATASET_PAGINATION_URLS(dataset, config, urls, offset=offset, limit=limit)
+    obj[JSON_REFERENCES] = links
     return obj
 
 
+def DATASET_ROWS(dataset, rows, offset=0):
+    """Serialize a list of dataset rows. Returns the list of serialized rows
+    and the list of annotated cells.
+
+    Parameters
+    ----------
+    dataset : vizier.datastore.base.DatasetHandle
+        Handle for dataset
+    rows: list()
+        List of rows from the dataset
+    offset: int, optional
+        Index position of the first row
+
+    Returns
+    -------
+    list(dict), list(dict)
+    """
+    # Serialize rows. The default dictionary representation for a row does
+    # not include the row index position nor the annotation information.
+    serialized_rows = list()
+    annotated_cells = list()
+    for row in rows:
+        obj = row.to_dict()
+        obj['index'] = len(serialized_rows) + offset
+        serialized_rows.append(obj)
+        for i in range(len(dataset.columns)):
+            if row.cell_annotations[i] == True:
+                annotated_cells.append({
+                    'column': dataset.columns[i].identifier,
+                    'row': row.identifier
+                })
+    return serialized_rows, annotated_cells
+
+
 def DATASET_ANNOTATIONS(dataset_id, annotations, column_id, row_id, urls):
     """Get dictionary serialization for dataset component annotations.
 
@@ -401,10 +511,13 @@ def DATASET_DESCRIPTOR(dataset, config, urls):
     }
 
 
-def DATASET_PAGE_URLS(dataset, rel, offset, limit, urls):
+def DATASET_PAGE_URLS(
+    dataset, rel, offset, limit, urls, after=None, before=None, sort=None
+):
     """Get a pair of Urls to access a specific page of a dataset. the result
     contains one Url to access the data with annotations and one Url to
-    access the data without annotations.
+    access the data without annotations. The page is either identified by the
+    offset or by a row cursor (after or before).
 
     Parameters
     ----------
@@ -418,6 +531,12 @@ def DATASET_PAGE_URLS(dataset, rel, offset, limit, urls):
         Current paginatio limit
     urls: vizier.hateoas.UrlFactory
         Factory for resource urls
+    after: int, optional
+        Identifier of the row that precedes the page
+    before: int, optional
+        Identifier of the row that follows the page
+    sort: string, optional
+        Sort order specification for sorted dataset pages
 
     Returns
     -------
@@ -425,15 +544,99 @@ def DATASET_PAGE_URLS(dataset, rel, offset, limit, urls):
     """
     # Shortcuts
     d_id = dataset.identifier
-    url = urls.dataset_pagination_url
+    url = urls.dataset_pagination_url(
+        d_id,
+        offset=offset,
+        limit=limit,
+        after=after,
+        before=before,
+        sort=sort
+    )
     # Return list with two references
-    return [
-        reference(rel, url(d_id, offset=offset, limit=limit)),
-        reference(rel + 'anno', url(d_id, offset=offset, limit=limit))
-    ]
+    return [reference(rel, url), reference(rel + 'anno', url)]
+
+
+def DATASET_CURSOR_URLS(dataset, rows, config, urls, offset=0, limit=None):
+    """Get a list of dataset references to allow browsing the dataset rows
+    using row cursors. The previous and next page are referenced by the
+    identifier of the first and last row in the current page.
+
+    Parameters
+    ----------
+    dataset: vizier.datastore.base.DatasetHandle
+        Handle for the dataset
+    rows: list(vizier.datastore.base.DatasetRow)
+        Rows in the current page
+    config : vizier.config.AppConfig
+        Application configuration parameters
+    urls: vizier.hateoas.UrlFactory
+        Factory for resource urls
+    offset: int, optional
+        Position of the first row in the current page
+    limit: int, optional
+        Current paginatio limit
+
+    Returns
+    -------
+    list()
+    """
+    # Max. number of records shown
+    if not limit is None and limit >= 0:
+        max_rows_per_request = int(limit)
+    elif config.defaults.row_limit >= 0:
+        max_rows_per_request = config.defaults.row_limit
+    elif config.defaults.max_row_limit >= 0:
+        max_rows_per_request = config.defaults.max_row_limit
+    else:
+        max_rows_per_request = -1
+    # FIRST: Always include Url's to access the first page
+    page_urls = DATASET_PAGE_URLS(
+        dataset,
+        rel=hateoas.REL_PAGE_FIRST,
+        offset=0,
+        limit=limit,
+        urls=urls
+    )
+    if len(rows) == 0:
+        return page_urls
+    # PREV: Rows before the first row in the current page
+    if offset > 0:
+        page_urls.extend(
+            DATASET_PAGE_URLS(
+                dataset,
+                rel=hateoas.REL_PAGE_PREV,
+                offset=None,
+                limit=limit,
+                urls=urls,
+                before=rows[0].identifier
+            )
+        )
+    # NEXT & LAST: Rows after the last row in the current page
+    if offset + len(rows) < dataset.row_count:
+        page_urls.extend(
+            DATASET_PAGE_URLS(
+                dataset,
+                rel=hateoas.REL_PAGE_NEXT,
+                offset=None,
+                limit=limit,
+                urls=urls,
+                after=rows[-1].identifier
+            )
+        )
+        if max_rows_per_request >= 0:
+            page_urls.extend(
+                DATASET_PAGE_URLS(
+                    dataset,
+                    rel=hateoas.REL_PAGE_LAST,
+                    offset=max(dataset.row_count - max_rows_per_request, 0),
+                    limit=limit,
+                    urls=urls
+                )
+            )
+    return page_urls
 
 
-def DATASET_PAGINATION_URLS(dataset, config, urls, offset=0, limit=None):
+def DATASET_PAGINATION_URLS(dataset, config, urls, offset=0, limit=None, sort=None):
     """Get a list of dataset references to allow browsing the dataset rows.
 
     Parameters
@@ -448,6 +651,8 @@ def DATASET_PAGINATION_URLS(dataset, config, urls, offset=0, limit=None):
         Current pagination offset
     limit: int, optional
         Current paginatio limit
+    sort: string, optional
+        Sort order specification for sorted dataset pages
 
     Returns
     -------
@@ -471,7 +676,8 @@ def DATASET_PAGINATION_URLS(dataset, config, urls, offset=0, limit=None):
             rel=hateoas.REL_PAGE_FIRST,
             offset=0,
             limit=limit,
-            urls=urls
+            urls=urls,
+            sort=sort
         )
     )
     # PREV: If offset is greater than zero allow to fetch previous page
@@ -485,7 +691,8 @@ def DATASET_PAGINATION_URLS(dataset, config, urls, offset=0, limit=None):
                         rel=hateoas.REL_PAGE_PREV,
                         offset=prev_offset,
                         limit=limit,
-                        urls=urls
+                        urls=urls,
+                        sort=sort
                     )
                 )
     # NEXT & LAST: If there are rows beyond the current offset+limit include
@@ -499,7 +706,8 @@ def DATASET_PAGINATION_URLS(dataset, config, urls, offset=0, limit=None):
                     rel=hateoas.REL_PAGE_NEXT,
                     offset=next_offset,
                     limit=limit,
-                    urls=urls
+                    urls=urls,
+                    sort=sort
                 )
             )
         last_offset = (dataset.row_count - max_rows_per_request)
@@ -510,7 +718,8 @@ def DATASET_PAGINATION_URLS(dataset, config, urls, offset=0, limit=None):
                     rel=hateoas.REL_PAGE_LAST,
                     offset=last_offset,
                     limit=limit,
-                    urls=urls
+                    urls=urls,
+                    sort=sort
                 )
             )
     # Return pagination Url list
@@ -663,6 +872,7 @@ def MODULE_HANDLE(viztrail, branch, version, module, views, urls):
             } for d in sorted(module.datasets.keys())
         ],
         'views': view_handles.values(),
+        'status': module.state,
         JSON_REFERENCES: [
             reference(hateoas.REL_DELETE, module_url),
             reference(hateoas.REL_INSERT, module_url),
@@ -1013,6 +1223,7 @@ def WORKFLOW_DESCRIPTOR(viztrail, branch, version, created_at, urls):
         self_ref = urls.workflow_url(vt_id, branch_id, version)
         append_url = urls.workflow_append_url(vt_id, branch_id, version)
     modules_url = urls.workflow_modules_url(vt_id, branch_id, version)
+    status_url = urls.workflow_status_url(vt_id, branch_id, version)
     # Return  serialization
     return {
         'version': version,
@@ -1022,7 +1233,8 @@ def WORKFLOW_DESCRIPTOR(viztrail, branch, version, created_at, urls):
             reference(hateoas.REL_BRANCH, urls.branch_url(vt_id, branch_id)),
             reference(hateoas.REL_BRANCHES, urls.branches_url(vt_id)),
             reference(hateoas.REL_APPEND, append_url),
-            reference(hateoas.REL_MODULES, modules_url)
+            reference(hateoas.REL_MODULES, modules_url),
+            reference(hateoas.REL_STATUS, status_url)
         ]
     }
 
@@ -1098,7 +1310,8 @@ def WORKFLOW_HANDLE(viztrail, workflow, config, urls, dataset_cache, read_only=F
         'datasets': datasets,
         'charts': charts,
         'hasError': workflow.has_error,
-        'moduleCount': len(workflow.modules)
+        'moduleCount': len(workflow.modules),
+        'status': workflow.state
     }
     obj['readOnly'] = read_only
     return obj
@@ -1157,6 +1370,44 @@ def WORKFLOW_MODULES(viztrail, workflow, config, urls, dataset_cache, read_only=
     return add_modules(obj, viztrail, workflow, config, urls, dataset_cache)
 
 
+def WORKFLOW_STATUS(viztrail, workflow, urls):
+    """Dictionary representation for the execution status of a workflow and
+    of each module in the workflow.
+
+    Parameters
+    ----------
+    viztrail : vizier.workflow.base.ViztrailHandle
+        Viztrail handle
+    workflow : vizier.workflow.base.WorkflowHandle
+        Workflow handle
+    urls: vizier.hateoas.UrlFactory
+        Factory for resource urls
+
+    Returns
+    -------
+    dict
+    """
+    vt_id = viztrail.identifier
+    branch_id = workflow.branch_id
+    version = workflow.version
+    return {
+        'version': version,
+        'status': workflow.state,
+        'modules': [{
+                'id': m.identifier,
+                'status': m.state
+            } for m in workflow.modules
+        ],
+        JSON_REFERENCES: [
+            self_reference(urls.workflow_status_url(vt_id, branch_id, version)),
+            reference(
+                hateoas.REL_WORKFLOW,
+                urls.workflow_url(vt_id, branch_id, version)
+            )
+        ]
+    }
+
+
 def WORKFLOW_UPDATE_RESULT(
     viztrail, workflow, config, urls, dataset_cache,
     read_only=False, includeDataset=None, dataset_serializer=None
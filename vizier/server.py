@@ -21,6 +21,7 @@ from flask import Flask, jsonify, make_response, request, send_file
 from flask_cors import CORS
 import csv
 import gzip
+import json
 import os
 import StringIO
 import shutil
@@ -37,12 +38,19 @@ import vistrails.packages.mimir.init as mimir
 
 from vizier.api import VizierWebService
 from vizier.config import AppConfig, ENGINEENV_DEFAULT, ENGINEENV_MIMIR
+from vizier.core.jobs import JobQueue
 from vizier.core.util import LOGGER_ENGINE
+from vizier.datastore.cache import PAGE_CACHE
 from vizier.datastore.federated import FederatedDataStore
 from vizier.datastore.fs import FileSystemDataStore
 from vizier.datastore.mimir import MimirDataStore
+from vizier.datastore.sort import SORT_CACHE
 from vizier.filestore.base import DefaultFileServer
-from vizier.hateoas import PAGE_LIMIT, PAGE_OFFSET, PAGE_ROWID
+from vizier.hateoas import PAGE_AFTER, PAGE_BEFORE, PAGE_COLUMNS
+from vizier.hateoas import PAGE_CONTAINS, PAGE_LIMIT, PAGE_OFFSET, PAGE_ROWID
+from vizier.hateoas import PAGE_SORT
+from vizier.hateoas import QUERY_FILTER
+from vizier.workflow.engine.cache import MODULE_CACHE
 from vizier.workflow.module import ModuleSpecification
 from vizier.workflow.repository.fs import FileSystemViztrailRepository
 from vizier.core.util import get_unique_identifier 
@@ -73,6 +81,18 @@ app.config['MAX_CONTENT_LENGTH'] = config.fileserver.max_file_size
 
 CORS(app)
 
+# Set the memory budget for the cache of decoded dataset rows that is shared by
+# all datasets
+PAGE_CACHE.set_budget(config.defaults.page_cache_size)
+
+# Set the directory and disk budget for cached sort permutations
+SORT_CACHE.set_directory(config.defaults.sort_cache_dir)
+SORT_CACHE.set_budget(config.defaults.sort_cache_size)
+
+# Set the memory budget for the cache of module execution outputs that is
+# shared by all workflow engines
+MODULE_CACHE.set_budget(config.defaults.module_cache_size)
+
 # Currently uses the default file server
 fileserver = DefaultFileServer(config.fileserver.directory)
 
@@ -96,7 +116,18 @@ if len(datastores) > 1:
 else:
     datastore = datastores[0]
 
-viztrails = FileSystemViztrailRepository(config.viztrails.directory, config.envs)
+# Execute workflows in the background if enabled. Requests that modify a
+# workflow return immediately and the new workflow version is pending until it
+# has been executed.
+executor = None
+if config.settings.background_execution:
+    executor = JobQueue()
+
+viztrails = FileSystemViztrailRepository(
+    config.viztrails.directory,
+    config.envs,
+    executor=executor
+)
 
 # Initialize the Web Service API.
 api = VizierWebService(
@@ -262,7 +293,10 @@ def rename_file(file_id):
 @app.route('/datasets/<string:dataset_id>')
 def get_dataset(dataset_id):
     """Get the dataset with given identifier that has been generated by a
-    curation workflow.
+    curation workflow. If the contains argument is given the returned rows are
+    the page that contains the row with the given identifier. The after and
+    before arguments are row cursors for keyset pagination. The sort argument
+    is a list of column identifier and sort directions, e.g., sort=1:asc,0:desc.
     """
     # Get dataset rows with offset and limit parameters
     try:
@@ -270,7 +304,11 @@ def get_dataset(dataset_id):
             dataset_id,
             offset=request.args.get(PAGE_OFFSET),
             limit=request.args.get(PAGE_LIMIT),
-            rowid=request.args.get(PAGE_ROWID)
+            rowid=request.args.get(PAGE_ROWID),
+            contains=request.args.get(PAGE_CONTAINS),
+            after=request.args.get(PAGE_AFTER),
+            before=request.args.get(PAGE_BEFORE),
+            sort=request.args.get(PAGE_SORT)
         )
     except ValueError as ex:
         raise InvalidRequest(str(ex))
@@ -367,6 +405,9 @@ def feedback_dataset(dataset_id):
     acknowledge = obj['acknowledge'] if 'acknowledge' in obj else False
     
     mimir._mimir.feedback(reason['source'], reason['varid'], mimir._jvmhelper.to_scala_seq(reason['args']), acknowledge, repair)
+    # Feedback may change the rows of any dataset that depends on the lens
+    PAGE_CACHE.clear()
+    SORT_CACHE.clear()
     
     annotations = api.get_dataset_annotations(
         dataset_id,
@@ -378,20 +419,58 @@ def feedback_dataset(dataset_id):
     raise ResourceNotFound('unknown dataset \'' + dataset_id + '\'')
 
 
+@app.route('/datasets/<string:dataset_id>/query')
+def query_dataset(dataset_id):
+    """Get the rows of the dataset with given identifier that satisfy a query
+    predicate. The predicate is given as a Json object in the filter argument.
+    """
+    try:
+        query = json.loads(request.args.get(QUERY_FILTER, '{}'))
+        result = api.query_dataset(
+            dataset_id,
+            query,
+            offset=request.args.get(PAGE_OFFSET),
+            limit=request.args.get(PAGE_LIMIT)
+        )
+    except ValueError as ex:
+        raise InvalidRequest(str(ex))
+    if not result is None:
+        return jsonify(result)
+    raise ResourceNotFound('unknown dataset \'' + dataset_id + '\'')
+
+
 @app.route('/datasets/<string:dataset_id>/csv')
 def download_dataset(dataset_id):
-    """Get the dataset with given identifier in CSV format.
+    """Get the dataset with given identifier in CSV format. The optional
+    columns argument is a comma-separated list of column identifier. If given,
+    only the values of these columns are included in the CSV file.
     """
     # Get the handle for the dataset with given identifier. The result is None
     # if no dataset with given identifier exists.
     dataset = api.get_dataset_handle(dataset_id)
     if dataset is None:
         raise ResourceNotFound('unknown dataset \'' + dataset_id + '\'')
+    # Get the list of exported columns. Only the values of these columns are
+    # read from the dataset.
+    columns = None
+    schema = dataset.columns
+    if not request.args.get(PAGE_COLUMNS) is None:
+        try:
+            columns = [
+                int(col_id)
+                    for col_id in request.args.get(PAGE_COLUMNS).split(',')
+            ]
+            schema = [
+                dataset.columns[pos]
+                    for pos in dataset.get_column_positions(columns)
+            ]
+        except ValueError as ex:
+            raise InvalidRequest(str(ex))
     # Read the dataset into a string buffer in memory
     si = StringIO.StringIO()
     cw = csv.writer(si)
-    cw.writerow([col.name for col in dataset.columns])
-    with dataset.reader() as reader:
+    cw.writerow([col.name for col in schema])
+    with dataset.reader(columns=columns) as reader:
         for row in reader:
             cw.writerow(map(lambda x: unicode(x).encode("utf-8"), row.values))
     # Return the CSV file file
@@ -740,6 +819,17 @@ def workflow_modules(project_id, branch_id, version):
     raise ResourceNotFound('unknown workflow \'' + project_id + ':' + branch_id + ':' + str(version) + '\'')
 
 
+@app.route('/projects/<string:project_id>/branches/<string:branch_id>/workflows/<int:version>/status')
+def get_workflow_status(project_id, branch_id, version):
+    """Get the execution status of a workflow and of each workflow module."""
+    # Get the workflow status. The result is None if the project, branch, or
+    # workflow do not exist.
+    status = api.get_workflow_status(project_id, branch_id, version)
+    if not status is None:
+        return jsonify(status)
+    raise ResourceNotFound('unknown workflow \'' + project_id + ':' + branch_id + ':' + str(version) + '\'')
+
+
 @app.route('/projects/<string:project_id>/branches/<string:branch_id>/workflows/<int:version>/modules', methods=['POST'])
 def append_module(project_id, branch_id, version):
     """Append a module to a workflow branch and execute the resulting workflow.
@@ -22,6 +22,8 @@ only the different workflows but also the history for each of them.
 """
 
 from vizier.core.timestamp import get_current_time, to_datetime
+from vizier.workflow.module import MODULE_ERROR, MODULE_PENDING
+from vizier.workflow.module import MODULE_RUNNING, MODULE_SUCCESS
 
 import vizier.workflow.command as cmd
 
@@ -157,6 +159,40 @@ class WorkflowHandle(object):
                 return True
         return False
 
+    @property
+    def is_active(self):
+        """Flag indicating whether the workflow is being executed, i.e., at
+        least one of the modules is pending or running.
+
+        Returns
+        -------
+        bool
+        """
+        for m in self.modules:
+            if m.is_active:
+                return True
+        return False
+
+    @property
+    def state(self):
+        """Execution state of the workflow. The workflow is running if any of
+        the modules is running and pending if any of the modules is pending.
+        The state of a workflow that has been executed depends on whether
+        there was an error during workflow execution.
+
+        Returns
+        -------
+        string
+        """
+        states = [m.state for m in self.modules]
+        if MODULE_RUNNING in states:
+            return MODULE_RUNNING
+        elif MODULE_PENDING in states:
+            return MODULE_PENDING
+        elif self.has_error:
+            return MODULE_ERROR
+        return MODULE_SUCCESS
+
 
 class ViztrailBranch(object):
     """Branch in a viztrail. Each branch has a unique identifier, a set of user-
@@ -57,6 +57,7 @@ DATA_TYPES = [
 ]
 
 """Definition of common module parameter names."""
+PARA_AGGREGATES = 'aggregates'
 PARA_CHART = 'chart'
 PARA_CHART_TYPE = 'chartType'
 PARA_CHART_GROUPED = 'chartGrouped'
@@ -68,17 +69,25 @@ PARA_DATASET = 'dataset'
 PARA_OUTPUT_DATASET = 'output_dataset'
 PARA_FILE = 'file'
 PARA_FILEID = 'fileid'
+PARA_FUNCTION = 'function'
 PARA_GEOCODER = 'geocoder'
 PARA_HOUSE_NUMBER = 'strnumber'
+PARA_JOIN_COLUMN = 'joinColumn'
+PARA_JOIN_DATASET = 'joinDataset'
+PARA_JOIN_TYPE = 'joinType'
+PARA_KEEP = 'keep'
+PARA_KEYS = 'keys'
 PARA_LABEL = 'label'
 PARA_MAKE_CERTAIN = 'makeInputCertain'
 PARA_NAME = 'name'
 PARA_ORDER = 'order'
+PARA_PATTERN = 'pattern'
 PARA_PERCENT_CONFORM = 'percentConform'
 PARA_PICKAS = 'pickAs'
 PARA_PICKFROM = 'pickFrom'
 PARA_POSITION = 'position'
 PARA_RANGE = 'range'
+PARA_REPLACEMENT = 'replacement'
 PARA_RESULT_DATASET = 'resultName'
 PARA_ROW = 'row'
 PARA_SCHEMA = 'schema'
@@ -97,10 +106,15 @@ PARA_LOAD_DH = 'loadDetectHeaders'
 PARA_LOAD_DSE = 'loadDataSourceErrors'
 PARA_DSE_MODEL_NAME = 'dseModel'
 # Concatenation of parameter kets
+PARA_AGGREGATES_COLUMN = PARA_AGGREGATES + '_' + PARA_COLUMN
+PARA_AGGREGATES_FUNCTION = PARA_AGGREGATES + '_' + PARA_FUNCTION
+PARA_AGGREGATES_NAME = PARA_AGGREGATES + '_' + PARA_NAME
 PARA_COLUMNS_COLUMN = PARA_COLUMNS + '_' + PARA_COLUMN
 PARA_COLUMNS_ORDER = PARA_COLUMNS + '_' + PARA_ORDER
 PARA_COLUMNS_RENAME = PARA_COLUMNS + '_' + PARA_NAME
 PARA_COLUMNS_CONSTRAINT = PARA_COLUMNS + '_' + PARA_CONSTRAINT
+PARA_KEYS_COLUMN = PARA_KEYS + '_' + PARA_COLUMN
+PARA_KEYS_JOIN_COLUMN = PARA_KEYS + '_' + PARA_JOIN_COLUMN
 
 
 """Values for sort order."""
@@ -296,11 +310,17 @@ MARKDOWN_CODE = 'CODE'
 SYS_CREATE_BRANCH = 'CREATE_BRANCH'
 
 """Identifier for VizUAL commands."""
+VIZUAL_AGGREGATE = 'AGGREGATE'
+VIZUAL_CAST_COL = 'CAST_COLUMN'
+VIZUAL_DEDUPLICATE = 'DEDUPLICATE'
 VIZUAL_DEL_COL = 'DELETE_COLUMN'
 VIZUAL_DEL_ROW = 'DELETE_ROW'
 VIZUAL_DROP_DS = 'DROP_DATASET'
+VIZUAL_FILL_COL = 'FILL_COLUMN'
+VIZUAL_FILL_DOWN = 'FILL_DOWN'
 VIZUAL_INS_COL = 'INSERT_COLUMN'
 VIZUAL_INS_ROW = 'INSERT_ROW'
+VIZUAL_JOIN = 'JOIN'
 VIZUAL_LOAD = 'LOAD'
 VIZUAL_UNLOAD = 'UNLOAD'
 VIZUAL_MOV_COL = 'MOVE_COLUMN'
@@ -308,6 +328,7 @@ VIZUAL_MOV_ROW = 'MOVE_ROW'
 VIZUAL_PROJECTION = 'PROJECTION'
 VIZUAL_REN_COL = 'RENAME_COLUMN'
 VIZUAL_REN_DS = 'RENAME_DATASET'
+VIZUAL_REPLACE = 'REPLACE_VALUES'
 VIZUAL_SORT = 'SORT_DATASET'
 VIZUAL_UPD_CELL = 'UPDATE_CELL'
 
@@ -660,6 +681,115 @@ PYTHON_COMMANDS = {
 
 """VizUAL command specification schema."""
 VIZUAL_COMMANDS = {
+    VIZUAL_AGGREGATE: {
+        MODULE_NAME: 'Aggregate',
+        MODULE_GROUP: 'dataset',
+        MODULE_ARGUMENTS: {
+            PARA_DATASET: para_dataset(0),
+            PARA_COLUMNS: parameter_specification(
+                PARA_COLUMNS,
+                name='Group By',
+                data_type=DT_GROUP,
+                index=1,
+                required=False
+            ),
+            PARA_COLUMNS_COLUMN: parameter_specification(
+                PARA_COLUMNS_COLUMN,
+                name='Column',
+                data_type=DT_COLUMN_ID,
+                index=2,
+                parent=PARA_COLUMNS
+            ),
+            PARA_AGGREGATES: parameter_specification(
+                PARA_AGGREGATES,
+                name='Aggregates',
+                data_type=DT_GROUP,
+                index=3
+            ),
+            PARA_AGGREGATES_FUNCTION: parameter_specification(
+                PARA_AGGREGATES_FUNCTION,
+                name='Function',
+                data_type=DT_STRING,
+                index=4,
+                values=[
+                    {'value': 'count', 'isDefault': True},
+                    'sum',
+                    'min',
+                    'max',
+                    'avg'
+                ],
+                parent=PARA_AGGREGATES
+            ),
+            PARA_AGGREGATES_COLUMN: parameter_specification(
+                PARA_AGGREGATES_COLUMN,
+                name='Column',
+                data_type=DT_COLUMN_ID,
+                index=5,
+                parent=PARA_AGGREGATES,
+                required=False
+            ),
+            PARA_AGGREGATES_NAME: parameter_specification(
+                PARA_AGGREGATES_NAME,
+                name='Result Column Name',
+                data_type=DT_STRING,
+                index=6,
+                parent=PARA_AGGREGATES,
+                required=False
+            ),
+            PARA_RESULT_DATASET: parameter_specification(
+                PARA_RESULT_DATASET,
+                name='Store Result As ...',
+                data_type=DT_STRING,
+                index=7
+            )
+        }
+    },
+    VIZUAL_CAST_COL: {
+        MODULE_NAME: 'Cast Column',
+        MODULE_ARGUMENTS: {
+            PARA_DATASET: para_dataset(0),
+            PARA_COLUMN: para_column(1),
+            PARA_TYPE: parameter_specification(
+                PARA_TYPE,
+                name='Data Type',
+                data_type=DT_STRING,
+                index=2,
+                values=['int', 'real', 'varchar']
+            )
+        }
+    },
+    VIZUAL_DEDUPLICATE: {
+        MODULE_NAME: 'Remove Duplicates',
+        MODULE_GROUP: 'dataset',
+        MODULE_ARGUMENTS: {
+            PARA_DATASET: para_dataset(0),
+            PARA_COLUMNS: parameter_specification(
+                PARA_COLUMNS,
+                name='Key Columns',
+                data_type=DT_GROUP,
+                index=1,
+                required=False
+            ),
+            PARA_COLUMNS_COLUMN: parameter_specification(
+                PARA_COLUMNS_COLUMN,
+                name='Column',
+                data_type=DT_COLUMN_ID,
+                index=2,
+                parent=PARA_COLUMNS
+            ),
+            PARA_KEEP: parameter_specification(
+                PARA_KEEP,
+                name='Keep',
+                data_type=DT_STRING,
+                index=3,
+                values=[
+                    {'value': 'first', 'isDefault': True},
+                    'last'
+                ],
+                required=False
+            )
+        }
+    },
     VIZUAL_DEL_COL: {
         MODULE_NAME: 'Delete Column',
         MODULE_ARGUMENTS: {
@@ -681,6 +811,27 @@ VIZUAL_COMMANDS = {
             PARA_DATASET: para_dataset(0)
         }
     },
+    VIZUAL_FILL_COL: {
+        MODULE_NAME: 'Fill Column',
+        MODULE_ARGUMENTS: {
+            PARA_DATASET: para_dataset(0),
+            PARA_COLUMN: para_column(1),
+            PARA_VALUE: parameter_specification(
+                PARA_VALUE,
+                name='Value',
+                data_type=DT_STRING,
+                index=2,
+                required=False
+            )
+        }
+    },
+    VIZUAL_FILL_DOWN: {
+        MODULE_NAME: 'Fill Down',
+        MODULE_ARGUMENTS: {
+            PARA_DATASET: para_dataset(0),
+            PARA_COLUMN: para_column(1)
+        }
+    },
     VIZUAL_INS_COL: {
         MODULE_NAME: 'Insert Column',
         MODULE_ARGUMENTS: {
@@ -701,6 +852,56 @@ VIZUAL_COMMANDS = {
             PARA_POSITION: para_position(1)
         }
     },
+    VIZUAL_JOIN: {
+        MODULE_NAME: 'Join Datasets',
+        MODULE_GROUP: 'dataset',
+        MODULE_ARGUMENTS: {
+            PARA_DATASET: para_dataset(0),
+            PARA_JOIN_DATASET: parameter_specification(
+                PARA_JOIN_DATASET,
+                name='Join With',
+                data_type=DT_DATASET_ID,
+                index=1
+            ),
+            PARA_JOIN_TYPE: parameter_specification(
+                PARA_JOIN_TYPE,
+                name='Join Type',
+                data_type=DT_STRING,
+                index=2,
+                values=[
+                    {'value': 'inner', 'isDefault': True},
+                    'left'
+                ],
+                required=False
+            ),
+            PARA_KEYS: parameter_specification(
+                PARA_KEYS,
+                name='Join Columns',
+                data_type=DT_GROUP,
+                index=3
+            ),
+            PARA_KEYS_COLUMN: parameter_specification(
+                PARA_KEYS_COLUMN,
+                name='Column',
+                data_type=DT_COLUMN_ID,
+                index=4,
+                parent=PARA_KEYS
+            ),
+            PARA_KEYS_JOIN_COLUMN: parameter_specification(
+                PARA_KEYS_JOIN_COLUMN,
+                name='Join Column',
+                data_type=DT_COLUMN_ID,
+                index=5,
+                parent=PARA_KEYS
+            ),
+            PARA_RESULT_DATASET: parameter_specification(
+                PARA_RESULT_DATASET,
+                name='Store Result As ...',
+                data_type=DT_STRING,
+                index=6
+            )
+        }
+    },
     VIZUAL_LOAD: {
         MODULE_NAME: 'Load Dataset',
         MODULE_GROUP: 'dataset',
@@ -889,6 +1090,26 @@ VIZUAL_COMMANDS = {
             )
         }
     },
+    VIZUAL_REPLACE: {
+        MODULE_NAME: 'Find and Replace',
+        MODULE_ARGUMENTS: {
+            PARA_DATASET: para_dataset(0),
+            PARA_COLUMN: para_column(1),
+            PARA_PATTERN: parameter_specification(
+                PARA_PATTERN,
+                name='Find (Regular Expression)',
+                data_type=DT_STRING,
+                index=2
+            ),
+            PARA_REPLACEMENT: parameter_specification(
+                PARA_REPLACEMENT,
+                name='Replace with',
+                data_type=DT_STRING,
+                index=3,
+                required=False
+            )
+        }
+    },
     VIZUAL_SORT: {
         MODULE_NAME: 'Sort Dataset',
         MODULE_GROUP: 'dataset',
@@ -1282,6 +1503,90 @@ def python_cell(source):
 # VizUAL Command specifications
 # ------------------------------------------------------------------------------
 
+def aggregate_dataset(dataset_name, columns, aggregates, result_name):
+    """Group a dataset by one or more columns and store aggregate values for
+    each group as a new dataset.
+
+    Parameters
+    ----------
+    dataset_name: string
+        Name of the dataset
+    columns: list(string or int)
+        Names or indices of grouping columns
+    aggregates: list(dict)
+        List of objects containing 'aggregates_function' and optional
+        'aggregates_column' and 'aggregates_name' elements
+    result_name: string
+        Name of the resulting dataset
+
+    Returns
+    -------
+    vizier.workflow.module.ModuleSpecification
+    """
+    return ModuleSpecification(
+        PACKAGE_VIZUAL,
+        VIZUAL_AGGREGATE,
+        {
+            PARA_DATASET : dataset_name,
+            PARA_COLUMNS: [{PARA_COLUMNS_COLUMN: col} for col in columns],
+            PARA_AGGREGATES: aggregates,
+            PARA_RESULT_DATASET: result_name
+        }
+    )
+
+
+def cast_column(dataset_name, column, data_type):
+    """Convert the values in a dataset column to the given data type.
+
+    Parameters
+    ----------
+    dataset_name: string
+        Name of the dataset
+    column: string or int
+        Name or index for column that is being converted
+    data_type: string
+        Target data type ('int', 'real', or 'varchar')
+
+    Returns
+    -------
+    vizier.workflow.module.ModuleSpecification
+    """
+    return ModuleSpecification(
+        PACKAGE_VIZUAL,
+        VIZUAL_CAST_COL,
+        {
+            PARA_DATASET : dataset_name,
+            PARA_COLUMN: column,
+            PARA_TYPE: data_type
+        }
+    )
+
+
+def deduplicate(dataset_name, columns=None, keep='first'):
+    """Remove duplicate rows from a dataset.
+
+    Parameters
+    ----------
+    dataset_name: string
+        Name of the dataset
+    columns: list(string or int), optional
+        Names or indices of key columns. All columns are used if not given.
+    keep: string, optional
+        Keep the 'first' or 'last' row for each key
+
+    Returns
+    -------
+    vizier.workflow.module.ModuleSpecification
+    """
+    args = {
+        PARA_DATASET : dataset_name,
+        PARA_KEEP: keep
+    }
+    if not columns is None:
+        args[PARA_COLUMNS] = [{PARA_COLUMNS_COLUMN: col} for col in columns]
+    return ModuleSpecification(PACKAGE_VIZUAL, VIZUAL_DEDUPLICATE, args)
+
+
 def delete_column(dataset_name, column):
     """Delete dataset column.
 
@@ -1351,6 +1656,58 @@ def drop_dataset(dataset_name):
     )
 
 
+def fill_column(dataset_name, column, value):
+    """Set all values in a dataset column to the given value.
+
+    Parameters
+    ----------
+    dataset_name: string
+        Name of the dataset
+    column: string or int
+        Name or index for column that is being filled
+    value: string
+        New cell value
+
+    Returns
+    -------
+    vizier.workflow.module.ModuleSpecification
+    """
+    return ModuleSpecification(
+        PACKAGE_VIZUAL,
+        VIZUAL_FILL_COL,
+        {
+            PARA_DATASET : dataset_name,
+            PARA_COLUMN: column,
+            PARA_VALUE: value
+        }
+    )
+
+
+def fill_down(dataset_name, column):
+    """Replace missing values in a dataset column with the last non-missing
+    value in a preceding row.
+
+    Parameters
+    ----------
+    dataset_name: string
+        Name of the dataset
+    column: string or int
+        Name or index for column that is being filled
+
+    Returns
+    -------
+    vizier.workflow.module.ModuleSpecification
+    """
+    return ModuleSpecification(
+        PACKAGE_VIZUAL,
+        VIZUAL_FILL_DOWN,
+        {
+            PARA_DATASET : dataset_name,
+            PARA_COLUMN: column
+        }
+    )
+
+
 def insert_column(dataset_name, position, name):
     """Insert a column into a dataset.
 
@@ -1402,6 +1759,42 @@ def insert_row(dataset_name, position):
     )
 
 
+def join_datasets(dataset_name, join_dataset_name, keys, result_name, join_type='inner'):
+    """Join two datasets and store the result as a new dataset.
+
+    Parameters
+    ----------
+    dataset_name: string
+        Name of the left dataset
+    join_dataset_name: string
+        Name of the right dataset
+    keys: list((string or int, string or int))
+        Pairs of join columns in the left and right dataset
+    result_name: string
+        Name of the resulting dataset
+    join_type: string, optional
+        Join type ('inner' or 'left')
+
+    Returns
+    -------
+    vizier.workflow.module.ModuleSpecification
+    """
+    return ModuleSpecification(
+        PACKAGE_VIZUAL,
+        VIZUAL_JOIN,
+        {
+            PARA_DATASET : dataset_name,
+            PARA_JOIN_DATASET: join_dataset_name,
+            PARA_JOIN_TYPE: join_type,
+            PARA_KEYS: [
+                {PARA_KEYS_COLUMN: col, PARA_KEYS_JOIN_COLUMN: join_col}
+                    for col, join_col in keys
+            ],
+            PARA_RESULT_DATASET: result_name
+        }
+    )
+
+
 def load_dataset(file_id, dataset_name, filename=None, url=None, infer_types=False, detect_headers=False, load_format='csv', load_options=None):
     """Load dataset from file. Expects file identifier and new dataset name.
 
@@ -1544,6 +1937,37 @@ def rename_dataset(dataset_name, new_name):
     )
 
 
+def replace_values(dataset_name, column, pattern, replacement):
+    """Replace all matches of a regular expression in the values of a dataset
+    column.
+
+    Parameters
+    ----------
+    dataset_name: string
+        Name of the dataset
+    column: string or int
+        Name or index for column whose values are replaced
+    pattern: string
+        Regular expression
+    replacement: string
+        Replacement string for matches of the regular expression
+
+    Returns
+    -------
+    vizier.workflow.module.ModuleSpecification
+    """
+    return ModuleSpecification(
+        PACKAGE_VIZUAL,
+        VIZUAL_REPLACE,
+        {
+            PARA_DATASET : dataset_name,
+            PARA_COLUMN: column,
+            PARA_PATTERN: pattern,
+            PARA_REPLACEMENT: replacement
+        }
+    )
+
+
 def update_cell(dataset_name, column, row, value):
     """Update a dataset cell value.
 
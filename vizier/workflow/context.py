@@ -24,7 +24,8 @@ dataset updates are handled. In a volatile context dataset updates are not
 persisted or propagated to following modules.
 
 The Vizier datastore client enables access to and manipulation of datasets in a
-Vizier datastore from within a python script.
+Vizier datastore from within a python script. The client keeps track of the
+dataset names that are read and written by a workflow module.
 """
 
 from vizier.core.util import is_valid_name
@@ -51,6 +52,8 @@ VZRENV_ENV_IDENTIFIER = 'identifier'
 """Components of a dataset mapping."""
 VZRENV_DATASETS_MODULEID = 'moduleId'
 VZRENV_DATASETS_MAPPING = 'mapping'
+VZRENV_DATASETS_READ = 'read'
+VZRENV_DATASETS_WRITTEN = 'written'
 
 """Context variable name for Vizier DB Client."""
 VZRENV_VARS_DBCLIENT = 'vizierdb'
@@ -59,6 +62,12 @@ VZRENV_VARS_DBCLIENT = 'vizierdb'
 class VizierDBClient(object):
     """The Vizier DB Client provides access to datasets that are identified by
     a unique name.
+
+    The client records the dataset names that are accessed. For each name that
+    is read before it is written the identifier in the initial mapping (or None
+    if the name did not exist) is kept in datasets_read. For each name that is
+    written the final identifier (or None if the dataset was removed) is kept
+    in datasets_written.
     """
     def __init__(self, datastore, datasets, vizual):
         """Initialize the reference to the workflow context and the datastore.
@@ -76,6 +85,8 @@ class VizierDBClient(object):
         self.datastore = datastore
         self.datasets = datasets
         self.vizual = vizual
+        self.datasets_read = dict()
+        self.datasets_written = dict()
 
     def create_dataset(self, name, dataset):
         """Create a new dataset with given name.
@@ -177,6 +188,7 @@ class VizierDBClient(object):
         """
         # Datset names should be case insensitive
         key = name.lower()
+        self.record_read(key)
         if not key in self.datasets:
             raise ValueError('unknown dataset \'' + name + '\'')
         return self.datasets[key]
@@ -194,7 +206,9 @@ class VizierDBClient(object):
         bool
         """
         # Dataset names are case insensitive
-        return name.lower() in self.datasets
+        key = name.lower()
+        self.record_read(key)
+        return key in self.datasets
 
     def new_dataset(self):
         """Get a dataset client instance for a new dataset.
@@ -205,6 +219,19 @@ class VizierDBClient(object):
         """
         return DatasetClient()
 
+    def record_read(self, key):
+        """Record that the dataset with the given (lower case) name is read.
+        Only names that have not been written by the module before are
+        recorded.
+
+        Parameters
+        ----------
+        key: string
+            Lower case dataset name
+        """
+        if not key in self.datasets_read and not key in self.datasets_written:
+            self.datasets_read[key] = self.datasets.get(key)
+
     def remove_dataset_identifier(self, name):
         """Remove the entry in the dataset distionary that is associated with
         the given name. Raises ValueError if not dataset with name exists.
@@ -218,9 +245,11 @@ class VizierDBClient(object):
         """
         # Convert name to lower case to ensure that names are case insensitive
         key = name.lower()
+        self.record_read(key)
         if not key in self.datasets:
             raise ValueError('unknown dataset \'' + name + '\'')
         del self.datasets[key]
+        self.datasets_written[key] = None
 
     def rename_dataset(self, name, new_name):
         """Rename an existing dataset.
@@ -258,7 +287,9 @@ class VizierDBClient(object):
             Unique identifier for persistent dataset
         """
         # Convert name to lower case to ensure that names are case insensitive
-        self.datasets[name.lower()] = identifier
+        key = name.lower()
+        self.datasets[key] = identifier
+        self.datasets_written[key] = identifier
 
     def update_dataset(self, name, dataset):
         """Update a given dataset.
@@ -368,6 +399,31 @@ def WorkflowContext(exec_env, context_type=CONTEXT_DEFAULT, datasets=None, varia
     return context
 
 
+def get_dataset_access(datasets, module_id):
+    """Get the datasets that were read and written by the module with the given
+    identifier. The result is a pair of dictionaries that map dataset names to
+    identifier. The result is (None, None) if no access has been recorded for
+    the module.
+
+    Parameters
+    ----------
+    datasets: list
+        List of (module-id, dataset-mapping)-pairs
+    module_id: int
+        Unique module identifier
+
+    Returns
+    -------
+    dict, dict
+    """
+    for m_map in datasets:
+        if m_map[VZRENV_DATASETS_MODULEID] == module_id:
+            if VZRENV_DATASETS_READ in m_map:
+                return m_map[VZRENV_DATASETS_READ], m_map[VZRENV_DATASETS_WRITTEN]
+            break
+    return None, None
+
+
 def get_datasets(datasets, module_id):
     """Get the dataset mapping for the module with the given identifier.
 
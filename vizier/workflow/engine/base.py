@@ -83,7 +83,10 @@ class WorkflowEngine(object):
         raise NotImplementedError
 
     @abstractmethod
-    def execute_workflow(self, viztrail_id, branch_id, version, modules, modified_index):
+    def execute_workflow(
+        self, viztrail_id, branch_id, version, modules, modified_index,
+        monitor=None
+    ):
         """Execute a sequence of modules that define the next version of a given
         workflow in a viztrail. The list of modules is a modified list compared
         to the module in the given workflow. The modified_index points to the
@@ -106,6 +109,10 @@ class WorkflowEngine(object):
             List of modules for the new workflow versions
         modified_index: int
             Index position of the first modified module in modules
+        monitor: func, optional
+            Function that is called with the index position and the handle of
+            each module in the new workflow after the module has been
+            executed, skipped, or copied
 
         Returns
         -------
@@ -0,0 +1,254 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module execution cache - Shared cache for the outputs of executed workflow
+modules.
+
+The same module is often executed with the same inputs in different branches
+and versions of a viztrail. The cache keeps the outputs of successful module
+executions. Cache entries are identified by the execution environment and the
+module command. For each entry the cache keeps a list of executions together
+with the identifier of the datasets that were read by the module. A cached
+execution is used if all datasets that it read have the same identifier in
+the dataset mapping of the module that is being executed.
+
+The cache is bounded by a memory budget (in bytes) and evicts the least
+recently used entries first.
+"""
+
+import hashlib
+import json
+import urllib
+
+from vizier.core.cache import MemoryBudgetCache
+from vizier.workflow.module import ModuleHandle, copy_mapping
+
+import vizier.workflow.command as cmdtype
+
+
+"""Default memory budget for the module execution cache (in bytes)."""
+DEFAULT_MODULE_CACHE_SIZE = 16 * 1024 * 1024
+
+"""Comment that marks a Python cell as pure, i.e., a cell that only depends on
+and modifies the datasets that it accesses through the Vizier DB client. The
+marker has to be the first line of the cell source."""
+PURE_PYTHON_MARKER = '# vizier: pure'
+
+
+class ModuleExecutionCache(MemoryBudgetCache):
+    """Cache for outputs of executed workflow modules. The cache key is a hash
+    of the execution environment identifier and the module command. Each
+    cached value is a list of module handles for executions of the command
+    with different inputs.
+    """
+    def __init__(self, budget=DEFAULT_MODULE_CACHE_SIZE):
+        """Initialize the memory budget.
+
+        Parameters
+        ----------
+        budget: int, optional
+            Maximum number of bytes held by the cache
+        """
+        super(ModuleExecutionCache, self).__init__(budget)
+
+    def add_module(self, env_id, module):
+        """Add the outputs of an executed module to the cache. Only modules
+        that executed successfully and for which the accessed datasets are
+        known are added. Replaces a cached execution of the same command that
+        read the same datasets.
+
+        Parameters
+        ----------
+        env_id: string
+            Identifier of the execution environment
+        module: vizier.workflow.module.ModuleHandle
+            Handle for the executed module
+        """
+        if self.budget == 0 or not is_cacheable(module):
+            return
+        key = command_key(env_id, module.command)
+        with self.lock:
+            executions = self.entries.get(key, list())
+        executions = [
+            m for m in executions if m.datasets_read != module.datasets_read
+        ]
+        executions.append(
+            ModuleHandle(
+                module.identifier,
+                module.command,
+                stdout=list(module.stdout),
+                stderr=list(),
+                command_text=module.command_text,
+                datasets_read=copy_mapping(module.datasets_read),
+                datasets_written=copy_mapping(module.datasets_written)
+            )
+        )
+        self.put(
+            key,
+            executions,
+            size=sum([module_size(m) for m in executions])
+        )
+
+    def find_module(self, env_id, module, datasets):
+        """Get a cached execution for the given module. The result is a handle
+        that contains the outputs and the dataset accesses of the cached
+        execution. Returns None if the cache does not contain an execution of
+        the module command whose input datasets match the given dataset
+        mapping.
+
+        Parameters
+        ----------
+        env_id: string
+            Identifier of the execution environment
+        module: vizier.workflow.module.ModuleHandle
+            Handle for the module that is being executed
+        datasets: dict
+            Mapping of dataset names to identifier for the module input
+
+        Returns
+        -------
+        vizier.workflow.module.ModuleHandle
+        """
+        if self.budget == 0 or not is_cacheable_command(module.command):
+            return None
+        executions = self.get(command_key(env_id, module.command))
+        if executions is None:
+            return None
+        for m in executions:
+            match = True
+            for name in m.datasets_read:
+                if datasets.get(name) != m.datasets_read[name]:
+                    match = False
+                    break
+            if match:
+                return ModuleHandle(
+                    module.identifier,
+                    module.command,
+                    stdout=list(m.stdout),
+                    stderr=list(),
+                    command_text=m.command_text,
+                    datasets_read=copy_mapping(m.datasets_read),
+                    datasets_written=copy_mapping(m.datasets_written)
+                )
+        return None
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def command_key(env_id, command):
+    """Get the cache key for a module command in the given execution
+    environment.
+
+    Parameters
+    ----------
+    env_id: string
+        Identifier of the execution environment
+    command: vizier.workflow.module.ModuleSpecification
+        Specification of the module command
+
+    Returns
+    -------
+    string
+    """
+    m = hashlib.md5()
+    m.update(str(env_id))
+    m.update(json.dumps(command.to_dict(), sort_keys=True))
+    return m.hexdigest()
+
+
+def is_cacheable(module):
+    """Test if the outputs of an executed module can be cached.
+
+    Parameters
+    ----------
+    module: vizier.workflow.module.ModuleHandle
+        Handle for an executed module
+
+    Returns
+    -------
+    bool
+    """
+    if module.has_error:
+        return False
+    if module.datasets_read is None or module.datasets_written is None:
+        return False
+    return is_cacheable_command(module.command)
+
+
+def is_cacheable_command(command):
+    """Test if the outputs of the given command only depend on the datasets
+    that the command reads. This is not the case for Python cells (unless they
+    are marked as pure) and Scala cells since they may depend on state other
+    than the datasets.
+
+    Parameters
+    ----------
+    command: vizier.workflow.module.ModuleSpecification
+        Specification of the module command
+
+    Returns
+    -------
+    bool
+    """
+    if command.is_type(cmdtype.PACKAGE_SCALA):
+        return False
+    elif command.is_type(cmdtype.PACKAGE_PYTHON):
+        return is_pure_python(command)
+    return True
+
+
+def is_pure_python(command):
+    """Test if the first line of the source of a Python cell is the marker for
+    pure Python cells.
+
+    Parameters
+    ----------
+    command: vizier.workflow.module.ModuleSpecification
+        Specification of a Python cell command
+
+    Returns
+    -------
+    bool
+    """
+    source = urllib.unquote(command.arguments.get('source', ''))
+    lines = source.strip().splitlines()
+    if len(lines) == 0:
+        return False
+    return lines[0].strip().lower() == PURE_PYTHON_MARKER
+
+
+def module_size(module):
+    """Estimate the size (in bytes) of a cached module execution.
+
+    Parameters
+    ----------
+    module: vizier.workflow.module.ModuleHandle
+        Handle for a cached module execution
+
+    Returns
+    -------
+    int
+    """
+    size = len(repr(module.stdout)) + len(repr(module.command_text))
+    for mapping in [module.datasets_read, module.datasets_written]:
+        size += len(repr(mapping))
+    return size
+
+
+"""Module execution cache that is shared by all workflow engines."""
+MODULE_CACHE = ModuleExecutionCache()
@@ -0,0 +1,221 @@
+# Copyright (C) 2018 New York University
+#                    University at Buffalo,
+#                    Illinois Institute of Technology.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Snapshots of the global Python variables in a workflow.
+
+The state of the Python variables after a Python cell has been executed is
+written to a file. When a workflow is re-executed, the state can be restored
+from the snapshot of the last unchanged Python cell instead of running all
+Python cells that precede the first modified module.
+
+Snapshots are identified by a key that is computed from the identifier and
+command of the Python cell, the identifier of the datasets that the cell read,
+and the key of the snapshot for the preceding Python cell. Workflow versions
+that share the same sequence of Python cells reading the same datasets
+therefore share the snapshot for each cell, independently of any other
+modules in the workflow. Snapshots are not written if any of the variable
+values cannot be pickled. A snapshot that cannot be read is treated as if it
+was missing.
+"""
+
+import cPickle
+import hashlib
+import importlib
+import json
+import os
+import types
+
+import vizier.workflow.context as ctx
+
+
+"""Variables that are not included in snapshots. The database client object is
+set by each Python cell before the cell is executed."""
+EXCLUDED_VARIABLES = ['__builtins__', ctx.VZRENV_VARS_DBCLIENT]
+
+"""Suffix for snapshot files."""
+SNAPSHOT_SUFFIX = '.pkl'
+
+
+class ModuleReference(object):
+    """Reference to an imported Python module. Python modules cannot be
+    pickled. Snapshots contain the module name instead and the module is
+    imported again when the snapshot is restored.
+
+    Attributes
+    ----------
+    name: string
+        Name of the imported module
+    """
+    def __init__(self, name):
+        """Initialize the module name.
+
+        Parameters
+        ----------
+        name: string
+            Name of the imported module
+        """
+        self.name = name
+
+
+class VariableSnapshotStore(object):
+    """Store for snapshots of Python variables. Each snapshot is kept in a
+    separate file in the store directory. The directory is created when the
+    first snapshot is written.
+    """
+    def __init__(self, directory):
+        """Initialize the store directory.
+
+        Parameters
+        ----------
+        directory: string
+            Path to directory for snapshot files
+        """
+        self.directory = os.path.abspath(directory)
+
+    def get(self, key):
+        """Read the snapshot with the given key. Returns None if the snapshot
+        does not exist or if it cannot be read.
+
+        Parameters
+        ----------
+        key: string
+            Unique snapshot key
+
+        Returns
+        -------
+        dict
+        """
+        filename = self.snapshot_file(key)
+        if not os.path.isfile(filename):
+            return None
+        try:
+            with open(filename, 'rb') as f:
+                state = cPickle.load(f)
+            variables = dict()
+            for name in state:
+                value = state[name]
+                if isinstance(value, ModuleReference):
+                    value = importlib.import_module(value.name)
+                variables[name] = value
+            return variables
+        except Exception:
+            return None
+
+    def has_snapshot(self, key):
+        """Test if a snapshot with the given key exists. The result is False
+        if the key is None.
+
+        Parameters
+        ----------
+        key: string
+            Unique snapshot key
+
+        Returns
+        -------
+        bool
+        """
+        if key is None:
+            return False
+        return os.path.isfile(self.snapshot_file(key))
+
+    def put(self, key, variables):
+        """Write a snapshot of the given variables. Returns False if the
+        variables cannot be pickled. In this case no snapshot is written and
+        an existing snapshot with the same key is removed.
+
+        Parameters
+        ----------
+        key: string
+            Unique snapshot key
+        variables: dict
+            Python variables state
+
+        Returns
+        -------
+        bool
+        """
+        filename = self.snapshot_file(key)
+        state = dict()
+        for name in variables:
+            if name in EXCLUDED_VARIABLES:
+                continue
+            value = variables[name]
+            if isinstance(value, types.ModuleType):
+                value = ModuleReference(value.__name__)
+            state[name] = value
+        try:
+            data = cPickle.dumps(state, cPickle.HIGHEST_PROTOCOL)
+        except Exception:
+            if os.path.isfile(filename):
+                os.remove(filename)
+            return False
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        # Write to a temporary file first to avoid partially written snapshots
+        tmp_file = filename + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.rename(tmp_file, filename)
+        return True
+
+    def snapshot_file(self, key):
+        """Get the name of the file for the snapshot with the given key.
+
+        Parameters
+        ----------
+        key: string
+            Unique snapshot key
+
+        Returns
+        -------
+        string
+        """
+        return os.path.join(self.directory, key + SNAPSHOT_SUFFIX)
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def snapshot_key(prev_key, module):
+    """Get the key for the snapshot of the variables after the given Python
+    cell. The key depends on the key for the snapshot after the preceding
+    Python cell, the identifier and command of the cell, and the datasets that
+    were read by the cell. The key for the (empty) variables before the first
+    Python cell is the empty string.
+
+    The result is None if the given key is None or if the datasets that were
+    read by the cell are unknown.
+
+    Parameters
+    ----------
+    prev_key: string
+        Key for the variables before the cell is executed
+    module: vizier.workflow.module.ModuleHandle
+        Handle for an executed Python cell
+
+    Returns
+    -------
+    string
+    """
+    if prev_key is None or module.datasets_read is None:
+        return None
+    m = hashlib.md5()
+    m.update(prev_key)
+    m.update(str(module.identifier))
+    m.update(json.dumps(module.command.to_dict(), sort_keys=True))
+    m.update(json.dumps(module.datasets_read, sort_keys=True))
+    return m.hexdigest()
@@ -46,7 +46,10 @@ class TestWorkflowEngine(WorkflowEngine):
             [m.copy() for m in modules]
         )
 
-    def execute_workflow(self, viztrail_id, branch_id, version, modules, modified_index):
+    def execute_workflow(
+        self, viztrail_id, branch_id, version, modules, modified_index,
+        monitor=None
+    ):
         """Execute a sequence of modules that define the next version of a given
         workflow in a viztrail. The list of modules is a modified list compared
         to the module in the given workflow. The modified_index points to the
@@ -69,6 +72,10 @@ class TestWorkflowEngine(WorkflowEngine):
             List of modules for the new workflow versions
         modified_index: int
             Index position of the first modified module in modules
+        monitor: func, optional
+            Function that is called with the index position and the handle of
+            each module in the new workflow after the module has been
+            executed, skipped, or copied
 
         Returns
         -------
@@ -86,6 +93,8 @@ class TestWorkflowEngine(WorkflowEngine):
             elif  m.identifier < 0:
                 raise ValueError('invalid module identifier \'' + str(m.identifier) + '\'')
             wf_modules.append(m)
+            if not monitor is None:
+                monitor(i, m)
         # Get the identifier of the modified module. The start_index may point
         # beyond the end of the modul elist if we deleted the last module. In
         # this case the result is -1
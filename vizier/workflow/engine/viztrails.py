@@ -20,11 +20,15 @@ import time
 import traceback
 import sys
 
+from vizier.datastore.fs import FileSystemDataStore
 from vizier.datastore.mem import VolatileDataStore
 from vizier.serialize import PLAIN_TEXT
-from vizier.workflow.module import ModuleHandle
+from vizier.workflow.module import MODULE_CANCELED
+from vizier.workflow.module import ModuleHandle, copy_mapping
 from vizier.workflow.context import WorkflowContext
 from vizier.workflow.engine.base import WorkflowExecutionResult, WorkflowEngine
+from vizier.workflow.engine.cache import MODULE_CACHE, is_pure_python
+from vizier.workflow.engine.snapshot import VariableSnapshotStore, snapshot_key
 from vizier.workflow.module import ModuleOutputs
 
 import vizier.config as config
@@ -40,13 +44,41 @@ logger = logging.getLogger(LOGGER_ENGINE)
 """Module execution status."""
 ERROR = '0'
 SUCCESS = '1'
+SKIPPED = '2'
+CACHED = '3'
+
+"""Packages whose modules are always executed if a preceding module has been
+modified. The modules may depend on state other than the datasets that they
+access through the Vizier DB client."""
+ALWAYS_EXECUTED_PACKAGES = [cmdtype.PACKAGE_SCALA]
+
+"""VizUAL commands that are executed as operations on the rows of a single
+dataset and that can therefore be fused with neighbouring commands on the same
+dataset."""
+FUSED_VIZUAL_COMMANDS = set([
+    cmdtype.VIZUAL_CAST_COL,
+    cmdtype.VIZUAL_DEDUPLICATE,
+    cmdtype.VIZUAL_DEL_COL,
+    cmdtype.VIZUAL_DEL_ROW,
+    cmdtype.VIZUAL_FILL_COL,
+    cmdtype.VIZUAL_FILL_DOWN,
+    cmdtype.VIZUAL_INS_COL,
+    cmdtype.VIZUAL_INS_ROW,
+    cmdtype.VIZUAL_MOV_COL,
+    cmdtype.VIZUAL_MOV_ROW,
+    cmdtype.VIZUAL_PROJECTION,
+    cmdtype.VIZUAL_REN_COL,
+    cmdtype.VIZUAL_REPLACE,
+    cmdtype.VIZUAL_SORT,
+    cmdtype.VIZUAL_UPD_CELL
+])
 
 
 class DefaultViztrailsEngine(WorkflowEngine):
     """Implementation of the workflow engine using Vistrails modules but not
     the Vistrails controller for workflow execution.
     """
-    def __init__(self, exec_env):
+    def __init__(self, exec_env, snapshot_dir=None):
         """Initialize the build information. Expects a dictionary containing two
         elements: name and version.
 
@@ -56,8 +88,15 @@ class DefaultViztrailsEngine(WorkflowEngine):
         ---------
         exec_env: vizier.config.ExecEnv
             Environment for execution of viztrail workflows
+        snapshot_dir: string, optional
+            Directory for snapshots of the Python variables state. Snapshots
+            are not used if no directory is given.
         """
         self.exec_env = exec_env
+        if not snapshot_dir is None:
+            self.snapshots = VariableSnapshotStore(snapshot_dir)
+        else:
+            self.snapshots = None
 
     def copy_workflow(self, version, modules):
         """Make a copy of the given workflow up until the given module
@@ -87,7 +126,23 @@ class DefaultViztrailsEngine(WorkflowEngine):
             [m.copy() for m in modules]
         )
 
-    def execute_module(self, viztrail_id, branch_id, version, module, context):
+    @property
+    def env_key(self):
+        """Key for the execution environment in the module execution cache.
+        Contains the environment identifier and the datastore directory.
+
+        Returns
+        -------
+        string
+        """
+        return ':'.join([
+            self.exec_env.identifier,
+            self.exec_env.datastore.directory
+        ])
+
+    def execute_module(
+        self, viztrail_id, branch_id, version, module, context, defer=False
+    ):
         """Execute a given workflow module. Depending on the module command type
         a corresponding Viztrails cell is created and the compute method called.
         Returns a handle to the executed module.
@@ -105,6 +160,9 @@ class DefaultViztrailsEngine(WorkflowEngine):
         context: dict
             Workflow execution context containing datasets and Python variables
             state.
+        defer: bool, optional
+            Defer materialization of datasets that are modified by a VizUAL
+            command
 
         Returns
         -------
@@ -122,7 +180,12 @@ class DefaultViztrailsEngine(WorkflowEngine):
         elif cmd.is_type(cmdtype.PACKAGE_MARKDOWN):
             cell = create_markdown_cell(module.identifier, cmd, context)
         elif cmd.is_type(cmdtype.PACKAGE_VIZUAL):
-            cell = create_vizual_cell(module.identifier, cmd, context)
+            cell = create_vizual_cell(
+                module.identifier,
+                cmd,
+                context,
+                defer=defer
+            )
         elif cmd.is_type(cmdtype.PACKAGE_PLOT):
             cell = create_plot_cell(module.identifier, cmd, context)
         else:
@@ -158,7 +221,12 @@ class DefaultViztrailsEngine(WorkflowEngine):
             str(end_time - start_time),
             status
         ]))
-        # Return new module. Copies current state of the datastore mapping.
+        # Return new module. Copies current state of the datastore mapping and
+        # the datasets that were accessed by the module.
+        datasets_read, datasets_written = ctx.get_dataset_access(
+            context[ctx.VZRENV_DATASETS],
+            module.identifier
+        )
         return ModuleHandle(
             module.identifier,
             module.command,
@@ -170,10 +238,15 @@ class DefaultViztrailsEngine(WorkflowEngine):
             ),
             stdout=outputs.stdout(),
             stderr=outputs.stderr(),
-            command_text=cell.get_output('command')
+            command_text=cell.get_output('command'),
+            datasets_read=copy_mapping(datasets_read),
+            datasets_written=copy_mapping(datasets_written)
         )
 
-    def execute_workflow(self, viztrail_id, branch_id, version, modules, modified_index):
+    def execute_workflow(
+        self, viztrail_id, branch_id, version, modules, modified_index,
+        monitor=None
+    ):
         """Execute a sequence of modules that define the next version of a given
         workflow in a viztrail. The list of modules is a modified list compared
         to the module in the given workflow. The modified_index points to the
@@ -184,6 +257,38 @@ class DefaultViztrailsEngine(WorkflowEngine):
         The modified index may be negative. In that case execution starts at the
         first module.
 
+        Runs of consecutive VizUAL commands on the same dataset are fused. Each
+        command in the run still outputs a new dataset. Materialization of
+        these datasets is deferred for all but the last command in the run.
+        The datastore then applies all commands in a single pass over the rows
+        of the dataset that is the input to the run.
+
+        The state of the Python variables after each Python cell is kept as a
+        snapshot (if a snapshot directory is given). The variables for the
+        modified module are restored from the snapshot of the last Python cell
+        before modified_index. Only Python cells that follow the last cell
+        with a readable snapshot are executed again to set the variables.
+
+        Modules after modified_index are skipped if none of the datasets that
+        they read in the previous execution has changed. The skipped modules
+        are copied and their dataset writes are applied to the current dataset
+        mapping. Python cells are only skipped if they are marked as pure (as
+        for the module execution cache) and if, in addition, a snapshot of the
+        variables after the cell exists for the current sequence of Python
+        cells. Scala cells are never skipped. Skipped modules are logged with
+        status SKIPPED.
+
+        If an executed module outputs a dataset whose content fingerprint is
+        the same as the fingerprint of the dataset that the following modules
+        read in the previous execution, the identifier of the previous dataset
+        is used instead. Re-execution therefore stops propagating once the
+        modules reproduce the datasets of the previous workflow version.
+
+        The outputs of modules that need to be executed are taken from the
+        shared module execution cache if the cache contains an execution of
+        the module command with the same input datasets. These modules are
+        logged with status CACHED.
+
         Parameters
         ----------
         viztrail_id : string
@@ -196,6 +301,10 @@ class DefaultViztrailsEngine(WorkflowEngine):
             List of modules for the new workflow versions
         modified_index: int
             Index position of the first modified module in modules
+        monitor: func, optional
+            Function that is called with the index position and the handle of
+            each module in the new workflow after the module has been
+            executed, skipped, or copied
 
         Returns
         -------
@@ -222,54 +331,162 @@ class DefaultViztrailsEngine(WorkflowEngine):
         # execution. All modules that are following a modules whose execution
         # failed are not executed.
         has_error = False
+        # Datastore to compare the fingerprints of datasets
+        datastore = None
+        if self.exec_env.identifier == config.ENGINEENV_DEFAULT:
+            datastore = FileSystemDataStore(self.exec_env.datastore.directory)
+        # Restore the Python variables from the snapshot of the last Python
+        # cell before start_index. Python cells up to (and including) the cell
+        # with the restored snapshot do not need to be executed again.
+        var_keys = dict()
+        key = ''
+        for i in range(min(start_index, len(modules))):
+            if modules[i].command.is_type(cmdtype.PACKAGE_PYTHON):
+                key = snapshot_key(key, modules[i])
+                var_keys[i] = key
+        restored_index = -1
+        if not self.snapshots is None:
+            for i in sorted(var_keys.keys(), reverse=True):
+                if var_keys[i] is None:
+                    continue
+                variables = self.snapshots.get(var_keys[i])
+                if not variables is None:
+                    context[ctx.VZRENV_VARS].update(variables)
+                    restored_index = i
+                    break
+        # Key for the snapshot of the current state of the Python variables
+        # and the list of Python cells that were skipped since the variables
+        # have last been updated
+        var_key = var_keys[restored_index] if restored_index >= 0 else ''
+        skipped_cells = list()
         # Iterate through the modules. Modules that occur before start_index are
         # assumed to have the same outputs as before. These modules do not need
-        # to be executed again with the exception of PythonCells in order to
-        # set global variables.
+        # to be executed again with the exception of PythonCells after the
+        # restored snapshot in order to set global variables.
         for i in range(len(modules)):
             module = modules[i]
+            is_python = module.command.is_type(cmdtype.PACKAGE_PYTHON)
             if has_error:
                 module = ModuleHandle(
                     module.identifier,
                     module.command,
                     stdout=list(),
                     stderr=list(),
-                    command_text=module.command_text
+                    command_text=module.command_text,
+                    state=MODULE_CANCELED
                 )
+            elif i < start_index:
+                if is_python and i > restored_index:
+                    # Save original module dataset mapping. This mapping
+                    # should not change.
+                    m_datasets = module.datasets
+                    # Re-run the module to update the global state
+                    module = self.replay_module(
+                        viztrail_id,
+                        branch_id,
+                        version,
+                        module,
+                        context
+                    )
+                    # Set module dataset mapping to original values
+                    module.datasets = m_datasets
+                    has_error = module.has_error
+                    var_key = self.put_snapshot(var_key, module, context)
+                else:
+                    # Copy the module
+                    module = module.copy()
+                    has_error = module.has_error
             else:
-                if i < start_index:
-                    if module.command.is_type(cmdtype.PACKAGE_PYTHON):
-                        # Save original module dataset mapping. This mapping
-                        # should not change.
-                        m_datasets = module.datasets
-                        # Re-run the module to update the global state
-                        module = self.execute_module(
-                            viztrail_id,
-                            branch_id,
-                            version,
-                            module,
-                            WorkflowContext(
-                                self.exec_env,
-                                context_type=ctx.CONTEXT_VOLATILE,
-                                datasets=dataset_maps,
-                                variables=context[ctx.VZRENV_VARS],
-                            )
-                        )
-                        # Set module dataset mapping to original values
-                        module.datasets = m_datasets
+                datasets = prev_datasets(context, i)
+                skip = can_skip_module(module, datasets)
+                if skip and is_python:
+                    # Python cells are only skipped if they are pure and if
+                    # the variables after the cell can be restored from a
+                    # snapshot. Other cells may depend on state other than
+                    # the datasets that they read.
+                    if not is_pure_python(module.command):
+                        skip = False
+                    elif not self.snapshots is None:
+                        key = snapshot_key(var_key, module)
+                        skip = self.snapshots.has_snapshot(key)
                     else:
-                        # Copy the module
-                        module = module.copy()
-                else:
-                    module = self.execute_module(
+                        skip = False
+                if skip:
+                    module = self.skip_module(
                         viztrail_id,
                         branch_id,
                         version,
                         module,
+                        context,
+                        i
+                    )
+                    if is_python:
+                        var_key = key
+                        skipped_cells.append(module)
+                    wf_modules.append(module)
+                    if not monitor is None:
+                        monitor(i, module)
+                    continue
+                cached = MODULE_CACHE.find_module(self.env_key, module, datasets)
+                if not cached is None:
+                    module = self.skip_module(
+                        viztrail_id,
+                        branch_id,
+                        version,
+                        cached,
+                        context,
+                        i,
+                        status=CACHED
+                    )
+                    if is_python:
+                        var_key = snapshot_key(var_key, module)
+                        skipped_cells.append(module)
+                    wf_modules.append(module)
+                    if not monitor is None:
+                        monitor(i, module)
+                    continue
+                if is_python and len(skipped_cells) > 0:
+                    # Bring the variables up to date before a Python cell is
+                    # executed after skipped cells
+                    self.restore_variables(
+                        viztrail_id,
+                        branch_id,
+                        version,
+                        var_key,
+                        skipped_cells,
                         context
                     )
+                    skipped_cells = list()
+                defer = False
+                if i + 1 < len(modules):
+                    defer = is_fused_vizual_command(
+                        module.command,
+                        modules[i + 1].command
+                    )
+                module = self.execute_module(
+                    viztrail_id,
+                    branch_id,
+                    version,
+                    module,
+                    context,
+                    defer=defer
+                )
                 has_error = module.has_error
+                if not has_error:
+                    if not datastore is None:
+                        replace_identical_datasets(
+                            datastore,
+                            module,
+                            modules[i + 1:],
+                            context,
+                            i
+                        )
+                    MODULE_CACHE.add_module(self.env_key, module)
+                    if is_python:
+                        var_key = self.put_snapshot(var_key, module, context)
             wf_modules.append(module)
+            if not monitor is None:
+                monitor(i, module)
         # Return handle for new workflow
         if start_index < len(wf_modules):
             mod_id = wf_modules[start_index].identifier
@@ -277,6 +494,159 @@ class DefaultViztrailsEngine(WorkflowEngine):
             mod_id = -1
         return WorkflowExecutionResult(version, mod_id, wf_modules)
 
+    def put_snapshot(self, var_key, module, context):
+        """Write a snapshot of the Python variables after an executed Python
+        cell. Returns the key for the snapshot. The snapshot is not written if
+        the cell execution failed or if no snapshot directory is given.
+
+        Parameters
+        ----------
+        var_key: string
+            Key for the variables before the cell was executed
+        module: vizier.workflow.module.ModuleHandle
+            Handle for the executed Python cell
+        context: dict
+            Workflow execution context
+
+        Returns
+        -------
+        string
+        """
+        key = snapshot_key(var_key, module)
+        if not key is None and not self.snapshots is None:
+            if not module.has_error:
+                self.snapshots.put(key, context[ctx.VZRENV_VARS])
+        return key
+
+    def replay_module(self, viztrail_id, branch_id, version, module, context):
+        """Execute a Python cell in a volatile context to update the Python
+        variables state. Datasets that are modified by the cell are not
+        changed in the datastore or the workflow dataset mapping.
+
+        Parameters
+        ----------
+        viztrail_id : string
+            Unique viztrail identifier
+        branch_id : string
+            Unique branch identifier for existing branch
+        version: int
+            Unique version identifier for new workflow
+        module: vizier.workflow.module.ModuleHandle
+            Handle for the Python cell
+        context: dict
+            Workflow execution context
+
+        Returns
+        -------
+        vizier.workflow.module.ModuleHandle
+        """
+        return self.execute_module(
+            viztrail_id,
+            branch_id,
+            version,
+            module,
+            WorkflowContext(
+                self.exec_env,
+                context_type=ctx.CONTEXT_VOLATILE,
+                datasets=context[ctx.VZRENV_DATASETS],
+                variables=context[ctx.VZRENV_VARS],
+            )
+        )
+
+    def restore_variables(
+        self, viztrail_id, branch_id, version, var_key, modules, context
+    ):
+        """Update the Python variables state after a sequence of skipped
+        Python cells. The variables are read from the snapshot with the given
+        key. If the snapshot cannot be read the skipped cells are executed in
+        a volatile context instead.
+
+        Parameters
+        ----------
+        viztrail_id : string
+            Unique viztrail identifier
+        branch_id : string
+            Unique branch identifier for existing branch
+        version: int
+            Unique version identifier for new workflow
+        var_key: string
+            Key for the variables after the last skipped cell
+        modules: list(vizier.workflow.module.ModuleHandle)
+            Skipped Python cells
+        context: dict
+            Workflow execution context
+        """
+        variables = None
+        if not self.snapshots is None and not var_key is None:
+            variables = self.snapshots.get(var_key)
+        if not variables is None:
+            # Keep the variables dictionary object. It is shared with the
+            # context of the workflow execution.
+            context[ctx.VZRENV_VARS].clear()
+            context[ctx.VZRENV_VARS].update(variables)
+        else:
+            for module in modules:
+                self.replay_module(
+                    viztrail_id,
+                    branch_id,
+                    version,
+                    module,
+                    context
+                )
+
+    def skip_module(
+        self, viztrail_id, branch_id, version, module, context, index,
+        status=SKIPPED
+    ):
+        """Copy a module whose inputs have not changed instead of executing it.
+        The datasets that were written by the module in a previous execution
+        are applied to the dataset mapping of the previous module to get the
+        new dataset mapping for the module.
+
+        Parameters
+        ----------
+        viztrail_id : string
+            Unique viztrail identifier
+        branch_id : string
+            Unique branch identifier for existing branch
+        version: int
+            Unique version identifier for new workflow
+        module: vizier.workflow.module.ModuleHandle
+            Handle for the skipped module
+        context: dict
+            Workflow execution context
+        index: int
+            Index position of the module in the workflow
+        status: string, optional
+            Status that is written to the engine log (SKIPPED or CACHED)
+
+        Returns
+        -------
+        vizier.workflow.module.ModuleHandle
+        """
+        datasets = dict(prev_datasets(context, index))
+        for name in module.datasets_written:
+            identifier = module.datasets_written[name]
+            if identifier is None:
+                datasets.pop(name, None)
+            else:
+                datasets[name] = identifier
+        context[ctx.VZRENV_DATASETS][index][ctx.VZRENV_DATASETS_MAPPING] = datasets
+        cmd = module.command
+        logger.info('\t'.join([
+            viztrail_id,
+            branch_id,
+            str(version),
+            str(module.identifier),
+            cmd.module_type,
+            cmd.command_identifier,
+            '0',
+            status
+        ]))
+        module = module.copy()
+        module.datasets = dict(datasets)
+        return module
+
 
 class InputPort(object):
     """Simple implementation of input port for Vistrails modules."""
@@ -307,6 +677,37 @@ class InputPort(object):
 # Helper Methods
 # ------------------------------------------------------------------------------
 
+def can_skip_module(module, datasets):
+    """Test if a module that follows a modified module can be copied instead of
+    being executed. This is the case if the datasets that were accessed by the
+    module in its previous execution are known and if all datasets that the
+    module read still have the same identifier. Modules that previously failed
+    and modules in packages that are always executed cannot be skipped.
+
+    Parameters
+    ----------
+    module: vizier.workflow.module.ModuleHandle
+        Handle for a module from the previous workflow version
+    datasets: dict
+        Current mapping of dataset names to identifier for the module input
+
+    Returns
+    -------
+    bool
+    """
+    if module.datasets_read is None or module.datasets_written is None:
+        return False
+    if module.has_error:
+        return False
+    for package_id in ALWAYS_EXECUTED_PACKAGES:
+        if module.command.is_type(package_id):
+            return False
+    for name in module.datasets_read:
+        if datasets.get(name) != module.datasets_read[name]:
+            return False
+    return True
+
+
 def create_mimir_cell(module_id, command, context):
     """Create a new Mimir cell module from the given command specification.
 
@@ -487,7 +888,7 @@ def create_python_cell(module_id, command, context):
     return cell
 
 
-def create_vizual_cell(module_id, command, context):
+def create_vizual_cell(module_id, command, context, defer=False):
     """Create a new python cell module from the given command specification.
 
     Assumes that the validity of the command has been verified.
@@ -502,6 +903,8 @@ def create_vizual_cell(module_id, command, context):
         Command specification
     context: dict
         Workflow execution context
+    defer: bool, optional
+        Defer materialization of the modified dataset
 
     Returns
     -------
@@ -513,4 +916,122 @@ def create_vizual_cell(module_id, command, context):
     cell.set_input_port('name', InputPort(command.command_identifier))
     cell.set_input_port('arguments', InputPort(command.arguments))
     cell.set_input_port('context', InputPort(context))
+    cell.set_input_port('defer', InputPort(defer))
     return cell
+
+
+
+def is_fused_vizual_command(command, next_command):
+    """Test if the given command and the command that follows it in the
+    workflow are VizUAL commands that modify the same dataset and that can be
+    executed as a single pass over the dataset rows.
+
+    Parameters
+    ----------
+    command: vizier.worktrail.module.ModuleSpecification
+        Command specification
+    next_command: vizier.worktrail.module.ModuleSpecification
+        Specification of the following command
+
+    Returns
+    -------
+    bool
+    """
+    datasets = list()
+    for c in [command, next_command]:
+        if not c.is_type(cmdtype.PACKAGE_VIZUAL):
+            return False
+        if not c.command_identifier in FUSED_VIZUAL_COMMANDS:
+            return False
+        ds_name = c.arguments.get(cmdtype.PARA_DATASET)
+        if ds_name is None:
+            return False
+        datasets.append(ds_name.lower())
+    return datasets[0] == datasets[1]
+
+
+def prev_datasets(context, index):
+    """Get the dataset mapping that is the input for the module at the given
+    index position, i.e., the dataset mapping of the previous module.
+
+    Parameters
+    ----------
+    context: dict
+        Workflow execution context
+    index: int
+        Index position of the module in the workflow
+
+    Returns
+    -------
+    dict
+    """
+    if index == 0:
+        return dict()
+    mappings = context[ctx.VZRENV_DATASETS]
+    return mappings[index - 1][ctx.VZRENV_DATASETS_MAPPING]
+
+
+def replace_identical_datasets(datastore, module, modules, context, index):
+    """Replace datasets that were written by an executed module with the
+    dataset that the following modules read in the previous workflow version
+    if both datasets have the same content fingerprint. Updates the dataset
+    mappings of the module and all mappings in the workflow context, starting
+    at the executed module, that refer to the replaced dataset. Returns the
+    names of the replaced datasets.
+
+    Parameters
+    ----------
+    datastore: vizier.datastore.base.DataStore
+        Datastore that contains the datasets
+    module: vizier.workflow.module.ModuleHandle
+        Handle for the executed module
+    modules: list(vizier.workflow.module.ModuleHandle)
+        Modules that follow the executed module in the previous workflow
+        version
+    context: dict
+        Workflow execution context
+    index: int
+        Index position of the executed module in the workflow
+
+    Returns
+    -------
+    list(string)
+    """
+    if module.datasets_written is None:
+        return list()
+    replaced = list()
+    for name in module.datasets_written:
+        identifier = module.datasets_written[name]
+        if identifier is None:
+            continue
+        # Find the dataset that the following modules read in the previous
+        # workflow version
+        prev_id = None
+        for m in modules:
+            if m.datasets_read is None or m.datasets_written is None:
+                break
+            if name in m.datasets_read:
+                prev_id = m.datasets_read[name]
+                break
+            if name in m.datasets_written:
+                break
+        if prev_id is None or prev_id == identifier:
+            continue
+        dataset = datastore.get_dataset(identifier)
+        prev_dataset = datastore.get_dataset(prev_id)
+        if dataset is None or prev_dataset is None:
+            continue
+        if dataset.fingerprint is None:
+            continue
+        if dataset.fingerprint != prev_dataset.fingerprint:
+            continue
+        module.datasets_written[name] = prev_id
+        if module.datasets.get(name) == identifier:
+            module.datasets[name] = prev_id
+        mappings = context[ctx.VZRENV_DATASETS]
+        for i in range(index, len(mappings)):
+            mapping = mappings[i][ctx.VZRENV_DATASETS_MAPPING]
+            if mapping.get(name) == identifier:
+                mapping[name] = prev_id
+        replaced.append(name)
+    return replaced
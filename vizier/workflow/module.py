@@ -17,6 +17,17 @@
 """Vizier DB Workflow API - Specification of workflow modules.
 """
 
+"""Module execution states. Modules of a workflow that is executed in the
+background are pending until the workflow engine reaches them and running
+while they are executed. Modules that follow a failed module are not executed
+and are canceled."""
+MODULE_CANCELED = 'CANCELED'
+MODULE_ERROR = 'ERROR'
+MODULE_PENDING = 'PENDING'
+MODULE_RUNNING = 'RUNNING'
+MODULE_SUCCESS = 'SUCCESS'
+
+
 class ModuleHandle(object):
     """Handle for a module in a curation workflow. Each module has a unique
     identifier, a specification of the executed command, a list of generated
@@ -35,8 +46,20 @@ class ModuleHandle(object):
         Module output that was written to STDOUT
     stderr: list(string), optional
         Module output that was written to STDERR
+    datasets_read: dict(string), optional
+        Identifier of the datasets that were read by the module (None if the
+        dataset did not exist). Is None if unknown.
+    datasets_written: dict(string), optional
+        Identifier of the datasets that were written by the module (None if
+        the dataset was removed). Is None if unknown.
+    state: string
+        Execution state of the module
     """
-    def __init__(self, identifier, command, datasets=None, stdout=None, stderr=None, command_text=None):
+    def __init__(
+        self, identifier, command, datasets=None, stdout=None, stderr=None,
+        command_text=None, datasets_read=None, datasets_written=None,
+        state=None
+    ):
         """Initialize the module handle. For new modules, datasets and outputs
         are initially empty.
 
@@ -55,6 +78,13 @@ class ModuleHandle(object):
             Module output that was written to STDERR
         command_text: string, optional
             Printable representation of module command
+        datasets_read: dict(string:string), optional
+            Identifier of the datasets that were read by the module
+        datasets_written: dict(string:string), optional
+            Identifier of the datasets that were written by the module
+        state: string, optional
+            Execution state of the module. By default, the state of an
+            executed module is derived from the output to STDERR
         """
         self.identifier = identifier
         self.command = command
@@ -62,6 +92,11 @@ class ModuleHandle(object):
         self.stdout = stdout if not stdout is None else list()
         self.stderr = stderr if not stderr is None else list()
         self.command_text = command_text
+        self.datasets_read = datasets_read
+        self.datasets_written = datasets_written
+        if state is None:
+            state = MODULE_ERROR if len(self.stderr) > 0 else MODULE_SUCCESS
+        self.state = state
 
     def copy(self):
         """Return a copy of the module handle.
@@ -79,7 +114,10 @@ class ModuleHandle(object):
             datasets=dict(self.datasets),
             stdout=list(self.stdout),
             stderr=list(self.stderr),
-            command_text=self.command_text
+            command_text=self.command_text,
+            datasets_read=copy_mapping(self.datasets_read),
+            datasets_written=copy_mapping(self.datasets_written),
+            state=self.state
         )
 
     @staticmethod
@@ -101,7 +139,10 @@ class ModuleHandle(object):
             datasets={ds['name'] : ds['id'] for ds in doc['datasets']},
             stdout=doc['stdout'],
             stderr=doc['stderr'],
-            command_text=doc['commandText']
+            command_text=doc['commandText'],
+            datasets_read=mapping_from_list(doc.get('datasetsRead')),
+            datasets_written=mapping_from_list(doc.get('datasetsWritten')),
+            state=doc.get('state')
         )
 
     @property
@@ -116,6 +157,16 @@ class ModuleHandle(object):
         """
         return len(self.stderr) > 0
 
+    @property
+    def is_active(self):
+        """Flag indicating whether the module is pending or running.
+
+        Returns
+        -------
+        bool
+        """
+        return self.state in [MODULE_PENDING, MODULE_RUNNING]
+
     def to_dict(self):
         """Get dictionary serialization of the module handle.
 
@@ -123,7 +174,7 @@ class ModuleHandle(object):
         -------
         dict
         """
-        return {
+        doc = {
             'id' : self.identifier,
             'command' : self.command.to_dict(),
             'stdout' : self.stdout,
@@ -133,8 +184,14 @@ class ModuleHandle(object):
                     'name' : key,
                     'id' : self.datasets[key]
                 } for key in self.datasets
-            ]
+            ],
+            'state': self.state
         }
+        if not self.datasets_read is None:
+            doc['datasetsRead'] = mapping_to_list(self.datasets_read)
+        if not self.datasets_written is None:
+            doc['datasetsWritten'] = mapping_to_list(self.datasets_written)
+        return doc
 
 
 class ModuleSpecification(object):
@@ -277,3 +334,56 @@ class ModuleOutputs(object):
         for key in ['type', 'data']:
             if not key in content:
                 raise ValueError('missing key \'' + key + '\'')
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def copy_mapping(mapping):
+    """Copy a dictionary that maps dataset names to identifier. The mapping may
+    be None.
+
+    Parameters
+    ----------
+    mapping: dict
+        Mapping of dataset names to identifier
+
+    Returns
+    -------
+    dict
+    """
+    return dict(mapping) if not mapping is None else None
+
+
+def mapping_from_list(doc):
+    """Create a mapping of dataset names to identifier from its list
+    serialization. The result is None if the given list is None.
+
+    Parameters
+    ----------
+    doc: list(dict)
+        List of name and identifier pairs
+
+    Returns
+    -------
+    dict
+    """
+    if doc is None:
+        return None
+    return {ds['name'] : ds['id'] for ds in doc}
+
+
+def mapping_to_list(mapping):
+    """Get list serialization for a mapping of dataset names to identifier.
+
+    Parameters
+    ----------
+    mapping: dict
+        Mapping of dataset names to identifier
+
+    Returns
+    -------
+    list(dict)
+    """
+    return [{'name' : key, 'id' : mapping[key]} for key in mapping]
@@ -806,11 +806,16 @@ class VizualCell(NotCacheable, Module):
     (name)and a dictionary of arguments that specify the actual VizUAL command
     and its arguments. The context contains the dataset mapping and reference to
     the VizUAL engine.
+
+    The optional defer flag indicates that the command is followed by another
+    VizUAL command on the same dataset. Materialization of the modified
+    dataset is then deferred.
     """
     _input_ports = [
         ('name', 'basic:String'),
         ('arguments', 'basic:Dictionary'),
-        ('context', 'basic:Dictionary')
+        ('context', 'basic:Dictionary'),
+        ('defer', 'basic:Boolean')
     ]
     _output_ports = [
         ('context', 'basic:Dictionary'),
@@ -825,9 +830,10 @@ class VizualCell(NotCacheable, Module):
         name = self.get_input('name')
         args = self.get_input('arguments')
         context = self.get_input('context')
+        defer = self.force_get_input('defer', False)
         # Get module identifier and VizierDB client for current workflow state
         module_id = self.moduleInfo['moduleId']
-        vizierdb = get_env(module_id, context)
+        vizierdb = get_env(module_id, context, defer=defer)
         # Set VizUAL engine (shortcut)
         v_eng = vizierdb.vizual
         outputs = ModuleOutputs()
@@ -838,7 +844,88 @@ class VizualCell(NotCacheable, Module):
         except Exception as ex:
             cmd_text = 'VIZUAL ' + str(name)
         self.set_output('command', cmd_text)
-        if name == cmd.VIZUAL_DEL_COL:
+        if name == cmd.VIZUAL_AGGREGATE:
+            # Get dataset name, grouping columns, aggregates, and the name of
+            # the result dataset. Raise exception if the specified dataset
+            # does not exist or if the result name is invalid or exists.
+            ds_name = get_argument(cmd.PARA_DATASET, args).lower()
+            result_name = get_argument(cmd.PARA_RESULT_DATASET, args).lower()
+            if vizierdb.has_dataset_identifier(result_name):
+                raise ValueError('dataset \'' + result_name + '\' exists')
+            if not is_valid_name(result_name):
+                raise ValueError('invalid dataset name \'' + result_name + '\'')
+            ds = vizierdb.get_dataset_identifier(ds_name)
+            columns = list()
+            for col in get_argument(cmd.PARA_COLUMNS, args, default_value=[]):
+                columns.append(
+                    get_argument(cmd.PARA_COLUMNS_COLUMN, col, as_int=True)
+                )
+            aggregates = list()
+            for agg in get_argument(cmd.PARA_AGGREGATES, args):
+                func = get_argument(cmd.PARA_AGGREGATES_FUNCTION, agg).lower()
+                a_col = get_argument(
+                    cmd.PARA_AGGREGATES_COLUMN,
+                    agg,
+                    as_int=True,
+                    raise_error=False
+                )
+                if a_col == '':
+                    a_col = None
+                a_name = get_argument(
+                    cmd.PARA_AGGREGATES_NAME,
+                    agg,
+                    raise_error=False
+                )
+                if a_name == '':
+                    a_name = None
+                aggregates.append((func, a_col, a_name))
+            # Execute aggregate command. Add new dataset to dictionary and
+            # add dataset schema and number of groups to output
+            count, ds_id = v_eng.aggregate_dataset(ds, columns, aggregates)
+            vizierdb.set_dataset_identifier(result_name, ds_id)
+            print_dataset_schema(
+                outputs,
+                result_name,
+                vizierdb.datastore.get_dataset(ds_id).columns
+            )
+            outputs.stdout(content=PLAIN_TEXT(str(count) + ' group(s)'))
+        elif name == cmd.VIZUAL_CAST_COL:
+            # Get dataset name, column specification, and data type. Raise
+            # exception if the specified dataset does not exist.
+            ds_name = get_argument(cmd.PARA_DATASET, args).lower()
+            c_col = get_argument(cmd.PARA_COLUMN, args, as_int=True)
+            c_type = get_argument(cmd.PARA_TYPE, args).lower()
+            ds = vizierdb.get_dataset_identifier(ds_name)
+            # Execute cast column command. Replacte existing dataset
+            # identifier with updated dataset id and set number of affected
+            # rows in output
+            count, ds_id = v_eng.cast_column(ds, c_col, c_type)
+            vizierdb.set_dataset_identifier(ds_name, ds_id)
+            outputs.stdout(content=PLAIN_TEXT(str(count) + ' row(s) converted'))
+        elif name == cmd.VIZUAL_DEDUPLICATE:
+            # Get dataset name, key columns, and keep option. Raise exception
+            # if the specified dataset does not exist.
+            ds_name = get_argument(cmd.PARA_DATASET, args).lower()
+            keep = get_argument(
+                cmd.PARA_KEEP,
+                args,
+                default_value='first'
+            ).lower()
+            ds = vizierdb.get_dataset_identifier(ds_name)
+            columns = list()
+            for col in get_argument(cmd.PARA_COLUMNS, args, default_value=[]):
+                columns.append(
+                    get_argument(cmd.PARA_COLUMNS_COLUMN, col, as_int=True)
+                )
+            # Execute deduplicate command. Replacte existing dataset
+            # identifier with updated dataset id and set number of removed
+            # rows in output
+            count, ds_id = v_eng.deduplicate(ds, columns, keep)
+            vizierdb.set_dataset_identifier(ds_name, ds_id)
+            outputs.stdout(
+                content=PLAIN_TEXT(str(count) + ' duplicate row(s) removed')
+            )
+        elif name == cmd.VIZUAL_DEL_COL:
             # Get dataset name, and column specification. Raise exception if
             # the specified dataset does not exist.
             ds_name = get_argument(cmd.PARA_DATASET, args).lower()
@@ -867,6 +954,31 @@ class VizualCell(NotCacheable, Module):
             ds_name = get_argument(cmd.PARA_DATASET, args).lower()
             vizierdb.remove_dataset_identifier(ds_name)
             outputs.stdout(content=PLAIN_TEXT('1 dataset dropped'))
+        elif name == cmd.VIZUAL_FILL_COL:
+            # Get dataset name, column specification, and fill value. Raise
+            # exception if the specified dataset does not exist.
+            ds_name = get_argument(cmd.PARA_DATASET, args).lower()
+            c_col = get_argument(cmd.PARA_COLUMN, args, as_int=True)
+            c_val = get_argument(cmd.PARA_VALUE, args, raise_error=False)
+            ds = vizierdb.get_dataset_identifier(ds_name)
+            # Execute fill column command. Replacte existing dataset
+            # identifier with updated dataset id and set number of affected
+            # rows in output
+            upd_count, ds_id = v_eng.fill_column(ds, c_col, c_val)
+            vizierdb.set_dataset_identifier(ds_name, ds_id)
+            outputs.stdout(content=PLAIN_TEXT(str(upd_count) + ' row(s) updated'))
+        elif name == cmd.VIZUAL_FILL_DOWN:
+            # Get dataset name and column specification. Raise exception if
+            # the specified dataset does not exist.
+            ds_name = get_argument(cmd.PARA_DATASET, args).lower()
+            c_col = get_argument(cmd.PARA_COLUMN, args, as_int=True)
+            ds = vizierdb.get_dataset_identifier(ds_name)
+            # Execute fill down command. Replacte existing dataset identifier
+            # with updated dataset id and set number of affected rows in
+            # output
+            count, ds_id = v_eng.fill_down(ds, c_col)
+            vizierdb.set_dataset_identifier(ds_name, ds_id)
+            outputs.stdout(content=PLAIN_TEXT(str(count) + ' row(s) filled'))
         elif name == cmd.VIZUAL_INS_COL:
             # Get dataset name, column index, and new column name. Raise
             # exception if the specified dataset does not exist or the
@@ -893,6 +1005,49 @@ class VizualCell(NotCacheable, Module):
             col_count, ds_id = v_eng.insert_row(ds, c_row)
             vizierdb.set_dataset_identifier(ds_name, ds_id)
             outputs.stdout(content=PLAIN_TEXT(str(col_count) + ' row inserted'))
+        elif name == cmd.VIZUAL_JOIN:
+            # Get names of both datasets, pairs of join columns, join type, and
+            # the name of the result dataset. Raise exception if either dataset
+            # does not exist or if the result name is invalid or exists.
+            ds_name = get_argument(cmd.PARA_DATASET, args).lower()
+            join_name = get_argument(cmd.PARA_JOIN_DATASET, args).lower()
+            result_name = get_argument(cmd.PARA_RESULT_DATASET, args).lower()
+            if vizierdb.has_dataset_identifier(result_name):
+                raise ValueError('dataset \'' + result_name + '\' exists')
+            if not is_valid_name(result_name):
+                raise ValueError('invalid dataset name \'' + result_name + '\'')
+            join_type = get_argument(
+                cmd.PARA_JOIN_TYPE,
+                args,
+                default_value='inner'
+            ).lower()
+            ds = vizierdb.get_dataset_identifier(ds_name)
+            join_ds = vizierdb.get_dataset_identifier(join_name)
+            columns = list()
+            join_columns = list()
+            for key in get_argument(cmd.PARA_KEYS, args):
+                columns.append(
+                    get_argument(cmd.PARA_KEYS_COLUMN, key, as_int=True)
+                )
+                join_columns.append(
+                    get_argument(cmd.PARA_KEYS_JOIN_COLUMN, key, as_int=True)
+                )
+            # Execute join command. Add new dataset to dictionary and add
+            # dataset schema and row count to output
+            count, ds_id = v_eng.join_datasets(
+                ds,
+                join_ds,
+                columns,
+                join_columns,
+                join_type
+            )
+            vizierdb.set_dataset_identifier(result_name, ds_id)
+            print_dataset_schema(
+                outputs,
+                result_name,
+                vizierdb.datastore.get_dataset(ds_id).columns
+            )
+            outputs.stdout(content=PLAIN_TEXT(str(count) + ' row(s)'))
         elif name == cmd.VIZUAL_LOAD:
             # Get the name of the file and dataset name from command
             # arguments. Raise exception if a dataset with the specified
@@ -1033,6 +1188,27 @@ class VizualCell(NotCacheable, Module):
             vizierdb.remove_dataset_identifier(ds_name)
             vizierdb.set_dataset_identifier(new_name, ds)
             outputs.stdout(content=PLAIN_TEXT('1 dataset renamed'))
+        elif name == cmd.VIZUAL_REPLACE:
+            # Get dataset name, column specification, regular expression, and
+            # replacement string. Raise exception if the specified dataset
+            # does not exist or the pattern is invalid.
+            ds_name = get_argument(cmd.PARA_DATASET, args).lower()
+            c_col = get_argument(cmd.PARA_COLUMN, args, as_int=True)
+            pattern = get_argument(cmd.PARA_PATTERN, args)
+            replacement = get_argument(
+                cmd.PARA_REPLACEMENT,
+                args,
+                raise_error=False
+            )
+            if replacement is None:
+                replacement = ''
+            ds = vizierdb.get_dataset_identifier(ds_name)
+            # Execute replace command. Replacte existing dataset identifier
+            # with updated dataset id and set number of affected rows in
+            # output
+            count, ds_id = v_eng.replace_values(ds, c_col, pattern, replacement)
+            vizierdb.set_dataset_identifier(ds_name, ds_id)
+            outputs.stdout(content=PLAIN_TEXT(str(count) + ' row(s) searched'))
         elif name == cmd.VIZUAL_SORT:
             # Get the name of the dataset and the list of columns to sort on
             # as well as the optional sort order.
@@ -1089,7 +1265,93 @@ class VizualCell(NotCacheable, Module):
         -------
         string
         """
-        if name in [cmd.VIZUAL_DEL_COL]:
+        if name == cmd.VIZUAL_AGGREGATE:
+            # AGGREGATE <aggregates> FROM <dataset> GROUP BY <columns> INTO
+            # <name>
+            ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
+            agg_list = list()
+            for agg in get_argument(cmd.PARA_AGGREGATES, args, default_value=list()):
+                func = get_argument(
+                    cmd.PARA_AGGREGATES_FUNCTION,
+                    agg,
+                    default_value='?'
+                )
+                col_id = get_argument(
+                    cmd.PARA_AGGREGATES_COLUMN,
+                    agg,
+                    raise_error=False
+                )
+                if col_id is None or col_id == '':
+                    col_name = '*'
+                else:
+                    col_name = get_column_name(ds_name, col_id, vizierdb)
+                    col_name = format_str(col_name)
+                agg_text = str(func).upper() + '(' + col_name + ')'
+                a_name = get_argument(
+                    cmd.PARA_AGGREGATES_NAME,
+                    agg,
+                    raise_error=False
+                )
+                if not a_name is None and a_name != '':
+                    agg_text += ' AS ' + format_str(a_name)
+                agg_list.append(agg_text)
+            group_columns = list()
+            for col in get_argument(cmd.PARA_COLUMNS, args, default_value=list()):
+                col_id = get_argument(
+                    cmd.PARA_COLUMNS_COLUMN, col, default_value='?'
+                )
+                col_name = get_column_name(ds_name, col_id, vizierdb)
+                group_columns.append(format_str(col_name))
+            tokens = [
+                'AGGREGATE',
+                ', '.join(agg_list),
+                'FROM',
+                format_str(ds_name.lower())
+            ]
+            if len(group_columns) > 0:
+                tokens.extend(['GROUP BY', ', '.join(group_columns)])
+            tokens.extend([
+                'INTO',
+                format_str(
+                    get_argument(
+                        cmd.PARA_RESULT_DATASET,
+                        args,
+                        default_value='?'
+                    )
+                )
+            ])
+            return ' '.join(tokens)
+        elif name == cmd.VIZUAL_CAST_COL:
+            # CAST COLUMN <name> IN <dataset> AS <type>
+            ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
+            col_id = get_argument(cmd.PARA_COLUMN, args, raise_error=False)
+            return ' '.join([
+                'CAST COLUMN',
+                format_str(get_column_name(ds_name, col_id, vizierdb)),
+                'IN',
+                format_str(ds_name.lower()),
+                'AS',
+                str(get_argument(cmd.PARA_TYPE, args, default_value='?')).upper()
+            ])
+        elif name == cmd.VIZUAL_DEDUPLICATE:
+            # REMOVE DUPLICATES FROM <dataset> [ON <columns>] KEEP <keep>
+            ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
+            key_columns = list()
+            for col in get_argument(cmd.PARA_COLUMNS, args, default_value=list()):
+                col_id = get_argument(
+                    cmd.PARA_COLUMNS_COLUMN, col, default_value='?'
+                )
+                col_name = get_column_name(ds_name, col_id, vizierdb)
+                key_columns.append(format_str(col_name))
+            tokens = ['REMOVE DUPLICATES FROM', format_str(ds_name.lower())]
+            if len(key_columns) > 0:
+                tokens.extend(['ON', ', '.join(key_columns)])
+            tokens.extend([
+                'KEEP',
+                str(get_argument(cmd.PARA_KEEP, args, default_value='first')).upper()
+            ])
+            return ' '.join(tokens)
+        elif name in [cmd.VIZUAL_DEL_COL]:
             # DELETE COLUMN <name> FROM <dataset>
             ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
             col_id = get_argument(cmd.PARA_COLUMN, args, raise_error=False)
@@ -1112,6 +1374,30 @@ class VizualCell(NotCacheable, Module):
             # DROP DATASET <dataset>
             ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
             return ' '.join(['DROP DATASET', format_str(ds_name.lower())])
+        elif name == cmd.VIZUAL_FILL_COL:
+            # FILL COLUMN <name> IN <dataset> WITH <value>
+            ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
+            col_id = get_argument(cmd.PARA_COLUMN, args, raise_error=False)
+            return ' '.join([
+                'FILL COLUMN',
+                format_str(get_column_name(ds_name, col_id, vizierdb)),
+                'IN',
+                format_str(ds_name.lower()),
+                'WITH',
+                number_or_str(
+                    get_argument(cmd.PARA_VALUE, args, default_value='?')
+                )
+            ])
+        elif name == cmd.VIZUAL_FILL_DOWN:
+            # FILL DOWN COLUMN <name> IN <dataset>
+            ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
+            col_id = get_argument(cmd.PARA_COLUMN, args, raise_error=False)
+            return ' '.join([
+                'FILL DOWN COLUMN',
+                format_str(get_column_name(ds_name, col_id, vizierdb)),
+                'IN',
+                format_str(ds_name.lower())
+            ])
         elif name == cmd.VIZUAL_INS_COL:
             # INSERT COLUMN <name> INTO <dataset> AT POSITION <index>
             ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
@@ -1132,6 +1418,50 @@ class VizualCell(NotCacheable, Module):
                 'AT POSITION',
                 str(get_argument(cmd.PARA_POSITION, args, default_value='?'))
             ])
+        elif name == cmd.VIZUAL_JOIN:
+            # <TYPE> JOIN <dataset> WITH <dataset> ON <column> = <column>, ...
+            # INTO <name>
+            ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
+            join_name = get_argument(
+                cmd.PARA_JOIN_DATASET,
+                args,
+                raise_error=False
+            )
+            join_type = get_argument(
+                cmd.PARA_JOIN_TYPE,
+                args,
+                default_value='inner'
+            )
+            conditions = list()
+            for key in get_argument(cmd.PARA_KEYS, args, default_value=list()):
+                col_id = get_argument(
+                    cmd.PARA_KEYS_COLUMN, key, default_value='?'
+                )
+                join_col_id = get_argument(
+                    cmd.PARA_KEYS_JOIN_COLUMN, key, default_value='?'
+                )
+                conditions.append(' '.join([
+                    format_str(get_column_name(ds_name, col_id, vizierdb)),
+                    '=',
+                    format_str(get_column_name(join_name, join_col_id, vizierdb))
+                ]))
+            return ' '.join([
+                str(join_type).upper(),
+                'JOIN',
+                format_str(ds_name.lower()),
+                'WITH',
+                format_str(join_name.lower()),
+                'ON',
+                ', '.join(conditions),
+                'INTO',
+                format_str(
+                    get_argument(
+                        cmd.PARA_RESULT_DATASET,
+                        args,
+                        default_value='?'
+                    )
+                )
+            ])
         elif name == cmd.VIZUAL_LOAD:
             # LOAD DATASET <dataset> FROM FILE <name>
             file_info = get_argument(cmd.PARA_FILE, args, default_value='?')
@@ -1238,6 +1568,27 @@ class VizualCell(NotCacheable, Module):
                 'TO',
                 format_str(get_argument(cmd.PARA_NAME, args, default_value='?'))
             ])
+        elif name == cmd.VIZUAL_REPLACE:
+            # REPLACE '<pattern>' IN COLUMN <name> OF <dataset> WITH
+            # '<replacement>'
+            ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
+            col_id = get_argument(cmd.PARA_COLUMN, args, raise_error=False)
+            pattern = get_argument(cmd.PARA_PATTERN, args, default_value='?')
+            replacement = get_argument(
+                cmd.PARA_REPLACEMENT,
+                args,
+                default_value=''
+            )
+            return ' '.join([
+                'REPLACE',
+                '\'' + str(pattern) + '\'',
+                'IN COLUMN',
+                format_str(get_column_name(ds_name, col_id, vizierdb)),
+                'OF',
+                format_str(ds_name.lower()),
+                'WITH',
+                '\'' + str(replacement) + '\''
+            ])
         elif name == cmd.VIZUAL_SORT:
             ds_name = get_argument(cmd.PARA_DATASET, args, raise_error=False)
             sort_columns = list()
@@ -1484,7 +1835,7 @@ def get_column_name(ds_name, column_id, vizierdb):
     return str(column_id)
 
 
-def get_env(module_id, context):
+def get_env(module_id, context, defer=False):
     """Get the VizierDB client for the workflow state of the given module.
 
     Patameters
@@ -1493,6 +1844,9 @@ def get_env(module_id, context):
         Unique module identifier
     context: dict
         Workflow execution context
+    defer: bool, optional
+        Defer materialization of datasets that are modified by the default
+        VizUAL engine
 
     Returns
     -------
@@ -1507,6 +1861,7 @@ def get_env(module_id, context):
     # module.
     datasets = None
     prev_map = None
+    m_map = None
     for module_map in context[ctx.VZRENV_DATASETS]:
         if module_map[ctx.VZRENV_DATASETS_MODULEID] == module_id:
             # Copy dataset mapping from previous module
@@ -1514,6 +1869,7 @@ def get_env(module_id, context):
                 datasets = dict(prev_map[ctx.VZRENV_DATASETS_MAPPING])
             else:
                 datasets = dict()
+            m_map = module_map
             break
         prev_map = module_map
     
@@ -1538,11 +1894,16 @@ def get_env(module_id, context):
     # Create Viual engine depending on environment type
     vizual = None
     if env_type == config.ENGINEENV_DEFAULT:
-        vizual = DefaultVizualEngine(datastore, fileserver)
+        vizual = DefaultVizualEngine(datastore, fileserver, defer=defer)
     elif env_type == config.ENGINEENV_MIMIR:
         vizual = MimirVizualEngine(datastore, fileserver)
-    # Return vizier client
-    return VizierDBClient(datastore, datasets, vizual)
+    # Create vizier client. The datasets that are accessed by the client are
+    # recorded with the module dataset mapping.
+    vizierdb = VizierDBClient(datastore, datasets, vizual)
+    if not m_map is None:
+        m_map[ctx.VZRENV_DATASETS_READ] = vizierdb.datasets_read
+        m_map[ctx.VZRENV_DATASETS_WRITTEN] = vizierdb.datasets_written
+    return vizierdb
 
 
 def number_or_str(value):
@@ -18,10 +18,16 @@
 
 Implementation of the default viztrail repository class that uses the file
 system to persist viztrail information.
+
+Workflows can either be executed synchronously or in the background by a job
+queue. For background execution, the modified workflow is written as the new
+head of the branch with all modules that need to be executed in pending state.
+The state of the workflow file is updated as each module finishes.
 """
 
 import os
 import shutil
+import threading
 import yaml
 
 from yaml import CLoader, CDumper
@@ -37,9 +43,13 @@ from vizier.workflow.base import ViztrailHandle, WorkflowHandle
 from vizier.workflow.base import WorkflowVersionDescriptor
 from vizier.workflow.base import DEFAULT_BRANCH, DEFAULT_BRANCH_NAME
 from vizier.workflow.base import ACTION_CREATE, ACTION_DELETE, ACTION_INSERT, ACTION_REPLACE
+from vizier.serialize import PLAIN_TEXT
 from vizier.workflow.command import PACKAGE_SYS, SYS_CREATE_BRANCH
+from vizier.workflow.engine.base import WorkflowExecutionResult
 from vizier.workflow.engine.viztrails import DefaultViztrailsEngine
 from vizier.workflow.module import ModuleHandle
+from vizier.workflow.module import MODULE_CANCELED, MODULE_PENDING
+from vizier.workflow.module import MODULE_RUNNING
 from vizier.workflow.repository.base import ViztrailRepository
 
 
@@ -48,6 +58,9 @@ PROPERTIES_FILE = 'properties.yaml'
 PROVENANCE_FILE = 'provenance.yaml'
 VIZTRAIL_FILE = 'viztrail.yaml'
 
+"""Directory containing snapshots of the Python variables in workflows."""
+SNAPSHOT_DIR = 'snapshots'
+
 
 class FileSystemBranchProvenance(ViztrailBranchProvenance):
     """Branch provenance object for provenance that is maintained in a Yaml file
@@ -163,6 +176,55 @@ class FileSystemViztrailHandle(ViztrailHandle):
         if fs_dir is None:
             raise ValueError('missing base directory for viztrail')
         self.fs_dir = fs_dir
+        # The handle is modified by request threads and by the worker thread
+        # that executes workflows in the background. The lock is reentrant
+        # since modifications of the handle write workflow files.
+        self.lock = threading.RLock()
+
+    def cancel_active_workflows(self):
+        """Cancel all modules that are pending or running. Workflows that are
+        executed in the background are left in an active state if the process
+        that executes them terminates. When the viztrail is loaded these
+        workflows will never finish.
+
+        Jobs are executed in the order in which they were submitted and
+        version numbers are assigned at submission. The active workflows are
+        therefore always the most recent executed versions in the viztrail.
+        Versions are checked in descending order until the first inactive
+        workflow is found. Workflows that were created as copies for a new
+        branch are never active and are skipped.
+
+        Returns
+        -------
+        int
+            Number of canceled workflows
+        """
+        with self.lock:
+            versions = list()
+            for branch_id in self.branches:
+                for wf_desc in self.branches[branch_id].workflows:
+                    if wf_desc.action != ACTION_CREATE:
+                        versions.append((wf_desc.version, branch_id))
+            count = 0
+            for version, branch_id in sorted(versions, reverse=True):
+                workflow = self.get_workflow(branch_id, version)
+                if workflow is None or not workflow.is_active:
+                    break
+                modules = list()
+                for m in workflow.modules:
+                    if m.is_active:
+                        m = ModuleHandle(
+                            m.identifier,
+                            m.command,
+                            state=MODULE_CANCELED
+                        )
+                    modules.append(m)
+                self.write_workflow(
+                    WorkflowExecutionResult(version, -1, modules),
+                    created_at=workflow.created_at
+                )
+                count += 1
+            return count
 
     @staticmethod
     def create_viztrail(fs_dir, identifier, exec_env, properties=None):
@@ -225,7 +287,10 @@ class FileSystemViztrailHandle(ViztrailHandle):
             from vizier.workflow.engine.test import TestWorkflowEngine
             return TestWorkflowEngine()
         else:
-            return DefaultViztrailsEngine(self.exec_env)
+            return DefaultViztrailsEngine(
+                self.exec_env,
+                snapshot_dir=os.path.join(self.fs_dir, SNAPSHOT_DIR)
+            )
 
     @staticmethod
     def from_file(fs_dir, envs):
@@ -282,34 +347,35 @@ class FileSystemViztrailHandle(ViztrailHandle):
         version: int, optional
             Workflow version number
         """
-        # Return None if branch does not exist
-        if not branch_id in self.branches:
-            return None
-        branch = self.branches[branch_id]
-        if version <= 0 and len(branch.workflows) == 0:
-            # Returns an empty workflow if the branch does not contain any
-            # executed workflows yet.
-            return WorkflowHandle(branch_id, -1, get_current_time(), [])
-        # Get version number of branch HEAD if negative version is given
-        wf_file = None
-        if version < 0 and len(branch.workflows) > 0:
-            wf_file = workflow_file(self.fs_dir, branch.workflows[-1].version)
-        else:
-            for wf_desc in branch.workflows:
-                if wf_desc.version == version:
-                    wf_file = workflow_file(self.fs_dir, version)
-                    break
-        # Return None if version number is not in branch (indicated by an non-
-        # existing workflow file)
-        if wf_file is None:
-            return None
-        # Read workflow handle from file
-        try:
-            with open(wf_file, 'r') as f:
-                doc = load_json(f.read())
-        except:
-            with open(wf_file, 'r') as f:
-                doc = yaml.load(f.read(), Loader=CLoader)
+        with self.lock:
+            # Return None if branch does not exist
+            if not branch_id in self.branches:
+                return None
+            branch = self.branches[branch_id]
+            if version <= 0 and len(branch.workflows) == 0:
+                # Returns an empty workflow if the branch does not contain any
+                # executed workflows yet.
+                return WorkflowHandle(branch_id, -1, get_current_time(), [])
+            # Get version number of branch HEAD if negative version is given
+            wf_file = None
+            if version < 0 and len(branch.workflows) > 0:
+                wf_file = workflow_file(self.fs_dir, branch.workflows[-1].version)
+            else:
+                for wf_desc in branch.workflows:
+                    if wf_desc.version == version:
+                        wf_file = workflow_file(self.fs_dir, version)
+                        break
+            # Return None if version number is not in branch (indicated by an
+            # non-existing workflow file)
+            if wf_file is None:
+                return None
+            # Read workflow handle from file
+            try:
+                with open(wf_file, 'r') as f:
+                    doc = load_json(f.read())
+            except:
+                with open(wf_file, 'r') as f:
+                    doc = yaml.load(f.read(), Loader=CLoader)
         return WorkflowHandle(
             branch_id,
             doc['version'],
@@ -321,51 +387,64 @@ class FileSystemViztrailHandle(ViztrailHandle):
         """Write the current state of the viztrail to file. Sets the last
         modified at timestamp to the current time.
         """
-        self.last_modified_at = get_current_time()
-        # Serialize viztrail
-        doc = {
-            'id': self.identifier,
-            'env': self.exec_env.identifier,
-            'branches' : [{
-                    'id': b,
-                    'versions': [w.to_dict() for w in self.branches[b].workflows]
-                } for b in self.branches
-            ],
-            'timestamps' : {
-                'createdAt' : self.created_at.isoformat(),
-                'lastModifiedAt' : self.last_modified_at.isoformat()
-            },
-            'versionCounter': self.version_counter.value,
-            'moduleCounter': self.module_counter.value
-        }
-        # Write viztrail serialization to file
-        with open(os.path.join(self.fs_dir, VIZTRAIL_FILE), 'w') as f:
-            #yaml.dump(doc, f, default_flow_style=False, Dumper=CDumper)
-            dump_json(doc, f)
-
-    def write_workflow(self, exec_result):
-        """Write workflow execution result into a new workflow file.
+        with self.lock:
+            self.last_modified_at = get_current_time()
+            # Serialize viztrail
+            doc = {
+                'id': self.identifier,
+                'env': self.exec_env.identifier,
+                'branches' : [{
+                        'id': b,
+                        'versions': [w.to_dict() for w in self.branches[b].workflows]
+                    } for b in self.branches
+                ],
+                'timestamps' : {
+                    'createdAt' : self.created_at.isoformat(),
+                    'lastModifiedAt' : self.last_modified_at.isoformat()
+                },
+                'versionCounter': self.version_counter.value,
+                'moduleCounter': self.module_counter.value
+            }
+            # Write viztrail serialization to file
+            with open(os.path.join(self.fs_dir, VIZTRAIL_FILE), 'w') as f:
+                #yaml.dump(doc, f, default_flow_style=False, Dumper=CDumper)
+                dump_json(doc, f)
+
+    def write_workflow(self, exec_result, created_at=None):
+        """Write workflow execution result into a new workflow file. Existing
+        workflow files are overwritten when the state of a workflow that is
+        executed in the background changes.
 
         Parameters
         ----------
         exec_result: vizier.workflow.engine.base.WorkflowExecutionResult
             Resulting workflow state after execution
+        created_at: datetime.datetime, optional
+            Timestamp of workflow creation. The current time is used if None
 
         Returns
         -------
         datetime.datetime
         """
         # Create dictionary for workflow information
-        created_at = get_current_time()
+        if created_at is None:
+            created_at = get_current_time()
         doc = {
             'version': exec_result.version,
             'createdAt': created_at.isoformat(),
             'modules': [m.to_dict() for m in exec_result.modules]
         }
-        # Write handle to file
-        with open(workflow_file(self.fs_dir, exec_result.version), 'w') as f:
-            #yaml.dump(doc, f, default_flow_style=False, Dumper=CDumper)
-            dump_json(doc, f)
+        # Write handle to a temporary file first. The workflow file may be
+        # read while the workflow is being executed. The lock prevents that
+        # the request thread and the worker thread write the same temporary
+        # file at the same time.
+        wf_file = workflow_file(self.fs_dir, exec_result.version)
+        tmp_file = wf_file + '.tmp'
+        with self.lock:
+            with open(tmp_file, 'w') as f:
+                #yaml.dump(doc, f, default_flow_style=False, Dumper=CDumper)
+                dump_json(doc, f)
+            os.rename(tmp_file, wf_file)
         return created_at
 
 class FileSystemViztrailRepository(ViztrailRepository):
@@ -374,7 +453,7 @@ class FileSystemViztrailRepository(ViztrailRepository):
     All available viztrails information is maitained in an internal cache to
     avoid frequent IO operations when accessing viztrail inforamtion.
     """
-    def __init__(self, base_directory, envs):
+    def __init__(self, base_directory, envs, executor=None):
         """Initialize the base directory and the dictionary of workflow
         execution environments.
 
@@ -389,6 +468,9 @@ class FileSystemViztrailRepository(ViztrailRepository):
             Path to base directory
         envs : dict(string: vizier.config.ExecEnv)
             Dictionary of supported execution environments
+        executor: vizier.core.jobs.JobQueue, optional
+            Queue for workflow execution in the background. Workflows are
+            executed synchronously if no queue is given.
         """
         super(FileSystemViztrailRepository, self).__init__(
             build_info('FileSystemViztrailRepository')
@@ -399,10 +481,12 @@ class FileSystemViztrailRepository(ViztrailRepository):
             os.makedirs(self.base_dir)
         # Set list of workflow execution environments
         self.envs = envs
+        self.executor = executor
         # Read information about all available viztrails into an internal cache.
         # The cache is a dictionary of viztrail handles (keyes by their
         # identifier). Assumes that every directory in the base dir represents
-        # a viztrail
+        # a viztrail. Workflows that were pending or running when the process
+        # that executed them terminated are canceled.
         self.cache = dict()
         for filename in os.listdir(self.base_dir):
             fs_dir = os.path.join(self.base_dir, filename)
@@ -411,6 +495,7 @@ class FileSystemViztrailRepository(ViztrailRepository):
                     fs_dir,
                     self.envs
                 )
+                viztrail.cancel_active_workflows()
                 self.cache[viztrail.identifier] = viztrail
 
     def append_workflow_module(self, viztrail_id, branch_id=DEFAULT_BRANCH, workflow_version=-1, command=None, before_id=-1):
@@ -420,7 +505,8 @@ class FileSystemViztrailRepository(ViztrailRepository):
         one that is being modified.
 
         The modified workflow will be executed. The result is the new head of
-        the branch.
+        the branch. If the repository has a job queue the workflow is executed
+        in the background and the new head is in pending state.
 
         If before_id is non-negative the new module is inserted into the
         existing workflow before the module with the specified identifier. If no
@@ -463,43 +549,24 @@ class FileSystemViztrailRepository(ViztrailRepository):
             return None
         # Validate given command specification. Will raise exception if invalid.
         viztrail.validate_command(command)
-        # Extend worktrails module list by appending the module (or inserting it
-        # if before_id is <> -1). Raise ValueError if a module that is
-        # referenced as before_id does not exist.
-        modules = []
-        module_index = -1
+        # Get the position of the new module in the workflow. Return None if a
+        # module that is referenced as before_id does not exist.
         if before_id < 0:
-            modules = workflow.modules
-            modules.append(ModuleHandle(viztrail.module_counter.inc(), command))
-            module_index = len(modules) - 1
+            module_index = len(workflow.modules)
         else:
-            for i in range(len(workflow.modules)):
-                m = workflow.modules[i]
-                if m.identifier == before_id:
-                    modules.append(
-                        ModuleHandle(viztrail.module_counter.inc(), command)
-                    )
-                    module_index = i
-                modules.append(m)
+            module_index = get_module_index(workflow.modules, before_id)
             if module_index == -1:
                 return None
-        # Execute the workflow and return the handle for the resulting workflow
-        # state. Execution should persist the generated workflow state.
-        result = viztrail.engine.execute_workflow(
-            viztrail_id,
-            branch_id,
-            viztrail.version_counter.inc(),
-            modules,
-            module_index
-        )
-        # Update viztrail information
-        return persist_workflow_result(
+        # Execute the modified workflow. Execution will persist the generated
+        # workflow state.
+        return self.execute_workflow(
             viztrail,
             branch_id,
-            result=result,
-            action=ACTION_INSERT,
-            package_id=command.module_type,
-            command_id=command.command_identifier
+            workflow,
+            ACTION_INSERT,
+            module_index,
+            command,
+            module=ModuleHandle(viztrail.module_counter.inc(), command)
         )
 
     def components(self):
@@ -546,65 +613,71 @@ class FileSystemViztrailRepository(ViztrailRepository):
         if not viztrail_id in self.cache:
             return None
         viztrail = self.cache[viztrail_id]
-        # Raise exception if source branch does not exist
-        if not source_branch in viztrail.branches:
-            raise ValueError('unknown branch \'' + source_branch + '\'')
-        # Get the referenced workflow. Raise exception if the workflow does not
-        # exist oris empty
-        workflow = viztrail.get_workflow(source_branch, workflow_version)
-        if workflow is None:
-            raise ValueError('unknown workflow')
-        if len(workflow.modules) == 0:
-            raise ValueError('attempt to branch from empty workflow')
-        # Copy list of workflow modules depending on value of module_id
-        if module_id < 0:
-            modules = workflow.modules
-        else:
-            modules = []
-            found = False
-            for m in workflow.modules:
-                modules.append(m)
-                if m.identifier == module_id:
-                    found = True
-                    break
-            if not found:
-                raise ValueError('unknown module \'' + str(module_id) + '\'')
-        # Make a copy of the source workflow for the branch
-        result = viztrail.engine.copy_workflow(
-            viztrail.version_counter.inc(),
-            modules
-        )
-        # Create file for new workflow
-        created_at = viztrail.write_workflow(result)
-        # Create new branch handle
-        target_branch = get_unique_identifier()
-        # Store provenance information for new branch in file
-        prov_file = branch_prov_file(viztrail.fs_dir, target_branch)
-        FileSystemBranchProvenance.to_file(
-            prov_file,
-            source_branch,
-            workflow.version,
-            result.modules[-1].identifier
-        )
-        branch = ViztrailBranch(
-            target_branch,
-            FilePropertiesHandler(
-                branch_file(viztrail.fs_dir, target_branch),
-                properties
-            ),
-            FileSystemBranchProvenance(prov_file),
-            workflows=[WorkflowVersionDescriptor(
-                result.version,
-                action=ACTION_CREATE,
-                package_id=PACKAGE_SYS,
-                command_id=SYS_CREATE_BRANCH,
-                created_at=created_at
-            )]
-        )
-        # Update the viztrail on disk
-        viztrail.branches[target_branch] = branch
-        viztrail.to_file()
-        return branch
+        # Hold the viztrail lock while the branch is created since the source
+        # workflow may be modified by a workflow that is executed in the
+        # background
+        with viztrail.lock:
+            # Raise exception if source branch does not exist
+            if not source_branch in viztrail.branches:
+                raise ValueError('unknown branch \'' + source_branch + '\'')
+            # Get the referenced workflow. Raise exception if the workflow does not
+            # exist oris empty
+            workflow = viztrail.get_workflow(source_branch, workflow_version)
+            if workflow is None:
+                raise ValueError('unknown workflow')
+            if len(workflow.modules) == 0:
+                raise ValueError('attempt to branch from empty workflow')
+            if workflow.is_active:
+                raise ValueError('attempt to branch from workflow that is being executed')
+            # Copy list of workflow modules depending on value of module_id
+            if module_id < 0:
+                modules = workflow.modules
+            else:
+                modules = []
+                found = False
+                for m in workflow.modules:
+                    modules.append(m)
+                    if m.identifier == module_id:
+                        found = True
+                        break
+                if not found:
+                    raise ValueError('unknown module \'' + str(module_id) + '\'')
+            # Make a copy of the source workflow for the branch
+            result = viztrail.engine.copy_workflow(
+                viztrail.version_counter.inc(),
+                modules
+            )
+            # Create file for new workflow
+            created_at = viztrail.write_workflow(result)
+            # Create new branch handle
+            target_branch = get_unique_identifier()
+            # Store provenance information for new branch in file
+            prov_file = branch_prov_file(viztrail.fs_dir, target_branch)
+            FileSystemBranchProvenance.to_file(
+                prov_file,
+                source_branch,
+                workflow.version,
+                result.modules[-1].identifier
+            )
+            branch = ViztrailBranch(
+                target_branch,
+                FilePropertiesHandler(
+                    branch_file(viztrail.fs_dir, target_branch),
+                    properties
+                ),
+                FileSystemBranchProvenance(prov_file),
+                workflows=[WorkflowVersionDescriptor(
+                    result.version,
+                    action=ACTION_CREATE,
+                    package_id=PACKAGE_SYS,
+                    command_id=SYS_CREATE_BRANCH,
+                    created_at=created_at
+                )]
+            )
+            # Update the viztrail on disk
+            viztrail.branches[target_branch] = branch
+            viztrail.to_file()
+            return branch
 
     def create_viztrail(self, env_id, properties):
         """Create a new viztrail.
@@ -663,19 +736,20 @@ class FileSystemViztrailRepository(ViztrailRepository):
         if not viztrail_id in self.cache:
             return None
         viztrail = self.cache[viztrail_id]
-        # Get viztrail branch. Return None if branch does not exist
-        if not branch_id in viztrail.branches:
-            return None
-        branch = viztrail.branches[branch_id]
-        # Delete workflow files associated with the branch
-        for wf_desc in branch.workflows:
-            os.remove(workflow_file(viztrail.fs_dir, wf_desc.version))
-        # Delete branch properties file
-        os.remove(branch_file(viztrail.fs_dir, branch_id))
-        # Update the viztrail information
-        del viztrail.branches[branch_id]
-        viztrail.to_file()
-        return viztrail
+        with viztrail.lock:
+            # Get viztrail branch. Return None if branch does not exist
+            if not branch_id in viztrail.branches:
+                return None
+            branch = viztrail.branches[branch_id]
+            # Delete workflow files associated with the branch
+            for wf_desc in branch.workflows:
+                os.remove(workflow_file(viztrail.fs_dir, wf_desc.version))
+            # Delete branch properties file
+            os.remove(branch_file(viztrail.fs_dir, branch_id))
+            # Update the viztrail information
+            del viztrail.branches[branch_id]
+            viztrail.to_file()
+            return viztrail
 
     def delete_workflow_module(self, viztrail_id, branch_id=DEFAULT_BRANCH, workflow_version=-1, module_id=-1):
         """Delete the module with the given identifier in the specified
@@ -683,7 +757,8 @@ class FileSystemViztrailRepository(ViztrailRepository):
         will form the new head of the given viztrail branch.
 
         The result is True on success. Returns False if no viztrail, branch, or
-        module with given identifier exists.
+        module with given identifier exists. If the repository has a job queue
+        the resulting workflow is executed in the background.
 
         Parameters
         ----------
@@ -710,39 +785,20 @@ class FileSystemViztrailRepository(ViztrailRepository):
         workflow = viztrail.get_workflow(branch_id, workflow_version)
         if workflow is None:
             return False
-        # Modify worktrails module list by deleting the module with the given.
-        # identifier. Returns False if no module with the given identifier
-        # exists.
-        modules = []
-        module_index = -1
-        for i in range(len(workflow.modules)):
-            m = workflow.modules[i]
-            if m.identifier != module_id:
-                modules.append(m)
-            else:
-                module_index = i
+        # Get the position of the deleted module. Returns False if no module
+        # with the given identifier exists.
+        module_index = get_module_index(workflow.modules, module_id)
         if module_index == -1:
             return False
-        # Get command of the deleted module for workflow descriptor in branch
-        # history
-        command = workflow.modules[module_index].command
-        # Execute the workflow and return the handle for the resulting workflow
-        # state. Execution should persist the generated workflow state.
-        result = viztrail.engine.execute_workflow(
-            viztrail_id,
-            branch_id,
-            viztrail.version_counter.inc(),
-            modules,
-            module_index
-        )
-        # Update viztrail information
-        return persist_workflow_result(
+        # Execute the modified workflow. Execution will persist the generated
+        # workflow state.
+        return self.execute_workflow(
             viztrail,
             branch_id,
-            result=result,
-            action=ACTION_DELETE,
-            package_id=command.module_type,
-            command_id=command.command_identifier
+            workflow,
+            ACTION_DELETE,
+            module_index,
+            workflow.modules[module_index].command
         )
 
     def delete_viztrail(self, viztrail_id):
@@ -766,6 +822,77 @@ class FileSystemViztrailRepository(ViztrailRepository):
         else:
             return False
 
+    def execute_workflow(
+        self, viztrail, branch_id, workflow, action, module_index, command,
+        module=None
+    ):
+        """Execute the workflow that results from modifying the given workflow
+        and make it the new head of the branch. Returns the modified viztrail.
+
+        If the repository has a job queue the new workflow version is written
+        with all modules starting at module_index in pending state and the
+        execution is added to the queue.
+
+        Parameters
+        ----------
+        viztrail: vizier.workflow.repository.fs.FileSystemViztrailHandle
+            Handle for the modified viztrail
+        branch_id: string
+            Unique identifier of the modified branch
+        workflow: vizier.workflow.base.WorkflowHandle
+            Workflow that is being modified
+        action: string
+            Identifier of the modification (insert, delete, or replace)
+        module_index: int
+            Index position of the modified module
+        command: vizier.workflow.module.ModuleSpecification
+            Command of the inserted, deleted, or replaced module
+        module: vizier.workflow.module.ModuleHandle, optional
+            Handle for the inserted or replacing module
+
+        Returns
+        -------
+        vizier.workflow.repository.fs.FileSystemViztrailHandle
+        """
+        # Version numbers are assigned and jobs are submitted while holding
+        # the viztrail lock. Jobs are therefore submitted in the order of
+        # their version numbers.
+        with viztrail.lock:
+            version = viztrail.version_counter.inc()
+            modules = modify_workflow(workflow.modules, action, module_index, module)
+            if self.executor is None:
+                result = viztrail.engine.execute_workflow(
+                    viztrail.identifier,
+                    branch_id,
+                    version,
+                    modules,
+                    module_index
+                )
+            else:
+                result = pending_workflow(version, modules, module_index)
+            # Update viztrail information
+            viztrail = persist_workflow_result(
+                viztrail,
+                branch_id,
+                result=result,
+                action=action,
+                package_id=command.module_type,
+                command_id=command.command_identifier
+            )
+            if not self.executor is None:
+                self.executor.submit(
+                    run_workflow,
+                    viztrail,
+                    branch_id,
+                    workflow.version,
+                    result,
+                    action,
+                    module_index,
+                    module=module,
+                    created_at=viztrail.branches[branch_id].workflows[-1].created_at
+                )
+            return viztrail
+
     def get_viztrail(self, viztrail_id):
         """Retrieve the viztrail with the given identifier. The result is None
         if no viztrail with given identifier exists.
@@ -824,7 +951,8 @@ class FileSystemViztrailRepository(ViztrailRepository):
         the workflow that is identified by the given version number. If the
         version number is negative the workflow at the branch HEAD is the
         one that is being modified. The modified workflow is executed and the
-        result will be the new head of the branch.
+        result will be the new head of the branch. If the repository has a job
+        queue the workflow is executed in the background.
 
         Returns a handle to the state of the executed workflow. Returns None if
         the specified viztrail, branch, workflow, or module do not exist.
@@ -860,36 +988,21 @@ class FileSystemViztrailRepository(ViztrailRepository):
             return None
         # Validate given command specification. Will raise exception if invalid.
         viztrail.validate_command(command)
-        # Create modified module list replacing the specified module with the
-        # given command. Return None if no module with the specified id exists.
-        modules = []
-        module_index = -1
-        for i in range(len(workflow.modules)):
-            m = workflow.modules[i]
-            if m.identifier == module_id:
-                modules.append(ModuleHandle(module_id, command))
-                module_index = i
-            else:
-                modules.append(m)
+        # Get the position of the replaced module. Return None if no module
+        # with the specified id exists.
+        module_index = get_module_index(workflow.modules, module_id)
         if module_index == -1:
             return None
-        # Execute the workflow and return the handle for the resulting workflow
-        # state. Execution should persist the generated workflow state.
-        result = viztrail.engine.execute_workflow(
-            viztrail_id,
-            branch_id,
-            viztrail.version_counter.inc(),
-            modules,
-            module_index
-        )
-        # Update viztrail information
-        return persist_workflow_result(
+        # Execute the modified workflow. Execution will persist the generated
+        # workflow state.
+        return self.execute_workflow(
             viztrail,
             branch_id,
-            result=result,
-            action=ACTION_REPLACE,
-            package_id=command.module_type,
-            command_id=command.command_identifier
+            workflow,
+            ACTION_REPLACE,
+            module_index,
+            command,
+            module=ModuleHandle(module_id, command)
         )
 
 
@@ -930,6 +1043,89 @@ def branch_prov_file(fs_dir, branch_id):
     """
     return os.path.join(fs_dir, branch_id + '_' + PROVENANCE_FILE)
 
+
+def get_module_index(modules, module_id):
+    """Get the index position of the module with the given identifier. The
+    result is -1 if no such module exists.
+
+    Parameters
+    ----------
+    modules: list(vizier.workflow.module.ModuleHandle)
+        List of workflow modules
+    module_id: int
+        Module identifier
+
+    Returns
+    -------
+    int
+    """
+    for i in range(len(modules)):
+        if modules[i].identifier == module_id:
+            return i
+    return -1
+
+
+def modify_workflow(modules, action, module_index, module=None):
+    """Get the modified list of workflow modules for an insert, delete, or
+    replace action. The given list is not modified.
+
+    Parameters
+    ----------
+    modules: list(vizier.workflow.module.ModuleHandle)
+        List of modules in the modified workflow
+    action: string
+        Identifier of the modification (insert, delete, or replace)
+    module_index: int
+        Index position of the modified module
+    module: vizier.workflow.module.ModuleHandle, optional
+        Handle for the inserted or replacing module
+
+    Returns
+    -------
+    list(vizier.workflow.module.ModuleHandle)
+    """
+    modules = list(modules)
+    if action == ACTION_INSERT:
+        modules.insert(module_index, module)
+    elif action == ACTION_REPLACE:
+        modules[module_index] = module
+    elif action == ACTION_DELETE:
+        del modules[module_index]
+    else:
+        raise ValueError('unknown action \'' + str(action) + '\'')
+    return modules
+
+
+def pending_workflow(version, modules, module_index):
+    """Get the initial state of a workflow that is executed in the
+    background. All modules starting at module_index are pending. The modules
+    before module_index are copied.
+
+    Parameters
+    ----------
+    version: int
+        Unique version identifier for the new workflow
+    modules: list(vizier.workflow.module.ModuleHandle)
+        List of modules in the new workflow
+    module_index: int
+        Index position of the first module that needs to be executed
+
+    Returns
+    -------
+    vizier.workflow.engine.base.WorkflowExecutionResult
+    """
+    wf_modules = [m.copy() for m in modules[:module_index]]
+    for m in modules[module_index:]:
+        wf_modules.append(
+            ModuleHandle(m.identifier, m.command, state=MODULE_PENDING)
+        )
+    if module_index < len(wf_modules):
+        module_id = wf_modules[module_index].identifier
+    else:
+        module_id = -1
+    return WorkflowExecutionResult(version, module_id, wf_modules)
+
+
 def persist_workflow_result(viztrail, branch_id, result, action=None, package_id=None, command_id=None):
     """Persist the result of executing a viztrail workflow. Writes the new
     workflow file and the updated viztrail informaiton. Returns the modified
@@ -969,6 +1165,117 @@ def persist_workflow_result(viztrail, branch_id, result, action=None, package_id
     return viztrail
 
 
+def run_workflow(
+    viztrail, branch_id, base_version, pending, action, module_index,
+    module=None, created_at=None
+):
+    """Execute a workflow version that was written in pending state. The
+    modules are taken from the base workflow at the time of execution since
+    the base workflow may itself have been pending when the new version was
+    created. Jobs are executed in the order in which they were submitted, so
+    the base workflow has been executed by now. The workflow file is updated
+    after each executed module.
+
+    Parameters
+    ----------
+    viztrail: vizier.workflow.repository.fs.FileSystemViztrailHandle
+        Handle for the modified viztrail
+    branch_id: string
+        Unique identifier of the modified branch
+    base_version: int
+        Version of the workflow that was modified
+    pending: vizier.workflow.engine.base.WorkflowExecutionResult
+        Initial state of the new workflow version
+    action: string
+        Identifier of the modification (insert, delete, or replace)
+    module_index: int
+        Index position of the modified module
+    module: vizier.workflow.module.ModuleHandle, optional
+        Handle for the inserted or replacing module
+    created_at: datetime.datetime, optional
+        Timestamp of workflow creation
+    """
+    # Nothing to do if the branch has been deleted in the meantime
+    if not branch_id in viztrail.branches:
+        return
+    if base_version < 0:
+        modules = list()
+    else:
+        workflow = viztrail.get_workflow(branch_id, base_version)
+        if workflow is None:
+            return
+        modules = workflow.modules
+    modules = modify_workflow(modules, action, module_index, module)
+    # Current state of the workflow modules. The module at module_index is
+    # the first module that is being executed.
+    states = [m.copy() for m in modules[:module_index]]
+    states.extend(pending.modules[module_index:])
+    if module_index < len(states):
+        m = states[module_index]
+        states[module_index] = ModuleHandle(
+            m.identifier,
+            m.command,
+            state=MODULE_RUNNING
+        )
+    viztrail.write_workflow(
+        WorkflowExecutionResult(pending.version, pending.module_id, states),
+        created_at=created_at
+    )
+    def monitor(index, m):
+        """Update the workflow file after a module has been executed."""
+        states[index] = m
+        if index + 1 < len(states) and states[index + 1].is_active:
+            states[index + 1] = ModuleHandle(
+                states[index + 1].identifier,
+                states[index + 1].command,
+                state=MODULE_RUNNING
+            )
+        if index >= module_index:
+            viztrail.write_workflow(
+                WorkflowExecutionResult(
+                    pending.version,
+                    pending.module_id,
+                    states
+                ),
+                created_at=created_at
+            )
+    try:
+        result = viztrail.engine.execute_workflow(
+            viztrail.identifier,
+            branch_id,
+            pending.version,
+            modules,
+            module_index,
+            monitor=monitor
+        )
+    except Exception as ex:
+        # Modules that have not been executed are not left in pending state.
+        # The error is reported for the first of these modules. All following
+        # modules are canceled.
+        stderr = [PLAIN_TEXT(type(ex).__name__ + ': ' + str(ex))]
+        for i in range(len(states)):
+            if states[i].is_active:
+                if not stderr is None:
+                    states[i] = ModuleHandle(
+                        states[i].identifier,
+                        states[i].command,
+                        stderr=stderr
+                    )
+                    stderr = None
+                else:
+                    states[i] = ModuleHandle(
+                        states[i].identifier,
+                        states[i].command,
+                        state=MODULE_CANCELED
+                    )
+        viztrail.write_workflow(
+            WorkflowExecutionResult(pending.version, pending.module_id, states),
+            created_at=created_at
+        )
+        raise
+    viztrail.write_workflow(result, created_at=created_at)
+
+
 def workflow_file(fs_dir, version):
     """Get file for viztrail workflow.
 
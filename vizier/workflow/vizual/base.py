@@ -22,12 +22,24 @@ via VizUAL commands.
 from abc import abstractmethod
 import csv
 import gzip
+import re
+import sre_parse
 
 from vizier.core.util import is_valid_name
 from vizier.core.system import build_info, component_descriptor
 from vizier.core.system import VizierSystemComponent
+from vizier.datastore.aggregate import DEFAULT_AGGREGATE_BUFFER_SIZE
 from vizier.datastore.base import DatasetColumn, DatasetRow
 from vizier.datastore.base import get_index_for_column
+from vizier.datastore.convert import cast_value
+from vizier.datastore.join import DEFAULT_JOIN_BUFFER_SIZE
+from vizier.datastore.sort import DEFAULT_SORT_BUFFER_SIZE
+
+import vizier.datastore.aggregate as aggregate
+import vizier.datastore.convert as convert
+import vizier.datastore.dedup as dedup
+import vizier.datastore.derived as derived
+import vizier.datastore.join as join
 
 
 class VizualEngine(VizierSystemComponent):
@@ -57,6 +69,90 @@ class VizualEngine(VizierSystemComponent):
         """
         return [component_descriptor('vizual', self.system_build())]
 
+    @abstractmethod
+    def aggregate_dataset(self, identifier, columns, aggregates):
+        """Group the rows of a given dataset by the values in the given list
+        of columns and compute aggregate values for each group. The result is
+        stored as a new dataset that contains one column for each grouping
+        column followed by one column for each aggregate.
+
+        Each aggregate is a triple of aggregate function (see
+        vizier.datastore.aggregate), identifier of the aggregated column, and
+        an optional result column name. The column identifier is None for a
+        count of all rows in a group.
+
+        Raises ValueError if no dataset with given identifier exists, if any of
+        the columns are unknown, or if an aggregate function is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        columns: list(int)
+            List of column identifier for grouping columns
+        aggregates: list((string, int, string))
+            List of aggregate functions, column identifier, and result names
+
+        Returns
+        -------
+        int, string
+            Number of groups and identifier of resulting dataset
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def cast_column(self, identifier, column, data_type):
+        """Convert the values in a given column of a dataset to the given data
+        type (see vizier.datastore.convert). Missing values and values that
+        cannot be converted are set to None.
+
+        Raises ValueError if no dataset with given identifier exists, if the
+        specified column is unknown, or if the data type is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        data_type: string
+            Target data type
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def deduplicate(self, identifier, columns, keep):
+        """Remove duplicate rows from a given dataset. Rows are duplicates if
+        they have equal values in all of the given columns (or in all columns
+        if the list of columns is empty). Either the first or the last row for
+        each distinct key is kept. The order of the remaining rows does not
+        change.
+
+        Raises ValueError if no dataset with given identifier exists, if any
+        of the columns are unknown, or if the keep option is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        columns: list(int)
+            List of identifier for key columns
+        keep: string
+            Keep the first or last row for each key (see
+            vizier.datastore.dedup)
+
+        Returns
+        -------
+        int, string
+            Number of removed rows and identifier of resulting dataset
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def delete_column(self, identifier, column):
         """Delete a column in a given dataset.
@@ -101,6 +197,51 @@ class VizualEngine(VizierSystemComponent):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def fill_column(self, identifier, column, value):
+        """Set all values in a given column of a dataset to the given value.
+
+        Raises ValueError if no dataset with given identifier exists or if the
+        specified column is unknown.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        value: string
+            New cell value
+
+        Returns
+        -------
+        int, string
+            Number of updated rows and identifier of resulting dataset
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def fill_down(self, identifier, column):
+        """Replace missing values in a given column of a dataset with the
+        last non-missing value in a preceding row.
+
+        Raises ValueError if no dataset with given identifier exists or if the
+        specified column is unknown.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def filter_columns(self, identifier, columns, names):
         """Dataset projection operator. Returns a copy of the dataset with the
@@ -177,6 +318,44 @@ class VizualEngine(VizierSystemComponent):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def join_datasets(
+        self, left_identifier, right_identifier, left_columns, right_columns,
+        join_type
+    ):
+        """Join two datasets on the values of one or more pairs of columns.
+        The result is stored as a new dataset that contains the columns of
+        the left dataset followed by the columns of the right dataset. Rows
+        match if the values in all pairs of join columns are equal. Missing
+        values never match.
+
+        For a left outer join the rows in the left dataset that have no
+        matching row in the right dataset are included with missing values
+        for all columns of the right dataset.
+
+        Raises ValueError if either dataset does not exist, if any of the
+        columns are unknown, or if the join type is invalid.
+
+        Parameters
+        ----------
+        left_identifier: string
+            Unique identifier of the left dataset
+        right_identifier: string
+            Unique identifier of the right dataset
+        left_columns: list(int)
+            List of join column identifier in the left dataset
+        right_columns: list(int)
+            List of join column identifier in the right dataset
+        join_type: string
+            Join type (see vizier.datastore.join)
+
+        Returns
+        -------
+        int, string
+            Number of rows and identifier of resulting dataset
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def load_dataset(self, dataset_name, file_id):
         """Create (or load) a new dataset from a given Uri. The format of the
@@ -299,6 +478,33 @@ class VizualEngine(VizierSystemComponent):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def replace_values(self, identifier, column, pattern, replacement):
+        """Replace all matches of a regular expression in the values of a
+        given column of a dataset with the replacement string.
+
+        Raises ValueError if no dataset with given identifier exists, if the
+        specified column is unknown, or if the pattern is not a valid regular
+        expression.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        pattern: string
+            Regular expression
+        replacement: string
+            Replacement string for matches of the regular expression
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def sort_dataset(self, identifier, columns, reversed):
         """Sort the dataset with the given identifier according to the order by
@@ -357,10 +563,22 @@ class VizualEngine(VizierSystemComponent):
 
 
 class DefaultVizualEngine(VizualEngine):
-    """Default implementation for VizUAL DB Engine. Manipulates datasets in
-    memory and uses a datastore object to store changes.
+    """Default implementation for VizUAL DB Engine. Each command is
+    translated into an operation on the rows of the input dataset (see
+    vizier.datastore.derived). The result is stored as a derived dataset in
+    the datastore.
+
+    If the engine defers materialization, derived datasets are created without
+    writing their rows. Consecutive commands on the same dataset are then
+    collapsed by the datastore and applied in a single pass over the rows of
+    the original dataset.
     """
-    def __init__(self, datastore, fileserver, build=None):
+    def __init__(
+        self, datastore, fileserver, build=None,
+        sort_buffer_size=DEFAULT_SORT_BUFFER_SIZE, defer=False,
+        aggregate_buffer_size=DEFAULT_AGGREGATE_BUFFER_SIZE,
+        join_buffer_size=DEFAULT_JOIN_BUFFER_SIZE
+    ):
         """Initialize the datastore that is used to retrieve and update
         datasets and the file server managing CSV files.
 
@@ -370,12 +588,233 @@ class DefaultVizualEngine(VizualEngine):
             Datastore to retireve and update datasets.
         fileserver:  vizier.filestore.base.FileSever
             File server to access uploaded  CSV files
+        sort_buffer_size: int, optional
+            Memory budget (in bytes) for sorted runs when sorting datasets
+        defer: bool, optional
+            Defer the materialization of the rows of modified datasets
+        aggregate_buffer_size: int, optional
+            Memory budget (in bytes) for the group table when aggregating
+            datasets
+        join_buffer_size: int, optional
+            Memory budget (in bytes) for the hash table when joining datasets
         """
         if build is None:
             build = build_info('DefaultVizualEngine')
         super(DefaultVizualEngine, self).__init__(build)
         self.datastore = datastore
         self.fileserver = fileserver
+        self.sort_buffer_size = sort_buffer_size
+        self.defer = defer
+        self.aggregate_buffer_size = aggregate_buffer_size
+        self.join_buffer_size = join_buffer_size
+
+    def aggregate_dataset(self, identifier, columns, aggregates):
+        """Group the rows of a given dataset by the values in the given list
+        of columns and compute aggregate values for each group. The result is
+        stored as a new dataset that contains one column for each grouping
+        column followed by one column for each aggregate.
+
+        Each aggregate is a triple of aggregate function (see
+        vizier.datastore.aggregate), identifier of the aggregated column, and
+        an optional result column name. The column identifier is None for a
+        count of all rows in a group.
+
+        Rows are aggregated in a single pass over the values of the referenced
+        columns using a hash aggregation that spills to disk if the group
+        table exceeds the aggregate buffer size (see
+        vizier.datastore.aggregate.hash_aggregate).
+
+        Raises ValueError if no dataset with given identifier exists, if any of
+        the columns are unknown, or if an aggregate function is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        columns: list(int)
+            List of column identifier for grouping columns
+        aggregates: list((string, int, string))
+            List of aggregate functions, column identifier, and result names
+
+        Returns
+        -------
+        int, string
+            Number of groups and identifier of resulting dataset
+        """
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        # The schema of the new dataset contains the grouping columns followed
+        # by the aggregate columns. Only the values of referenced columns are
+        # read. Keep track of the position of each column in the read values.
+        schema = list()
+        col_ids = list()
+        groups = list()
+        for column in columns:
+            col = dataset.columns[get_index_for_column(dataset, column)]
+            if not col.identifier in col_ids:
+                col_ids.append(col.identifier)
+            schema.append(
+                DatasetColumn(
+                    identifier=len(schema),
+                    name=col.name,
+                    data_type=col.data_type
+                )
+            )
+            groups.append(col_ids.index(col.identifier))
+        agg_list = list()
+        for func, column, name in aggregates:
+            if not func in aggregate.AGGREGATE_FUNCTIONS:
+                raise ValueError('unknown aggregate function \'' + str(func) + '\'')
+            if column is None:
+                if func != aggregate.AGG_COUNT:
+                    raise ValueError('missing column for \'' + func + '\'')
+                agg_list.append((func, None))
+                col_name = func
+            else:
+                col = dataset.columns[get_index_for_column(dataset, column)]
+                if not col.identifier in col_ids:
+                    col_ids.append(col.identifier)
+                agg_list.append((func, col_ids.index(col.identifier)))
+                col_name = func + '_' + col.name
+            if not name is None:
+                col_name = name
+            schema.append(DatasetColumn(identifier=len(schema), name=col_name))
+        with dataset.reader(columns=col_ids) as reader:
+            result = aggregate.hash_aggregate(
+                (row.values for row in reader),
+                groups,
+                agg_list,
+                buffer_size=self.aggregate_buffer_size
+            )
+            # Assign new row identifier to the groups
+            ds = self.datastore.create_dataset(
+                columns=schema,
+                rows=(
+                    DatasetRow(rowid, values)
+                        for rowid, values in enumerate(result)
+                ),
+                column_counter=len(schema)
+            )
+        return ds.row_count, ds.identifier
+
+    def cast_column(self, identifier, column, data_type):
+        """Convert the values in a given column of a dataset to the given data
+        type (see vizier.datastore.convert). Missing values and values that
+        cannot be converted are set to None.
+
+        Values are converted in batches when the rows of the resulting dataset
+        are materialized. The data type is recorded in the column of the
+        resulting dataset. Values of numeric columns are stored as typed
+        arrays in columnar data files.
+
+        Raises ValueError if no dataset with given identifier exists, if the
+        specified column is unknown, or if the data type is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        data_type: string
+            Target data type
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        if not data_type in convert.DATA_TYPES:
+            raise ValueError('unknown data type \'' + str(data_type) + '\'')
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        col_idx = get_index_for_column(dataset, column)
+        col = dataset.columns[col_idx]
+        columns = list(dataset.columns)
+        columns[col_idx] = DatasetColumn(
+            identifier=col.identifier,
+            name=col.name,
+            data_type=data_type
+        )
+        # Store updated dataset to get new identifier
+        ds = self.derive_dataset(
+            dataset,
+            columns,
+            {
+                'type': derived.OP_CAST_COLUMN,
+                'position': col_idx,
+                'dataType': data_type
+            }
+        )
+        return dataset.row_count, ds.identifier
+
+    def deduplicate(self, identifier, columns, keep):
+        """Remove duplicate rows from a given dataset. Rows are duplicates if
+        they have equal values in all of the given columns (or in all columns
+        if the list of columns is empty). Either the first or the last row for
+        each distinct key is kept. The order of the remaining rows does not
+        change.
+
+        The rows that are kept are determined in the same pass over the values
+        of the key columns that creates the resulting dataset. The number of
+        rows in the result is therefore not known in advance and the datastore
+        materializes the result if it cannot determine the number otherwise.
+        Only the fingerprints of the distinct keys are held in memory.
+
+        Raises ValueError if no dataset with given identifier exists, if any
+        of the columns are unknown, or if the keep option is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        columns: list(int)
+            List of identifier for key columns
+        keep: string
+            Keep the first or last row for each key (see
+            vizier.datastore.dedup)
+
+        Returns
+        -------
+        int, string
+            Number of removed rows and identifier of resulting dataset
+        """
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        if not keep in dedup.KEEP_OPTIONS:
+            raise ValueError('invalid keep option \'' + str(keep) + '\'')
+        if len(columns) > 0:
+            positions = list()
+            for col_id in columns:
+                col_idx = get_index_for_column(dataset, col_id)
+                if not col_idx in positions:
+                    positions.append(col_idx)
+        else:
+            positions = range(len(dataset.columns))
+        # Store updated dataset to get new identifier. The number of rows is
+        # left to the datastore (see derive_dataset for the remaining
+        # arguments).
+        ds = self.datastore.create_derived_dataset(
+            dataset,
+            columns=dataset.columns,
+            operations=[{
+                'type': derived.OP_DEDUPLICATE,
+                'positions': positions,
+                'keep': keep
+            }],
+            row_count=None,
+            column_counter=dataset.column_counter,
+            row_counter=dataset.row_counter,
+            annotations=dataset.annotations,
+            materialize=not self.defer
+        )
+        return dataset.row_count - ds.row_count, ds.identifier
 
     def delete_column(self, identifier, column):
         """Delete a column in a given dataset.
@@ -405,17 +844,11 @@ class DefaultVizualEngine(VizualEngine):
         # Delete column from schema
         columns = list(dataset.columns)
         del columns[col_index]
-        # Delete all value for the deleted column
-        rows = dataset.fetch_rows()
-        for row in rows:
-            del row.values[col_index]
         # Store updated dataset to get new identifier
-        ds = self.datastore.create_dataset(
-            columns=columns,
-            rows=rows,
-            column_counter=dataset.column_counter,
-            row_counter=dataset.row_counter,
-            annotations=dataset.annotations
+        ds = self.derive_dataset(
+            dataset,
+            columns,
+            {'type': derived.OP_DELETE_COLUMN, 'position': col_index}
         )
         return 1, ds.identifier
 
@@ -443,21 +876,124 @@ class DefaultVizualEngine(VizualEngine):
         if dataset is None:
             raise ValueError('unknown dataset \'' + identifier + '\'')
         # Make sure that row refers a valid row in the dataset
-        rows = dataset.fetch_rows()
-        if row < 0 or row >= len(rows):
+        if row < 0 or row >= dataset.row_count:
             raise ValueError('invalid row index \'' + str(row) + '\'')
-        # Delete the row at the given position
-        del rows[row]
         # Store updated dataset to get new identifier
-        ds = self.datastore.create_dataset(
-            columns=dataset.columns,
-            rows=rows,
-            column_counter=dataset.column_counter,
-            row_counter=dataset.row_counter,
-            annotations=dataset.annotations
+        ds = self.derive_dataset(
+            dataset,
+            dataset.columns,
+            {'type': derived.OP_DELETE_ROW, 'position': row},
+            row_count=dataset.row_count - 1
         )
         return 1, ds.identifier
 
+    def derive_dataset(
+        self, dataset, columns, operation=None, row_count=None,
+        column_counter=None, row_counter=None, annotations=None
+    ):
+        """Create a dataset that is derived from the given dataset by a
+        single operation. Materialization of the dataset rows is deferred if
+        the engine defers materialization. Counters and annotations of the
+        source dataset are used unless given.
+
+        Parameters
+        ----------
+        dataset: vizier.datastore.base.DatasetHandle
+            Handle for the source dataset
+        columns: list(vizier.datastore.base.DatasetColumn)
+            List of columns in the derived dataset
+        operation: dict, optional
+            Operation on the rows of the source dataset
+        row_count: int, optional
+            Number of rows in the derived dataset
+        column_counter: int, optional
+            Counter to generate unique column identifier
+        row_counter: int, optional
+            Counter to generate unique row identifier
+        annotations: vizier.datastore.metadata.DatasetMetadata, optional
+            Annotations for dataset components
+
+        Returns
+        -------
+        vizier.datastore.base.DatasetHandle
+        """
+        return self.datastore.create_derived_dataset(
+            dataset,
+            columns=columns,
+            operations=[operation] if not operation is None else list(),
+            row_count=row_count if not row_count is None else dataset.row_count,
+            column_counter=column_counter if not column_counter is None else dataset.column_counter,
+            row_counter=row_counter if not row_counter is None else dataset.row_counter,
+            annotations=annotations if not annotations is None else dataset.annotations,
+            materialize=not self.defer
+        )
+
+    def fill_column(self, identifier, column, value):
+        """Set all values in a given column of a dataset to the given value.
+
+        Raises ValueError if no dataset with given identifier exists or if the
+        specified column is unknown.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        value: string
+            New cell value
+
+        Returns
+        -------
+        int, string
+            Number of updated rows and identifier of resulting dataset
+        """
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        col_idx = get_index_for_column(dataset, column)
+        columns, value = typed_value(dataset.columns, col_idx, value)
+        # Store updated dataset to get new identifier
+        ds = self.derive_dataset(
+            dataset,
+            columns,
+            {'type': derived.OP_FILL_COLUMN, 'position': col_idx, 'value': value}
+        )
+        return dataset.row_count, ds.identifier
+
+    def fill_down(self, identifier, column):
+        """Replace missing values in a given column of a dataset with the
+        last non-missing value in a preceding row.
+
+        Raises ValueError if no dataset with given identifier exists or if the
+        specified column is unknown.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        col_idx = get_index_for_column(dataset, column)
+        # Store updated dataset to get new identifier
+        ds = self.derive_dataset(
+            dataset,
+            dataset.columns,
+            {'type': derived.OP_FILL_DOWN, 'position': col_idx}
+        )
+        return dataset.row_count, ds.identifier
+
     def filter_columns(self, identifier, columns, names):
         """Dataset projection operator. Returns a copy of the dataset with the
         given identifier that contains only those columns listed in columns.
@@ -497,27 +1033,23 @@ class DefaultVizualEngine(VizualEngine):
             col = dataset.columns[col_idx]
             if not names[i] is None:
                 schema.append(
-                    DatasetColumn(identifier=col.identifier, name=names[i])
+                    DatasetColumn(
+                        identifier=col.identifier,
+                        name=names[i],
+                        data_type=col.data_type
+                    )
                 )
             else:
                 schema.append(col)
             val_filter.append(col_idx)
-        # Create a list of projected rows
-        rows = list()
-        for row in dataset.fetch_rows():
-            values = list()
-            for v_idx in val_filter:
-                values.append(row.values[v_idx])
-            rows.append(DatasetRow(identifier=row.identifier, values=values))
         # Store updated dataset to get new identifier
-        ds = self.datastore.create_dataset(
-            columns=schema,
-            rows=rows,
-            column_counter=dataset.column_counter,
-            row_counter=dataset.row_counter,
+        ds = self.derive_dataset(
+            dataset,
+            schema,
+            {'type': derived.OP_FILTER_COLUMNS, 'positions': val_filter},
             annotations=dataset.annotations.filter_columns(columns)
         )
-        return len(rows), ds.identifier
+        return dataset.row_count, ds.identifier
 
     def insert_column(self, identifier, position, name):
         """Insert column with given name at given position in dataset.
@@ -553,18 +1085,13 @@ class DefaultVizualEngine(VizualEngine):
             raise ValueError('invalid column index \'' + str(position) + '\'')
         # Insert new column into dataset
         columns = list(dataset.columns)
-        rows = dataset.fetch_rows()
         columns.insert(position, DatasetColumn(dataset.column_counter, name))
-         # Add a null value to each row for the new column
-        for row in rows:
-            row.values.insert(position, None)
         # Store updated dataset to get new identifier
-        ds = self.datastore.create_dataset(
-            columns=columns,
-            rows=rows,
-            column_counter=dataset.column_counter + 1,
-            row_counter=dataset.row_counter,
-            annotations=dataset.annotations
+        ds = self.derive_dataset(
+            dataset,
+            columns,
+            {'type': derived.OP_INSERT_COLUMN, 'position': position},
+            column_counter=dataset.column_counter + 1
         )
         return 1, ds.identifier
 
@@ -592,22 +1119,111 @@ class DefaultVizualEngine(VizualEngine):
         if dataset is None:
             raise ValueError('unknown dataset \'' + identifier + '\'')
         # Make sure that position is a valid row index in the new dataset
-        rows = dataset.fetch_rows()
-        if position < 0 or position > len(rows):
+        if position < 0 or position > dataset.row_count:
             raise ValueError('invalid row index \'' + str(position) + '\'')
-        # Create empty set of values
-        row = DatasetRow(dataset.row_counter, [None] * len(dataset.columns))
-        rows.insert(position, row)
-        # Store updated dataset to get new identifier
-        ds = self.datastore.create_dataset(
-            columns=dataset.columns,
-            rows=rows,
-            column_counter=dataset.column_counter,
-            row_counter=dataset.row_counter + 1,
-            annotations=dataset.annotations
+        # Store updated dataset to get new identifier. The new row has an
+        # empty set of values.
+        ds = self.derive_dataset(
+            dataset,
+            dataset.columns,
+            {
+                'type': derived.OP_INSERT_ROW,
+                'position': position,
+                'rowid': dataset.row_counter,
+                'columnCount': len(dataset.columns)
+            },
+            row_count=dataset.row_count + 1,
+            row_counter=dataset.row_counter + 1
         )
         return 1, ds.identifier
 
+    def join_datasets(
+        self, left_identifier, right_identifier, left_columns, right_columns,
+        join_type
+    ):
+        """Join two datasets on the values of one or more pairs of columns.
+        The result is stored as a new dataset that contains the columns of
+        the left dataset followed by the columns of the right dataset. Rows
+        match if the values in all pairs of join columns are equal. Missing
+        values never match.
+
+        For a left outer join the rows in the left dataset that have no
+        matching row in the right dataset are included with missing values
+        for all columns of the right dataset.
+
+        The smaller dataset is loaded into a hash table and the larger dataset
+        is streamed through its reader. Both datasets are partitioned into
+        temporary files if the smaller dataset exceeds the join buffer size
+        (see vizier.datastore.join.hash_join).
+
+        Raises ValueError if either dataset does not exist, if any of the
+        columns are unknown, or if the join type is invalid.
+
+        Parameters
+        ----------
+        left_identifier: string
+            Unique identifier of the left dataset
+        right_identifier: string
+            Unique identifier of the right dataset
+        left_columns: list(int)
+            List of join column identifier in the left dataset
+        right_columns: list(int)
+            List of join column identifier in the right dataset
+        join_type: string
+            Join type (see vizier.datastore.join)
+
+        Returns
+        -------
+        int, string
+            Number of rows and identifier of resulting dataset
+        """
+        # Get datasets. Raise exception if either dataset is unknown
+        left = self.datastore.get_dataset(left_identifier)
+        if left is None:
+            raise ValueError('unknown dataset \'' + left_identifier + '\'')
+        right = self.datastore.get_dataset(right_identifier)
+        if right is None:
+            raise ValueError('unknown dataset \'' + right_identifier + '\'')
+        if not join_type in join.JOIN_TYPES:
+            raise ValueError('unknown join type \'' + str(join_type) + '\'')
+        if len(left_columns) == 0 or len(left_columns) != len(right_columns):
+            raise ValueError('invalid join columns')
+        left_keys = [get_index_for_column(left, c) for c in left_columns]
+        right_keys = [get_index_for_column(right, c) for c in right_columns]
+        # The schema of the new dataset contains the columns of both datasets
+        # with new column identifier
+        schema = list()
+        for col in list(left.columns) + list(right.columns):
+            schema.append(
+                DatasetColumn(
+                    identifier=len(schema),
+                    name=col.name,
+                    data_type=col.data_type
+                )
+            )
+        with left.reader() as left_reader, right.reader() as right_reader:
+            result = join.hash_join(
+                (row.values for row in left_reader),
+                (row.values for row in right_reader),
+                left_keys,
+                right_keys,
+                len(left.columns),
+                len(right.columns),
+                join_type=join_type,
+                build_left=left.row_count < right.row_count,
+                buffer_size=self.join_buffer_size
+            )
+            # Assign new row identifier to the joined rows
+            ds = self.datastore.create_dataset(
+                columns=schema,
+                rows=(
+                    DatasetRow(rowid, values)
+                        for rowid, values in enumerate(result)
+                ),
+                column_counter=len(schema)
+            )
+        return ds.row_count, ds.identifier
+
     def load_dataset(self, file_id, detect_headers=True, infer_types=True, load_format='csv', options=[]):
         """Create (or load) a new dataset from a given Uri. The format of the
         Uri and the method to resolve the Uri and retireve the data are all
@@ -696,16 +1312,15 @@ class DefaultVizualEngine(VizualEngine):
         if source_idx != position:
             columns = list(dataset.columns)
             columns.insert(position, columns.pop(source_idx))
-            rows = dataset.fetch_rows()
-            for row in rows:
-                row.values.insert(position, row.values.pop(source_idx))
             # Store updated dataset to get new identifier
-            ds = self.datastore.create_dataset(
-                columns=columns,
-                rows=rows,
-                column_counter=dataset.column_counter,
-                row_counter=dataset.row_counter,
-                annotations=dataset.annotations
+            ds = self.derive_dataset(
+                dataset,
+                columns,
+                {
+                    'type': derived.OP_MOVE_COLUMN,
+                    'source': source_idx,
+                    'target': position
+                }
             )
             return 1, ds.identifier
         else:
@@ -737,22 +1352,18 @@ class DefaultVizualEngine(VizualEngine):
         if dataset is None:
             raise ValueError('unknown dataset \'' + identifier + '\'')
         # Make sure that row is within dataset bounds
-        rows = dataset.fetch_rows()
-        if row < 0 or row >= len(rows):
+        if row < 0 or row >= dataset.row_count:
             raise ValueError('invalid source row \'' + str(row) + '\'')
         # Make sure that position is a valid row index in the new dataset
-        if position < 0 or position > len(rows):
+        if position < 0 or position > dataset.row_count:
             raise ValueError('invalid target position \'' + str(position) + '\'')
         # No need to do anything if source position equals target position
         if row != position:
-            rows.insert(position, rows.pop(row))
             # Store updated dataset to get new identifier
-            ds = self.datastore.create_dataset(
-                columns=dataset.columns,
-                rows=rows,
-                column_counter=dataset.column_counter,
-                row_counter=dataset.row_counter,
-                annotations=dataset.annotations
+            ds = self.derive_dataset(
+                dataset,
+                dataset.columns,
+                {'type': derived.OP_MOVE_ROW, 'source': row, 'target': position}
             )
             return 1, ds.identifier
         else:
@@ -794,20 +1405,78 @@ class DefaultVizualEngine(VizualEngine):
             columns = list(dataset.columns)
             columns[col_idx] = DatasetColumn(
                 columns[col_idx].identifier,
-                name
-            )
-            # Store updated dataset to get new identifier
-            ds = self.datastore.create_dataset(
-                columns=columns,
-                rows=dataset.fetch_rows(),
-                column_counter=dataset.column_counter,
-                row_counter=dataset.row_counter,
-                annotations=dataset.annotations
+                name,
+                data_type=columns[col_idx].data_type
             )
+            # Store updated dataset to get new identifier. The dataset rows
+            # remain unchanged.
+            ds = self.derive_dataset(dataset, columns)
             return 1, ds.identifier
         else:
             return 0, identifier
 
+    def replace_values(self, identifier, column, pattern, replacement):
+        """Replace all matches of a regular expression in the values of a
+        given column of a dataset with the replacement string.
+
+        Raises ValueError if no dataset with given identifier exists, if the
+        specified column is unknown, if the pattern is not a valid regular
+        expression, or if the replacement string is invalid for the pattern.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        pattern: string
+            Regular expression
+        replacement: string
+            Replacement string for matches of the regular expression
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        # Validate the pattern and the replacement string before the rows are
+        # read. Otherwise, an invalid replacement string (e.g., a reference to
+        # an unknown group) would only be detected when the values of a
+        # deferred dataset are read.
+        try:
+            regex = re.compile(pattern)
+        except re.error:
+            raise ValueError('invalid regular expression \'' + pattern + '\'')
+        try:
+            groups, _ = sre_parse.parse_template(replacement, regex)
+        except (IndexError, re.error):
+            groups = None
+        if groups is None or max([0] + [g for _, g in groups]) > regex.groups:
+            raise ValueError('invalid replacement string \'' + replacement + '\'')
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        col_idx = get_index_for_column(dataset, column)
+        # Replaced values are strings. Numeric columns therefore lose their
+        # data type.
+        columns = list(dataset.columns)
+        if columns[col_idx].is_numeric():
+            col = columns[col_idx]
+            columns[col_idx] = DatasetColumn(col.identifier, col.name)
+        # Store updated dataset to get new identifier
+        ds = self.derive_dataset(
+            dataset,
+            columns,
+            {
+                'type': derived.OP_REPLACE_VALUES,
+                'position': col_idx,
+                'pattern': pattern,
+                'replacement': replacement
+            }
+        )
+        return dataset.row_count, ds.identifier
+
     def sort_dataset(self, identifier, columns, reversed):
         """Sort the dataset with the given identifier according to the order by
         statement. The order by statement is a pair of lists. The first list
@@ -821,6 +1490,10 @@ class DefaultVizualEngine(VizualEngine):
         Raises ValueError if no dataset with given identifier exists or if any
         of the columns in the order by clause are unknown.
 
+        Rows are sorted using an external merge sort on a composite sort key
+        (see vizier.datastore.sort.external_sort) when the sorted dataset is
+        materialized.
+
         Parameters
         ----------
         identifier: string
@@ -839,25 +1512,19 @@ class DefaultVizualEngine(VizualEngine):
         dataset = self.datastore.get_dataset(identifier)
         if dataset is None:
             raise ValueError('unknown dataset \'' + identifier + '\'')
-        # Fetch the full set of rows
-        rows = dataset.fetch_rows()
-        # Sort multiple times, ones for each of the sort columns (in reverse
-        # order of appearance in the order by clause)
-        for i in range(len(columns)):
-            l_idx = len(columns) - (i + 1)
-            col_id = columns[l_idx]
-            col_idx = get_index_for_column(dataset, col_id)
-            reverse = reversed[l_idx]
-            rows.sort(key=lambda row: row.values[col_idx], reverse=reverse)
+        positions = [get_index_for_column(dataset, col_id) for col_id in columns]
         # Store updated dataset to get new identifier
-        ds = self.datastore.create_dataset(
-            columns=dataset.columns,
-            rows=rows,
-            column_counter=dataset.column_counter,
-            row_counter=dataset.row_counter,
-            annotations=dataset.annotations
+        ds = self.derive_dataset(
+            dataset,
+            dataset.columns,
+            {
+                'type': derived.OP_SORT,
+                'positions': positions,
+                'reversed': reversed,
+                'bufferSize': self.sort_buffer_size
+            }
         )
-        return len(rows), ds.identifier
+        return dataset.row_count, ds.identifier
 
     def update_cell(self, identifier, column, row, value):
         """Update a cell in a given dataset.
@@ -889,20 +1556,52 @@ class DefaultVizualEngine(VizualEngine):
         # Get column index forst in case it raises an exception
         col_idx = get_index_for_column(dataset, column)
         # Make sure that row refers a valid row in the dataset
-        rows = dataset.fetch_rows()
-        if row < 0 or row >= len(rows):
+        if row < 0 or row >= dataset.row_count:
             raise ValueError('invalid cell [' + str(column) + ', ' + str(row) + ']')
-        # Update the specified cell in the given data array
-        r = rows[row]
-        values = list(r.values)
-        values[col_idx] = value
-        rows[row] = DatasetRow(r.identifier, values)
+        columns, value = typed_value(dataset.columns, col_idx, value)
         # Store updated dataset to get new identifier
-        ds = self.datastore.create_dataset(
-            columns=dataset.columns,
-            rows=rows,
-            column_counter=dataset.column_counter,
-            row_counter=dataset.row_counter,
-            annotations=dataset.annotations
+        ds = self.derive_dataset(
+            dataset,
+            columns,
+            {
+                'type': derived.OP_UPDATE_CELL,
+                'row': row,
+                'column': col_idx,
+                'value': value
+            }
         )
         return 1, ds.identifier
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def typed_value(columns, col_idx, value):
+    """Prepare a new value for a column. If the column has a data type the
+    value is converted to that type. If the value cannot be converted the
+    column loses its data type. Returns the (modified) list of columns and
+    the value.
+
+    Parameters
+    ----------
+    columns: list(vizier.datastore.base.DatasetColumn)
+        List of dataset columns
+    col_idx: int
+        Index position of the column
+    value: string
+        New cell value
+
+    Returns
+    -------
+    list(vizier.datastore.base.DatasetColumn), any
+    """
+    col = columns[col_idx]
+    if col.data_type is None or value is None or value == '':
+        return columns, value
+    typed = cast_value(value, col.data_type)
+    if typed is None:
+        columns = list(columns)
+        columns[col_idx] = DatasetColumn(col.identifier, col.name)
+        return columns, value
+    return columns, typed
@@ -20,9 +20,11 @@ via VizUAL commands.
 """
 
 from abc import abstractmethod
+from array import array
 import csv
 import gzip
 import json
+import re
 
 import vistrails.packages.mimir.init as mimir
 
@@ -33,6 +35,9 @@ from vizier.datastore.mimir import MimirDatasetColumn
 from vizier.datastore.mimir import COL_PREFIX, ROW_ID
 from vizier.workflow.vizual.base import DefaultVizualEngine
 
+import vizier.datastore.convert as convert
+import vizier.datastore.dedup as dedup
+
 
 class MimirVizualEngine(DefaultVizualEngine):
     """Implementation for VizUAL DB Engine unsing Mimir. Translates most VizUAL
@@ -55,6 +60,152 @@ class MimirVizualEngine(DefaultVizualEngine):
             build=build_info('MimirVizualEngine')
         )
 
+    def cast_column(self, identifier, column, data_type):
+        """Convert the values in a given column of a dataset to the given data
+        type. The conversion is done by the database using a SQL CAST in the
+        view for the resulting dataset.
+
+        Raises ValueError if no dataset with given identifier exists, if the
+        specified column is unknown, or if the data type is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        data_type: string
+            Target data type
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        if not data_type in convert.DATA_TYPES:
+            raise ValueError('unknown data type \'' + str(data_type) + '\'')
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        # Get the index of the specified column
+        col_index = get_index_for_column(dataset, column)
+        # Create a view that converts the column values
+        schema = list(dataset.columns)
+        col_list = [ROW_ID]
+        for i in range(len(schema)):
+            col = schema[i]
+            if i == col_index:
+                col_list.append(
+                    'CAST(' + col.name_in_rdb + ' AS ' + data_type.upper() +
+                    ') AS ' + col.name_in_rdb
+                )
+                schema[i] = MimirDatasetColumn(
+                    col.identifier,
+                    col.name,
+                    col.name_in_rdb,
+                    data_type
+                )
+            else:
+                col_list.append(col.name_in_rdb)
+        sql = 'SELECT ' + ','.join(col_list) + ' FROM ' + dataset.table_name
+        view_name = mimir._mimir.createView(dataset.table_name, sql)
+        # Store updated dataset information with new identifier
+        ds = self.datastore.register_dataset(
+            table_name=view_name,
+            columns=schema,
+            row_ids=dataset.row_ids,
+            column_counter=dataset.column_counter,
+            row_counter=dataset.row_counter,
+            annotations=dataset.annotations
+        )
+        return len(dataset.row_ids), ds.identifier
+
+    def deduplicate(self, identifier, columns, keep):
+        """Remove duplicate rows from a given dataset. Rows are duplicates if
+        they have equal values in all of the given columns (or in all columns
+        if the list of columns is empty). Either the first or the last row for
+        each distinct key is kept. The order of the remaining rows does not
+        change.
+
+        The remaining rows are determined in a single pass over the values of
+        the key columns (see vizier.datastore.dedup). The view for the result
+        selects the remaining rows by their identifier.
+
+        Raises ValueError if no dataset with given identifier exists, if any
+        of the columns are unknown, or if the keep option is invalid.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        columns: list(int)
+            List of identifier for key columns
+        keep: string
+            Keep the first or last row for each key (see
+            vizier.datastore.dedup)
+
+        Returns
+        -------
+        int, string
+            Number of removed rows and identifier of resulting dataset
+        """
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        if not keep in dedup.KEEP_OPTIONS:
+            raise ValueError('invalid keep option \'' + str(keep) + '\'')
+        if len(columns) > 0:
+            col_ids = list()
+            for col_id in columns:
+                col = dataset.columns[get_index_for_column(dataset, col_id)]
+                if not col.identifier in col_ids:
+                    col_ids.append(col.identifier)
+        else:
+            col_ids = [col.identifier for col in dataset.columns]
+        # Compute the fingerprints of all rows and select the identifier of
+        # the remaining rows
+        row_ids = list()
+        with dataset.reader(columns=col_ids) as reader:
+            fps = array('l')
+            checks = array('l')
+            for row in reader:
+                fp, check = dedup.fingerprint(row.values)
+                fps.append(fp)
+                checks.append(check)
+                row_ids.append(row.identifier)
+        rows = [row_ids[pos] for pos in dedup.distinct_positions(fps, checks, keep=keep)]
+        # Create a view that contains only the remaining rows. List the
+        # removed rows if there are fewer of them.
+        col_list = [ROW_ID]
+        for col in dataset.columns:
+            col_list.append(col.name_in_rdb)
+        sql = 'SELECT ' + ','.join(col_list) + ' FROM ' + dataset.table_name
+        if len(rows) < len(row_ids):
+            if 2 * len(rows) <= len(row_ids):
+                selected = rows
+                sql += ' WHERE ' + ROW_ID + ' IN ('
+            else:
+                kept = set(rows)
+                selected = [rid for rid in row_ids if not rid in kept]
+                sql += ' WHERE ' + ROW_ID + ' NOT IN ('
+            sql += ','.join([
+                dataset.rowid_column.to_sql_value(rid) for rid in selected
+            ])
+            sql += ')'
+        view_name = mimir._mimir.createView(dataset.table_name, sql)
+        # Store updated dataset information with new identifier
+        ds = self.datastore.register_dataset(
+            table_name=view_name,
+            columns=dataset.columns,
+            row_ids=rows,
+            column_counter=dataset.column_counter,
+            row_counter=dataset.row_counter,
+            annotations=dataset.annotations
+        )
+        return len(row_ids) - len(rows), ds.identifier
+
     def delete_column(self, identifier, column):
         """Delete a column in a given dataset.
 
@@ -149,6 +300,122 @@ class MimirVizualEngine(DefaultVizualEngine):
         )
         return 1, ds.identifier
 
+    def fill_column(self, identifier, column, value):
+        """Set all values in a given column of a dataset to the given value.
+
+        Raises ValueError if no dataset with given identifier exists or if the
+        specified column is unknown.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        value: string
+            New cell value
+
+        Returns
+        -------
+        int, string
+            Number of updated rows and identifier of resulting dataset
+        """
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        # Get the index of the specified column
+        col_index = get_index_for_column(dataset, column)
+        # Create a view that replaces the column with a constant
+        col_list = [ROW_ID]
+        for i in range(len(dataset.columns)):
+            col = dataset.columns[i]
+            if i == col_index:
+                try:
+                    val_stmt = col.to_sql_value(value)
+                except ValueError:
+                    val_stmt = sql_string(value)
+                col_list.append(val_stmt + ' AS ' + col.name_in_rdb)
+            else:
+                col_list.append(col.name_in_rdb)
+        sql = 'SELECT ' + ','.join(col_list) + ' FROM ' + dataset.table_name
+        view_name = mimir._mimir.createView(dataset.table_name, sql)
+        # Store updated dataset information with new identifier
+        ds = self.datastore.register_dataset(
+            table_name=view_name,
+            columns=dataset.columns,
+            row_ids=dataset.row_ids,
+            column_counter=dataset.column_counter,
+            row_counter=dataset.row_counter,
+            annotations=dataset.annotations
+        )
+        return len(dataset.row_ids), ds.identifier
+
+    def fill_down(self, identifier, column):
+        """Replace missing values in a given column of a dataset with the
+        last non-missing value in a preceding row.
+
+        The view uses a window over the rows in dataset order. Rows are
+        ordered by their identifier if the row identifier are in ascending
+        order. Otherwise, the position of each row is encoded in the window
+        order expression.
+
+        Raises ValueError if no dataset with given identifier exists or if the
+        specified column is unknown.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        # Get the index of the specified column
+        col_index = get_index_for_column(dataset, column)
+        # Order expression for the rows in the dataset
+        row_ids = [int(r) for r in dataset.row_ids]
+        if row_ids == sorted(row_ids):
+            order_by = ROW_ID
+        else:
+            order_by = 'CASE ' + ROW_ID
+            for pos in range(len(row_ids)):
+                rid_sql = dataset.rowid_column.to_sql_value(row_ids[pos])
+                order_by += ' WHEN ' + rid_sql + ' THEN ' + str(pos)
+            order_by += ' END'
+        # Create a view that replaces missing values with the last
+        # non-missing value in the window of preceding rows
+        col_list = [ROW_ID]
+        for i in range(len(dataset.columns)):
+            col = dataset.columns[i]
+            if i == col_index:
+                stmt = 'LAST(' + col.name_in_rdb + ', TRUE) OVER (ORDER BY '
+                stmt += order_by
+                stmt += ' ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)'
+                col_list.append(stmt + ' AS ' + col.name_in_rdb)
+            else:
+                col_list.append(col.name_in_rdb)
+        sql = 'SELECT ' + ','.join(col_list) + ' FROM ' + dataset.table_name
+        view_name = mimir._mimir.createView(dataset.table_name, sql)
+        # Store updated dataset information with new identifier
+        ds = self.datastore.register_dataset(
+            table_name=view_name,
+            columns=dataset.columns,
+            row_ids=dataset.row_ids,
+            column_counter=dataset.column_counter,
+            row_counter=dataset.row_counter,
+            annotations=dataset.annotations
+        )
+        return len(dataset.row_ids), ds.identifier
+
     def filter_columns(self, identifier, columns, names):
         """Dataset projection operator. Returns a copy of the dataset with the
         given identifier that contains only those columns listed in columns.
@@ -471,6 +738,65 @@ class MimirVizualEngine(DefaultVizualEngine):
         else:
             return 0, identifier
 
+    def replace_values(self, identifier, column, pattern, replacement):
+        """Replace all matches of a regular expression in the values of a
+        given column of a dataset with the replacement string.
+
+        Raises ValueError if no dataset with given identifier exists, if the
+        specified column is unknown, or if the pattern is not a valid regular
+        expression.
+
+        Parameters
+        ----------
+        identifier: string
+            Unique dataset identifier
+        column: int
+            Unique column identifier
+        pattern: string
+            Regular expression
+        replacement: string
+            Replacement string for matches of the regular expression
+
+        Returns
+        -------
+        int, string
+            Number of rows in the dataset and identifier of resulting dataset
+        """
+        # Validate the pattern before the view is created
+        try:
+            re.compile(pattern)
+        except re.error:
+            raise ValueError('invalid regular expression \'' + pattern + '\'')
+        # Get dataset. Raise exception if dataset is unknown
+        dataset = self.datastore.get_dataset(identifier)
+        if dataset is None:
+            raise ValueError('unknown dataset \'' + identifier + '\'')
+        # Get the index of the specified column
+        col_index = get_index_for_column(dataset, column)
+        # Create a view that replaces matches in the column values
+        col_list = [ROW_ID]
+        for i in range(len(dataset.columns)):
+            col = dataset.columns[i]
+            if i == col_index:
+                stmt = 'REGEXP_REPLACE(CAST({{input}}.' + col.name_in_rdb
+                stmt += ' AS varchar), ' + sql_string(pattern) + ', '
+                stmt += sql_string(replacement) + ')'
+                col_list.append(stmt + ' AS ' + col.name_in_rdb)
+            else:
+                col_list.append(col.name_in_rdb)
+        sql = 'SELECT ' + ','.join(col_list) + ' FROM ' + dataset.table_name
+        view_name = mimir._mimir.createView(dataset.table_name, sql)
+        # Store updated dataset information with new identifier
+        ds = self.datastore.register_dataset(
+            table_name=view_name,
+            columns=dataset.columns,
+            row_ids=dataset.row_ids,
+            column_counter=dataset.column_counter,
+            row_counter=dataset.row_counter,
+            annotations=dataset.annotations
+        )
+        return len(dataset.row_ids), ds.identifier
+
     def sort_dataset(self, identifier, columns, reversed):
         """Sort the dataset with the given identifier according to the order by
         statement. The order by statement is a pair of lists. The first list
@@ -591,3 +917,23 @@ class MimirVizualEngine(DefaultVizualEngine):
             annotations=dataset.annotations
         )
         return 1, ds.identifier
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def sql_string(value):
+    """Get SQL string literal for the given value. Single quotes in the value
+    are escaped.
+
+    Parameters
+    ----------
+    value: string
+        String value
+
+    Returns
+    -------
+    string
+    """
+    return '\'' + str(value).replace('\'', '\'\'') + '\''